@@ -0,0 +1,493 @@
+import asyncio
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Deque, Dict, FrozenSet, List, Optional
+
+import jwt
+from fastapi_users.jwt import decode_jwt
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import TTLCache
+from app.config import Settings, get_settings
+from app.metrics import REGISTRY, Counter, Gauge, Histogram
+from app.responses import NegotiatedResponse
+
+"""
+Admission control: per-user rate limits and concurrency caps, and global
+load shedding, in front of every HTTP route.
+
+Requests are keyed by the JWT subject (the user ID; the signature is
+checked, so a forged token cannot drain someone else's allowance), or by
+client IP when there is no valid token. For each request:
+
+1. per-user token bucket (`admission_user_rate_per_second`, burst
+   `admission_user_burst`); empty → 429 with Retry-After,
+2. per-user concurrent requests (`admission_user_max_concurrent`) → 429,
+3. global concurrency (`admission_max_concurrent`, by default the DB pool
+   capacity): excess requests wait in a bounded FIFO queue. A full queue,
+   or a wait longer than `admission_queue_timeout_seconds`, → 503 with
+   Retry-After. Overload is turned away here, cheaply, instead of piling
+   up on the connection pool until `db_pool_timeout`.
+
+A request's global slot is freed once its response starts (the handler and
+its queries are done), so long streaming bodies (SSE, NDJSON) do not hold
+it; its per-user slot is held until the body is sent. Exempt paths (the
+root health check, /metrics) and WebSockets always get through.
+
+State lives in process memory. With `admission_redis_url`, the per-user
+buckets and concurrency counts are shared by all workers through Redis;
+queueing and shedding stay per worker, like the DB pool they protect.
+"""
+
+logger = logging.getLogger(__name__)
+
+# 📊 Admission metrics
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "admission_rejected_total", "Requests turned away by admission control", ("reason",),
+))
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "admission_in_flight", "Requests holding a global admission slot",
+))
+ADMISSION_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "admission_queue_depth", "Requests waiting for a global admission slot",
+))
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    "admission_wait_seconds", "Time queued for a global admission slot",
+))
+
+AUDIENCE = ["fastapi-users:auth"]
+
+
+class Rejected(Exception):
+    """
+    A request that must be turned away, with its status and retry hint.
+    """
+
+    def __init__(self, reason: str, status_code: int, retry_after: float, detail: str) -> None:
+        super().__init__(detail)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+# -------------------------------------------------------
+# 🪣 Per-user state (process memory or Redis)
+# -------------------------------------------------------
+
+class AdmissionBackend(ABC):
+    """
+    Per-key token buckets and concurrency counts.
+    """
+
+    @abstractmethod
+    async def take(self, key: str) -> float:
+        """
+        Take one token from `key`'s bucket.
+
+        Returns:
+            float: 0 if a token was taken, else seconds until one is available.
+        """
+
+    @abstractmethod
+    async def acquire(self, key: str) -> bool:
+        """
+        Claim one of `key`'s concurrent-request slots; False if all are taken.
+        """
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """
+        Give back a slot claimed by `acquire`.
+        """
+
+
+class MemoryBackend(AdmissionBackend):
+    """
+    In-process buckets. A bucket is dropped once it would have refilled,
+    which is the same as starting a full one, so memory stays bounded by
+    the recently active keys.
+
+    Args:
+        rate (float): Tokens added per second (0 disables rate limiting).
+        burst (int): Bucket size.
+        max_concurrent (int): Concurrent requests per key (0 disables the cap).
+        clock (Callable[[], float]): Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self, rate: float, burst: int, max_concurrent: int, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.clock = clock
+        refill = burst / rate if rate > 0 else 1.0
+        self._buckets: TTLCache[str, List[float]] = TTLCache(
+            maxsize=100_000, default_ttl=refill, clock=clock
+        )
+        self._active: Dict[str, int] = {}
+
+    async def take(self, key: str) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        if tokens < 1:
+            self._buckets.set(key, [tokens, now])
+            return (1 - tokens) / self.rate
+        self._buckets.set(key, [tokens - 1, now])
+        return 0.0
+
+    async def acquire(self, key: str) -> bool:
+        if self.max_concurrent <= 0:
+            return True
+        active = self._active.get(key, 0)
+        if active >= self.max_concurrent:
+            return False
+        self._active[key] = active + 1
+        return True
+
+    async def release(self, key: str) -> None:
+        if self.max_concurrent <= 0:
+            return
+        active = self._active.get(key, 0) - 1
+        if active > 0:
+            self._active[key] = active
+        else:
+            self._active.pop(key, None)
+
+
+# Atomic token bucket: KEYS[1] bucket hash; ARGV rate, burst, now (s), ttl (s)
+_TAKE_SCRIPT = """
+local rate, burst, now, ttl = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens < 1 then
+  wait = (1 - tokens) / rate
+else
+  tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ttl)
+return tostring(wait)
+"""
+
+
+class RedisBackend(AdmissionBackend):
+    """
+    Buckets and concurrency counts shared by all workers through Redis.
+
+    If Redis is unreachable, falls back to `fallback` (per-worker limits)
+    rather than failing requests.
+
+    Args:
+        redis_url (str): Redis connection URL.
+        fallback (MemoryBackend): Limits (and state) used when Redis fails.
+        slot_ttl (int): Seconds after which a leaked concurrency count expires
+            (e.g., a worker killed mid-request).
+    """
+
+    key_prefix = "stockmind:admission:"
+
+    def __init__(self, redis_url: str, fallback: MemoryBackend, slot_ttl: int = 300) -> None:
+        from redis import asyncio as redis_asyncio
+
+        self._redis = redis_asyncio.from_url(redis_url)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+        self.fallback = fallback
+        self.slot_ttl = slot_ttl
+        self._local_slots: Dict[str, int] = {}
+
+    async def take(self, key: str) -> float:
+        fallback = self.fallback
+        if fallback.rate <= 0:
+            return 0.0
+        ttl = max(1, math.ceil(fallback.burst / fallback.rate))
+        try:
+            wait = await self._take(
+                keys=[f"{self.key_prefix}bucket:{key}"],
+                args=[fallback.rate, fallback.burst, time.time(), ttl],
+            )
+            return float(wait)
+        except Exception:
+            logger.warning("Admission rate limit in Redis failed", exc_info=True)
+            return await fallback.take(key)
+
+    async def acquire(self, key: str) -> bool:
+        if self.fallback.max_concurrent <= 0:
+            return True
+        name = f"{self.key_prefix}active:{key}"
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                active, _ = await pipe.incr(name).expire(name, self.slot_ttl).execute()
+            if active > self.fallback.max_concurrent:
+                await self._redis.decr(name)
+                return False
+            return True
+        except Exception:
+            logger.warning("Admission concurrency cap in Redis failed", exc_info=True)
+            if not await self.fallback.acquire(key):
+                return False
+            self._local_slots[key] = self._local_slots.get(key, 0) + 1
+            return True
+
+    async def release(self, key: str) -> None:
+        if self.fallback.max_concurrent <= 0:
+            return
+        local = self._local_slots.get(key, 0)
+        if local:  # claimed from the fallback while Redis was down
+            if local > 1:
+                self._local_slots[key] = local - 1
+            else:
+                del self._local_slots[key]
+            await self.fallback.release(key)
+            return
+        name = f"{self.key_prefix}active:{key}"
+        try:
+            if await self._redis.decr(name) <= 0:
+                await self._redis.delete(name)
+        except Exception:
+            logger.warning("Admission concurrency release in Redis failed", exc_info=True)
+
+
+# -------------------------------------------------------
+# 🚦 Global concurrency with a bounded wait queue
+# -------------------------------------------------------
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` requests admitted at once; up to `max_queue` more wait
+    (first in, first out) for at most `timeout` seconds.
+
+    Args:
+        limit (int): Concurrent requests admitted.
+        max_queue (int): Requests allowed to wait.
+        timeout (float): Longest wait before giving up.
+    """
+
+    def __init__(self, limit: int, max_queue: int, timeout: float) -> None:
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _report(self) -> None:
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+    async def acquire(self) -> None:
+        """
+        Wait for a slot.
+
+        Raises:
+            Rejected: If the queue is full or the wait times out.
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self._report()
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise Rejected("queue_full", 503, 1.0, "Server busy, retry shortly.")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._report()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=self.timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # handed a slot just as the client went away
+            else:
+                self._drop(waiter)
+            raise
+        finally:
+            ADMISSION_WAIT.observe(time.perf_counter() - started)
+        if not waiter.done():
+            self._drop(waiter)
+            raise Rejected("queue_timeout", 503, 1.0, "Server busy, retry shortly.")
+
+    def _drop(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._report()
+
+    def release(self) -> None:
+        """
+        Free a slot, handing it straight to the longest waiter if any.
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot moves over; in_flight is unchanged
+                self._report()
+                return
+        self.in_flight -= 1
+        self._report()
+
+
+# -------------------------------------------------------
+# 🛂 Middleware
+# -------------------------------------------------------
+
+class AdmissionController:
+    """
+    Decides, per request, whether it may run now, wait, or be turned away.
+
+    Args:
+        backend (AdmissionBackend): Per-user buckets and concurrency.
+        limiter (ConcurrencyLimiter): Global concurrency and queue.
+        secret (str): JWT signing secret, to identify users.
+        exempt_paths (FrozenSet[str]): Paths that are never limited.
+    """
+
+    def __init__(
+        self,
+        backend: AdmissionBackend,
+        limiter: ConcurrencyLimiter,
+        secret: str,
+        exempt_paths: FrozenSet[str] = frozenset(),
+    ) -> None:
+        self.backend = backend
+        self.limiter = limiter
+        self.secret = secret
+        self.exempt_paths = exempt_paths
+        # token → subject, so each token's signature is checked once a minute at most
+        self._subjects: TTLCache[bytes, str] = TTLCache(maxsize=100_000, default_ttl=60.0)
+
+    def client_key(self, scope: Scope) -> str:
+        """
+        "user:<id>" for a valid bearer token, else "ip:<client address>".
+        """
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                if value[:7].lower() == b"bearer ":
+                    token = value[7:].strip()
+                    subject = self._subjects.get(token)
+                    if subject is None:
+                        try:
+                            data = decode_jwt(token.decode("latin-1"), self.secret, AUDIENCE)
+                            subject = str(data.get("sub") or "")
+                        except jwt.PyJWTError:
+                            subject = ""
+                        self._subjects.set(token, subject)
+                    if subject:
+                        return f"user:{subject}"
+                break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def admit(self, key: str) -> None:
+        """
+        Take a rate-limit token and a per-user slot for `key`.
+
+        Raises:
+            Rejected: Over the rate limit or the per-user concurrency cap.
+        """
+        wait = await self.backend.take(key)
+        if wait > 0:
+            raise Rejected("rate_limited", 429, wait, "Too many requests, slow down.")
+        if not await self.backend.acquire(key):
+            raise Rejected("user_concurrency", 429, 1.0, "Too many requests in progress.")
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware applying `AdmissionController` to HTTP requests.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        controller = self.controller
+        if scope["type"] != "http" or scope["path"] in controller.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        key = controller.client_key(scope)
+        try:
+            await controller.admit(key)
+        except Rejected as rejection:
+            await self._reject(rejection, scope, receive, send)
+            return
+        try:
+            await controller.limiter.acquire()
+        except Rejected as rejection:
+            await controller.backend.release(key)
+            await self._reject(rejection, scope, receive, send)
+            return
+
+        holding = True
+
+        def free_slot() -> None:
+            nonlocal holding
+            if holding:
+                holding = False
+                controller.limiter.release()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                free_slot()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            free_slot()
+            await controller.backend.release(key)
+
+    @staticmethod
+    async def _reject(rejection: Rejected, scope: Scope, receive: Receive, send: Send) -> None:
+        ADMISSION_REJECTED.inc(reason=rejection.reason)
+        response = NegotiatedResponse(
+            status_code=rejection.status_code,
+            content={"detail": rejection.detail},
+            headers={"Retry-After": str(max(1, math.ceil(rejection.retry_after)))},
+        )
+        await response(scope, receive, send)
+
+
+def create_admission_controller(settings: Optional[Settings] = None) -> AdmissionController:
+    """
+    Build a controller from the `admission_*` settings.
+    """
+    settings = settings or get_settings()
+    memory = MemoryBackend(
+        rate=settings.admission_user_rate_per_second,
+        burst=settings.admission_user_burst,
+        max_concurrent=settings.admission_user_max_concurrent,
+    )
+    backend: AdmissionBackend = memory
+    if settings.admission_redis_url:
+        backend = RedisBackend(settings.admission_redis_url, fallback=memory)
+    limit = settings.admission_max_concurrent or settings.db_pool_size + settings.db_max_overflow
+    return AdmissionController(
+        backend,
+        ConcurrencyLimiter(
+            limit, settings.admission_max_queue, settings.admission_queue_timeout_seconds
+        ),
+        secret=settings.jwt_secret,
+        exempt_paths=frozenset(
+            path.strip() for path in settings.admission_exempt_paths.split(",") if path.strip()
+        ),
+    )
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, NamedTuple, Optional, TypeVar
+
+"""
+In-process TTL + LRU cache shared by the market, user and insight layers.
+
+Entries expire after a per-entry time-to-live and the least recently used
+entry is evicted once the cache is full. All operations are O(1) and guarded
+by a lock so the cache can be touched from the event loop and worker threads.
+"""
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class CacheEntry(NamedTuple, Generic[V]):
+    """
+    A cached value together with the clock readings it was stored and expires at.
+    """
+    value: V
+    stored_at: float
+    expires_at: float
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Bounded mapping whose entries expire after a time-to-live.
+
+    Args:
+        maxsize (int): Maximum number of entries kept before LRU eviction.
+        default_ttl (float): Lifetime in seconds used when `set` gets no `ttl`.
+        clock (Callable[[], float]): Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        default_ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._data: "OrderedDict[K, CacheEntry[V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: K, allow_stale: bool = False) -> Optional[CacheEntry[V]]:
+        """
+        Return the full entry for `key`, or None if missing.
+
+        Expired entries are dropped unless `allow_stale` is set, in which case
+        they are returned as-is so callers can serve them while refreshing.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= self.clock() and not allow_stale:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """
+        Return the fresh value for `key`, or `default`.
+        """
+        entry = self.get_entry(key)
+        return default if entry is None else entry.value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """
+        Store `value` under `key` for `ttl` seconds (defaults to `default_ttl`).
+        """
+        now = self.clock()
+        lifetime = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = CacheEntry(value, now, now + lifetime)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K) -> Optional[V]:
+        """
+        Remove `key` and return its value (fresh or not), or None.
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return None if entry is None else entry.value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return self.get_entry(key) is not None  # type: ignore[arg-type]
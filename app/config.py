@@ -0,0 +1,235 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Mapping, Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+"""
+Typed application settings.
+
+Every field can be overridden by an environment variable of the same name in
+upper case (e.g., `db_pool_size` ← `DB_POOL_SIZE`), or by a `.env` file in the
+working directory. Values are validated and coerced by Pydantic, so a typo
+like `DB_POOL_SIZE=ten` fails at startup instead of at the first query.
+"""
+
+# Generated data (bar store, replay recordings) goes under the project root,
+# not the working directory the app or a benchmark happens to start in
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+class Settings(BaseModel):
+    """
+    Runtime configuration for the API, database engine and integrations.
+    """
+
+    # 🗄️ Database engine
+    database_url: str = Field(
+        "sqlite+aiosqlite:///./stockmind.db", description="Async SQLAlchemy URL"
+    )
+    db_echo: bool = Field(False, description="Log every SQL statement (development only)")
+    db_pool_size: int = Field(5, ge=1, description="Connections kept open in the pool")
+    db_max_overflow: int = Field(10, ge=0, description="Extra connections allowed under burst")
+    db_pool_timeout: float = Field(30.0, gt=0, description="Seconds to wait for a free connection")
+    db_pool_recycle: int = Field(
+        1800, description="Recycle connections older than this many seconds (-1 disables)"
+    )
+    db_pool_pre_ping: bool = Field(True, description="Test connections before handing them out")
+    db_statement_timeout_ms: int = Field(
+        0, ge=0, description="Server-side statement timeout (PostgreSQL; 0 disables)"
+    )
+
+    # 🔀 Read replicas (reads routed by app.db.database.session_router)
+    database_replica_urls: str = Field(
+        "", description="Comma-separated async URLs of read replicas (empty: primary only)"
+    )
+    db_read_your_writes_seconds: float = Field(
+        5.0, ge=0, description="Keep a user's reads on the primary this long after their write"
+    )
+    db_replica_eviction_seconds: float = Field(
+        30.0, gt=0, description="Leave a failing replica out of rotation this long"
+    )
+
+    # 🪶 SQLite pragmas (applied on every new connection when the URL is SQLite)
+    sqlite_journal_mode: str = Field("WAL", description="WAL lets readers run during writes")
+    sqlite_synchronous: str = Field("NORMAL", description="NORMAL is durable enough with WAL")
+    sqlite_mmap_size: int = Field(256 * 1024 * 1024, ge=0, description="Bytes of the file to mmap")
+    sqlite_cache_size_kib: int = Field(64 * 1024, ge=0, description="Page cache size in KiB")
+    sqlite_busy_timeout_ms: int = Field(5000, ge=0, description="Wait this long on a locked DB")
+
+    # 🔐 Authentication
+    jwt_secret: str = Field(
+        "SUPER_SECRET_JWT_KEY", description="Signs access, reset and verification tokens"
+    )
+    jwt_lifetime_seconds: int = Field(3600, gt=0, description="Access token lifetime")
+    user_cache_ttl_seconds: float = Field(
+        60.0, ge=0, description="How long a resolved user is reused (0 disables the cache)"
+    )
+    user_cache_maxsize: int = Field(10000, ge=1, description="Users kept in process memory")
+    user_cache_redis_url: Optional[str] = Field(
+        None, description="Share the user cache across workers via Redis"
+    )
+    user_cache_local_ttl_seconds: float = Field(
+        5.0, ge=0, description="In-process TTL in front of Redis (bounds cross-worker staleness)"
+    )
+
+    # 🔑 Password hashing (runs off the event loop; see app/users/passwords.py)
+    password_hash_executor: str = Field("thread", description="thread, process or inline")
+    password_hash_workers: int = Field(
+        default_factory=lambda: max(1, (os.cpu_count() or 2) // 2),
+        ge=1, description="Password hashes run concurrently (default: half the CPUs)",
+    )
+    password_hash_max_queue: int = Field(
+        64, ge=0, description="Hashes allowed to wait for a worker before logins get 503"
+    )
+    password_argon2_time_cost: int = Field(3, ge=1, description="Argon2 iterations")
+    password_argon2_memory_kib: int = Field(65536, ge=8, description="Argon2 memory per hash")
+    password_argon2_parallelism: int = Field(4, ge=1, description="Argon2 lanes")
+    password_bcrypt_rounds: int = Field(12, ge=4, le=31, description="bcrypt cost (legacy hashes)")
+
+    # 📈 Market data
+    market_data_provider: str = Field("yahoo", description="yahoo or replay")
+    market_max_workers: int = Field(4, ge=1, description="Threads running provider calls")
+    market_batch_size: int = Field(100, ge=1, description="Symbols per upstream call")
+    price_cache_maxsize: int = Field(10000, ge=1, description="Prices kept in memory")
+    market_replay_dir: str = Field(str(DATA_DIR / "replay"), description="Replay provider recording")
+    market_replay_latency_ms: float = Field(0.0, ge=0)
+    market_replay_jitter_ms: float = Field(0.0, ge=0)
+    market_replay_error_rate: float = Field(0.0, ge=0, le=1)
+    market_replay_seed: int = Field(0)
+    market_store_dir: str = Field(str(DATA_DIR / "bars"), description="Local historical bar store")
+    market_store_refresh_seconds: float = Field(
+        300.0, ge=0, description="How long the newest bars are served locally before refetching"
+    )
+
+    # 🔄 Background price refresh (keeps held symbols warm in the price cache)
+    market_refresh_enabled: bool = Field(True, description="Run the refresh scheduler")
+    market_refresh_interval_seconds: float = Field(
+        5.0, gt=0, description="Seconds between refresh passes"
+    )
+    market_refresh_universe_seconds: float = Field(
+        60.0, gt=0, description="Seconds between reloads of the held symbols"
+    )
+    market_refresh_batches_per_second: float = Field(
+        2.0, gt=0, description="Upstream calls per second made by the scheduler"
+    )
+    market_refresh_max_attempts: int = Field(3, ge=1, description="Tries per failed batch")
+
+    market_stream_interval_seconds: float = Field(
+        2.0, gt=0, description="Seconds between live price stream ticks"
+    )
+    market_stream_send_timeout_seconds: float = Field(
+        10.0, gt=0, description="Disconnect stream clients that take longer to accept a message"
+    )
+    market_stream_max_symbols: int = Field(500, ge=1, description="Symbols per stream client")
+
+    # 🚦 Admission control (app/admission.py)
+    admission_enabled: bool = Field(True, description="Rate-limit, cap and shed requests")
+    admission_user_rate_per_second: float = Field(
+        20.0, ge=0, description="Sustained requests per second per user / client IP (0 disables)"
+    )
+    admission_user_burst: int = Field(40, ge=1, description="Requests a user may burst above the rate")
+    admission_user_max_concurrent: int = Field(
+        8, ge=0, description="Requests in progress per user / client IP (0 disables)"
+    )
+    admission_max_concurrent: int = Field(
+        0, ge=0, description="Requests handled at once per worker (0: DB pool size + overflow)"
+    )
+    admission_max_queue: int = Field(
+        100, ge=0, description="Requests waiting for a slot before new ones get 503"
+    )
+    admission_queue_timeout_seconds: float = Field(
+        2.0, gt=0, description="Longest wait for a slot before 503"
+    )
+    admission_exempt_paths: str = Field(
+        "/,/metrics", description="Comma-separated paths never limited (health check, metrics)"
+    )
+    admission_redis_url: Optional[str] = Field(
+        None, description="Share per-user limits across workers via Redis"
+    )
+
+    # 🚀 Startup (app lifespan; see app/startup.py)
+    startup_create_schema: bool = Field(False, description="Create missing tables on startup")
+    startup_min_connections: int = Field(
+        2, ge=0, description="Pooled DB connections opened before serving"
+    )
+    startup_load_provider: bool = Field(
+        False, description="Load the market data provider (and its imports) before serving"
+    )
+    startup_warm_users: int = Field(
+        100, ge=0, description="Most recently active users whose user and price caches are warmed"
+    )
+    startup_warm_timeout_seconds: float = Field(10.0, gt=0, description="Give up warming after this")
+
+    # 🧠 AI insights (app/insights)
+    insights_provider: str = Field("openai", description="openai, or stub (local, no network)")
+    insights_model: str = Field("gpt-4o-mini", description="Chat model used for insights")
+    openai_api_key: Optional[str] = Field(None, description="OpenAI API key")
+    openai_base_url: Optional[str] = Field(None, description="OpenAI-compatible endpoint")
+    insights_max_tokens: int = Field(600, ge=1, description="Reply length limit")
+    insights_temperature: float = Field(0.2, ge=0, le=2, description="Sampling temperature")
+    insights_timeout_seconds: float = Field(60.0, gt=0, description="Give up on a generation after this")
+    insights_cache_ttl_seconds: float = Field(
+        24 * 3600.0, ge=0, description="How long a reply is reused for an identical portfolio and prompt"
+    )
+    insights_cache_maxsize: int = Field(10000, ge=1, description="Replies kept in process memory")
+    insights_stub_latency_seconds: float = Field(
+        0.5, ge=0, description="Stub model: delay before the first token"
+    )
+    insights_stub_token_delay_seconds: float = Field(
+        0.02, ge=0, description="Stub model: delay between tokens"
+    )
+
+    # 🧮 Cost basis (app/holdings/lots.py)
+    cost_basis_method: str = Field(
+        "fifo",
+        description="fifo, lifo, hifo or average: default lot matching for gain reports and holding cost",
+    )
+
+    # 📒 Ledger (app/ledger)
+    ledger_snapshot_every: int = Field(
+        1000, ge=10, description="Events between ledger snapshots (bounds a point-in-time replay)"
+    )
+    ledger_compaction_enabled: bool = Field(True, description="Write ledger snapshots in the background")
+    ledger_compaction_interval_seconds: float = Field(
+        30.0, gt=0, description="Seconds between background compaction passes"
+    )
+
+    # 📊 Metrics
+    metrics_enabled: bool = Field(True, description="Record request/SQL metrics and serve /metrics")
+    metrics_debug_header: bool = Field(
+        False,
+        description="Add X-DB-Queries and Server-Timing headers to every response (development only)",
+    )
+
+    @property
+    def is_sqlite(self) -> bool:
+        return self.database_url.startswith("sqlite")
+
+    @property
+    def replica_urls(self) -> List[str]:
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        """
+        Build settings from environment variables (upper-cased field names).
+        """
+        environ = os.environ if environ is None else environ
+        values = {
+            name: environ[name.upper()]
+            for name in cls.model_fields
+            if name.upper() in environ
+        }
+        return cls(**values)
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Process-wide settings, loaded once from `.env` and the environment.
+    """
+    load_dotenv()
+    return Settings.from_env()
@@ -1,17 +1,116 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
-from typing import AsyncGenerator  # ✅ Add this
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from app.cache import TTLCache
+from app.config import Settings, get_settings
+from app.metrics import REGISTRY, Counter, Gauge, record_query
+
+settings = get_settings()
+
+# 📌 Use async-friendly database URL (SQLite or Postgres), from settings / env
+DATABASE_URL = settings.database_url
+
+
+def _engine_options(settings: Settings) -> Dict[str, Any]:
+    """
+    Pool and logging options for `create_async_engine`.
+
+    In-memory SQLite uses a single static connection, so pool sizing does
+    not apply there.
+    """
+    options: Dict[str, Any] = {
+        "echo": settings.db_echo,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+    url = make_url(settings.database_url)
+    in_memory = settings.is_sqlite and url.database in (None, "", ":memory:")
+    if not in_memory:
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+        )
+    return options
+
+
+def _install_connect_hooks(engine: AsyncEngine, settings: Settings) -> None:
+    """
+    Run per-connection setup (SQLite pragmas, PostgreSQL statement timeout)
+    once, when the pool opens each new DBAPI connection.
+    """
+    if settings.is_sqlite:
+        pragmas = [
+            f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+            f"PRAGMA synchronous={settings.sqlite_synchronous}",
+            f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+            f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}",  # negative → KiB
+            f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        ]
+    elif engine.dialect.name == "postgresql" and settings.db_statement_timeout_ms:
+        pragmas = [f"SET statement_timeout = {settings.db_statement_timeout_ms}"]
+    else:
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in pragmas:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def _install_query_hooks(engine: AsyncEngine) -> None:
+    """
+    Time every SQL statement and account it to the current request's
+    `QueryStats` (see `app.metrics`), so query counts and DB time are
+    reported per route.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        record_query(time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _on_error(exception_context) -> None:
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            record_query(time.perf_counter() - conn.info["query_started"].pop())
+
+
+def build_engine(settings: Settings) -> AsyncEngine:
+    """
+    Create an async engine configured from `settings`.
+
+    Args:
+        settings (Settings): Database URL, pool sizing, logging and pragmas.
+
+    Returns:
+        AsyncEngine: The configured engine.
+    """
+    engine = create_async_engine(settings.database_url, **_engine_options(settings))
+    _install_connect_hooks(engine, settings)
+    if settings.metrics_enabled:
+        _install_query_hooks(engine)
+    return engine
 
-# 📌 Use async-friendly database URL (SQLite or Postgres)
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./stockmind.db")
 
 # ✅ Create an async engine
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,  # Optional: set to False to disable SQL logs
-)
+engine = build_engine(settings)
 
 # ✅ Async session factory
 AsyncSessionLocal = sessionmaker(
@@ -24,7 +123,194 @@ AsyncSessionLocal = sessionmaker(
 Base = declarative_base()
 
 # -------------------------------------------------------
-# ✅ Add this: Dependency for FastAPI to get DB session
+# 🔀 Read/write routing (primary + read replicas)
+# -------------------------------------------------------
+
+DB_READS = REGISTRY.register(Counter(
+    "db_read_sessions_total", "Read sessions handed out, by target", ("target",),
+))
+DB_REPLICA_HEALTHY = REGISTRY.register(Gauge(
+    "db_replica_healthy", "1 while a read replica is in rotation, 0 while evicted", ("replica",),
+))
+DB_REPLICA_EVICTIONS = REGISTRY.register(Counter(
+    "db_replica_evictions_total", "Read replicas taken out of rotation after an error", ("replica",),
+))
+
+# Errors that mean the replica itself is unusable (not a bad query)
+REPLICA_ERRORS = (OperationalError, InterfaceError, OSError)
+
+
+def _checked_out(engine: AsyncEngine) -> int:
+    checkedout = getattr(engine.pool, "checkedout", None)
+    return checkedout() if callable(checkedout) else 0
+
+
+class SessionRouter:
+    """
+    Hands out sessions on the primary (writes) or a read replica (reads).
+
+    - Reads go to the healthy replica with the fewest connections checked
+      out (round robin among ties), or to the primary when there are none.
+    - A replica that fails to connect, or fails a query with a connection
+      error, is evicted for `eviction_seconds`; a read that cannot connect
+      moves on to the next replica, then to the primary.
+    - After a write keyed by a user, that user's reads go to the primary for
+      `read_your_writes_seconds` so they see their own change despite
+      replication lag. This is tracked per process.
+
+    Write sessions (and reads without replicas) come from `AsyncSessionLocal`,
+    so re-binding it (e.g., to a scratch database) re-routes them too.
+
+    Args:
+        replicas (Sequence[AsyncEngine]): Read replica engines (may be empty).
+        read_your_writes_seconds (float): Primary-only reads after a user's write.
+        eviction_seconds (float): How long a failing replica is left out.
+        clock (Callable[[], float]): Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[AsyncEngine] = (),
+        read_your_writes_seconds: float = 5.0,
+        eviction_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.replicas: List[AsyncEngine] = list(replicas)
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.eviction_seconds = eviction_seconds
+        self._recent_writes: TTLCache[Hashable, bool] = TTLCache(
+            maxsize=100_000, default_ttl=read_your_writes_seconds, clock=clock
+        )
+        self._evicted: TTLCache[int, bool] = TTLCache(
+            maxsize=max(len(self.replicas), 1), default_ttl=eviction_seconds, clock=clock
+        )
+        self._next = 0
+        for index in range(len(self.replicas)):
+            DB_REPLICA_HEALTHY.set(1, replica=str(index))
+
+    def note_write(self, key: Hashable) -> None:
+        """
+        Send `key`'s reads to the primary for the read-your-writes window.
+        """
+        if self.replicas and self.read_your_writes_seconds > 0:
+            self._recent_writes.set(key, True)
+
+    def evict(self, index: int) -> None:
+        """
+        Take replica `index` out of rotation for `eviction_seconds`.
+        """
+        self._evicted.set(index, True)
+        DB_REPLICA_HEALTHY.set(0, replica=str(index))
+        DB_REPLICA_EVICTIONS.inc(replica=str(index))
+
+    def healthy_replicas(self) -> List[int]:
+        """
+        Indexes of the replicas in rotation, least busy first.
+        """
+        count = len(self.replicas)
+        if not count:
+            return []
+        start, self._next = self._next, (self._next + 1) % count
+        healthy = []
+        for index in range(count):
+            if index in self._evicted:
+                continue
+            DB_REPLICA_HEALTHY.set(1, replica=str(index))
+            healthy.append(index)
+        return sorted(
+            healthy,
+            key=lambda index: (_checked_out(self.replicas[index]), (index - start) % count),
+        )
+
+    async def _open_replica(self, key: Optional[Hashable]) -> Optional[Tuple[int, AsyncSession]]:
+        """
+        A connected session on the first replica that accepts a connection, or None.
+        """
+        if key is not None and key in self._recent_writes:
+            return None
+        for index in self.healthy_replicas():
+            session = AsyncSessionLocal(bind=self.replicas[index])
+            try:
+                await session.connection()
+            except REPLICA_ERRORS:
+                await session.close()
+                self.evict(index)
+                continue
+            return index, session
+        return None
+
+    @asynccontextmanager
+    async def reader(self, key: Optional[Hashable] = None) -> AsyncIterator[AsyncSession]:
+        """
+        A session for read-only work, on a replica when one is usable.
+
+        Args:
+            key (Hashable, optional): Whose reads these are (usually the user
+                ID), for read-your-writes.
+        """
+        opened = await self._open_replica(key)
+        if opened is None:
+            DB_READS.inc(target="primary")
+            async with AsyncSessionLocal() as session:
+                yield session
+            return
+
+        index, session = opened
+        DB_READS.inc(target="replica")
+        async with session:
+            try:
+                yield session
+            except DBAPIError as exc:
+                if exc.connection_invalidated or isinstance(exc, REPLICA_ERRORS):
+                    self.evict(index)
+                raise
+
+    @asynccontextmanager
+    async def writer(self, key: Optional[Hashable] = None) -> AsyncIterator[AsyncSession]:
+        """
+        A session on the primary. Afterwards, `key`'s reads stay on the
+        primary for the read-your-writes window.
+        """
+        try:
+            async with AsyncSessionLocal() as session:
+                yield session
+        finally:
+            if key is not None:
+                self.note_write(key)
+
+    async def dispose(self) -> None:
+        """
+        Close the connection pools of the replicas and of the primary (the
+        engine `AsyncSessionLocal` is bound to).
+        """
+        for replica in self.replicas:
+            await replica.dispose()
+        primary = AsyncSessionLocal.kw.get("bind")
+        if primary is not None:
+            await primary.dispose()
+
+
+def build_session_router(settings: Settings) -> SessionRouter:
+    """
+    Create the replica engines listed in `database_replica_urls` (with the
+    same pool and pragma settings as the primary) and a router over them.
+    """
+    replicas = [
+        build_engine(settings.model_copy(update={"database_url": url}))
+        for url in settings.replica_urls
+    ]
+    return SessionRouter(
+        replicas,
+        read_your_writes_seconds=settings.db_read_your_writes_seconds,
+        eviction_seconds=settings.db_replica_eviction_seconds,
+    )
+
+
+# ✅ Process-wide router (no replicas configured → everything on the primary)
+session_router = build_session_router(settings)
+
+# -------------------------------------------------------
+# ✅ Dependency for FastAPI to get DB session
 # -------------------------------------------------------
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """
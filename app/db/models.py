@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
-from sqlalchemy import String, ForeignKey, Enum as SQLEnum
+from sqlalchemy import JSON, String, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.database import Base
 from enum import Enum
@@ -22,6 +22,25 @@ class AssetType(str, Enum):
     OTHER = "other"
 
 
+class TransactionType(str, Enum):
+    """
+    Enum for the direction of a holding transaction.
+    """
+    BUY = "buy"
+    SELL = "sell"
+
+
+class LedgerEventType(str, Enum):
+    """
+    Enum for the kinds of event in a user's ledger.
+    """
+    BUY = "buy"
+    SELL = "sell"
+    SPLIT = "split"
+    DIVIDEND = "dividend"
+    ADJUSTMENT = "adjustment"
+
+
 class Holding(Base):
     """
     🧾 Represents a single asset held by a user in their portfolio.
@@ -37,6 +56,12 @@ class Holding(Base):
     """
 
     __tablename__ = "holdings"
+    __table_args__ = (
+        # Keyset pagination / streaming walk a user's holdings in id order
+        Index("ix_holdings_user_id_id", "user_id", "id"),
+        # Conditional GETs read MAX(updated_at) per user straight from the index
+        Index("ix_holdings_user_id_updated_at", "user_id", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(
         primary_key=True,
@@ -100,3 +125,297 @@ class Holding(Base):
         onupdate=datetime.utcnow,
         doc="Timestamp of the most recent update to this holding."
     )
+
+
+class HoldingTransaction(Base):
+    """
+    🧾 A buy or sell of units of a holding.
+
+    Every buy opens a tax lot; sells are matched against open lots by the
+    cost-basis engine (`app.holdings.lots`) to compute realized gains. The
+    holding's quantity and purchase price are kept in sync with what is left.
+    """
+
+    __tablename__ = "holding_transactions"
+    __table_args__ = (
+        # Gain reports read a user's transactions grouped by holding, in time order
+        Index("ix_holding_transactions_user_holding_time", "user_id", "holding_id", "executed_at", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(
+        primary_key=True,
+        doc="Primary key: Unique identifier for this transaction."
+    )
+
+    holding_id: Mapped[int] = mapped_column(
+        ForeignKey("holdings.id", ondelete="CASCADE"),
+        nullable=False,
+        doc="Foreign key: The holding this transaction belongs to."
+    )
+
+    user_id: Mapped[UUID] = mapped_column(
+        ForeignKey("users.id"),
+        nullable=False,
+        doc="Foreign key: Owner of the holding (denormalized for per-user reads)."
+    )
+
+    type: Mapped[TransactionType] = mapped_column(
+        SQLEnum(TransactionType),
+        nullable=False,
+        doc="Buy (opens a lot) or sell (closes lots)."
+    )
+
+    quantity: Mapped[float] = mapped_column(
+        nullable=False,
+        doc="Units bought or sold (always positive)."
+    )
+
+    price: Mapped[float] = mapped_column(
+        nullable=False,
+        doc="Per-unit price of the trade (in USD)."
+    )
+
+    fees: Mapped[float] = mapped_column(
+        default=0.0,
+        nullable=False,
+        doc="Commissions and fees: added to a buy's cost, taken off a sell's proceeds."
+    )
+
+    executed_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
+        nullable=False,
+        doc="When the trade happened; lots are ordered by it."
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
+        doc="Timestamp when the transaction was recorded in the system."
+    )
+
+
+class PositionSnapshot(Base):
+    """
+    📸 Running totals of a user's holdings of one symbol and asset type.
+
+    Maintained incrementally (as deltas) by every holdings write in the same
+    transaction, so a portfolio summary reads one row per distinct position
+    instead of every holding. `python -m app.holdings.snapshots verify`
+    checks it against the holdings table; `rebuild` recomputes it.
+    """
+
+    __tablename__ = "position_snapshots"
+
+    user_id: Mapped[UUID] = mapped_column(
+        ForeignKey("users.id"),
+        primary_key=True,
+        doc="Owner of the position."
+    )
+
+    asset_type: Mapped[AssetType] = mapped_column(
+        SQLEnum(AssetType),
+        primary_key=True,
+        doc="Asset type shared by the holdings in this position."
+    )
+
+    symbol: Mapped[str] = mapped_column(
+        String(length=10),
+        primary_key=True,
+        doc="Normalized (upper-case) ticker symbol."
+    )
+
+    total_quantity: Mapped[float] = mapped_column(
+        nullable=False,
+        doc="Sum of the holdings' quantities."
+    )
+
+    total_cost_basis: Mapped[float] = mapped_column(
+        nullable=False,
+        doc="Sum of quantity × purchase price over the holdings."
+    )
+
+    position_count: Mapped[int] = mapped_column(
+        nullable=False,
+        doc="Number of holdings in this position."
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
+        doc="When a holding in this position last changed."
+    )
+
+
+class PortfolioSnapshot(Base):
+    """
+    📸 Running totals over all of a user's holdings (see `PositionSnapshot`).
+    """
+
+    __tablename__ = "portfolio_snapshots"
+
+    user_id: Mapped[UUID] = mapped_column(
+        ForeignKey("users.id"),
+        primary_key=True,
+        doc="Owner of the portfolio."
+    )
+
+    total_quantity: Mapped[float] = mapped_column(
+        nullable=False,
+        doc="Sum of every holding's quantity."
+    )
+
+    total_cost_basis: Mapped[float] = mapped_column(
+        nullable=False,
+        doc="Sum of quantity × purchase price over every holding."
+    )
+
+    position_count: Mapped[int] = mapped_column(
+        nullable=False,
+        doc="Number of holdings."
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
+        doc="When any of the user's holdings last changed."
+    )
+
+
+class LedgerEvent(Base):
+    """
+    📒 One event in a user's append-only ledger.
+
+    Rows are only ever inserted: every holdings write appends the change it
+    made (`app.ledger.store`), so positions at any point in time can be
+    derived by replaying events. `quantity` and `cost_basis` are signed
+    deltas to the position; a split multiplies its quantity by `ratio`.
+    """
+
+    __tablename__ = "ledger_events"
+    __table_args__ = (
+        # Replays read a user's events in time order from a point onwards
+        Index("ix_ledger_events_user_id_occurred_at", "user_id", "occurred_at", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(
+        primary_key=True,
+        doc="Primary key: also the order in which events were recorded."
+    )
+
+    user_id: Mapped[UUID] = mapped_column(
+        ForeignKey("users.id"),
+        nullable=False,
+        doc="Foreign key: Owner of the ledger."
+    )
+
+    type: Mapped[LedgerEventType] = mapped_column(
+        SQLEnum(LedgerEventType),
+        nullable=False,
+        doc="Buy, sell, split, dividend or adjustment (manual edit of a holding)."
+    )
+
+    symbol: Mapped[str] = mapped_column(
+        String(length=10),
+        nullable=False,
+        doc="Normalized (upper-case) ticker symbol."
+    )
+
+    asset_type: Mapped[AssetType] = mapped_column(
+        SQLEnum(AssetType),
+        nullable=False,
+        doc="Asset type of the position the event applies to."
+    )
+
+    quantity: Mapped[float] = mapped_column(
+        default=0.0,
+        nullable=False,
+        doc="Change in units held (negative for sells and removals)."
+    )
+
+    cost_basis: Mapped[float] = mapped_column(
+        default=0.0,
+        nullable=False,
+        doc="Change in the position's cost basis."
+    )
+
+    amount: Mapped[float] = mapped_column(
+        default=0.0,
+        nullable=False,
+        doc="Cash flow: paid for buys (negative), received for sells and dividends."
+    )
+
+    price: Mapped[Optional[float]] = mapped_column(
+        nullable=True,
+        doc="Per-unit trade price, when there was a trade."
+    )
+
+    ratio: Mapped[float] = mapped_column(
+        default=1.0,
+        nullable=False,
+        doc="Split ratio (new units per old unit); 1 for every other event."
+    )
+
+    holding_id: Mapped[Optional[int]] = mapped_column(
+        nullable=True,
+        doc="Holding the event came from (not a foreign key: events outlive holdings)."
+    )
+
+    occurred_at: Mapped[datetime] = mapped_column(
+        nullable=False,
+        doc="When the event took effect; replays are ordered by it."
+    )
+
+    recorded_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
+        doc="When the event was appended."
+    )
+
+
+class LedgerSnapshot(Base):
+    """
+    📸 A user's positions as of a point in the ledger.
+
+    Written by compaction (`app.ledger.compaction`) every few thousand
+    events, so a point-in-time query replays only the events after the
+    nearest earlier snapshot. Derived data: a backdated event deletes the
+    snapshots it would change, and compaction writes them again.
+    """
+
+    __tablename__ = "ledger_snapshots"
+    __table_args__ = (
+        Index("ix_ledger_snapshots_user_id_as_of", "user_id", "as_of"),
+    )
+
+    id: Mapped[int] = mapped_column(
+        primary_key=True,
+        doc="Primary key."
+    )
+
+    user_id: Mapped[UUID] = mapped_column(
+        ForeignKey("users.id"),
+        nullable=False,
+        doc="Owner of the ledger."
+    )
+
+    as_of: Mapped[datetime] = mapped_column(
+        nullable=False,
+        doc="Covers every event that occurred at or before this time."
+    )
+
+    last_event_id: Mapped[int] = mapped_column(
+        nullable=False,
+        doc="Highest event ID covered, to detect events recorded late."
+    )
+
+    event_count: Mapped[int] = mapped_column(
+        nullable=False,
+        doc="Number of events covered."
+    )
+
+    positions: Mapped[dict] = mapped_column(
+        JSON,
+        nullable=False,
+        doc="Positions as columns: asset_types, symbols, quantity, cost_basis, realized_gain, dividends."
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
+        doc="When compaction wrote the snapshot."
+    )
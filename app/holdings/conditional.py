@@ -0,0 +1,49 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+"""
+ETag helpers for conditional GETs of holdings listings.
+
+The validator is derived from the user's holdings version (row count +
+latest `updated_at`) plus the request variant (query string and negotiated
+media type), so a 304 can be decided without loading any rows. Only
+`If-None-Match` is honored: `Last-Modified` is informational, since a delete
+does not move the latest `updated_at`.
+"""
+
+
+def make_etag(user_id: UUID, version: Tuple[int, Optional[datetime]], variant: str = "") -> str:
+    """
+    Strong ETag for one representation of a user's holdings at a version.
+    """
+    count, last_modified = version
+    stamp = last_modified.isoformat() if last_modified else "-"
+    digest = hashlib.sha1(f"{user_id}|{count}|{stamp}|{variant}".encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    True if an `If-None-Match` header value matches `etag` (weak comparison).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    """
+    Validator headers for a holdings response. Clients must revalidate.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.replace(tzinfo=timezone.utc), usegmt=True
+        )
+    return headers
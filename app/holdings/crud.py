@@ -1,9 +1,32 @@
+from datetime import datetime, timezone
 from uuid import UUID
-from typing import List, Optional
-from sqlalchemy import select, update, delete
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select, update, delete, insert, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.models import Holding as holding_model
-from app.holdings.schemas import HoldingCreate, HoldingUpdate
+from app.db.models import Holding as holding_model, HoldingTransaction
+from app.holdings import lots, snapshots
+from app.ledger import store as ledger
+from app.holdings.schemas import (
+    AssetType,
+    HoldingCreate,
+    HoldingRead,
+    HoldingUpdate,
+    TransactionCreate,
+    TransactionType,
+)
+
+# Columns of a HoldingRead, in field order, for row-level (non-ORM) reads
+HOLDING_READ_COLUMNS = [
+    holding_model.__table__.c[name] for name in HoldingRead.model_fields
+]
+
+# Columns a snapshot delta is computed from
+SNAPSHOT_COLUMNS = [
+    holding_model.symbol,
+    holding_model.asset_type,
+    holding_model.quantity,
+    holding_model.purchase_price,
+]
 
 
 async def get_holding_by_id(
@@ -48,6 +71,135 @@ async def get_all_holdings_for_user(
     return result.scalars().all()
 
 
+async def get_holdings_version(
+    db: AsyncSession, user_id: UUID
+) -> Tuple[int, Optional[datetime]]:
+    """
+    Cheap fingerprint of a user's holdings: row count and latest `updated_at`.
+
+    Inserts and updates move the timestamp; deletes change the count. Runs as
+    one aggregate over the `(user_id, updated_at)` index without loading rows.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The user's ID.
+
+    Returns:
+        Tuple[int, Optional[datetime]]: (count, max updated_at or None if empty).
+    """
+    result = await db.execute(
+        select(func.count(), func.max(holding_model.updated_at))
+        .where(holding_model.user_id == user_id)
+    )
+    count, last_modified = result.one()
+    return count, last_modified
+
+
+async def get_holdings_page(
+    db: AsyncSession, user_id: UUID, limit: Optional[int] = None, after_id: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Retrieve a user's holdings in id order using keyset pagination.
+
+    Seeks straight to `after_id` via the `(user_id, id)` index, so every page
+    costs the same no matter how deep into the portfolio it is. Rows come
+    back as plain dicts shaped like `HoldingRead` (no ORM objects), ready to
+    be encoded directly.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The user's ID.
+        limit (int, optional): Page size. None returns everything after `after_id`.
+        after_id (int, optional): Return holdings with an ID greater than this.
+
+    Returns:
+        Tuple[List[dict], Optional[int]]: The page, and the last ID in it when
+        more holdings follow (else None).
+    """
+    query = (
+        select(*HOLDING_READ_COLUMNS)
+        .where(holding_model.user_id == user_id)
+        .order_by(holding_model.id)
+    )
+    if after_id is not None:
+        query = query.where(holding_model.id > after_id)
+    if limit is not None:
+        query = query.limit(limit + 1)  # one extra row tells us whether more follow
+
+    result = await db.execute(query)
+    holdings = [dict(row) for row in result.mappings()]
+    if limit is not None and len(holdings) > limit:
+        holdings = holdings[:limit]
+        return holdings, holdings[-1]["id"]
+    return holdings, None
+
+
+async def stream_holdings_for_user(
+    db: AsyncSession, user_id: UUID, after_id: Optional[int] = None, chunk_size: int = 500
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Stream a user's holdings in id order from a server-side cursor.
+
+    Rows are fetched `chunk_size` at a time (`yield_per`) as plain dicts
+    shaped like `HoldingRead`, so memory stays flat regardless of how many
+    holdings the user has.
+
+    Args:
+        db (AsyncSession): The database session (must stay open while iterating).
+        user_id (UUID): The user's ID.
+        after_id (int, optional): Only stream holdings with an ID greater than this.
+        chunk_size (int): Rows fetched per round trip.
+
+    Yields:
+        List[dict]: Consecutive chunks of holdings.
+    """
+    query = (
+        select(*HOLDING_READ_COLUMNS)
+        .where(holding_model.user_id == user_id)
+        .order_by(holding_model.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if after_id is not None:
+        query = query.where(holding_model.id > after_id)
+
+    result = await db.stream(query)
+    async for chunk in result.mappings().partitions():
+        yield [dict(row) for row in chunk]
+
+
+async def stream_holding_rows(
+    db: AsyncSession,
+    user_id: Optional[UUID] = None,
+    chunk_size: int = 10000,
+    columns: Optional[Sequence[Any]] = None,
+) -> AsyncIterator[Sequence[Tuple]]:
+    """
+    Stream holdings in id order from a server-side cursor, as row tuples
+    (no ORM result layer or per-row dicts, for bulk exports).
+
+    Args:
+        db (AsyncSession): The database session (must stay open while iterating).
+        user_id (UUID, optional): Only this user's holdings (default: everyone's).
+        chunk_size (int): Rows fetched per round trip.
+        columns (Sequence, optional): Columns to select (default: `HOLDING_READ_COLUMNS`).
+
+    Yields:
+        Sequence[tuple]: Consecutive chunks of rows.
+    """
+    query = (
+        select(*(columns or HOLDING_READ_COLUMNS))
+        .order_by(holding_model.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if user_id is not None:
+        query = query.where(holding_model.user_id == user_id)
+
+    conn = await db.connection()
+    result = await conn.stream(query)
+    async for chunk in result.partitions():
+        yield chunk
+
+
 async def create_holding(
     db: AsyncSession, holding_data: HoldingCreate, user_id: UUID
 ) -> holding_model:
@@ -62,19 +214,81 @@ async def create_holding(
     Returns:
         Holding: The newly created holding object.
     """
-    new_holding = holding_model(**holding_data.dict(), user_id=user_id)
+    new_holding = holding_model(**holding_data.model_dump(), user_id=user_id)
     db.add(new_holding)
+    await snapshots.apply_deltas(db, user_id, [snapshots.holding_delta(
+        new_holding.symbol, new_holding.asset_type,
+        new_holding.quantity, new_holding.purchase_price,
+    )])
+    await db.flush()
+    await ledger.append(db, user_id, [ledger.buy(
+        new_holding.symbol, new_holding.asset_type, new_holding.quantity, new_holding.purchase_price,
+        occurred_at=new_holding.purchase_date, holding_id=new_holding.id,
+    )])
     await db.commit()
     await db.refresh(new_holding)
     return new_holding
 
 
+async def bulk_insert_holdings(
+    db: AsyncSession, holdings: Sequence[HoldingCreate], user_id: UUID
+) -> List[int]:
+    """
+    Insert many holdings with a single multi-row `INSERT ... RETURNING`.
+
+    Does not commit: callers group several batches into one transaction.
+
+    Args:
+        db (AsyncSession): The database session.
+        holdings (Sequence[HoldingCreate]): Validated holdings to insert.
+        user_id (UUID): The user ID to associate with every holding.
+
+    Returns:
+        List[int]: IDs of the new holdings.
+    """
+    if not holdings:
+        return []
+    now = datetime.utcnow()
+    rows = []
+    for holding in holdings:
+        row = holding.model_dump()
+        row["purchase_date"] = row["purchase_date"] or now
+        row["user_id"] = user_id
+        rows.append(row)
+
+    # executemany + RETURNING is sent as multi-row INSERT ... VALUES (...), (...)
+    # statements; one page per call keeps it to a single statement per batch,
+    # and unlike .values(rows) the compiled SQL is cached across batches.
+    result = await db.execute(
+        insert(holding_model.__table__).returning(holding_model.id, sort_by_parameter_order=True),
+        rows,
+        execution_options={"insertmanyvalues_page_size": len(rows)},
+    )
+    await snapshots.apply_deltas(db, user_id, (
+        snapshots.holding_delta(row["symbol"], row["asset_type"], row["quantity"], row["purchase_price"])
+        for row in rows
+    ))
+    holding_ids = list(result.scalars().all())
+    await ledger.append(db, user_id, (
+        ledger.buy(
+            row["symbol"], row["asset_type"], row["quantity"], row["purchase_price"],
+            occurred_at=row["purchase_date"], holding_id=holding_id,
+        )
+        for row, holding_id in zip(rows, holding_ids)
+    ))
+    return holding_ids
+
+
 async def update_holding(
     db: AsyncSession, holding_id: int, user_id: UUID, update_data: HoldingUpdate
 ) -> Optional[holding_model]:
     """
     Update an existing holding's fields.
 
+    Runs as one ownership-scoped `UPDATE ... RETURNING` statement. When
+    fields the snapshots track change, PostgreSQL returns their old values
+    from the same statement; SQLite reads them first.
+
     Args:
         db (AsyncSession): The database session.
         holding_id (int): The holding ID.
@@ -84,21 +298,73 @@ async def update_holding(
     Returns:
         Optional[Holding]: Updated holding if found and owned, else None.
     """
-    result = await db.execute(
-        select(holding_model).where(
+    values = update_data.model_dump(exclude_unset=True)
+    if not values:
+        return await get_holding_by_id(db, holding_id, user_id)
+
+    statement = (
+        update(holding_model)
+        .where(
             holding_model.id == holding_id,
             holding_model.user_id == user_id
         )
+        .values(**values)
+        .execution_options(populate_existing=True)
     )
-    holding = result.scalar_one_or_none()
-    if not holding:
-        return None
-
-    for field, value in update_data.dict(exclude_unset=True).items():
-        setattr(holding, field, value)
+    before = None
+    if not values.keys() & snapshots.SNAPSHOT_FIELDS:
+        result = await db.execute(statement.returning(holding_model))
+        holding = result.scalar_one_or_none()
+    elif db.get_bind().dialect.name == "postgresql":
+        # The snapshot delta needs the old values: join in a locked copy of
+        # the row taken before the update, and return its columns too
+        old = (
+            select(holding_model.id, *SNAPSHOT_COLUMNS)
+            .where(
+                holding_model.id == holding_id,
+                holding_model.user_id == user_id
+            )
+            .with_for_update()
+            .subquery("old")
+        )
+        result = await db.execute(
+            statement
+            .where(holding_model.id == old.c.id)
+            .returning(holding_model, *list(old.c)[1:])
+        )
+        row = result.one_or_none()
+        if row is not None:
+            holding, before = row[0], tuple(row[1:])
+        else:
+            holding = None
+    else:
+        # SQLite's RETURNING cannot see the tables of UPDATE ... FROM, so the
+        # old values are read first (in process: no network round trip)
+        result = await db.execute(
+            select(*SNAPSHOT_COLUMNS).where(
+                holding_model.id == holding_id,
+                holding_model.user_id == user_id
+            )
+        )
+        before = result.one_or_none()
+        result = await db.execute(statement.returning(holding_model))
+        holding = result.scalar_one_or_none()
 
+    if holding is not None and before is not None:
+        await snapshots.apply_deltas(db, user_id, [
+            snapshots.holding_delta(*before, sign=-1),
+            snapshots.holding_delta(
+                holding.symbol, holding.asset_type, holding.quantity, holding.purchase_price
+            ),
+        ])
+        await ledger.append(db, user_id, [
+            ledger.adjustment(*before, sign=-1, holding_id=holding_id),
+            ledger.adjustment(
+                holding.symbol, holding.asset_type, holding.quantity, holding.purchase_price,
+                holding_id=holding_id,
+            ),
+        ])
     await db.commit()
-    await db.refresh(holding)
     return holding
 
 
@@ -108,6 +374,8 @@ async def delete_holding(
     """
     Delete a holding by ID (only if owned by the user).
 
+    Runs as one ownership-scoped `DELETE ... RETURNING` statement.
+
     Args:
         db (AsyncSession): The database session.
         holding_id (int): The holding ID.
@@ -116,16 +384,311 @@ async def delete_holding(
     Returns:
         bool: True if deleted, False if not found or not owned.
     """
+    await db.execute(
+        delete(HoldingTransaction).where(
+            HoldingTransaction.holding_id == holding_id,
+            HoldingTransaction.user_id == user_id
+        )
+    )
     result = await db.execute(
-        select(holding_model).where(
+        delete(holding_model)
+        .where(
             holding_model.id == holding_id,
             holding_model.user_id == user_id
         )
+        .returning(*SNAPSHOT_COLUMNS)
+    )
+    row = result.one_or_none()
+    if row is not None:
+        await snapshots.apply_deltas(db, user_id, [snapshots.holding_delta(*row, sign=-1)])
+        await ledger.append(db, user_id, [ledger.adjustment(*row, sign=-1, holding_id=holding_id)])
+    await db.commit()
+    return row is not None
+
+
+def _symbol_matches(symbol: str):
+    """
+    Case-insensitive match on a holding's symbol.
+    """
+    return func.upper(holding_model.symbol) == symbol.strip().upper()
+
+
+async def bulk_delete_holdings(
+    db: AsyncSession, user_id: UUID, holding_ids: Sequence[int]
+) -> List[int]:
+    """
+    Delete many holdings by ID in one statement (only those owned by the user).
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The owner user ID.
+        holding_ids (Sequence[int]): IDs to delete.
+
+    Returns:
+        List[int]: IDs that were actually deleted.
+    """
+    await db.execute(
+        delete(HoldingTransaction)
+        .where(
+            HoldingTransaction.user_id == user_id,
+            HoldingTransaction.holding_id.in_(holding_ids)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        delete(holding_model)
+        .where(
+            holding_model.user_id == user_id,
+            holding_model.id.in_(holding_ids)
+        )
+        .returning(holding_model.id, *SNAPSHOT_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    await snapshots.apply_deltas(
+        db, user_id, (snapshots.holding_delta(*row[1:], sign=-1) for row in rows)
+    )
+    await ledger.append(
+        db, user_id, (ledger.adjustment(*row[1:], sign=-1, holding_id=row[0]) for row in rows)
+    )
+    await db.commit()
+    return [row[0] for row in rows]
+
+
+async def bulk_set_asset_type(
+    db: AsyncSession, user_id: UUID, symbol: str, asset_type: AssetType
+) -> List[int]:
+    """
+    Set the asset type of every holding of `symbol` in one statement.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The owner user ID.
+        symbol (str): Ticker symbol (case-insensitive).
+        asset_type (AssetType): New asset type.
+
+    Returns:
+        List[int]: IDs of the updated holdings.
+    """
+    # Holdings that change type move between ledger positions
+    result = await db.execute(
+        select(holding_model.id, *SNAPSHOT_COLUMNS).where(
+            holding_model.user_id == user_id,
+            _symbol_matches(symbol),
+            holding_model.asset_type != asset_type
+        )
+    )
+    moved = result.all()
+    result = await db.execute(
+        update(holding_model)
+        .where(holding_model.user_id == user_id, _symbol_matches(symbol))
+        .values(asset_type=asset_type)
+        .returning(holding_model.id)
+        .execution_options(synchronize_session=False)
+    )
+    updated = list(result.scalars().all())
+    if updated:
+        await snapshots.retype_symbol(db, user_id, symbol, asset_type)
+    await ledger.append(db, user_id, [
+        event
+        for holding_id, old_symbol, old_type, quantity, price in moved
+        for event in (
+            ledger.adjustment(old_symbol, old_type, quantity, price, sign=-1, holding_id=holding_id),
+            ledger.adjustment(old_symbol, asset_type, quantity, price, holding_id=holding_id),
+        )
+    ])
+    await db.commit()
+    return updated
+
+
+async def apply_split(
+    db: AsyncSession, user_id: UUID, symbol: str, ratio: float
+) -> List[int]:
+    """
+    Apply a stock split to every holding of `symbol` in one statement.
+
+    Quantity is multiplied and purchase price divided by `ratio`
+    (e.g., 4.0 for a 4-for-1 split, 0.1 for a 1-for-10 reverse split),
+    so each holding's cost basis is unchanged. The holdings' transactions
+    are adjusted the same way, so their lots stay in step.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The owner user ID.
+        symbol (str): Ticker symbol (case-insensitive).
+        ratio (float): New shares per old share.
+
+    Returns:
+        List[int]: IDs of the adjusted holdings.
+    """
+    result = await db.execute(
+        update(holding_model)
+        .where(holding_model.user_id == user_id, _symbol_matches(symbol))
+        .values(
+            quantity=holding_model.quantity * ratio,
+            purchase_price=holding_model.purchase_price / ratio,
+        )
+        .returning(holding_model.id, holding_model.symbol, holding_model.asset_type)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    updated = [row[0] for row in rows]
+    if updated:
+        await snapshots.scale_quantity(db, user_id, symbol, ratio)
+        positions = {(row[1].strip().upper(), row[2]) for row in rows}
+        await ledger.append(db, user_id, [
+            ledger.split(position_symbol, position_type, ratio)
+            for position_symbol, position_type in sorted(positions)
+        ])
+        await db.execute(
+            update(HoldingTransaction)
+            .where(
+                HoldingTransaction.user_id == user_id,
+                HoldingTransaction.holding_id.in_(updated)
+            )
+            .values(
+                quantity=HoldingTransaction.quantity * ratio,
+                price=HoldingTransaction.price / ratio,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+    return updated
+
+
+# ----------------------------------------------------------------------------
+# 🧾 Transactions (tax lots)
+# ----------------------------------------------------------------------------
+
+async def get_transactions(
+    db: AsyncSession, holding_id: int, user_id: UUID
+) -> Optional[List[HoldingTransaction]]:
+    """
+    Retrieve a holding's transactions in time order.
+
+    Args:
+        db (AsyncSession): The database session.
+        holding_id (int): The holding ID.
+        user_id (UUID): The owner user ID.
+
+    Returns:
+        Optional[List[HoldingTransaction]]: The transactions, or None if the
+        holding is not found or not owned.
+    """
+    if await get_holding_by_id(db, holding_id, user_id) is None:
+        return None
+    result = await db.execute(
+        select(HoldingTransaction)
+        .where(
+            HoldingTransaction.user_id == user_id,
+            HoldingTransaction.holding_id == holding_id
+        )
+        .order_by(HoldingTransaction.executed_at, HoldingTransaction.id)
+    )
+    return list(result.scalars().all())
+
+
+async def record_transaction(
+    db: AsyncSession, holding_id: int, user_id: UUID, data: TransactionCreate
+) -> Optional[HoldingTransaction]:
+    """
+    Record a buy or sell of a holding and bring the holding up to date.
+
+    The first transaction of a holding is preceded by an opening buy for
+    what the holding already had (its quantity at its purchase price and
+    date). The holding's lots are then re-matched under the configured
+    cost-basis method: a sell that exceeds the units held at its time is
+    rejected, and the holding's quantity and purchase price (the average
+    cost of what is left) are set from the result, with the snapshots
+    adjusted to match.
+
+    Args:
+        db (AsyncSession): The database session.
+        holding_id (int): The holding ID.
+        user_id (UUID): The owner user ID.
+        data (TransactionCreate): The trade.
+
+    Returns:
+        Optional[HoldingTransaction]: The new transaction, or None if the
+        holding is not found or not owned.
+
+    Raises:
+        lots.OversoldError: If the sell exceeds the units held at that time.
+    """
+    result = await db.execute(
+        select(holding_model)
+        .where(
+            holding_model.id == holding_id,
+            holding_model.user_id == user_id
+        )
+        .with_for_update()
     )
     holding = result.scalar_one_or_none()
-    if not holding:
-        return False
+    if holding is None:
+        return None
+
+    result = await db.execute(
+        select(
+            HoldingTransaction.executed_at,
+            HoldingTransaction.type,
+            HoldingTransaction.quantity,
+            HoldingTransaction.price,
+            HoldingTransaction.fees,
+        )
+        .where(
+            HoldingTransaction.user_id == user_id,
+            HoldingTransaction.holding_id == holding_id
+        )
+        .order_by(HoldingTransaction.executed_at, HoldingTransaction.id)
+    )
+    history = [tuple(row) for row in result.all()]
 
-    await db.delete(holding)
+    new = []
+    if not history and holding.quantity > 0:
+        new.append(HoldingTransaction(
+            holding_id=holding_id,
+            user_id=user_id,
+            type=TransactionType.BUY,
+            quantity=holding.quantity,
+            price=holding.purchase_price,
+            fees=0.0,
+            executed_at=holding.purchase_date,
+        ))
+    values = data.model_dump()
+    executed_at = values["executed_at"] or datetime.utcnow()
+    if executed_at.tzinfo is not None:  # stored as naive UTC, like every other timestamp
+        executed_at = executed_at.astimezone(timezone.utc).replace(tzinfo=None)
+    values["executed_at"] = executed_at
+    transaction = HoldingTransaction(**values, holding_id=holding_id, user_id=user_id)
+    new.append(transaction)
+
+    # Ties on executed_at keep insertion order, like the (executed_at, id) sort
+    rows = sorted(
+        history + [(t.executed_at, t.type, t.quantity, t.price, t.fees) for t in new],
+        key=lambda row: row[0],
+    )
+    match = lots.match_lots(
+        lots.LotLedger.from_rows([(0, *row[1:]) for row in rows]), lots.default_method()
+    )
+
+    before = snapshots.holding_delta(
+        holding.symbol, holding.asset_type, holding.quantity, holding.purchase_price, sign=-1
+    )
+    old_quantity, old_cost = holding.quantity, holding.quantity * holding.purchase_price
+    quantity = float(match.remaining_quantity[0])
+    holding.quantity = quantity
+    if quantity > 0:
+        holding.purchase_price = float(match.remaining_cost[0]) / quantity
+    db.add_all(new)
+    await snapshots.apply_deltas(db, user_id, [before, snapshots.holding_delta(
+        holding.symbol, holding.asset_type, holding.quantity, holding.purchase_price
+    )])
+    await ledger.append(db, user_id, [ledger.trade(
+        transaction.type, holding.symbol, holding.asset_type,
+        transaction.quantity, transaction.price, transaction.fees,
+        (quantity - old_quantity, float(match.remaining_cost[0]) - old_cost),
+        occurred_at=executed_at, holding_id=holding_id,
+    )])
     await db.commit()
-    return True
+    await db.refresh(transaction)
+    return transaction
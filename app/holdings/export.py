@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import csv
+import io
+import sys
+import time
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import zstandard
+from sqlalchemy import String, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.holdings import crud
+from app.holdings.schemas import AssetType, HoldingRead
+
+"""
+Bulk holdings export to CSV or Parquet, in constant memory.
+
+Rows come from a server-side cursor `chunk_size` at a time
+(`crud.stream_holding_rows`), and each chunk is encoded and handed on
+before the next is fetched: a block of CSV lines, or one Parquet row group.
+Peak memory depends on the chunk size, not on how many holdings there are.
+
+With `compression="zstd"`, CSV is written as a single zstd frame
+(`.csv.zst`) and Parquet uses zstd for its column chunks.
+
+Users download their own holdings from `GET /holdings/export`; full
+exports across all users (compliance) run from the command line:
+
+    python -m app.holdings.export --format parquet --compression zstd -o holdings.parquet
+"""
+
+FORMATS = ("csv", "parquet")
+COMPRESSIONS = ("none", "zstd")
+DEFAULT_CHUNK_SIZE = 10000
+ZSTD_LEVEL = 3
+
+# Exported columns: those of a HoldingRead, in field order
+FIELDS = list(HoldingRead.model_fields)
+_DATETIME_FIELDS = {"purchase_date", "created_at", "updated_at"}
+
+# The user ID and asset type are read as stored (no UUID / enum objects
+# built per row only to be turned back into strings)
+_RAW_FIELDS = {"user_id", "asset_type"}
+COLUMNS = [
+    type_coerce(column, String).label(column.key) if column.key in _RAW_FIELDS else column
+    for column in crud.HOLDING_READ_COLUMNS
+]
+# Asset types are stored by enum name
+_ASSET_TYPE_VALUES = {member.name: member.value for member in AssetType}
+
+
+def media_type(fmt: str, compression: str) -> str:
+    """
+    Content type of an export.
+    """
+    if fmt == "parquet":
+        return "application/vnd.apache.parquet"
+    return "application/zstd" if compression == "zstd" else "text/csv; charset=utf-8"
+
+
+def filename(fmt: str, compression: str, stem: str = "holdings") -> str:
+    """
+    Download name of an export (e.g. `holdings.csv.zst`).
+    """
+    suffix = ".zst" if fmt == "csv" and compression == "zstd" else ""
+    return f"{stem}.{fmt}{suffix}"
+
+
+def _columns(rows: Sequence[Tuple]) -> List[list]:
+    """
+    Transpose a chunk into plain-value columns (enum values, string UUIDs).
+    """
+    columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in FIELDS]
+    for i, name in enumerate(FIELDS):
+        if name == "asset_type":
+            columns[i] = [_ASSET_TYPE_VALUES.get(value, value) for value in columns[i]]
+        elif name == "user_id":
+            columns[i] = [str(value) for value in columns[i]]
+    return columns
+
+
+class CsvEncoder:
+    """
+    Encodes chunks of rows as CSV lines, the header first.
+    """
+
+    def __init__(self) -> None:
+        self._header = True
+
+    def encode(self, rows: Sequence[Tuple]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if self._header:
+            writer.writerow(FIELDS)
+            self._header = False
+        columns = _columns(rows)
+        for i, name in enumerate(FIELDS):
+            if name in _DATETIME_FIELDS:
+                columns[i] = [value.isoformat() if value is not None else None for value in columns[i]]
+        writer.writerows(zip(*columns))
+        return buffer.getvalue().encode("utf-8")
+
+    def finish(self) -> bytes:
+        return self.encode([]) if self._header else b""
+
+
+class _Sink(io.RawIOBase):
+    """
+    Write-only file that hands back (and forgets) what was written to it.
+    """
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class ParquetEncoder:
+    """
+    Encodes each chunk of rows as one Parquet row group.
+    """
+
+    def __init__(self, compression: str = "none") -> None:
+        # pyarrow is only needed (and imported) for Parquet exports
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._pq = pq
+        self._compression = compression
+        types = {
+            "id": pa.int64(), "user_id": pa.string(),
+            "quantity": pa.float64(), "purchase_price": pa.float64(),
+            **{name: pa.timestamp("us") for name in _DATETIME_FIELDS},
+        }
+        self._schema = pa.schema([(name, types.get(name, pa.string())) for name in FIELDS])
+        self._sink = _Sink()
+        self._writer = None
+
+    def _open(self):
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(
+                self._sink, self._schema, compression=self._compression
+            )
+        return self._writer
+
+    def encode(self, rows: Sequence[Tuple]) -> bytes:
+        columns = _columns(rows)
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema,
+        )
+        self._open().write_table(table)
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._open().close()
+        return self._sink.drain()
+
+
+class _Zstd:
+    """
+    Compresses another encoder's output as a single zstd frame.
+    """
+
+    def __init__(self, encoder: CsvEncoder, level: int = ZSTD_LEVEL) -> None:
+        self._encoder = encoder
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def encode(self, rows: Sequence[Tuple]) -> bytes:
+        return self._compressor.compress(self._encoder.encode(rows))
+
+    def finish(self) -> bytes:
+        return self._compressor.compress(self._encoder.finish()) + self._compressor.flush()
+
+
+def make_encoder(fmt: str, compression: str = "none"):
+    """
+    Build the encoder for an export format and compression.
+
+    Raises:
+        ValueError: If the format or compression is unknown.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression!r}")
+    if fmt == "parquet":
+        return ParquetEncoder(compression)
+    return _Zstd(CsvEncoder()) if compression == "zstd" else CsvEncoder()
+
+
+async def export_holdings(
+    db: AsyncSession,
+    fmt: str,
+    compression: str = "none",
+    user_id: Optional[UUID] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Encode holdings chunk by chunk, in id order.
+
+    Args:
+        db (AsyncSession): The database session (must stay open while iterating).
+        fmt (str): "csv" or "parquet".
+        compression (str): "none" or "zstd".
+        user_id (UUID, optional): Only this user's holdings (default: everyone's).
+        chunk_size (int): Rows fetched and encoded at a time.
+
+    Yields:
+        bytes: Consecutive pieces of the file.
+    """
+    encoder = make_encoder(fmt, compression)
+    async for rows in crud.stream_holding_rows(db, user_id, chunk_size, COLUMNS):
+        data = encoder.encode(rows)
+        if data:
+            yield data
+    data = encoder.finish()
+    if data:
+        yield data
+
+
+async def _main(args: argparse.Namespace) -> int:
+    from app.db.database import AsyncSessionLocal
+
+    user_id = UUID(args.user) if args.user else None
+    output = args.output or filename(args.format, args.compression, f"holdings-{datetime.utcnow():%Y%m%dT%H%M%S}")
+    started = time.perf_counter()
+    written = 0
+    async with AsyncSessionLocal() as session:
+        with open(output, "wb") as file:
+            async for data in export_holdings(
+                session, args.format, args.compression, user_id, args.chunk_size
+            ):
+                file.write(data)
+                written += len(data)
+    print(f"✅ Exported holdings to {output} ({written} bytes in {time.perf_counter() - started:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export holdings (all users by default) to CSV or Parquet.")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="none")
+    parser.add_argument("-o", "--output", default=None, help="Output file (default: holdings-<timestamp>.<format>)")
+    parser.add_argument("--user", default=None, help="Only this user ID")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk / row group")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
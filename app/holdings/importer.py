@@ -0,0 +1,171 @@
+import csv
+import io
+from itertools import islice
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+import orjson
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.holdings import crud
+from app.holdings.schemas import HoldingCreate, HoldingImportResult, ImportRowError
+
+"""
+Bulk holdings import from CSV or NDJSON files.
+
+The file is parsed incrementally, validated `batch_size` rows at a time, and
+each batch of valid rows is written with one multi-row `INSERT ... RETURNING`.
+All batches share a single transaction, so an import either lands completely
+or not at all, and memory is bounded by the batch size, not the file size.
+"""
+
+FORMATS = ("csv", "ndjson")
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 2000  # keeps rows × columns under SQLite's bound-parameter limit
+
+_batch_adapter = TypeAdapter(List[HoldingCreate])
+
+
+class ImportFormatError(ValueError):
+    """
+    Raised when the file cannot be parsed in the requested format.
+    """
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    """
+    Guess the import format from the upload's filename or content type.
+    """
+    name = (filename or "").lower()
+    kind = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in kind or "jsonl" in kind:
+        return "ndjson"
+    return "csv"
+
+
+def iter_records(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield `(row_number, record)` pairs from a binary file, one row at a time.
+
+    CSV rows become dicts keyed by the header (empty cells → None); NDJSON
+    lines are decoded JSON values. Blank lines are skipped.
+
+    Raises:
+        ImportFormatError: If `fmt` is unknown or the file is not readable as such.
+    """
+    if fmt == "csv":
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        try:
+            reader = csv.DictReader(text)
+            for number, row in enumerate(reader, start=1):
+                yield number, {k.strip(): (v if v != "" else None) for k, v in row.items() if k}
+        except (csv.Error, UnicodeDecodeError) as exc:
+            raise ImportFormatError(f"Unreadable CSV: {exc}") from exc
+        finally:
+            text.detach()  # leave the upload's file open for its owner
+    elif fmt == "ndjson":
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, orjson.loads(line)
+            except orjson.JSONDecodeError as exc:
+                yield number, exc
+    else:
+        raise ImportFormatError(f"Unsupported format: {fmt}")
+
+
+def _format_error(error: Dict[str, Any]) -> str:
+    field = ".".join(str(part) for part in error["loc"][1:])
+    return f"{field}: {error['msg']}" if field else error["msg"]
+
+
+def validate_batch(
+    batch: List[Tuple[int, Any]]
+) -> Tuple[List[HoldingCreate], List[ImportRowError]]:
+    """
+    Validate a batch of records in one call, splitting valid rows from errors.
+    """
+    errors: Dict[int, List[str]] = {}
+    candidates: List[Tuple[int, Any]] = []
+    for number, record in batch:
+        if isinstance(record, Exception):
+            errors[number] = [f"Invalid JSON: {record}"]
+        else:
+            candidates.append((number, record))
+
+    records = [record for _, record in candidates]
+    try:
+        valid = _batch_adapter.validate_python(records)
+    except ValidationError as exc:
+        rejected = set()
+        for error in exc.errors():
+            position = error["loc"][0]
+            rejected.add(position)
+            errors.setdefault(candidates[position][0], []).append(_format_error(error))
+        # Re-validate the survivors; they are known to pass
+        valid = _batch_adapter.validate_python(
+            [r for i, r in enumerate(records) if i not in rejected]
+        )
+
+    return valid, [
+        ImportRowError(row=number, errors=messages)
+        for number, messages in sorted(errors.items())
+    ]
+
+
+async def import_holdings(
+    db: AsyncSession,
+    user_id: UUID,
+    stream: IO[bytes],
+    fmt: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> HoldingImportResult:
+    """
+    Parse, validate and insert holdings from a file in one transaction.
+
+    Invalid rows are reported and skipped; valid rows are still imported.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): Owner of the imported holdings.
+        stream (IO[bytes]): The uploaded file.
+        fmt (str): "csv" or "ndjson".
+        batch_size (int): Rows validated and inserted per statement.
+        dry_run (bool): Validate only; write nothing.
+
+    Returns:
+        HoldingImportResult: Counts, created IDs and per-row errors.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    records = iter_records(stream, fmt)
+    total = valid_count = 0
+    created: List[int] = []
+    errors: List[ImportRowError] = []
+
+    try:
+        while batch := list(islice(records, batch_size)):
+            total += len(batch)
+            valid, batch_errors = validate_batch(batch)
+            valid_count += len(valid)
+            errors.extend(batch_errors)
+            if not dry_run:
+                created.extend(await crud.bulk_insert_holdings(db, valid, user_id))
+        if not dry_run:
+            await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    return HoldingImportResult(
+        dry_run=dry_run,
+        total_rows=total,
+        valid_rows=valid_count,
+        imported=len(created),
+        created_ids=created,
+        errors=errors,
+    )
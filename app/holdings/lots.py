@@ -0,0 +1,551 @@
+import heapq
+from dataclasses import dataclass
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import case, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db.models import Holding as holding_model, HoldingTransaction
+from app.holdings.schemas import (
+    AssetType,
+    CostBasisMethod,
+    GainsReport,
+    HoldingGains,
+    TransactionType,
+)
+from app.market.service import get_current_prices, normalize_symbol
+
+"""
+Tax lots and cost-basis matching.
+
+Every buy transaction opens a lot; every sell is matched against the lots of
+the same holding that are open at that moment, under one of four methods:
+
+- FIFO: oldest lots first
+- LIFO: newest lots first
+- HIFO: highest unit cost first
+- average: every open unit costs the running average
+
+The engine works on a `LotLedger` — all the transactions of one or more
+holdings as NumPy columns, grouped by holding and in time order — never on
+ORM objects. FIFO is fully vectorized: consumed ranges of the cumulative
+bought quantity are priced by interpolating the cumulative cost. LIFO and
+HIFO walk the sells with an index stack / heap of open lots, so Python-level
+work is proportional to sells plus lots they close; average cost loops over
+sells only. Buy fees are part of a lot's cost; sell fees reduce proceeds.
+
+Holdings without transactions are treated as one lot bought at their
+`purchase_price` when they were purchased.
+"""
+
+# Quantities this close to zero (relative to the ledger's scale) are zero
+EPSILON = 1e-9
+
+
+class OversoldError(ValueError):
+    """
+    A sell exceeds the units held at that point in time.
+    """
+
+    def __init__(self, group: int, position: int):
+        super().__init__(
+            f"Transaction {position + 1} of holding group {group} sells more units than are held."
+        )
+        self.group = group
+        self.position = position
+
+
+def default_method() -> CostBasisMethod:
+    """
+    The configured default cost-basis method.
+    """
+    return CostBasisMethod(get_settings().cost_basis_method.lower())
+
+
+@dataclass(frozen=True)
+class LotLedger:
+    """
+    Transactions in columnar form, sorted by group (holding) and then time.
+
+    `groups` are integer codes `0 … n_groups-1` in non-decreasing order; all
+    other arrays are aligned with it, one entry per transaction.
+    """
+    groups: np.ndarray
+    is_sell: np.ndarray
+    quantity: np.ndarray
+    price: np.ndarray
+    fees: np.ndarray
+    n_groups: int
+
+    def __len__(self) -> int:
+        return len(self.quantity)
+
+    @classmethod
+    def from_columns(
+        cls,
+        groups: np.ndarray,
+        signed_quantity: np.ndarray,
+        price: np.ndarray,
+        fees: np.ndarray,
+        n_groups: int,
+    ) -> "LotLedger":
+        """
+        Build a ledger from arrays, with sells as negative quantities.
+        """
+        return cls(
+            groups=np.asarray(groups, dtype=np.int64),
+            is_sell=signed_quantity < 0,
+            quantity=np.abs(signed_quantity),
+            price=np.asarray(price, dtype=np.float64),
+            fees=np.asarray(fees, dtype=np.float64),
+            n_groups=n_groups,
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple], n_groups: Optional[int] = None) -> "LotLedger":
+        """
+        Build a ledger from `(group, type, quantity, price, fees)` tuples,
+        already sorted by group and time. `type` is a `TransactionType` or its value.
+        """
+        sell = TransactionType.SELL.value
+        # One flat pass of C-level conversion instead of an array per column
+        flat = np.fromiter(
+            chain.from_iterable(
+                (group, -quantity if kind == sell else quantity, price, fees)
+                for group, kind, quantity, price, fees in rows
+            ),
+            dtype=np.float64, count=4 * len(rows),
+        ).reshape(-1, 4)
+        groups = flat[:, 0].astype(np.int64)
+        if n_groups is None:
+            n_groups = int(groups[-1]) + 1 if len(groups) else 0
+        return cls.from_columns(groups, flat[:, 1], flat[:, 2], flat[:, 3], n_groups)
+
+
+@dataclass(frozen=True)
+class LotMatch:
+    """
+    Result of matching a ledger's sells against its lots.
+
+    `sell_cost` is aligned with the ledger's sells (in order) and
+    `lot_remaining` with its buys (None for average cost, which has no
+    individual lots); every other array has one entry per group.
+    """
+    method: CostBasisMethod
+    sell_cost: np.ndarray
+    lot_remaining: Optional[np.ndarray]
+    bought: np.ndarray
+    sold: np.ndarray
+    buy_cost: np.ndarray
+    realized_cost: np.ndarray
+    proceeds: np.ndarray
+    lot_count: np.ndarray
+    sell_count: np.ndarray
+
+    @property
+    def remaining_quantity(self) -> np.ndarray:
+        return np.maximum(self.bought - self.sold, 0.0)
+
+    @property
+    def remaining_cost(self) -> np.ndarray:
+        return np.where(self.remaining_quantity > 0, self.buy_cost - self.realized_cost, 0.0)
+
+    @property
+    def realized_gain(self) -> np.ndarray:
+        return self.proceeds - self.realized_cost
+
+    def open_lots(self, ledger: LotLedger) -> Optional[np.ndarray]:
+        """
+        Lots with units left, per group (None for average cost).
+        """
+        if self.lot_remaining is None:
+            return None
+        open_ = self.lot_remaining > _tolerance(ledger)
+        return np.bincount(ledger.groups[~ledger.is_sell][open_], minlength=ledger.n_groups)
+
+
+def _tolerance(ledger: LotLedger) -> float:
+    scale = float(ledger.quantity.max()) if len(ledger) else 1.0
+    return EPSILON * max(scale, 1.0)
+
+
+def _group_cumsum(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Running sum of `values` that restarts at every group (groups sorted).
+    """
+    total = np.cumsum(values)
+    starts = np.searchsorted(groups, np.arange(n_groups))
+    before = np.concatenate(([0.0], total))[starts]
+    return total - before[groups]
+
+
+def _check_oversold(ledger: LotLedger, tolerance: float) -> None:
+    signed = np.where(ledger.is_sell, -ledger.quantity, ledger.quantity)
+    held = _group_cumsum(signed, ledger.groups, ledger.n_groups)
+    # Running sums over the whole ledger drift with its size; allow for it
+    slack = max(tolerance, 1e-12 * float(ledger.quantity.sum()))
+    bad = np.flatnonzero(held < -slack)
+    if bad.size:
+        position = int(bad[0])
+        group = int(ledger.groups[position])
+        raise OversoldError(group, position - int(np.searchsorted(ledger.groups, group)))
+
+
+def _match_fifo(
+    ledger: LotLedger, buys: np.ndarray, lot_qty: np.ndarray, lot_cost: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    FIFO without a loop: lots are laid end to end on one cumulative-quantity
+    axis (group after group), and each sell consumes the next slice of its
+    group's range. The cost of a slice is the difference of the cumulative
+    cost, linearly interpolated (lots are uniform inside).
+    """
+    n = ledger.n_groups
+    buy_groups = ledger.groups[buys]
+    x = np.concatenate(([0.0], np.cumsum(lot_qty)))
+    y = np.concatenate(([0.0], np.cumsum(lot_cost)))
+    group_bought = np.bincount(buy_groups, weights=lot_qty, minlength=n)
+    group_start = np.concatenate(([0.0], np.cumsum(group_bought)))[:-1]
+    group_end = group_start + group_bought
+
+    sells = ledger.is_sell
+    sell_groups = ledger.groups[sells]
+    sell_qty = ledger.quantity[sells]
+    consumed = _group_cumsum(sell_qty, sell_groups, n) + group_start[sell_groups]
+    consumed = np.minimum(consumed, group_end[sell_groups])
+    sell_cost = np.interp(consumed, x, y) - np.interp(
+        np.maximum(consumed - sell_qty, group_start[sell_groups]), x, y
+    )
+
+    total_consumed = group_start + np.bincount(sell_groups, weights=sell_qty, minlength=n)
+    remaining = np.clip(x[1:] - total_consumed[buy_groups], 0.0, lot_qty)
+    return sell_cost, remaining
+
+
+def _match_ordered(
+    ledger: LotLedger,
+    buys: np.ndarray,
+    lot_qty: np.ndarray,
+    lot_cost: np.ndarray,
+    method: CostBasisMethod,
+    tolerance: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    LIFO (a stack of open lots) or HIFO (a heap of open lots). Lots are
+    renumbered so that the lot to close first is always the largest (LIFO)
+    or smallest (HIFO) number open: for HIFO, its rank by unit cost, highest
+    first, then oldest. The heap then holds plain ints, and lots bought
+    before a sell are pushed in one batch.
+    """
+    buy_positions = np.flatnonzero(buys)
+    sell_positions = np.flatnonzero(ledger.is_sell)
+    buy_groups = ledger.groups[buys]
+    unit_cost = lot_cost / lot_qty
+    first_buy = np.searchsorted(buy_groups, np.arange(ledger.n_groups)).tolist()
+    pushed_upto = np.searchsorted(buy_positions, sell_positions).tolist()
+
+    hifo = method is CostBasisMethod.HIFO
+    if hifo:
+        order = np.lexsort((np.arange(len(unit_cost)), -unit_cost))
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        numbers = rank.tolist()
+        remaining = lot_qty[order].tolist()
+        units = unit_cost[order].tolist()
+    else:
+        remaining = lot_qty.tolist()
+        units = unit_cost.tolist()
+    sell_qty = ledger.quantity[ledger.is_sell].tolist()
+    sell_groups = ledger.groups[ledger.is_sell].tolist()
+    sell_cost = [0.0] * len(sell_qty)
+    heappush, heappop, heapify = heapq.heappush, heapq.heappop, heapq.heapify
+
+    open_lots: List[int] = []
+    group = -1
+    next_lot = 0
+    for k, (need, sell_group, upto) in enumerate(zip(sell_qty, sell_groups, pushed_upto)):
+        if sell_group != group:
+            group = sell_group
+            open_lots = []
+            next_lot = first_buy[group]
+        if upto > next_lot:
+            if not hifo:
+                open_lots.extend(range(next_lot, upto))
+            elif upto - next_lot > len(open_lots):
+                open_lots.extend(numbers[next_lot:upto])
+                heapify(open_lots)
+            else:
+                for number in numbers[next_lot:upto]:
+                    heappush(open_lots, number)
+            next_lot = upto
+
+        cost = 0.0
+        while need > tolerance and open_lots:
+            lot = open_lots[0] if hifo else open_lots[-1]
+            left = remaining[lot]
+            if left - need > tolerance:
+                remaining[lot] = left - need
+                cost += need * units[lot]
+                break
+            # The sell closes this lot
+            cost += left * units[lot]
+            need -= left
+            remaining[lot] = 0.0
+            if hifo:
+                heappop(open_lots)
+            else:
+                open_lots.pop()
+        sell_cost[k] = cost
+
+    remaining = np.asarray(remaining, dtype=np.float64)
+    return np.asarray(sell_cost, dtype=np.float64), (remaining[rank] if hifo else remaining)
+
+
+def _match_average(ledger: LotLedger, buys: np.ndarray, lot_qty: np.ndarray, lot_cost: np.ndarray) -> np.ndarray:
+    """
+    Average cost: a sell's cost is its share of the units held times the cost
+    still held. Cumulative bought units / cost before each sell are vectorized;
+    only the running sold totals need a loop over sells.
+    """
+    buy_positions = np.flatnonzero(buys)
+    sell_positions = np.flatnonzero(ledger.is_sell)
+    sell_groups = ledger.groups[ledger.is_sell]
+    x = np.concatenate(([0.0], np.cumsum(lot_qty)))
+    y = np.concatenate(([0.0], np.cumsum(lot_cost)))
+    upto = np.searchsorted(buy_positions, sell_positions)
+    start = np.searchsorted(ledger.groups[buys], sell_groups)
+    bought_qty = (x[upto] - x[start]).tolist()
+    bought_cost = (y[upto] - y[start]).tolist()
+
+    sell_cost = []
+    group = -1
+    sold = removed = 0.0
+    for need, sell_group, qty, cost in zip(
+        ledger.quantity[ledger.is_sell].tolist(), sell_groups.tolist(), bought_qty, bought_cost
+    ):
+        if sell_group != group:
+            group, sold, removed = sell_group, 0.0, 0.0
+        held = qty - sold
+        matched = (cost - removed) * min(need / held, 1.0) if held > 0 else 0.0
+        sell_cost.append(matched)
+        sold += need
+        removed += matched
+    return np.asarray(sell_cost, dtype=np.float64)
+
+
+def match_lots(ledger: LotLedger, method: CostBasisMethod = CostBasisMethod.FIFO) -> LotMatch:
+    """
+    Match every sell of a ledger against open lots.
+
+    Args:
+        ledger (LotLedger): Transactions grouped by holding, in time order.
+        method (CostBasisMethod): How sells pick lots.
+
+    Returns:
+        LotMatch: Cost of each sell, units left per lot and per-group totals.
+
+    Raises:
+        OversoldError: If a sell exceeds the units held at that time.
+    """
+    n = ledger.n_groups
+    tolerance = _tolerance(ledger)
+    _check_oversold(ledger, tolerance)
+
+    buys = ~ledger.is_sell
+    lot_qty = ledger.quantity[buys]
+    lot_cost = lot_qty * ledger.price[buys] + ledger.fees[buys]
+    sells = ledger.is_sell
+
+    if not sells.any():
+        sell_cost, lot_remaining = np.empty(0, dtype=np.float64), lot_qty.copy()
+    elif method is CostBasisMethod.FIFO:
+        sell_cost, lot_remaining = _match_fifo(ledger, buys, lot_qty, lot_cost)
+    elif method is CostBasisMethod.AVERAGE:
+        sell_cost, lot_remaining = _match_average(ledger, buys, lot_qty, lot_cost), None
+    else:
+        sell_cost, lot_remaining = _match_ordered(ledger, buys, lot_qty, lot_cost, method, tolerance)
+    if method is CostBasisMethod.AVERAGE:
+        lot_remaining = None
+
+    buy_groups = ledger.groups[buys]
+    sell_groups = ledger.groups[sells]
+    sell_qty = ledger.quantity[sells]
+    return LotMatch(
+        method=method,
+        sell_cost=sell_cost,
+        lot_remaining=lot_remaining,
+        bought=np.bincount(buy_groups, weights=lot_qty, minlength=n),
+        sold=np.bincount(sell_groups, weights=sell_qty, minlength=n),
+        buy_cost=np.bincount(buy_groups, weights=lot_cost, minlength=n),
+        realized_cost=np.bincount(sell_groups, weights=sell_cost, minlength=n),
+        proceeds=np.bincount(
+            sell_groups, weights=sell_qty * ledger.price[sells] - ledger.fees[sells], minlength=n
+        ),
+        lot_count=np.bincount(buy_groups, minlength=n),
+        sell_count=np.bincount(sell_groups, minlength=n),
+    )
+
+
+# ----------------------------------------------------------------------------
+# 🗄️ Loading ledgers and building reports
+# ----------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class HoldingInfo:
+    """
+    The holding behind one ledger group.
+    """
+    holding_id: int
+    symbol: str
+    asset_type: AssetType
+
+
+async def load_ledger(
+    db: AsyncSession, user_id: UUID, holding_id: Optional[int] = None
+) -> Tuple[LotLedger, List[HoldingInfo]]:
+    """
+    Load a user's transactions (optionally one holding's) as a ledger.
+
+    Two column-only queries: the holdings, then their transactions in
+    (holding, time) order straight off `ix_holding_transactions_user_holding_time`.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The owner user ID.
+        holding_id (int, optional): Restrict to this holding.
+
+    Returns:
+        Tuple[LotLedger, List[HoldingInfo]]: The ledger and one entry per group.
+    """
+    holdings_query = select(
+        holding_model.id,
+        holding_model.symbol,
+        holding_model.asset_type,
+        holding_model.quantity,
+        holding_model.purchase_price,
+    ).where(holding_model.user_id == user_id).order_by(holding_model.id)
+    # Sells come back as negative quantities, so every column is numeric
+    tx_query = select(
+        HoldingTransaction.holding_id,
+        case(
+            (HoldingTransaction.type == TransactionType.SELL, -HoldingTransaction.quantity),
+            else_=HoldingTransaction.quantity,
+        ),
+        HoldingTransaction.price,
+        HoldingTransaction.fees,
+    ).where(HoldingTransaction.user_id == user_id).order_by(
+        HoldingTransaction.holding_id, HoldingTransaction.executed_at, HoldingTransaction.id
+    )
+    if holding_id is not None:
+        holdings_query = holdings_query.where(holding_model.id == holding_id)
+        tx_query = tx_query.where(HoldingTransaction.holding_id == holding_id)
+
+    holdings = (await db.execute(holdings_query)).all()
+    # Core execution on the session's connection: plain rows, skipping the
+    # ORM result layer, which costs more than the query for 100k+ rows
+    connection = await db.connection()
+    transactions = (await connection.execute(tx_query)).all()
+
+    info = [HoldingInfo(row[0], normalize_symbol(row[1]), row[2]) for row in holdings]
+    holding_ids = np.fromiter((row[0] for row in holdings), dtype=np.int64, count=len(holdings))
+    flat = np.fromiter(
+        chain.from_iterable(transactions), dtype=np.float64, count=4 * len(transactions)
+    ).reshape(-1, 4)
+    tx_holding = flat[:, 0].astype(np.int64)
+    known = np.isin(tx_holding, holding_ids)
+    groups = np.searchsorted(holding_ids, tx_holding[known])
+    columns = [groups, flat[known, 1], flat[known, 2], flat[known, 3]]
+
+    # Holdings never traded through transactions are a single implicit lot
+    quantity = np.fromiter((row[3] for row in holdings), dtype=np.float64, count=len(holdings))
+    implicit = np.flatnonzero(
+        (np.bincount(groups, minlength=len(holdings)) == 0) & (quantity > 0)
+    )
+    if implicit.size:
+        price = np.fromiter((row[4] for row in holdings), dtype=np.float64, count=len(holdings))
+        extra = [implicit, quantity[implicit], price[implicit], np.zeros(implicit.size)]
+        columns = [np.concatenate(pair) for pair in zip(columns, extra)]
+        order = np.argsort(columns[0], kind="stable")  # stable: time order kept within a holding
+        columns = [column[order] for column in columns]
+    return LotLedger.from_columns(*columns, n_groups=len(holdings)), info
+
+
+async def gains_report(
+    db: AsyncSession,
+    user_id: UUID,
+    method: Optional[CostBasisMethod] = None,
+    holding_id: Optional[int] = None,
+) -> GainsReport:
+    """
+    Realized and unrealized gains of a user's holdings under a cost-basis method.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The owner user ID.
+        method (CostBasisMethod, optional): Defaults to `COST_BASIS_METHOD`.
+        holding_id (int, optional): Restrict to this holding.
+
+    Returns:
+        GainsReport: Totals and per-holding gains.
+    """
+    method = method or default_method()
+    ledger, info = await load_ledger(db, user_id, holding_id)
+    match = match_lots(ledger, method)
+
+    lookup = {h.symbol: h.asset_type.value for h in info if h.asset_type is not AssetType.CASH}
+    prices = await get_current_prices(lookup.keys(), asset_types=lookup) if lookup else {}
+    return build_report(ledger, match, info, prices)
+
+
+def build_report(
+    ledger: LotLedger, match: LotMatch, info: Sequence[HoldingInfo], prices: Dict[str, float]
+) -> GainsReport:
+    """
+    Shape a lot match and current prices into a `GainsReport`.
+    """
+    quantity = match.remaining_quantity
+    cost = match.remaining_cost
+    open_lots = match.open_lots(ledger)
+    # Cash is worth what was paid for it
+    price = np.array([
+        (c / q if q > 0 else np.nan) if h.asset_type is AssetType.CASH else prices.get(h.symbol, np.nan)
+        for h, q, c in zip(info, quantity.tolist(), cost.tolist())
+    ], dtype=np.float64)
+    priced = ~np.isnan(price)
+    value = np.where(priced, quantity * np.nan_to_num(price), 0.0)
+    held = quantity > 0
+
+    holdings = [
+        HoldingGains(
+            holding_id=h.holding_id,
+            symbol=h.symbol,
+            asset_type=h.asset_type,
+            quantity=float(quantity[i]),
+            cost_basis=round(float(cost[i]), 6),
+            open_lots=None if open_lots is None else int(open_lots[i]),
+            sold_quantity=float(match.sold[i]),
+            proceeds=round(float(match.proceeds[i]), 6),
+            realized_cost_basis=round(float(match.realized_cost[i]), 6),
+            realized_gain=round(float(match.realized_gain[i]), 6),
+            current_price=float(price[i]) if priced[i] else None,
+            market_value=round(float(value[i]), 6) if priced[i] else None,
+            unrealized_gain=round(float(value[i] - cost[i]), 6) if priced[i] else None,
+        )
+        for i, h in enumerate(info)
+    ]
+    return GainsReport(
+        method=match.method,
+        lots=int(match.lot_count.sum()),
+        sells=int(match.sell_count.sum()),
+        proceeds=round(float(match.proceeds.sum()), 6),
+        realized_gain=round(float(match.realized_gain.sum()), 6),
+        cost_basis=round(float(cost.sum()), 6),
+        market_value=round(float(value.sum()), 6),
+        unrealized_gain=round(float((value - cost)[priced].sum()), 6),
+        missing_prices=sorted({h.symbol for i, h in enumerate(info) if held[i] and not priced[i]}),
+        holdings=holdings,
+    )
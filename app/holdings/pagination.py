@@ -0,0 +1,45 @@
+import base64
+import binascii
+from typing import Optional
+
+"""
+Opaque keyset-pagination cursors for holdings listings.
+
+Pages are keyed on `(user_id, id)`: the user is fixed by authentication, so a
+cursor only needs the last holding id seen. It is base64url-encoded and
+versioned so the format can change without breaking clients holding cursors.
+"""
+
+_PREFIX = "h1:"
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a client-supplied cursor cannot be decoded.
+    """
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Build the cursor pointing just past holding `last_id`.
+    """
+    raw = f"{_PREFIX}{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Return the last holding id encoded in `cursor` (None for no cursor).
+
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError) as exc:
+        raise InvalidCursor("Malformed cursor") from exc
+    if not raw.startswith(_PREFIX) or not raw[len(_PREFIX):].isdigit():
+        raise InvalidCursor("Malformed cursor")
+    return int(raw[len(_PREFIX):])
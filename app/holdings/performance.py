@@ -0,0 +1,389 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Mapping, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import case, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Holding as holding_model, HoldingTransaction
+from app.holdings.schemas import AssetType, AssetTypeContribution, PortfolioPerformance, TransactionType
+from app.holdings.valuation import ASSET_TYPES, HoldingColumns
+from app.market.providers import PriceBars, ProviderError
+from app.market.providers.base import to_epoch
+from app.market.service import get_price_history
+
+"""
+Vectorized portfolio performance over history.
+
+Trades become a (position × day) quantity matrix — a cumulative sum of
+buys and sells — that is multiplied element-wise with the matching (position × day)
+close-price matrix to get market value per position per day. Asset-type
+totals are one matrix product with a one-hot (type × position) matrix, and
+every return metric is a handful of vector operations over the day axis.
+Python-level work is proportional to the number of distinct symbols.
+
+A holding's trades are its transactions; a holding never traded through
+transactions is one buy of its quantity at its purchase price and date.
+"""
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+DAYS_PER_YEAR = 365.25
+_CASH = ASSET_TYPES.index(AssetType.CASH)
+
+
+@dataclass(frozen=True)
+class HoldingHistory:
+    """
+    A user's trades in columnar form: `columns.quantity` is signed (sells
+    are negative) and `columns.purchase_price` is the trade price.
+    """
+    columns: HoldingColumns
+    trade_days: np.ndarray  # UTC epoch days, int64
+    fees: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> "HoldingHistory":
+        """
+        Build from `(symbol, quantity, price, asset_type, executed_at[, fees])`
+        tuples, one per trade (a negative quantity is a sell).
+        """
+        columns = HoldingColumns.from_rows([row[:4] for row in rows])
+        trade_days = np.fromiter(
+            (to_epoch(row[4]) // SECONDS_PER_DAY for row in rows),
+            dtype=np.int64, count=len(rows),
+        )
+        fees = np.fromiter(
+            (row[5] if len(row) > 5 else 0.0 for row in rows), dtype=np.float64, count=len(rows)
+        )
+        return cls(columns, trade_days, fees)
+
+    def priced_symbols(self) -> List[str]:
+        """
+        Symbols that need price history (everything but cash).
+        """
+        codes = np.unique(self.columns.symbol_codes[self.columns.asset_types != _CASH])
+        return [self.columns.symbols[c] for c in codes]
+
+
+@dataclass(frozen=True)
+class PriceMatrix:
+    """
+    Daily closes for many symbols on one shared calendar.
+
+    `close[i, d]` is the last close of `symbols[i]` at or before `days[d]`
+    (days before a symbol's first bar take its first close).
+    """
+    symbols: List[str]
+    days: np.ndarray  # UTC epoch days, int64, ascending
+    close: np.ndarray  # (len(symbols), len(days)) float64
+
+    @classmethod
+    def from_bars(cls, bars: Mapping[str, PriceBars]) -> "PriceMatrix":
+        series = {s: b for s, b in bars.items() if len(b)}
+        symbols = list(series)
+        if not symbols:
+            return cls([], np.empty(0, dtype=np.int64), np.empty((0, 0)))
+        bar_days = [np.asarray(b.timestamp) // SECONDS_PER_DAY for b in series.values()]
+        days = np.unique(np.concatenate(bar_days))
+        close = np.empty((len(symbols), len(days)))
+        for row, (symbol_days, b) in enumerate(zip(bar_days, series.values())):
+            # Forward-fill onto the shared calendar (last bar at or before each day)
+            idx = np.searchsorted(symbol_days, days, side="right") - 1
+            close[row] = np.asarray(b.close)[np.maximum(idx, 0)]
+        return cls(symbols, days, close)
+
+
+def _day_to_date(day: int) -> date:
+    return date(1970, 1, 1) + timedelta(days=int(day))
+
+
+def _xirr(years: np.ndarray, cashflows: np.ndarray) -> Optional[float]:
+    """
+    Annual rate r with sum(cashflows / (1 + r) ** years) == 0, or None.
+
+    Newton's method from 10%, falling back to bisection if it leaves the
+    domain or does not converge.
+    """
+    if not (cashflows > 0).any() or not (cashflows < 0).any():
+        return None
+
+    def npv(rate: float) -> float:
+        return float(np.sum(cashflows * np.power(1.0 + rate, -years)))
+
+    rate = 0.1
+    for _ in range(50):
+        growth = np.power(1.0 + rate, -years)
+        value = float(np.sum(cashflows * growth))
+        slope = float(np.sum(-years * cashflows * growth / (1.0 + rate)))
+        if slope == 0:
+            break
+        step = value / slope
+        rate -= step
+        if rate <= -1.0 or not np.isfinite(rate):
+            break
+        if abs(step) < 1e-10:
+            return rate
+
+    lo, hi = -0.9999, 10.0
+    f_lo, f_hi = npv(lo), npv(hi)
+    if np.sign(f_lo) == np.sign(f_hi):
+        return None
+    for _ in range(200):
+        mid = (lo + hi) / 2
+        f_mid = npv(mid)
+        if abs(f_mid) < 1e-9 or hi - lo < 1e-12:
+            break
+        if np.sign(f_mid) == np.sign(f_lo):
+            lo, f_lo = mid, f_mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def compute_performance(
+    history: HoldingHistory,
+    prices: PriceMatrix,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    include_series: bool = True,
+) -> PortfolioPerformance:
+    """
+    Portfolio value series, TWR, MWR, max drawdown and per-asset-type contribution.
+
+    Args:
+        history (HoldingHistory): The user's trades.
+        prices (PriceMatrix): Daily closes for (at least) every priced symbol.
+        start (date, optional): First day (default: first trade).
+        end (date, optional): Last day (default: last price day).
+        include_series (bool): Include the per-day series in the result.
+
+    Returns:
+        PortfolioPerformance: The metrics (and series).
+    """
+    columns = history.columns
+    price_row = {s: i for i, s in enumerate(prices.symbols)}
+    cash = columns.asset_types == _CASH
+    # Map each holding's symbol to its price row (-1: no history)
+    symbol_rows = np.array([price_row.get(s, -1) for s in columns.symbols], dtype=np.int64)
+    holding_rows = symbol_rows[columns.symbol_codes] if len(columns) else symbol_rows
+    usable = cash | (holding_rows >= 0)
+    missing = sorted({columns.symbols[c] for c in columns.symbol_codes[~usable]})
+    if not usable.any():
+        return PortfolioPerformance(missing_prices=missing)
+
+    # 📅 Calendar: price days (or trade days, for an all-cash portfolio)
+    days = prices.days if len(prices.days) else np.unique(history.trade_days[usable])
+    first = np.datetime64(start, "D").astype(np.int64) if start else history.trade_days[usable].min()
+    last = np.datetime64(end, "D").astype(np.int64) if end else days[-1]
+    lo, hi = np.searchsorted(days, [first, last], side="left")
+    hi = hi + 1 if hi < len(days) and days[hi] == last else hi
+    days = days[lo:hi]
+    if not len(days):
+        return PortfolioPerformance(missing_prices=missing)
+
+    # 🧱 Positions = distinct (asset type, symbol) pairs, like the summary
+    n_symbols = len(columns.symbols)
+    group_key = columns.asset_types[usable] * n_symbols + columns.symbol_codes[usable]
+    group_keys, group_idx = np.unique(group_key, return_inverse=True)
+    group_types, group_symbols = np.divmod(group_keys, n_symbols)
+    group_cash = group_types == _CASH
+
+    # Close matrix per position; cash is held in currency units priced at 1
+    group_close = np.ones((len(group_keys), len(days)))
+    priced = ~group_cash
+    if priced.any():
+        group_close[priced] = prices.close[symbol_rows[group_symbols[priced]], lo:lo + len(days)]
+
+    quantity = columns.quantity[usable]
+    trade_price = columns.purchase_price[usable]
+    units = np.where(cash[usable], quantity * trade_price, quantity)
+    day_idx = np.searchsorted(days, history.trade_days[usable], side="left")
+    bought = day_idx < len(days)  # traded after the last day: not in the period
+    before_start = history.trade_days[usable] < days[0]
+
+    # Money in (out, for sells): cost or proceeds, or market value on day
+    # one for what was already held
+    flow = np.where(
+        before_start,
+        units * group_close[group_idx, 0],
+        quantity * trade_price + history.fees[usable],
+    )
+
+    added = np.zeros((len(group_keys), len(days)))
+    np.add.at(added, (group_idx[bought], day_idx[bought]), units[bought])
+    value_by_group = np.cumsum(added, axis=1) * group_close
+
+    # 🏷️ Roll positions and flows up to asset types with one matrix product
+    type_codes = np.unique(group_types)
+    one_hot = (group_types[None, :] == type_codes[:, None]).astype(np.float64)
+    value_by_type = one_hot @ value_by_group
+    flow_by_type = np.zeros((len(type_codes), len(days)))
+    inflow_by_type = np.zeros((len(type_codes), len(days)))
+    holding_type = np.searchsorted(type_codes, group_types[group_idx])
+    np.add.at(flow_by_type, (holding_type[bought], day_idx[bought]), flow[bought])
+    np.add.at(inflow_by_type, (holding_type[bought], day_idx[bought]), np.maximum(flow[bought], 0.0))
+
+    value = value_by_type.sum(axis=0)
+    flows = flow_by_type.sum(axis=0)
+
+    # 📈 Time-weighted: daily returns with contributions at the start of the
+    # day and withdrawals (sells) at its end
+    prev_by_type = np.concatenate([np.zeros((len(type_codes), 1)), value_by_type[:, :-1]], axis=1)
+    base = prev_by_type.sum(axis=0) + inflow_by_type.sum(axis=0)
+    safe = np.where(base > 0, base, 1.0)
+    type_returns = np.where(base > 0, (value_by_type - prev_by_type - flow_by_type) / safe, 0.0)
+    daily = type_returns.sum(axis=0)
+    twr_index = np.cumprod(1.0 + daily)
+    twr = float(twr_index[-1] - 1.0)
+    # Geometric linking: each day's contribution compounds with the growth before it
+    growth_before = np.concatenate([[1.0], twr_index[:-1]])
+    contribution = type_returns @ growth_before
+
+    # Only annualize a year or more: shorter periods would be extrapolated
+    span_years = int(days[-1] - days[0]) / DAYS_PER_YEAR
+    twr_annualized = (1.0 + twr) ** (1.0 / span_years) - 1.0 if span_years >= 1 else None
+
+    # 📉 Max drawdown of the time-weighted index
+    peaks = np.maximum.accumulate(twr_index)
+    drawdown = twr_index / peaks - 1.0
+    trough = int(np.argmin(drawdown))
+    peak = int(np.argmax(twr_index[:trough + 1]))
+
+    # 💸 Money-weighted: IRR of the contributions against the end value
+    flow_days = np.flatnonzero(flows)
+    years = (days[np.append(flow_days, len(days) - 1)] - days[0]) / DAYS_PER_YEAR
+    cashflows = np.concatenate([-flows[flow_days], [value[-1]]])
+    mwr = _xirr(years, cashflows)
+
+    by_asset_type = [
+        AssetTypeContribution.model_construct(
+            asset_type=ASSET_TYPES[code],
+            contribution=round(float(contribution[i]), 6),
+            pnl=round(float(value_by_type[i, -1] - flow_by_type[i].sum()), 2),
+            end_value=round(float(value_by_type[i, -1]), 2),
+        )
+        for i, code in enumerate(type_codes)
+    ]
+
+    result = PortfolioPerformance.model_construct(
+        start=_day_to_date(days[0]),
+        end=_day_to_date(days[-1]),
+        end_value=round(float(value[-1]), 2),
+        net_invested=round(float(flows.sum()), 2),
+        twr=round(twr, 6),
+        twr_annualized=round(twr_annualized, 6) if twr_annualized is not None else None,
+        mwr=round(mwr, 6) if mwr is not None else None,
+        max_drawdown=round(float(drawdown[trough]), 6),
+        max_drawdown_peak=_day_to_date(days[peak]),
+        max_drawdown_trough=_day_to_date(days[trough]),
+        by_asset_type=by_asset_type,
+        missing_prices=missing,
+        dates=[], values=[], invested=[], twr_index=[],
+    )
+    if include_series:
+        epoch = np.datetime64("1970-01-01", "D")
+        result.dates = (epoch + days).tolist()
+        result.values = np.round(value, 2).tolist()
+        result.invested = np.round(np.cumsum(flows), 2).tolist()
+        result.twr_index = np.round(twr_index, 6).tolist()
+    return result
+
+
+async def load_holding_history(db: AsyncSession, user_id: UUID) -> HoldingHistory:
+    """
+    Load every trade of a user's holdings: their transactions, and one buy
+    (quantity at purchase price and date) per holding without any.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The user's ID.
+
+    Returns:
+        HoldingHistory: The user's trades as arrays.
+    """
+    result = await db.execute(
+        select(
+            holding_model.id,
+            holding_model.symbol,
+            holding_model.quantity,
+            holding_model.purchase_price,
+            holding_model.asset_type,
+            holding_model.purchase_date,
+        ).where(holding_model.user_id == user_id)
+    )
+    holdings = {row[0]: row[1:] for row in result.all()}
+    result = await db.execute(
+        select(
+            HoldingTransaction.holding_id,
+            case(
+                (HoldingTransaction.type == TransactionType.SELL, -HoldingTransaction.quantity),
+                else_=HoldingTransaction.quantity,
+            ),
+            HoldingTransaction.price,
+            HoldingTransaction.executed_at,
+            HoldingTransaction.fees,
+        ).where(HoldingTransaction.user_id == user_id)
+    )
+    rows, traded = [], set()
+    for holding_id, quantity, price, executed_at, fees in result.all():
+        holding = holdings.get(holding_id)
+        if holding is not None:
+            traded.add(holding_id)
+            rows.append((holding[0], quantity, price, holding[3], executed_at, fees))
+    rows.extend(
+        holding[:5] for holding_id, holding in holdings.items()
+        if holding_id not in traded and holding[1] > 0
+    )
+    return HoldingHistory.from_rows(rows)
+
+
+async def load_price_matrix(
+    symbols: Sequence[str], start: datetime, end: datetime
+) -> PriceMatrix:
+    """
+    Daily closes for `symbols` over `[start, end)` from the local bar store.
+
+    Symbols whose history cannot be fetched are left out of the matrix.
+    """
+
+    async def one(symbol: str) -> Tuple[str, PriceBars]:
+        try:
+            return symbol, await get_price_history(symbol, start, end, "1d")
+        except ProviderError as exc:
+            logger.warning("No price history for %s: %s", symbol, exc)
+            return symbol, PriceBars.empty()
+
+    pairs = await asyncio.gather(*(one(s) for s in symbols))
+    return PriceMatrix.from_bars(dict(pairs))
+
+
+async def portfolio_performance(
+    db: AsyncSession,
+    user_id: UUID,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    include_series: bool = True,
+) -> PortfolioPerformance:
+    """
+    Load a user's holdings and price history and compute their performance.
+    """
+    history = await load_holding_history(db, user_id)
+    if not len(history):
+        return PortfolioPerformance()
+    first_day = int(history.trade_days.min())
+    fetch_start = datetime.combine(start or _day_to_date(first_day), datetime.min.time(), timezone.utc)
+    fetch_end = (
+        datetime.combine(end + timedelta(days=1), datetime.min.time(), timezone.utc)
+        if end else datetime.now(timezone.utc)
+    )
+    prices = await load_price_matrix(history.priced_symbols(), fetch_start, fetch_end)
+    return compute_performance(history, prices, start, end, include_series)
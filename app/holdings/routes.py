@@ -1,14 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from datetime import date
+from typing import AsyncIterator, List, Literal, Optional
 from uuid import UUID
 
-from app.db.database import get_async_session
+from app.db.database import session_router
+from app.responses import NegotiatedResponse, wants_msgpack
 from app.users.models import User
-from app.users.deps import current_active_user
+from app.users.deps import current_active_user, get_read_session, get_write_session
 
-from app.holdings import crud
-from app.holdings.schemas import HoldingCreate, HoldingRead, HoldingUpdate
+from app.holdings import conditional, crud, export, importer, lots, performance, valuation
+from app.holdings.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.holdings.schemas import (
+    BulkAssetTypeUpdate,
+    BulkDeleteRequest,
+    BulkOperationResult,
+    CostBasisMethod,
+    GainsReport,
+    HoldingCreate,
+    HoldingImportResult,
+    HoldingRead,
+    HoldingUpdate,
+    PortfolioPerformance,
+    PortfolioSummary,
+    SplitRequest,
+    TransactionCreate,
+    TransactionRead,
+)
+from app.market.service import get_current_prices, price_staleness
 
 router = APIRouter(
     prefix="/holdings",
@@ -17,21 +48,160 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[HoldingRead])
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def _ndjson_holdings(user_id: UUID, after_id: Optional[int]) -> AsyncIterator[bytes]:
+    """
+    Encode a user's holdings as NDJSON, one chunk of lines per DB round trip.
+
+    Opens its own session: the request-scoped one is closed before a
+    streaming body is sent.
+    """
+    async with session_router.reader(user_id) as session:
+        async for chunk in crud.stream_holdings_for_user(session, user_id, after_id):
+            yield b"".join(orjson.dumps(row) + b"\n" for row in chunk)
+
+
+async def _export_holdings(user_id: UUID, fmt: str, compression: str) -> AsyncIterator[bytes]:
+    """
+    Stream a user's holdings export (own session, like `_ndjson_holdings`).
+    """
+    async with session_router.reader(user_id) as session:
+        async for data in export.export_holdings(session, fmt, compression, user_id):
+            yield data
+
+
+@router.get(
+    "/",
+    response_model=List[HoldingRead],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
 async def get_user_holdings(
-    db: AsyncSession = Depends(get_async_session),
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size (omit for all)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Get holdings for the currently authenticated user, in ID order.
+
+    - With `limit`, returns one page and sets `X-Next-Cursor` when more follow;
+      pass it back as `cursor` to get the next page.
+    - With `Accept: application/x-ndjson`, streams every holding after
+      `cursor` as newline-delimited JSON with flat memory use.
+    - With `Accept: application/msgpack`, the list is encoded as MessagePack.
+    - Responses carry an `ETag`; send it back in `If-None-Match` to get a
+      `304 Not Modified` (decided without loading any holdings).
+    """
+    try:
+        after_id = decode_cursor(cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    ndjson = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+    encoding = "ndjson" if ndjson else "msgpack" if wants_msgpack() else "json"
+    version = await crud.get_holdings_version(db, user.id)
+    etag = conditional.make_etag(user.id, version, variant=f"{request.url.query}|{encoding}")
+    headers = conditional.cache_headers(etag, version[1])
+    if conditional.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if ndjson:
+        return StreamingResponse(
+            _ndjson_holdings(user.id, after_id), media_type=NDJSON_MEDIA_TYPE, headers=headers
+        )
+
+    # Rows are already HoldingRead-shaped dicts: encode them directly
+    # instead of validating a model per row against response_model
+    holdings, last_id = await crud.get_holdings_page(db, user.id, limit, after_id)
+    if last_id is not None:
+        headers["X-Next-Cursor"] = encode_cursor(last_id)
+    return NegotiatedResponse(content=holdings, headers=headers)
+
+
+@router.get("/summary", response_model=PortfolioSummary)
+async def get_portfolio_summary(
+    db: AsyncSession = Depends(get_read_session),
     user: User = Depends(current_active_user),
 ):
     """
-    ✅ Get all holdings for the currently authenticated user.
+    ✅ Value the current user's portfolio at current market prices.
+    Returns totals, unrealized P&L, weights and per-asset-type breakdowns,
+    plus how fresh the prices used are.
     """
-    return await crud.get_all_holdings_for_user(db, user.id)
+    columns = await valuation.load_position_columns(db, user.id)
+    lookup = columns.price_lookup_types()
+    prices = await get_current_prices(lookup.keys(), asset_types=lookup)
+    summary = valuation.summarize(columns, prices)
+    age, summary.stale_prices = price_staleness(prices)
+    summary.price_age_seconds = None if age is None else round(age, 3)
+    return summary
+
+
+@router.get("/performance", response_model=PortfolioPerformance)
+async def get_portfolio_performance(
+    start: Optional[date] = Query(None, description="First day (default: first purchase)"),
+    end: Optional[date] = Query(None, description="Last day (default: latest prices)"),
+    include_series: bool = Query(True, description="Include the daily value series"),
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Portfolio value over time for the current user.
+    Returns time- and money-weighted returns, max drawdown, per-asset-type
+    contribution and (optionally) the daily value series.
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end.")
+    return await performance.portfolio_performance(db, user.id, start, end, include_series)
+
+
+@router.get("/gains", response_model=GainsReport)
+async def get_portfolio_gains(
+    method: Optional[CostBasisMethod] = Query(None, description="Lot matching (default: COST_BASIS_METHOD)"),
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Realized and unrealized gains of the current user's holdings.
+    Sells are matched against tax lots by FIFO, LIFO, HIFO or average cost.
+    """
+    try:
+        return await lots.gains_report(db, user.id, method)
+    except lots.OversoldError:
+        raise HTTPException(status_code=409, detail="Transactions sell more units than were held.")
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/csv": {}, "application/zstd": {}, "application/vnd.apache.parquet": {}}}},
+)
+async def export_holdings(
+    format: Literal["csv", "parquet"] = Query("csv", description="File format"),
+    compression: Literal["none", "zstd"] = Query("none", description="zstd: a .csv.zst file, or zstd Parquet columns"),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Download every holding of the current user as CSV or Parquet.
+    Rows are streamed and encoded chunk by chunk, so memory stays flat
+    however many holdings there are.
+    """
+    return StreamingResponse(
+        _export_holdings(user.id, format, compression),
+        media_type=export.media_type(format, compression),
+        headers={
+            "Content-Disposition": f'attachment; filename="{export.filename(format, compression)}"',
+        },
+    )
 
 
 @router.get("/{holding_id}", response_model=HoldingRead)
 async def get_holding_by_id(
     holding_id: int,
-    db: AsyncSession = Depends(get_async_session),
+    db: AsyncSession = Depends(get_read_session),
     user: User = Depends(current_active_user),
 ):
     """
@@ -44,10 +214,44 @@ async def get_holding_by_id(
     return holding
 
 
+@router.get("/{holding_id}/transactions", response_model=List[TransactionRead])
+async def get_holding_transactions(
+    holding_id: int,
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ List a holding's buys and sells in time order.
+    """
+    transactions = await crud.get_transactions(db, holding_id, user.id)
+    if transactions is None:
+        raise HTTPException(status_code=404, detail="Holding not found.")
+    return transactions
+
+
+@router.get("/{holding_id}/gains", response_model=GainsReport)
+async def get_holding_gains(
+    holding_id: int,
+    method: Optional[CostBasisMethod] = Query(None, description="Lot matching (default: COST_BASIS_METHOD)"),
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Realized and unrealized gains of one holding.
+    """
+    try:
+        report = await lots.gains_report(db, user.id, method, holding_id=holding_id)
+    except lots.OversoldError:
+        raise HTTPException(status_code=409, detail="Transactions sell more units than were held.")
+    if not report.holdings:
+        raise HTTPException(status_code=404, detail="Holding not found.")
+    return report
+
+
 @router.post("/", response_model=HoldingRead, status_code=status.HTTP_201_CREATED)
 async def create_holding(
     holding_in: HoldingCreate,
-    db: AsyncSession = Depends(get_async_session),
+    db: AsyncSession = Depends(get_write_session),
     user: User = Depends(current_active_user),
 ):
     """
@@ -56,11 +260,106 @@ async def create_holding(
     return await crud.create_holding(db, holding_in, user.id)
 
 
+@router.post("/import", response_model=HoldingImportResult)
+async def import_holdings(
+    file: UploadFile = File(..., description="CSV (with header) or NDJSON of holdings"),
+    format: Optional[str] = Query(None, description="csv or ndjson (default: from filename)"),
+    batch_size: int = Query(
+        importer.DEFAULT_BATCH_SIZE, ge=1, le=importer.MAX_BATCH_SIZE,
+        description="Rows validated and inserted per statement",
+    ),
+    dry_run: bool = Query(False, description="Validate only; write nothing"),
+    db: AsyncSession = Depends(get_write_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Bulk-import holdings for the current user from an uploaded file.
+
+    Columns/keys match the create payload. Invalid rows are reported
+    and skipped; all valid rows are written in a single transaction.
+    """
+    fmt = (format or importer.detect_format(file.filename, file.content_type)).lower()
+    if fmt not in importer.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    try:
+        return await importer.import_holdings(
+            db, user.id, file.file, fmt, batch_size=batch_size, dry_run=dry_run
+        )
+    except importer.ImportFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/bulk/delete", response_model=BulkOperationResult)
+async def bulk_delete_holdings(
+    request: BulkDeleteRequest,
+    db: AsyncSession = Depends(get_write_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Delete many holdings by ID in a single statement.
+    IDs that do not exist or belong to another user are ignored.
+    """
+    ids = await crud.bulk_delete_holdings(db, user.id, request.ids)
+    return BulkOperationResult(affected=len(ids), ids=ids)
+
+
+@router.patch("/bulk/asset-type", response_model=BulkOperationResult)
+async def bulk_set_asset_type(
+    request: BulkAssetTypeUpdate,
+    db: AsyncSession = Depends(get_write_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Set the asset type of every holding of a symbol in a single statement.
+    """
+    ids = await crud.bulk_set_asset_type(db, user.id, request.symbol, request.asset_type)
+    return BulkOperationResult(affected=len(ids), ids=ids)
+
+
+@router.post("/bulk/split", response_model=BulkOperationResult)
+async def apply_split(
+    request: SplitRequest,
+    db: AsyncSession = Depends(get_write_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Apply a stock split to every holding of a symbol in a single statement.
+    Quantity is multiplied and purchase price divided by the ratio.
+    """
+    ids = await crud.apply_split(db, user.id, request.symbol, request.ratio)
+    return BulkOperationResult(affected=len(ids), ids=ids)
+
+
+@router.post(
+    "/{holding_id}/transactions",
+    response_model=TransactionRead,
+    status_code=status.HTTP_201_CREATED,
+)
+async def record_transaction(
+    holding_id: int,
+    transaction_in: TransactionCreate,
+    db: AsyncSession = Depends(get_write_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Record a buy or sell of a holding.
+    The holding's quantity and purchase price are updated from its lots;
+    a sell of more units than held at that time is rejected.
+    """
+    try:
+        transaction = await crud.record_transaction(db, holding_id, user.id, transaction_in)
+    except lots.OversoldError:
+        raise HTTPException(status_code=400, detail="Sell exceeds the units held at that time.")
+    if transaction is None:
+        raise HTTPException(status_code=404, detail="Holding not found or not authorized.")
+    return transaction
+
+
 @router.put("/{holding_id}", response_model=HoldingRead)
 async def update_holding(
     holding_id: int,
     holding_update: HoldingUpdate,
-    db: AsyncSession = Depends(get_async_session),
+    db: AsyncSession = Depends(get_write_session),
     user: User = Depends(current_active_user),
 ):
     """
@@ -76,7 +375,7 @@ async def update_holding(
 @router.delete("/{holding_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_holding(
     holding_id: int,
-    db: AsyncSession = Depends(get_async_session),
+    db: AsyncSession = Depends(get_write_session),
     user: User = Depends(current_active_user),
 ):
     """
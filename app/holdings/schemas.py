@@ -1,8 +1,8 @@
-from pydantic import BaseModel, Field
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import date, datetime
 from enum import Enum
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 
 
 class AssetType(str, Enum):
@@ -19,6 +19,24 @@ class AssetType(str, Enum):
     OTHER = "other"
 
 
+class TransactionType(str, Enum):
+    """
+    Direction of a holding transaction.
+    """
+    BUY = "buy"
+    SELL = "sell"
+
+
+class CostBasisMethod(str, Enum):
+    """
+    How sells are matched against open lots.
+    """
+    FIFO = "fifo"
+    LIFO = "lifo"
+    HIFO = "hifo"
+    AVERAGE = "average"
+
+
 class HoldingBase(BaseModel):
     """
     Shared base schema for holding-related models.
@@ -70,6 +88,218 @@ class HoldingRead(HoldingBase):
     user_id: UUID = Field(..., description="UUID of the user who owns this holding")
     created_at: datetime = Field(..., description="Timestamp when the holding was created")
     updated_at: datetime = Field(..., description="Timestamp when the holding was last updated")
+    # A position sold down to nothing keeps its row (and its transactions)
+    quantity: float = Field(..., ge=0, description="Number of units or shares held")
+
+    model_config = ConfigDict(from_attributes=True)  # ✅ Allows Pydantic to work seamlessly with SQLAlchemy models
+
+
+class PositionSummary(BaseModel):
+    """
+    Aggregated valuation of every holding of one symbol and asset type.
+    """
+    symbol: str = Field(..., description="Normalized ticker symbol")
+    asset_type: AssetType = Field(..., description="Classification of the asset")
+    quantity: float = Field(..., description="Total units held across holdings")
+    average_cost: float = Field(..., description="Quantity-weighted average purchase price")
+    cost_basis: float = Field(..., description="Total amount paid")
+    current_price: Optional[float] = Field(None, description="Latest price (null if unavailable)")
+    market_value: Optional[float] = Field(None, description="quantity × current_price")
+    unrealized_pnl: Optional[float] = Field(None, description="market_value − cost_basis")
+    weight: Optional[float] = Field(None, description="Share of total portfolio market value")
+
+
+class AssetTypeBreakdown(BaseModel):
+    """
+    Portfolio totals for a single asset type.
+    """
+    asset_type: AssetType = Field(..., description="Classification of the asset")
+    holdings_count: int = Field(..., description="Number of holdings of this type")
+    cost_basis: float = Field(..., description="Total amount paid")
+    market_value: float = Field(..., description="Market value of priced holdings")
+    unrealized_pnl: float = Field(..., description="Unrealized P&L of priced holdings")
+    weight: float = Field(..., description="Share of total portfolio market value")
+
+
+class PortfolioSummary(BaseModel):
+    """
+    Valuation of a user's whole portfolio at current market prices.
+
+    Market value and P&L only include holdings a price was found for;
+    `missing_prices` lists the symbols that were left out.
+    """
+    holdings_count: int = Field(..., description="Number of holdings")
+    priced_count: int = Field(..., description="Number of holdings with a current price")
+    total_cost_basis: float = Field(..., description="Total amount paid across all holdings")
+    total_market_value: float = Field(..., description="Market value of priced holdings")
+    unrealized_pnl: float = Field(..., description="Unrealized P&L of priced holdings")
+    unrealized_pnl_pct: Optional[float] = Field(
+        None, description="Unrealized P&L relative to the cost basis of priced holdings"
+    )
+    missing_prices: List[str] = Field(default_factory=list, description="Symbols without a price")
+    price_age_seconds: Optional[float] = Field(
+        None, description="Age of the oldest market price used (null if none were needed)"
+    )
+    stale_prices: List[str] = Field(
+        default_factory=list,
+        description="Symbols valued at a price past its refresh window (the refetch failed)",
+    )
+    by_asset_type: List[AssetTypeBreakdown] = Field(default_factory=list)
+    positions: List[PositionSummary] = Field(default_factory=list)
+
+
+class AssetTypeContribution(BaseModel):
+    """
+    How much one asset type contributed to the portfolio's performance.
+    """
+    asset_type: AssetType
+    contribution: float = Field(
+        ..., description="Share of the time-weighted return (sums to twr across types)"
+    )
+    pnl: float = Field(..., description="Market value at the end minus money put in")
+    end_value: float = Field(..., description="Market value on the last day")
+
+
+class PortfolioPerformance(BaseModel):
+    """
+    Portfolio value over time and the returns derived from it.
+
+    Every buy is a contribution of `quantity × price + fees` on its date and
+    every sell a withdrawal of its proceeds (holdings without transactions
+    are one buy at their purchase price and date); what was already held on
+    `start` counts as a contribution of its market value that day.
+    """
+    start: Optional[date] = Field(None, description="First day of the series")
+    end: Optional[date] = Field(None, description="Last day of the series")
+    end_value: float = Field(0.0, description="Market value on the last day")
+    net_invested: float = Field(0.0, description="Money put in over the period")
+    twr: Optional[float] = Field(None, description="Time-weighted return over the period")
+    twr_annualized: Optional[float] = Field(None, description="Annualized time-weighted return")
+    mwr: Optional[float] = Field(
+        None, description="Money-weighted return (annualized IRR of the contributions)"
+    )
+    max_drawdown: Optional[float] = Field(
+        None, description="Largest peak-to-trough fall of the time-weighted index"
+    )
+    max_drawdown_peak: Optional[date] = None
+    max_drawdown_trough: Optional[date] = None
+    by_asset_type: List[AssetTypeContribution] = Field(default_factory=list)
+    missing_prices: List[str] = Field(
+        default_factory=list, description="Symbols without price history (left out)"
+    )
+    dates: List[date] = Field(default_factory=list, description="Series dates")
+    values: List[float] = Field(default_factory=list, description="Market value per day")
+    invested: List[float] = Field(default_factory=list, description="Cumulative money put in")
+    twr_index: List[float] = Field(
+        default_factory=list, description="Growth of 1 at the time-weighted return"
+    )
+
 
-    class Config:
-        orm_mode = True  # ✅ Allows Pydantic to work seamlessly with SQLAlchemy models
+class ImportRowError(BaseModel):
+    """
+    Validation problems for one row of an import file.
+    """
+    row: int = Field(..., description="1-based data row number (header excluded)")
+    errors: List[str] = Field(..., description="Human-readable validation errors")
+
+
+class HoldingImportResult(BaseModel):
+    """
+    Outcome of a bulk holdings import.
+    """
+    dry_run: bool = Field(..., description="True if nothing was written")
+    total_rows: int = Field(..., description="Data rows read from the file")
+    valid_rows: int = Field(..., description="Rows that passed validation")
+    imported: int = Field(..., description="Holdings written to the database")
+    created_ids: List[int] = Field(default_factory=list, description="IDs of the new holdings")
+    errors: List[ImportRowError] = Field(default_factory=list, description="Per-row validation errors")
+
+
+class BulkDeleteRequest(BaseModel):
+    """
+    Schema for deleting many holdings at once.
+    """
+    ids: List[int] = Field(..., min_length=1, max_length=10000, description="Holding IDs to delete")
+
+
+class BulkAssetTypeUpdate(BaseModel):
+    """
+    Schema for re-classifying every holding of a symbol.
+    """
+    symbol: str = Field(..., description="Ticker symbol to match (case-insensitive)")
+    asset_type: AssetType = Field(..., description="New asset type")
+
+
+class SplitRequest(BaseModel):
+    """
+    Schema for applying a stock split to every holding of a symbol.
+    """
+    symbol: str = Field(..., description="Ticker symbol to match (case-insensitive)")
+    ratio: float = Field(..., gt=0, description="New shares per old share (4 for 4-for-1, 0.1 for 1-for-10)")
+
+
+class BulkOperationResult(BaseModel):
+    """
+    Outcome of a bulk update or delete.
+    """
+    affected: int = Field(..., description="Number of holdings changed")
+    ids: List[int] = Field(default_factory=list, description="IDs of the holdings changed")
+
+
+class TransactionCreate(BaseModel):
+    """
+    Schema for recording a buy or sell of a holding.
+    """
+    type: TransactionType = Field(..., description="buy or sell")
+    quantity: float = Field(..., gt=0, description="Units bought or sold")
+    price: float = Field(..., ge=0, description="Price per unit")
+    fees: float = Field(0.0, ge=0, description="Commissions and fees")
+    executed_at: Optional[datetime] = Field(
+        None, description="When the trade happened (defaults to current time on server if omitted)"
+    )
+
+
+class TransactionRead(TransactionCreate):
+    """
+    Schema for reading a holding transaction.
+    """
+    id: int = Field(..., description="Unique identifier for the transaction")
+    holding_id: int = Field(..., description="Holding the transaction belongs to")
+    executed_at: datetime = Field(..., description="When the trade happened")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class HoldingGains(BaseModel):
+    """
+    Realized and unrealized gains of one holding under a cost-basis method.
+    """
+    holding_id: int = Field(..., description="Holding ID")
+    symbol: str = Field(..., description="Normalized ticker symbol")
+    asset_type: AssetType = Field(..., description="Classification of the asset")
+    quantity: float = Field(..., description="Units still held")
+    cost_basis: float = Field(..., description="Cost of the units still held")
+    open_lots: Optional[int] = Field(None, description="Lots with units left (null for average cost)")
+    sold_quantity: float = Field(..., description="Units sold")
+    proceeds: float = Field(..., description="Sale proceeds, net of fees")
+    realized_cost_basis: float = Field(..., description="Cost of the units sold")
+    realized_gain: float = Field(..., description="proceeds − realized_cost_basis")
+    current_price: Optional[float] = Field(None, description="Latest price (null if unavailable)")
+    market_value: Optional[float] = Field(None, description="quantity × current_price")
+    unrealized_gain: Optional[float] = Field(None, description="market_value − cost_basis")
+
+
+class GainsReport(BaseModel):
+    """
+    Realized and unrealized gains over a user's holdings.
+    """
+    method: CostBasisMethod = Field(..., description="Cost-basis method used to match sells to lots")
+    lots: int = Field(..., description="Buy lots considered")
+    sells: int = Field(..., description="Sell transactions matched")
+    proceeds: float = Field(..., description="Total sale proceeds, net of fees")
+    realized_gain: float = Field(..., description="Total realized gain")
+    cost_basis: float = Field(..., description="Cost of all units still held")
+    market_value: float = Field(..., description="Market value of priced holdings")
+    unrealized_gain: float = Field(..., description="Unrealized gain of priced holdings")
+    missing_prices: List[str] = Field(default_factory=list, description="Symbols without a current price")
+    holdings: List[HoldingGains] = Field(default_factory=list, description="Per-holding gains")
@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import math
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import AssetType, Holding as holding_model, PortfolioSnapshot, PositionSnapshot
+
+"""
+Incrementally maintained portfolio snapshots.
+
+`position_snapshots` keeps, per (user, asset type, normalized symbol), the
+total quantity, total cost basis, number of holdings and last change time;
+`portfolio_snapshots` keeps the same totals per user. Every write in
+`app.holdings.crud` turns the rows it touched into deltas and applies them
+here before committing, so the snapshots change in the same transaction as
+the holdings and portfolio summaries read one row per distinct position.
+
+Float totals accumulate rounding error over many deltas, and writes made
+outside `crud` bypass the snapshots, so drift can be checked and repaired:
+
+    python -m app.holdings.snapshots verify [--user <id>]
+    python -m app.holdings.snapshots rebuild [--user <id>]
+"""
+
+SNAPSHOT_FIELDS = {"symbol", "asset_type", "quantity", "purchase_price"}
+
+# Totals closer than this are considered equal when verifying
+REL_TOLERANCE = 1e-9
+ABS_TOLERANCE = 1e-6
+
+
+class Delta(NamedTuple):
+    """
+    Change to one position: quantity, cost basis and holding count.
+    """
+    asset_type: AssetType
+    symbol: str
+    quantity: float
+    cost_basis: float
+    count: int
+
+
+def holding_delta(
+    symbol: str, asset_type, quantity: float, purchase_price: float, sign: int = 1
+) -> Delta:
+    """
+    The delta for adding (`sign=1`) or removing (`sign=-1`) one holding.
+    """
+    return Delta(
+        AssetType(getattr(asset_type, "value", asset_type)),
+        symbol.strip().upper(),
+        sign * quantity,
+        sign * quantity * purchase_price,
+        sign,
+    )
+
+
+def _upsert(db: AsyncSession, model):
+    """
+    Dialect-specific `INSERT ... ON CONFLICT` for a snapshot table.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model)
+
+
+async def _add_to_positions(db: AsyncSession, user_id: UUID, deltas: Dict[tuple, list]) -> None:
+    now = datetime.utcnow()
+    stmt = _upsert(db, PositionSnapshot)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "asset_type", "symbol"],
+        set_={
+            "total_quantity": PositionSnapshot.total_quantity + stmt.excluded.total_quantity,
+            "total_cost_basis": PositionSnapshot.total_cost_basis + stmt.excluded.total_cost_basis,
+            "position_count": PositionSnapshot.position_count + stmt.excluded.position_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await db.execute(stmt, [
+        {
+            "user_id": user_id, "asset_type": asset_type, "symbol": symbol,
+            "total_quantity": qty, "total_cost_basis": cost, "position_count": count,
+            "updated_at": now,
+        }
+        for (asset_type, symbol), (qty, cost, count) in deltas.items()
+    ])
+    # Positions whose last holding went away
+    await db.execute(
+        delete(PositionSnapshot)
+        .where(PositionSnapshot.user_id == user_id, PositionSnapshot.position_count <= 0)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def _add_to_portfolio(
+    db: AsyncSession, user_id: UUID, quantity: float, cost_basis: float, count: int
+) -> None:
+    stmt = _upsert(db, PortfolioSnapshot)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={
+            "total_quantity": PortfolioSnapshot.total_quantity + stmt.excluded.total_quantity,
+            "total_cost_basis": PortfolioSnapshot.total_cost_basis + stmt.excluded.total_cost_basis,
+            "position_count": PortfolioSnapshot.position_count + stmt.excluded.position_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await db.execute(stmt.values(
+        user_id=user_id, total_quantity=quantity, total_cost_basis=cost_basis,
+        position_count=count, updated_at=datetime.utcnow(),
+    ))
+
+
+async def apply_deltas(db: AsyncSession, user_id: UUID, deltas: Iterable[Delta]) -> None:
+    """
+    Add holding deltas to a user's position and portfolio snapshots.
+
+    Deltas for the same position are merged first, so a batch costs one
+    upsert statement per table. Does not commit: call it in the transaction
+    that changed the holdings.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The owner user ID.
+        deltas (Iterable[Delta]): Per-holding changes (see `holding_delta`).
+    """
+    merged: Dict[tuple, list] = {}
+    for delta in deltas:
+        totals = merged.setdefault((delta.asset_type, delta.symbol), [0.0, 0.0, 0])
+        totals[0] += delta.quantity
+        totals[1] += delta.cost_basis
+        totals[2] += delta.count
+    merged = {key: totals for key, totals in merged.items() if any(totals)}
+    if not merged:
+        return
+    await _add_to_positions(db, user_id, merged)
+    await _add_to_portfolio(
+        db, user_id,
+        sum(t[0] for t in merged.values()),
+        sum(t[1] for t in merged.values()),
+        sum(t[2] for t in merged.values()),
+    )
+
+
+async def retype_symbol(
+    db: AsyncSession, user_id: UUID, symbol: str, asset_type: AssetType
+) -> None:
+    """
+    Move every position of `symbol` to `asset_type` (bulk asset type change).
+
+    Portfolio totals are unchanged. Does not commit.
+    """
+    result = await db.execute(
+        delete(PositionSnapshot)
+        .where(PositionSnapshot.user_id == user_id, PositionSnapshot.symbol == symbol.strip().upper())
+        .returning(
+            PositionSnapshot.total_quantity,
+            PositionSnapshot.total_cost_basis,
+            PositionSnapshot.position_count,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    if not rows:
+        return
+    key = (AssetType(getattr(asset_type, "value", asset_type)), symbol.strip().upper())
+    await _add_to_positions(db, user_id, {key: [
+        sum(r[0] for r in rows), sum(r[1] for r in rows), sum(r[2] for r in rows),
+    ]})
+    await _add_to_portfolio(db, user_id, 0.0, 0.0, 0)
+
+
+async def scale_quantity(db: AsyncSession, user_id: UUID, symbol: str, ratio: float) -> None:
+    """
+    Multiply the quantity of every position of `symbol` by `ratio` (stock
+    split). Cost basis is unchanged. Does not commit.
+    """
+    result = await db.execute(
+        update(PositionSnapshot)
+        .where(PositionSnapshot.user_id == user_id, PositionSnapshot.symbol == symbol.strip().upper())
+        .values(
+            total_quantity=PositionSnapshot.total_quantity * ratio,
+            updated_at=datetime.utcnow(),
+        )
+        .returning(PositionSnapshot.total_quantity)
+        .execution_options(synchronize_session=False)
+    )
+    new_quantity = sum(result.scalars().all())
+    if new_quantity:
+        await _add_to_portfolio(db, user_id, new_quantity - new_quantity / ratio, 0.0, 0)
+
+
+# ----------------------------------------
+# 🩺 Drift check and rebuild
+# ----------------------------------------
+
+def _expected_positions(user_id: Optional[UUID] = None):
+    """
+    Position totals recomputed from the holdings table.
+    """
+    query = select(
+        holding_model.user_id,
+        holding_model.asset_type,
+        func.upper(func.trim(holding_model.symbol)),
+        func.sum(holding_model.quantity),
+        func.sum(holding_model.quantity * holding_model.purchase_price),
+        func.count(),
+        func.max(holding_model.updated_at),
+    ).group_by(
+        holding_model.user_id,
+        holding_model.asset_type,
+        func.upper(func.trim(holding_model.symbol)),
+    )
+    if user_id is not None:
+        query = query.where(holding_model.user_id == user_id)
+    return query
+
+
+def _expected_portfolios(user_id: Optional[UUID] = None):
+    """
+    Portfolio totals recomputed from the holdings table.
+    """
+    query = select(
+        holding_model.user_id,
+        func.sum(holding_model.quantity),
+        func.sum(holding_model.quantity * holding_model.purchase_price),
+        func.count(),
+        func.max(holding_model.updated_at),
+    ).group_by(holding_model.user_id)
+    if user_id is not None:
+        query = query.where(holding_model.user_id == user_id)
+    return query
+
+
+@dataclass
+class SnapshotDrift:
+    """
+    A snapshot total that does not match the holdings table.
+
+    `asset_type` and `symbol` are None for portfolio-level totals.
+    """
+    user_id: UUID
+    asset_type: Optional[AssetType]
+    symbol: Optional[str]
+    field: str
+    expected: Optional[float]
+    actual: Optional[float]
+
+
+def _compare(
+    expected: Dict[tuple, tuple], actual: Dict[tuple, tuple]
+) -> List[Tuple[tuple, str, Optional[float], Optional[float]]]:
+    fields = ("total_quantity", "total_cost_basis", "position_count")
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        want, have = expected.get(key), actual.get(key)
+        for i, name in enumerate(fields):
+            a = None if want is None else want[i]
+            b = None if have is None else have[i]
+            if a is None or b is None:
+                if a != b:
+                    mismatches.append((key, name, a, b))
+            elif not math.isclose(a, b, rel_tol=REL_TOLERANCE, abs_tol=ABS_TOLERANCE):
+                mismatches.append((key, name, a, b))
+    return mismatches
+
+
+async def verify_snapshots(db: AsyncSession, user_id: Optional[UUID] = None) -> List[SnapshotDrift]:
+    """
+    Compare the snapshots against totals recomputed from the holdings table.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID, optional): Check one user (default: everyone).
+
+    Returns:
+        List[SnapshotDrift]: Every mismatching total (empty if in sync).
+    """
+    expected = {
+        (row[0], row[1], row[2]): tuple(row[3:6])
+        for row in (await db.execute(_expected_positions(user_id))).all()
+    }
+    query = select(
+        PositionSnapshot.user_id, PositionSnapshot.asset_type, PositionSnapshot.symbol,
+        PositionSnapshot.total_quantity, PositionSnapshot.total_cost_basis,
+        PositionSnapshot.position_count,
+    )
+    if user_id is not None:
+        query = query.where(PositionSnapshot.user_id == user_id)
+    actual = {(row[0], row[1], row[2]): tuple(row[3:]) for row in (await db.execute(query)).all()}
+    drift = [
+        SnapshotDrift(key[0], key[1], key[2], name, want, have)
+        for key, name, want, have in _compare(expected, actual)
+    ]
+
+    expected = {
+        (row[0],): tuple(row[1:4])
+        for row in (await db.execute(_expected_portfolios(user_id))).all()
+    }
+    query = select(
+        PortfolioSnapshot.user_id, PortfolioSnapshot.total_quantity,
+        PortfolioSnapshot.total_cost_basis, PortfolioSnapshot.position_count,
+    ).where(PortfolioSnapshot.position_count > 0)
+    if user_id is not None:
+        query = query.where(PortfolioSnapshot.user_id == user_id)
+    actual = {(row[0],): tuple(row[1:]) for row in (await db.execute(query)).all()}
+    drift.extend(
+        SnapshotDrift(key[0], None, None, name, want, have)
+        for key, name, want, have in _compare(expected, actual)
+    )
+    return drift
+
+
+async def rebuild_snapshots(db: AsyncSession, user_id: Optional[UUID] = None) -> int:
+    """
+    Recompute the snapshots from the holdings table and commit.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID, optional): Rebuild one user (default: everyone).
+
+    Returns:
+        int: Number of position snapshots written.
+    """
+    for model in (PositionSnapshot, PortfolioSnapshot):
+        stmt = delete(model)
+        if user_id is not None:
+            stmt = stmt.where(model.user_id == user_id)
+        await db.execute(stmt.execution_options(synchronize_session=False))
+
+    position_columns = [
+        "user_id", "asset_type", "symbol", "total_quantity",
+        "total_cost_basis", "position_count", "updated_at",
+    ]
+    result = await db.execute(
+        insert(PositionSnapshot).from_select(position_columns, _expected_positions(user_id))
+    )
+    await db.execute(
+        insert(PortfolioSnapshot).from_select(
+            [c for c in position_columns if c not in ("asset_type", "symbol")],
+            _expected_portfolios(user_id),
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def _main(args: argparse.Namespace) -> int:
+    from app.db.database import AsyncSessionLocal, Base, engine
+    import app.users.models  # noqa: F401  (register the users table)
+
+    # Existing databases predate the snapshot tables
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[PositionSnapshot.__table__, PortfolioSnapshot.__table__],
+        )
+
+    user_id = UUID(args.user) if args.user else None
+    async with AsyncSessionLocal() as session:
+        if args.command == "rebuild":
+            written = await rebuild_snapshots(session, user_id)
+            print(f"✅ Rebuilt {written} position snapshots")
+            return 0
+        drift = await verify_snapshots(session, user_id)
+    for item in drift:
+        where = f"{item.asset_type.value}:{item.symbol}" if item.symbol else "portfolio"
+        print(f"❌ {item.user_id} {where} {item.field}: expected {item.expected}, got {item.actual}")
+    if drift:
+        print(f"{len(drift)} mismatches; run `python -m app.holdings.snapshots rebuild` to repair")
+        return 1
+    print("✅ Snapshots match the holdings table")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or rebuild portfolio snapshots.")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--user", default=None, help="Only this user ID")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
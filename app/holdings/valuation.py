@@ -0,0 +1,333 @@
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Holding as holding_model, PositionSnapshot
+from app.holdings.schemas import (
+    AssetType,
+    AssetTypeBreakdown,
+    PortfolioSummary,
+    PositionSummary,
+)
+from app.market.service import normalize_symbol
+
+"""
+Vectorized portfolio valuation.
+
+Holdings are loaded as plain column tuples (no ORM objects) into NumPy arrays
+with symbols factorized to integer codes, joined with one batched price lookup
+per distinct symbol, and aggregated with `np.bincount` group-bys. Python-level
+work is proportional to the number of distinct positions, not holdings.
+
+Summaries go one step further and load the pre-aggregated position
+snapshots (`app.holdings.snapshots`): one row per (asset type, symbol),
+each standing for `counts` holdings, so reads are O(distinct positions).
+"""
+
+# Stable integer code per asset type, used as a group-by key
+ASSET_TYPES: List[AssetType] = list(AssetType)
+_ASSET_TYPE_CODES: Dict[str, int] = {t.value: i for i, t in enumerate(ASSET_TYPES)}
+_CASH = _ASSET_TYPE_CODES[AssetType.CASH.value]
+
+
+@dataclass(frozen=True)
+class HoldingColumns:
+    """
+    A user's holdings in columnar form (one array entry per holding, or per
+    aggregated position when built with `from_positions`).
+
+    `symbol_codes` index into `symbols` (distinct normalized tickers);
+    `asset_types` index into `ASSET_TYPES`; `counts`, when set, is the number
+    of holdings each entry stands for.
+    """
+    symbols: List[str]
+    symbol_codes: np.ndarray
+    quantity: np.ndarray
+    purchase_price: np.ndarray
+    asset_types: np.ndarray
+    counts: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        """
+        Number of holdings represented.
+        """
+        return len(self.quantity) if self.counts is None else int(self.counts.sum())
+
+    def holding_counts(self) -> np.ndarray:
+        """
+        Holdings per entry (all ones unless built from positions).
+        """
+        return np.ones(len(self.quantity), dtype=np.int64) if self.counts is None else self.counts
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> "HoldingColumns":
+        """
+        Build columns from `(symbol, quantity, purchase_price, asset_type)` tuples.
+        """
+        if not rows:
+            return cls(
+                [],
+                np.empty(0, dtype=np.int64),
+                np.empty(0, dtype=np.float64),
+                np.empty(0, dtype=np.float64),
+                np.empty(0, dtype=np.int64),
+            )
+        raw_symbols, quantity, purchase_price, asset_types = zip(*rows)
+
+        # Factorize raw symbols, then normalize once per distinct symbol
+        raw_codes: Dict[str, int] = {}
+        raw_idx = np.fromiter(
+            (raw_codes.setdefault(s, len(raw_codes)) for s in raw_symbols),
+            dtype=np.int64, count=len(raw_symbols),
+        )
+        codes: Dict[str, int] = {}
+        remap = np.fromiter(
+            (codes.setdefault(normalize_symbol(s), len(codes)) for s in raw_codes),
+            dtype=np.int64, count=len(raw_codes),
+        )
+        return cls(
+            symbols=list(codes),
+            symbol_codes=remap[raw_idx],
+            quantity=np.asarray(quantity, dtype=np.float64),
+            purchase_price=np.asarray(purchase_price, dtype=np.float64),
+            asset_types=np.fromiter(
+                (_ASSET_TYPE_CODES[getattr(t, "value", t)] for t in asset_types),
+                dtype=np.int64, count=len(asset_types),
+            ),
+        )
+
+    @classmethod
+    def from_positions(cls, rows: Sequence[tuple]) -> "HoldingColumns":
+        """
+        Build columns from `(symbol, total_quantity, total_cost_basis, asset_type,
+        position_count)` snapshot tuples; each entry carries its average cost.
+        """
+        if not rows:
+            return cls.from_rows([])
+        symbols, quantity, cost_basis, asset_types, counts = zip(*rows)
+        quantity = np.asarray(quantity, dtype=np.float64)
+        average_cost = np.divide(
+            np.asarray(cost_basis, dtype=np.float64), quantity,
+            out=np.zeros_like(quantity), where=quantity != 0,
+        )
+        columns = cls.from_rows(list(zip(symbols, quantity, average_cost, asset_types)))
+        return cls(
+            symbols=columns.symbols,
+            symbol_codes=columns.symbol_codes,
+            quantity=columns.quantity,
+            purchase_price=columns.purchase_price,
+            asset_types=columns.asset_types,
+            counts=np.asarray(counts, dtype=np.int64),
+        )
+
+    def needs_price(self) -> np.ndarray:
+        """
+        Entries valued at a market price: not cash, and something still held.
+        """
+        return (self.asset_types != _CASH) & (self.quantity != 0)
+
+    def price_lookup_types(self) -> Dict[str, str]:
+        """
+        Symbol → asset type for every symbol that needs a market price.
+        """
+        mask = self.needs_price()
+        pairs = np.unique(np.stack([self.symbol_codes[mask], self.asset_types[mask]]), axis=1)
+        return {self.symbols[s]: ASSET_TYPES[t].value for s, t in pairs.T}
+
+
+@dataclass(frozen=True)
+class Aggregates:
+    """
+    Raw vectorized valuation results, before they are shaped into a response.
+
+    Per-holding arrays are aligned with the input columns; `group_*` arrays are
+    aligned with `group_keys` (asset type code × number of symbols + symbol code).
+    """
+    priced: np.ndarray
+    priced_count: int
+    cost: np.ndarray
+    value: np.ndarray
+    unique_prices: np.ndarray
+    type_count: np.ndarray
+    type_cost: np.ndarray
+    type_value: np.ndarray
+    type_pnl: np.ndarray
+    group_keys: np.ndarray
+    group_qty: np.ndarray
+    group_cost: np.ndarray
+    group_value: np.ndarray
+    group_price: np.ndarray
+    group_priced: np.ndarray
+
+
+def aggregate(columns: HoldingColumns, prices: Mapping[str, float]) -> Aggregates:
+    """
+    Join holdings with prices and compute every group-by in vectorized passes.
+
+    Cash holdings are valued at their purchase price and never looked up.
+    """
+    # 🔗 Join: one price per distinct symbol, broadcast back to every holding
+    unique_prices = np.fromiter(
+        (prices.get(s, np.nan) for s in columns.symbols),
+        dtype=np.float64, count=len(columns.symbols),
+    )
+    cash = columns.asset_types == _CASH
+    price = np.where(cash, columns.purchase_price, unique_prices[columns.symbol_codes])
+
+    priced = ~np.isnan(price)
+    price = np.nan_to_num(price)
+    cost = columns.quantity * columns.purchase_price
+    value = np.where(priced, columns.quantity * price, 0.0)
+    pnl = np.where(priced, value - cost, 0.0)
+
+    n_types = len(ASSET_TYPES)
+    by_type = columns.asset_types
+
+    group_key = columns.asset_types * len(columns.symbols) + columns.symbol_codes
+    group_keys, group_idx = np.unique(group_key, return_inverse=True)
+    n_groups = len(group_keys)
+    group_size = np.bincount(group_idx, minlength=n_groups)
+
+    counts = columns.holding_counts()
+    return Aggregates(
+        priced=priced,
+        priced_count=int(counts[priced].sum()),
+        cost=cost,
+        value=value,
+        unique_prices=unique_prices,
+        type_count=np.bincount(by_type, weights=counts, minlength=n_types).astype(np.int64),
+        type_cost=np.bincount(by_type, weights=cost, minlength=n_types),
+        type_value=np.bincount(by_type, weights=value, minlength=n_types),
+        type_pnl=np.bincount(by_type, weights=pnl, minlength=n_types),
+        group_keys=group_keys,
+        group_qty=np.bincount(group_idx, weights=columns.quantity, minlength=n_groups),
+        group_cost=np.bincount(group_idx, weights=cost, minlength=n_groups),
+        group_value=np.bincount(group_idx, weights=value, minlength=n_groups),
+        # Every holding in a group shares one price, so the mean is that price
+        group_price=np.bincount(group_idx, weights=price, minlength=n_groups) / group_size,
+        group_priced=np.bincount(group_idx, weights=priced, minlength=n_groups) > 0,
+    )
+
+
+async def load_holding_columns(db: AsyncSession, user_id: UUID) -> HoldingColumns:
+    """
+    Load the columns valuation needs for all of a user's holdings.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The user's ID.
+
+    Returns:
+        HoldingColumns: The user's holdings as arrays.
+    """
+    result = await db.execute(
+        select(
+            holding_model.symbol,
+            holding_model.quantity,
+            holding_model.purchase_price,
+            holding_model.asset_type,
+        ).where(holding_model.user_id == user_id)
+    )
+    return HoldingColumns.from_rows(result.all())
+
+
+async def load_position_columns(db: AsyncSession, user_id: UUID) -> HoldingColumns:
+    """
+    Load a user's positions from the snapshot table (one row per asset type
+    and symbol, however many holdings each one has).
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The user's ID.
+
+    Returns:
+        HoldingColumns: The user's positions as arrays, with holding counts.
+    """
+    result = await db.execute(
+        select(
+            PositionSnapshot.symbol,
+            PositionSnapshot.total_quantity,
+            PositionSnapshot.total_cost_basis,
+            PositionSnapshot.asset_type,
+            PositionSnapshot.position_count,
+        ).where(PositionSnapshot.user_id == user_id)
+    )
+    return HoldingColumns.from_positions(result.all())
+
+
+def summarize(columns: HoldingColumns, prices: Mapping[str, float]) -> PortfolioSummary:
+    """
+    Value a portfolio against current prices.
+
+    Args:
+        columns (HoldingColumns): The holdings to value.
+        prices (Mapping[str, float]): Normalized symbol → current price.
+
+    Returns:
+        PortfolioSummary: Totals, per-asset-type breakdown and per-position rows.
+    """
+    if len(columns) == 0:
+        return PortfolioSummary(
+            holdings_count=0, priced_count=0, total_cost_basis=0.0,
+            total_market_value=0.0, unrealized_pnl=0.0,
+        )
+
+    agg = aggregate(columns, prices)
+    total_value = float(agg.type_value.sum())
+    total_pnl = float(agg.type_pnl.sum())
+    priced_cost = float(agg.cost[agg.priced].sum())
+    scale = 1.0 / total_value if total_value else 0.0
+
+    by_asset_type = [
+        AssetTypeBreakdown.model_construct(
+            asset_type=ASSET_TYPES[code],
+            holdings_count=int(agg.type_count[code]),
+            cost_basis=round(float(agg.type_cost[code]), 2),
+            market_value=round(float(agg.type_value[code]), 2),
+            unrealized_pnl=round(float(agg.type_pnl[code]), 2),
+            weight=round(float(agg.type_value[code]) * scale, 6),
+        )
+        for code in np.flatnonzero(agg.type_count)
+    ]
+
+    n_symbols = len(columns.symbols)
+    positions = []
+    for g in np.argsort(-agg.group_value, kind="stable"):
+        code, sym = divmod(int(agg.group_keys[g]), n_symbols)
+        qty, cost, value = float(agg.group_qty[g]), float(agg.group_cost[g]), float(agg.group_value[g])
+        if qty == 0:
+            continue  # sold down to nothing: no position left to value
+        has_price = bool(agg.group_priced[g])
+        positions.append(
+            PositionSummary.model_construct(
+                symbol=columns.symbols[sym],
+                asset_type=ASSET_TYPES[code],
+                quantity=qty,
+                average_cost=round(cost / qty, 4),
+                cost_basis=round(cost, 2),
+                current_price=round(float(agg.group_price[g]), 4) if has_price else None,
+                market_value=round(value, 2) if has_price else None,
+                unrealized_pnl=round(value - cost, 2) if has_price else None,
+                weight=round(value * scale, 6) if has_price else None,
+            )
+        )
+
+    looked_up = np.zeros(n_symbols, dtype=bool)
+    looked_up[columns.symbol_codes[columns.needs_price()]] = True
+    missing = np.flatnonzero(looked_up & np.isnan(agg.unique_prices))
+
+    return PortfolioSummary(
+        holdings_count=len(columns),
+        priced_count=agg.priced_count,
+        total_cost_basis=round(float(agg.type_cost.sum()), 2),
+        total_market_value=round(total_value, 2),
+        unrealized_pnl=round(total_pnl, 2),
+        unrealized_pnl_pct=round(total_pnl / priced_cost, 6) if priced_cost else None,
+        missing_prices=sorted(columns.symbols[i] for i in missing),
+        by_asset_type=by_asset_type,
+        positions=positions,
+    )
@@ -0,0 +1,4 @@
+"""
+AI portfolio insights: a langgraph pipeline over the user's positions,
+with cached and shared model generations streamed over SSE.
+"""
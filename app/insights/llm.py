@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Optional, Sequence
+
+from app.config import get_settings
+
+"""
+Chat models behind the insights pipeline.
+
+`get_model()` returns the process-wide model selected by the
+`insights_provider` setting: "openai" (any OpenAI-compatible endpoint), or
+"stub", a local model with configurable latency for development, tests and
+benchmarks. The OpenAI SDK is imported on first use, not at app import.
+"""
+
+Message = Dict[str, str]  # {"role": ..., "content": ...}
+
+
+class InsightModelError(RuntimeError):
+    """
+    Raised when the model cannot produce an insight (network, quota, timeout).
+    """
+
+
+class InsightModel(ABC):
+    """
+    A chat model that streams its reply as text fragments.
+    """
+
+    name: str
+
+    @abstractmethod
+    def stream(self, messages: Sequence[Message]) -> AsyncIterator[str]:
+        """
+        Yield the reply to `messages`, fragment by fragment, as it is generated.
+        """
+
+
+class StubModel(InsightModel):
+    """
+    Offline model: waits `latency_seconds` (time to first token), then
+    streams a deterministic reply built from the prompt, one word every
+    `token_delay_seconds`.
+
+    Args:
+        latency_seconds (float): Delay before the first token.
+        token_delay_seconds (float): Delay between tokens.
+        max_tokens (int): Words in the reply.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_seconds: float = 0.5, token_delay_seconds: float = 0.02, max_tokens: int = 40) -> None:
+        self.latency_seconds = latency_seconds
+        self.token_delay_seconds = token_delay_seconds
+        self.max_tokens = max_tokens
+        self.calls = 0
+
+    async def stream(self, messages: Sequence[Message]) -> AsyncIterator[str]:
+        self.calls += 1
+        prompt = "\n".join(message["content"] for message in messages)
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+        words = [f"Insight {digest}:"] + messages[-1]["content"].split()
+        await asyncio.sleep(self.latency_seconds)
+        for i, word in enumerate(words[: self.max_tokens]):
+            if i:
+                await asyncio.sleep(self.token_delay_seconds)
+            yield word if i == 0 else f" {word}"
+
+
+class OpenAIModel(InsightModel):
+    """
+    Streams chat completions from OpenAI (or a compatible `base_url`).
+
+    Args:
+        model (str): Model name.
+        api_key (str, optional): Defaults to the `OPENAI_API_KEY` environment variable.
+        base_url (str, optional): Alternative OpenAI-compatible endpoint.
+        max_tokens (int): Reply length limit.
+        temperature (float): Sampling temperature.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_tokens: int = 600,
+        temperature: float = 0.2,
+    ) -> None:
+        self.name = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI  # heavy; deferred to first use
+
+            self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    async def stream(self, messages: Sequence[Message]) -> AsyncIterator[str]:
+        import openai
+
+        try:
+            response = await self._get_client().chat.completions.create(
+                model=self.name,
+                messages=list(messages),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True,
+            )
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except openai.OpenAIError as exc:
+            raise InsightModelError(f"OpenAI request failed: {exc}") from exc
+
+
+_model: Optional[InsightModel] = None
+_lock = threading.Lock()
+
+
+def create_model(name: Optional[str] = None) -> InsightModel:
+    """
+    Build a model by provider name from settings.
+
+    Args:
+        name (str, optional): "openai" or "stub". Defaults to `insights_provider`.
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    settings = get_settings()
+    name = (name or settings.insights_provider).lower()
+    if name == "openai":
+        return OpenAIModel(
+            settings.insights_model,
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            max_tokens=settings.insights_max_tokens,
+            temperature=settings.insights_temperature,
+        )
+    if name == "stub":
+        return StubModel(
+            latency_seconds=settings.insights_stub_latency_seconds,
+            token_delay_seconds=settings.insights_stub_token_delay_seconds,
+        )
+    raise ValueError(f"Unknown insights provider: {name}")
+
+
+def get_model() -> InsightModel:
+    """
+    Return the active model, creating it from settings on first use.
+    """
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                _model = create_model()
+    return _model
+
+
+def set_model(model: InsightModel) -> None:
+    """
+    Swap the active model (benchmarks, tests, or runtime reconfiguration).
+    """
+    global _model
+    with _lock:
+        _model = model
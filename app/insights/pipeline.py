@@ -0,0 +1,200 @@
+import hashlib
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple, TypedDict
+from uuid import UUID
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import PositionSnapshot
+from app.insights.llm import Message, get_model
+from app.insights.service import insight_service
+from app.market.service import normalize_symbol
+
+"""
+The portfolio insight pipeline, as a langgraph graph:
+
+    analyze → compose → generate
+
+- analyze: weights, asset-type mix and concentration of the normalized
+  portfolio (cost basis, so the prompt, and therefore the cache key, does
+  not change with every price tick);
+- compose: the chat prompt, and its content hash (the cache key);
+- generate: the model reply through `insight_service` (cached / shared),
+  emitted token by token on langgraph's custom stream.
+
+langgraph is imported when the graph is first built, not at app import.
+"""
+
+PROMPT_VERSION = "1"
+MAX_PROMPT_POSITIONS = 50
+DEFAULT_QUESTION = (
+    "Give a short overview of this portfolio: diversification, concentration "
+    "risk and anything notable about its asset mix."
+)
+SYSTEM_PROMPT = (
+    "You are StockMind, a concise portfolio assistant. You get a user's "
+    "positions at cost basis (not market value). Answer in plain language, "
+    "in at most three short paragraphs. Do not give personalized financial "
+    "advice or tell the user to buy or sell specific securities."
+)
+
+
+class PortfolioPosition(NamedTuple):
+    """
+    One normalized position: canonical symbol, rounded quantity and cost basis.
+    """
+    asset_type: str
+    symbol: str
+    quantity: float
+    cost_basis: float
+
+
+class InsightState(TypedDict, total=False):
+    positions: List[PortfolioPosition]
+    question: str
+    analysis: Dict[str, Any]
+    messages: List[Message]
+    key: str
+    source: str
+    text: str
+
+
+def normalize_question(question: Optional[str]) -> str:
+    return " ".join((question or "").split()) or DEFAULT_QUESTION
+
+
+async def load_portfolio(db: AsyncSession, user_id: UUID) -> List[PortfolioPosition]:
+    """
+    A user's positions, normalized so that equal portfolios compare (and
+    hash) equal: symbols canonicalized and merged, quantities rounded to 6
+    and cost bases to 2 decimals, empty positions dropped, sorted.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The user's ID.
+
+    Returns:
+        List[PortfolioPosition]: Sorted by asset type, then symbol.
+    """
+    result = await db.execute(
+        select(
+            PositionSnapshot.asset_type,
+            PositionSnapshot.symbol,
+            PositionSnapshot.total_quantity,
+            PositionSnapshot.total_cost_basis,
+        ).where(PositionSnapshot.user_id == user_id)
+    )
+    merged: Dict[Tuple[str, str], List[float]] = {}
+    for asset_type, symbol, quantity, cost_basis in result.all():
+        totals = merged.setdefault((asset_type.value, normalize_symbol(symbol)), [0.0, 0.0])
+        totals[0] += quantity
+        totals[1] += cost_basis
+    positions = [
+        PortfolioPosition(asset_type, symbol, round(quantity, 6), round(cost_basis, 2))
+        for (asset_type, symbol), (quantity, cost_basis) in merged.items()
+    ]
+    return sorted(p for p in positions if p.quantity > 0)
+
+
+# -------------------------------------------------------
+# 🧩 Graph nodes
+# -------------------------------------------------------
+
+def analyze(state: InsightState) -> InsightState:
+    positions = state["positions"]
+    total = sum(p.cost_basis for p in positions)
+    weights = sorted(
+        ((p, p.cost_basis / total * 100 if total else 0.0) for p in positions),
+        key=lambda item: (-item[1], item[0].symbol),
+    )
+    by_asset_type: Dict[str, float] = {}
+    for position, weight in weights:
+        by_asset_type[position.asset_type] = by_asset_type.get(position.asset_type, 0.0) + weight
+    return {"analysis": {
+        "total_cost_basis": round(total, 2),
+        "weights": weights,
+        "by_asset_type": sorted(by_asset_type.items(), key=lambda item: -item[1]),
+        "top5_weight": sum(weight for _, weight in weights[:5]),
+    }}
+
+
+def compose(state: InsightState) -> InsightState:
+    analysis = state["analysis"]
+    weights = analysis["weights"]
+    lines = [
+        f"Portfolio: {len(weights)} positions, total cost basis {analysis['total_cost_basis']:.2f}.",
+        "Positions (largest first):",
+    ]
+    lines += [
+        f"- {p.symbol} ({p.asset_type}): quantity {p.quantity:g}, cost {p.cost_basis:.2f}, {weight:.1f}%"
+        for p, weight in weights[:MAX_PROMPT_POSITIONS]
+    ]
+    if len(weights) > MAX_PROMPT_POSITIONS:
+        rest = sum(weight for _, weight in weights[MAX_PROMPT_POSITIONS:])
+        lines.append(f"- … and {len(weights) - MAX_PROMPT_POSITIONS} more ({rest:.1f}%)")
+    lines.append("By asset type: " + ", ".join(
+        f"{asset_type} {weight:.1f}%" for asset_type, weight in analysis["by_asset_type"]
+    ))
+    lines.append(f"Top 5 positions: {analysis['top5_weight']:.1f}% of cost basis.")
+    lines.append(f"Question: {state['question']}")
+
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": "\n".join(lines)},
+    ]
+    fingerprint = orjson.dumps(
+        {"version": PROMPT_VERSION, "model": get_model().name, "messages": messages},
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return {"messages": messages, "key": hashlib.sha256(fingerprint).hexdigest()}
+
+
+async def generate(state: InsightState) -> InsightState:
+    from langgraph.config import get_stream_writer
+
+    write = get_stream_writer()
+    tokens, source = insight_service.stream(state["key"], state["messages"])
+    text = []
+    async for token in tokens:
+        text.append(token)
+        write({"token": token})
+    return {"source": source, "text": "".join(text)}
+
+
+@lru_cache(maxsize=1)
+def get_graph():
+    """
+    The compiled pipeline (built, and langgraph imported, on first use).
+    """
+    from langgraph.graph import END, START, StateGraph
+
+    graph = StateGraph(InsightState)
+    graph.add_node("analyze", analyze)
+    graph.add_node("compose", compose)
+    graph.add_node("generate", generate)
+    graph.add_edge(START, "analyze")
+    graph.add_edge("analyze", "compose")
+    graph.add_edge("compose", "generate")
+    graph.add_edge("generate", END)
+    return graph.compile()
+
+
+async def run_insight(
+    positions: List[PortfolioPosition], question: Optional[str] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the pipeline, yielding `("token", str)` as the reply streams in,
+    then `("done", InsightState)`.
+
+    Raises:
+        InsightModelError: If the model fails.
+    """
+    state: InsightState = {"positions": positions, "question": normalize_question(question)}
+    async for mode, chunk in get_graph().astream(state, stream_mode=["custom", "values"]):
+        if mode == "custom":
+            yield "token", chunk["token"]
+        else:
+            state = chunk
+    yield "done", state
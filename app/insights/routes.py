@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional
+
+from app.insights.llm import InsightModelError, get_model
+from app.insights.pipeline import PortfolioPosition, load_portfolio, run_insight
+from app.insights.schemas import InsightRead, InsightRequest
+from app.users.deps import current_active_user, get_read_session
+from app.users.models import User
+
+router = APIRouter(
+    prefix="/insights",
+    tags=["insights"],
+)
+
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def _event(name: str, payload: dict) -> bytes:
+    return b"event: " + name.encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
+
+
+async def _sse_insight(positions: List[PortfolioPosition], question: Optional[str]) -> AsyncIterator[bytes]:
+    """
+    Stream the insight as server-sent events: `token` events as the reply
+    is generated, then `done` (or `error`).
+    """
+    try:
+        async for kind, value in run_insight(positions, question):
+            if kind == "token":
+                yield _event("token", {"text": value})
+            else:
+                yield _event("done", {
+                    "model": get_model().name, "source": value["source"], "key": value["key"],
+                })
+    except InsightModelError as exc:
+        yield _event("error", {"detail": str(exc)})
+
+
+@router.post(
+    "/portfolio",
+    response_model=InsightRead,
+    responses={200: {"content": {SSE_MEDIA_TYPE: {}}}},
+)
+async def portfolio_insight(
+    request: Request,
+    body: InsightRequest,
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ AI insight about the current user's portfolio.
+
+    - With `Accept: text/event-stream`, the reply streams as server-sent
+      events (`token` with `{"text"}`, then `done` or `error`).
+    - Otherwise the whole reply is returned at once.
+    - Replies are cached by a hash of the normalized portfolio and prompt;
+      identical concurrent requests share one model call.
+    """
+    positions = await load_portfolio(db, user.id)
+    await db.rollback()  # return the connection to the pool while the model runs
+    if not positions:
+        raise HTTPException(status_code=400, detail="No holdings to analyze.")
+
+    if SSE_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _sse_insight(positions, body.question),
+            media_type=SSE_MEDIA_TYPE,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    try:
+        async for kind, value in run_insight(positions, body.question):
+            if kind == "done":
+                state = value
+    except InsightModelError as exc:
+        raise HTTPException(status_code=502, detail=str(exc))
+    return InsightRead(
+        text=state["text"], model=get_model().name, source=state["source"], key=state["key"]
+    )
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class InsightRequest(BaseModel):
+    """
+    What to ask about the current user's portfolio.
+    """
+    question: Optional[str] = Field(
+        None, max_length=500, description="Question to answer (default: a general overview)"
+    )
+
+
+class InsightRead(BaseModel):
+    """
+    An AI-generated insight about the user's portfolio.
+    """
+    text: str = Field(..., description="The model's reply")
+    model: str = Field(..., description="Model that generated the reply")
+    source: str = Field(
+        ..., description="cached (reused reply), shared (joined a running generation) or generated"
+    )
+    key: str = Field(..., description="Content hash of the normalized portfolio and prompt")
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from app.cache import TTLCache
+from app.config import get_settings
+from app.insights.llm import InsightModelError, Message, get_model
+from app.metrics import REGISTRY, Counter, Histogram
+
+"""
+Cached, shared model generations.
+
+A generation is identified by a content hash of everything that decides the
+model's reply (model name, prompt version, normalized portfolio and
+question; see `app.insights.pipeline`):
+
+- a finished reply is cached for `insights_cache_ttl_seconds`, so an
+  identical portfolio never triggers a second model call;
+- while a reply is being generated, identical requests follow the same
+  generation: each replays the tokens produced so far, then receives new
+  ones as they arrive.
+
+Generations run in their own task, so a client disconnecting does not
+cancel it for the others (and the reply is still cached).
+"""
+
+# 📊 Insight metrics
+INSIGHT_REQUESTS = REGISTRY.register(Counter(
+    "insight_requests_total", "Insight requests by how they were served", ("source",),
+))
+INSIGHT_MODEL_CALLS = REGISTRY.register(Counter(
+    "insight_model_calls_total", "Model calls made for insights", ("outcome",),
+))
+INSIGHT_GENERATION_SECONDS = REGISTRY.register(Histogram(
+    "insight_generation_seconds", "Time to generate one insight reply",
+))
+
+
+class Generation:
+    """
+    The tokens of one reply, as produced so far, with any number of followers.
+    """
+
+    def __init__(self) -> None:
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def push(self, token: str) -> None:
+        self.tokens.append(token)
+        self._notify()
+
+    def finish(self, error: Optional[Exception] = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def follow(self) -> AsyncIterator[str]:
+        """
+        Yield every token from the start, then new ones until the reply ends.
+
+        Raises:
+            InsightModelError: If the generation failed.
+        """
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.tokens):
+                yield self.tokens[sent]
+                sent += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+async def _replay(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+class InsightService:
+    """
+    Runs model generations through the reply cache and in-flight sharing.
+
+    Args:
+        cache_ttl (float): Seconds a finished reply is reused.
+        cache_maxsize (int): Replies kept.
+        timeout (float): Seconds a generation may take before it fails.
+    """
+
+    def __init__(self, cache_ttl: float, cache_maxsize: int, timeout: float) -> None:
+        self.cache: TTLCache[str, str] = TTLCache(maxsize=cache_maxsize, default_ttl=cache_ttl)
+        self.timeout = timeout
+        self._inflight: Dict[str, Generation] = {}
+
+    def stream(self, key: str, messages: Sequence[Message]) -> Tuple[AsyncIterator[str], str]:
+        """
+        The reply to `messages` as a token stream, and where it comes from.
+
+        Args:
+            key (str): Content hash identifying the reply.
+            messages (Sequence[Message]): The prompt, used only on a cache miss.
+
+        Returns:
+            Tuple[AsyncIterator[str], str]: Tokens, and "cached", "shared" or "generated".
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            source, tokens = "cached", _replay(cached)
+        elif key in self._inflight:
+            source, tokens = "shared", self._inflight[key].follow()
+        else:
+            generation = Generation()
+            self._inflight[key] = generation
+            generation.task = asyncio.create_task(self._generate(key, list(messages), generation))
+            source, tokens = "generated", generation.follow()
+        INSIGHT_REQUESTS.inc(source=source)
+        return tokens, source
+
+    async def _generate(self, key: str, messages: List[Message], generation: Generation) -> None:
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                async for token in get_model().stream(messages):
+                    generation.push(token)
+        except asyncio.CancelledError:
+            generation.finish(InsightModelError("Insight generation was cancelled"))
+            raise
+        except Exception as exc:
+            INSIGHT_MODEL_CALLS.inc(outcome="error")
+            if isinstance(exc, TimeoutError):
+                exc = InsightModelError(f"Insight generation timed out after {self.timeout:g}s")
+            elif not isinstance(exc, InsightModelError):
+                exc = InsightModelError(f"Insight generation failed: {exc!r}")
+            generation.finish(exc)
+        else:
+            INSIGHT_MODEL_CALLS.inc(outcome="ok")
+            self.cache.set(key, "".join(generation.tokens))
+            generation.finish()
+        finally:
+            self._inflight.pop(key, None)
+            INSIGHT_GENERATION_SECONDS.observe(time.perf_counter() - started)
+
+    async def stop(self) -> None:
+        """
+        Cancel generations still running (app shutdown).
+        """
+        tasks = [g.task for g in self._inflight.values() if g.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def create_insight_service() -> InsightService:
+    settings = get_settings()
+    return InsightService(
+        cache_ttl=settings.insights_cache_ttl_seconds,
+        cache_maxsize=settings.insights_cache_maxsize,
+        timeout=settings.insights_timeout_seconds,
+    )
+
+
+# ✅ Process-wide service used by the insights pipeline
+insight_service = create_insight_service()
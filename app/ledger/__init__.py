@@ -0,0 +1,5 @@
+"""
+Append-only ledger of every change to a user's positions (buys, sells,
+splits, dividends, manual adjustments), with periodic snapshots so any
+point in time is rebuilt by replaying only the events since the nearest one.
+"""
@@ -0,0 +1,295 @@
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import distinct, exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db.database import AsyncSessionLocal
+from app.db.models import Holding as holding_model, LedgerEvent, LedgerSnapshot
+from app.ledger import store
+from app.ledger.replay import PositionState, replay
+from app.metrics import REGISTRY, Counter, Histogram
+
+"""
+Ledger compaction: materializing snapshots so replays stay short.
+
+A user's events are folded, in time order and from their latest snapshot
+onwards, into a new snapshot every `ledger_snapshot_every` events (a
+snapshot boundary never splits events that occurred at the same instant).
+Point-in-time queries then replay at most about that many events, however
+long the ledger gets. Events are never deleted; snapshots are.
+
+`LedgerCompactor` runs this in the background for users who appended events
+(and, once per process, for every user with a ledger); the same can be run
+by hand:
+
+    python -m app.ledger.compaction compact [--user <id>]
+    python -m app.ledger.compaction backfill   # ledgers for holdings that predate it
+"""
+
+logger = logging.getLogger(__name__)
+
+# 📊 Compaction metrics
+COMPACTION_SNAPSHOTS = REGISTRY.register(Counter(
+    "ledger_snapshots_written_total", "Ledger snapshots written by compaction",
+))
+COMPACTION_CONFLICTS = REGISTRY.register(Counter(
+    "ledger_compaction_conflicts_total", "Compactions discarded because older events were appended meanwhile",
+))
+COMPACTION_PASS_LATENCY = REGISTRY.register(Histogram(
+    "ledger_compaction_pass_seconds", "Duration of one background compaction pass",
+))
+
+
+async def pending_events(db: AsyncSession, user_id: UUID) -> int:
+    """
+    Events not covered by the user's latest snapshot.
+    """
+    snapshot = await store.latest_snapshot(db, user_id)
+    query = select(func.count()).select_from(LedgerEvent).where(LedgerEvent.user_id == user_id)
+    if snapshot is not None:
+        query = query.where(LedgerEvent.occurred_at > snapshot.as_of)
+    return (await db.execute(query)).scalar_one()
+
+
+async def compact_user(db: AsyncSession, user_id: UUID, every: int) -> int:
+    """
+    Write snapshots covering a user's events since their latest snapshot,
+    one per `every` events, and commit.
+
+    Events are streamed from a server-side cursor, so memory stays flat
+    however many there are. The events left over after the last full chunk
+    stay uncovered until more arrive.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The owner user ID.
+        every (int): Events per snapshot.
+
+    Returns:
+        int: Number of snapshots written (0 if a concurrent backdated
+        append made them stale; they are retried on the next pass).
+    """
+    snapshot = await store.latest_snapshot(db, user_id)
+    state = PositionState.empty() if snapshot is None else PositionState.from_json(snapshot.positions)
+    count = 0 if snapshot is None else snapshot.event_count
+    last_id = 0 if snapshot is None else snapshot.last_event_id
+
+    query = (
+        select(LedgerEvent.id, LedgerEvent.occurred_at, *store.event_columns())
+        .where(LedgerEvent.user_id == user_id)
+        .order_by(LedgerEvent.occurred_at, LedgerEvent.id)
+        .execution_options(yield_per=every)
+    )
+    if snapshot is not None:
+        query = query.where(LedgerEvent.occurred_at > snapshot.as_of)
+
+    written: List[LedgerSnapshot] = []
+    pending: list = []
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        pending.extend(partition)
+        while len(pending) > every:
+            # Extend the chunk over events at the same instant as its last
+            cut = every
+            while cut < len(pending) and pending[cut][1] == pending[cut - 1][1]:
+                cut += 1
+            if cut == len(pending):
+                break  # the tie may continue into the next partition
+            chunk, pending = pending[:cut], pending[cut:]
+            state = replay(state, [row[2:] for row in chunk])
+            count += len(chunk)
+            last_id = max(last_id, max(row[0] for row in chunk))
+            written.append(LedgerSnapshot(
+                user_id=user_id, as_of=chunk[-1][1], last_event_id=last_id,
+                event_count=count, positions=state.to_json(),
+            ))
+    await result.close()
+    if not written:
+        await db.rollback()
+        return 0
+
+    db.add_all(written)
+    await db.flush()
+    # An event appended meanwhile, dated inside what we covered, would have
+    # deleted these snapshots had they been committed: discard them
+    stale = await db.execute(select(exists().where(
+        LedgerEvent.user_id == user_id,
+        LedgerEvent.occurred_at <= written[-1].as_of,
+        LedgerEvent.id > last_id,
+    )))
+    if stale.scalar():
+        await db.rollback()
+        COMPACTION_CONFLICTS.inc()
+        return 0
+    await db.commit()
+    COMPACTION_SNAPSHOTS.inc(len(written))
+    return len(written)
+
+
+async def backfill(db: AsyncSession) -> int:
+    """
+    Start the ledger of every user who has holdings but no events yet: one
+    `buy` per holding at its purchase date, price and current quantity.
+
+    Args:
+        db (AsyncSession): The database session.
+
+    Returns:
+        int: Number of events appended.
+    """
+    has_ledger = exists().where(LedgerEvent.user_id == holding_model.user_id)
+    result = await db.execute(
+        select(
+            holding_model.user_id, holding_model.id, holding_model.symbol, holding_model.asset_type,
+            holding_model.quantity, holding_model.purchase_price, holding_model.purchase_date,
+        )
+        .where(~has_ledger)
+        .order_by(holding_model.user_id, holding_model.id)
+    )
+    by_user: dict = {}
+    for user_id, holding_id, symbol, asset_type, quantity, price, purchased in result.all():
+        by_user.setdefault(user_id, []).append(store.buy(
+            symbol, asset_type, quantity, price, occurred_at=purchased, holding_id=holding_id
+        ))
+    appended = 0
+    for user_id, events in by_user.items():
+        appended += len(await store.append(db, user_id, events))
+    await db.commit()
+    return appended
+
+
+class LedgerCompactor:
+    """
+    Periodically compacts the ledgers of users with new events.
+
+    Args:
+        interval (float): Seconds between passes.
+        every (int): Events per snapshot.
+        session_factory: Async session factory.
+    """
+
+    def __init__(self, interval: float, every: int, session_factory=AsyncSessionLocal) -> None:
+        self.interval = interval
+        self.every = every
+        self.session_factory = session_factory
+        self._discovered = False
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def discover(self) -> None:
+        """
+        Queue every user with a ledger (once per process: appends made by
+        other processes, or before this one started, are not tracked).
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(select(distinct(LedgerEvent.user_id)))
+            store.written_users.update(result.scalars().all())
+        self._discovered = True
+
+    async def compact_once(self) -> int:
+        """
+        Run one pass over the queued users.
+
+        Returns:
+            int: Number of snapshots written.
+        """
+        started = time.perf_counter()
+        if not self._discovered:
+            await self.discover()
+        users = list(store.written_users)
+        store.written_users.clear()
+        written = 0
+        for user_id in users:
+            try:
+                async with self.session_factory() as session:
+                    if await pending_events(session, user_id) > self.every:
+                        written += await compact_user(session, user_id, self.every)
+            except Exception:
+                store.written_users.add(user_id)  # try again next pass
+                logger.warning("Ledger compaction failed for %s", user_id, exc_info=True)
+        COMPACTION_PASS_LATENCY.observe(time.perf_counter() - started)
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.compact_once()
+            except Exception:
+                logger.warning("Ledger compaction pass failed", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """
+        Start the compaction loop on the running event loop (app startup).
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Cancel the compaction loop (app shutdown).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_compactor() -> LedgerCompactor:
+    """
+    Build a compactor from the `ledger_*` settings.
+    """
+    settings = get_settings()
+    return LedgerCompactor(
+        interval=settings.ledger_compaction_interval_seconds,
+        every=settings.ledger_snapshot_every,
+    )
+
+
+async def _main(args: argparse.Namespace) -> int:
+    from app.db.database import Base, engine
+    import app.users.models  # noqa: F401  (register the users table)
+
+    # Existing databases predate the ledger tables
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[LedgerEvent.__table__, LedgerSnapshot.__table__],
+        )
+
+    async with AsyncSessionLocal() as session:
+        if args.command == "backfill":
+            appended = await backfill(session)
+            print(f"✅ Appended {appended} ledger events")
+            return 0
+        if args.user:
+            users = [UUID(args.user)]
+        else:
+            users = list((await session.execute(select(distinct(LedgerEvent.user_id)))).scalars().all())
+    every = get_settings().ledger_snapshot_every
+    written = 0
+    for user_id in users:
+        async with AsyncSessionLocal() as session:
+            written += await compact_user(session, user_id, every)
+    print(f"✅ Wrote {written} ledger snapshots for {len(users)} users")
+    return 0
+
+
+# ✅ Process-wide compactor, started and stopped by the app lifespan
+compactor = create_compactor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact or backfill users' ledgers.")
+    parser.add_argument("command", choices=["compact", "backfill"])
+    parser.add_argument("--user", default=None, help="Only this user ID (compact)")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
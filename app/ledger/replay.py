@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.db.models import LedgerEventType
+
+"""
+Positions as columns, and vectorized replay of ledger events onto them.
+
+A `PositionState` holds one entry per (asset type, symbol): units held,
+cost basis, realized gain and dividends received. `replay` applies a batch
+of events in time order without a per-event loop:
+
+- quantity, cost basis, realized gain and dividends are sums of per-event
+  deltas (`np.bincount` per position);
+- a split multiplies the units held at that moment, so each event's
+  quantity delta is scaled by the product of the ratios of the same
+  position's later splits in the batch (a per-position suffix sum of log
+  ratios), and the starting quantity by all of them.
+
+Replays start from a snapshot (`app.ledger.store`), so their cost depends
+on the events since that snapshot, not on the length of the ledger.
+"""
+
+# Event columns a replay reads, in this order
+EVENT_FIELDS = ("type", "asset_type", "symbol", "quantity", "cost_basis", "amount", "ratio")
+
+# Positions this close to zero are closed
+EPSILON = 1e-9
+
+_SELL = LedgerEventType.SELL.value
+_SPLIT = LedgerEventType.SPLIT.value
+_DIVIDEND = LedgerEventType.DIVIDEND.value
+
+
+@dataclass(frozen=True)
+class PositionState:
+    """
+    A user's positions as columns, aligned with `keys` ((asset type, symbol)).
+    """
+    keys: List[Tuple[str, str]]
+    quantity: np.ndarray
+    cost_basis: np.ndarray
+    realized_gain: np.ndarray
+    dividends: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def empty(cls) -> "PositionState":
+        zeros = np.zeros(0, dtype=np.float64)
+        return cls([], zeros, zeros, zeros, zeros)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "PositionState":
+        """
+        Load the column layout stored in `LedgerSnapshot.positions`.
+        """
+        return cls(
+            keys=list(zip(data["asset_types"], data["symbols"])),
+            quantity=np.asarray(data["quantity"], dtype=np.float64),
+            cost_basis=np.asarray(data["cost_basis"], dtype=np.float64),
+            realized_gain=np.asarray(data["realized_gain"], dtype=np.float64),
+            dividends=np.asarray(data["dividends"], dtype=np.float64),
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "asset_types": [asset_type for asset_type, _ in self.keys],
+            "symbols": [symbol for _, symbol in self.keys],
+            "quantity": self.quantity.tolist(),
+            "cost_basis": self.cost_basis.tolist(),
+            "realized_gain": self.realized_gain.tolist(),
+            "dividends": self.dividends.tolist(),
+        }
+
+    def compacted(self) -> "PositionState":
+        """
+        Drop positions with nothing left in them (closed, no gains or dividends).
+        """
+        closed = np.abs(self.quantity) <= EPSILON
+        cost = np.where(closed, 0.0, self.cost_basis)
+        keep = ~closed | (self.realized_gain != 0) | (self.dividends != 0)
+        if keep.all() and not closed.any():
+            return self
+        return PositionState(
+            keys=[key for key, kept in zip(self.keys, keep.tolist()) if kept],
+            quantity=np.where(closed, 0.0, self.quantity)[keep],
+            cost_basis=cost[keep],
+            realized_gain=self.realized_gain[keep],
+            dividends=self.dividends[keep],
+        )
+
+
+def _value(kind) -> str:
+    return getattr(kind, "value", kind)
+
+
+def replay(state: PositionState, events: Sequence[tuple]) -> PositionState:
+    """
+    Apply events to a state.
+
+    Args:
+        state (PositionState): Positions before the first event.
+        events (Sequence[tuple]): `EVENT_FIELDS` tuples, in time order.
+
+    Returns:
+        PositionState: Positions after the last event (closed ones dropped).
+    """
+    if not events:
+        return state
+    codes: Dict[Tuple[str, str], int] = {key: i for i, key in enumerate(state.keys)}
+    types, asset_types, symbols, quantity, cost, amount, ratio = zip(*events)
+    n_events = len(events)
+    code = np.fromiter(
+        (codes.setdefault((_value(t), s), len(codes)) for t, s in zip(asset_types, symbols)),
+        dtype=np.int64, count=n_events,
+    )
+    kinds = [_value(kind) for kind in types]
+    is_split = np.fromiter((kind == _SPLIT for kind in kinds), dtype=bool, count=n_events)
+    is_sell = np.fromiter((kind == _SELL for kind in kinds), dtype=bool, count=n_events)
+    is_dividend = np.fromiter((kind == _DIVIDEND for kind in kinds), dtype=bool, count=n_events)
+    quantity = np.asarray(quantity, dtype=np.float64)
+    cost = np.asarray(cost, dtype=np.float64)
+    amount = np.asarray(amount, dtype=np.float64)
+
+    n = len(codes)
+    grown = n - len(state)
+
+    def extend(column: np.ndarray) -> np.ndarray:
+        return np.concatenate((column, np.zeros(grown))) if grown else column
+
+    # 🔀 Splits: scale each event's units by the later splits of its position
+    log_ratio = np.where(is_split, np.log(np.asarray(ratio, dtype=np.float64)), 0.0)
+    split_total = np.bincount(code, weights=log_ratio, minlength=n)
+    if is_split.any():
+        order = np.argsort(code, kind="stable")  # by position, time order kept
+        sorted_code = code[order]
+        running = np.cumsum(log_ratio[order])
+        starts = np.searchsorted(sorted_code, np.arange(n))
+        before = np.concatenate(([0.0], running))[starts]
+        later = np.empty(n_events)
+        later[order] = split_total[sorted_code] - (running - before[sorted_code])
+        quantity = quantity * np.exp(later)
+
+    return PositionState(
+        keys=list(codes),
+        quantity=extend(state.quantity) * np.exp(split_total)
+        + np.bincount(code, weights=quantity, minlength=n),
+        cost_basis=extend(state.cost_basis) + np.bincount(code, weights=cost, minlength=n),
+        realized_gain=extend(state.realized_gain)
+        + np.bincount(code, weights=np.where(is_sell, amount + cost, 0.0), minlength=n),
+        dividends=extend(state.dividends)
+        + np.bincount(code, weights=np.where(is_dividend, amount, 0.0), minlength=n),
+    ).compacted()
@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import LedgerEvent
+from app.holdings.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.ledger import store
+from app.ledger.schemas import DividendCreate, LedgerEventRead, LedgerPosition, LedgerPositions
+from app.users.deps import current_active_user, get_read_session, get_write_session
+from app.users.models import User
+
+router = APIRouter(
+    prefix="/ledger",
+    tags=["ledger"],
+)
+
+
+def _utc_naive(moment: Optional[datetime]) -> Optional[datetime]:
+    """
+    Timestamps are stored as naive UTC.
+    """
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@router.get("/positions", response_model=LedgerPositions)
+async def get_positions(
+    at: Optional[datetime] = Query(None, description="Point in time (default: now)"),
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ The current user's positions at any point in time, rebuilt from the
+    ledger: the nearest snapshot plus the events after it.
+    """
+    at = _utc_naive(at) or datetime.utcnow()
+    state, snapshot, replayed = await store.positions_at(db, user.id, at)
+    return LedgerPositions(
+        at=at,
+        snapshot_as_of=snapshot.as_of if snapshot is not None else None,
+        events_replayed=replayed,
+        positions=[
+            LedgerPosition(
+                asset_type=asset_type, symbol=symbol, quantity=quantity, cost_basis=round(cost, 6),
+                realized_gain=round(realized, 6), dividends=round(dividends, 6),
+            )
+            for (asset_type, symbol), quantity, cost, realized, dividends in zip(
+                state.keys, state.quantity.tolist(), state.cost_basis.tolist(),
+                state.realized_gain.tolist(), state.dividends.tolist(),
+            )
+        ],
+    )
+
+
+@router.get("/events", response_model=List[LedgerEventRead])
+async def get_events(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ The current user's ledger in time order, one page at a time.
+    Sets `X-Next-Cursor` when more events follow.
+    """
+    try:
+        after_id = decode_cursor(cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    events, last_id = await store.get_events_page(db, user.id, limit, after_id)
+    if last_id is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(last_id)
+    return events
+
+
+@router.post("/dividends", response_model=LedgerEventRead, status_code=status.HTTP_201_CREATED)
+async def record_dividend(
+    dividend_in: DividendCreate,
+    db: AsyncSession = Depends(get_write_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    ✅ Record a dividend received by the current user.
+    """
+    [event_id] = await store.append(db, user.id, [store.dividend(
+        dividend_in.symbol, dividend_in.asset_type, dividend_in.amount,
+        occurred_at=_utc_naive(dividend_in.occurred_at),
+    )])
+    await db.commit()
+    return await db.get(LedgerEvent, event_id)
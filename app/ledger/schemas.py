@@ -0,0 +1,72 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.holdings.schemas import AssetType
+
+
+class LedgerEventType(str, Enum):
+    """
+    Kinds of ledger event.
+    """
+    BUY = "buy"
+    SELL = "sell"
+    SPLIT = "split"
+    DIVIDEND = "dividend"
+    ADJUSTMENT = "adjustment"
+
+
+class DividendCreate(BaseModel):
+    """
+    Schema for recording a dividend.
+    """
+    symbol: str = Field(..., description="Ticker symbol that paid the dividend")
+    asset_type: AssetType = Field(AssetType.STOCK, description="Asset type of the position")
+    amount: float = Field(..., gt=0, description="Cash received")
+    occurred_at: Optional[datetime] = Field(
+        None, description="When it was paid (defaults to current time on server if omitted)"
+    )
+
+
+class LedgerEventRead(BaseModel):
+    """
+    Schema for reading a ledger event.
+    """
+    id: int = Field(..., description="Unique identifier, in recording order")
+    type: LedgerEventType = Field(..., description="buy, sell, split, dividend or adjustment")
+    symbol: str = Field(..., description="Normalized ticker symbol")
+    asset_type: AssetType = Field(..., description="Asset type of the position")
+    quantity: float = Field(..., description="Change in units held")
+    cost_basis: float = Field(..., description="Change in cost basis")
+    amount: float = Field(..., description="Cash flow (negative when paid out)")
+    price: Optional[float] = Field(None, description="Trade price per unit")
+    ratio: float = Field(..., description="Split ratio (1 for other events)")
+    holding_id: Optional[int] = Field(None, description="Holding the event came from")
+    occurred_at: datetime = Field(..., description="When the event took effect")
+    recorded_at: datetime = Field(..., description="When it was recorded")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class LedgerPosition(BaseModel):
+    """
+    One position rebuilt from the ledger.
+    """
+    symbol: str = Field(..., description="Normalized ticker symbol")
+    asset_type: AssetType = Field(..., description="Asset type of the position")
+    quantity: float = Field(..., description="Units held")
+    cost_basis: float = Field(..., description="Cost of the units held")
+    realized_gain: float = Field(..., description="Sale proceeds minus the cost of units sold")
+    dividends: float = Field(..., description="Dividends received")
+
+
+class LedgerPositions(BaseModel):
+    """
+    A user's positions at a point in time.
+    """
+    at: datetime = Field(..., description="Point in time (UTC)")
+    snapshot_as_of: Optional[datetime] = Field(None, description="Snapshot the replay started from")
+    events_replayed: int = Field(..., description="Events replayed on top of the snapshot")
+    positions: List[LedgerPosition] = Field(default_factory=list, description="Open or realized positions")
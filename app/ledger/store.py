@@ -0,0 +1,267 @@
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import AssetType, LedgerEvent, LedgerEventType, LedgerSnapshot
+from app.ledger.replay import EVENT_FIELDS, PositionState, replay
+
+"""
+Writing to and reading from the append-only ledger.
+
+Every holdings write in `app.holdings.crud` describes what it changed as
+ledger events and appends them in the same transaction (like the snapshot
+deltas of `app.holdings.snapshots`):
+
+- creating holdings → `buy` at the purchase date
+- recording a trade → `trade` (a buy or sell) at its execution time
+- applying a split → `split` per position of the symbol
+- editing, re-typing or deleting holdings → `adjustment` (out of the old
+  position, into the new one)
+
+Dividends are recorded directly (`POST /ledger/dividends`). Events are never
+updated or deleted. Positions at time T are the nearest snapshot at or
+before T plus a replay of the events after it, up to T. An event dated at
+or before an existing snapshot makes that snapshot (and later ones) wrong,
+so appending deletes them; compaction writes them again.
+"""
+
+
+class Event(NamedTuple):
+    """
+    A ledger event to append (see `LedgerEvent` for the fields).
+    """
+    type: LedgerEventType
+    asset_type: AssetType
+    symbol: str
+    quantity: float = 0.0
+    cost_basis: float = 0.0
+    amount: float = 0.0
+    price: Optional[float] = None
+    ratio: float = 1.0
+    holding_id: Optional[int] = None
+    occurred_at: Optional[datetime] = None
+
+
+def _key(symbol: str, asset_type) -> Tuple[str, AssetType]:
+    return symbol.strip().upper(), AssetType(getattr(asset_type, "value", asset_type))
+
+
+def buy(
+    symbol: str, asset_type, quantity: float, price: float, fees: float = 0.0,
+    occurred_at: Optional[datetime] = None, holding_id: Optional[int] = None,
+) -> Event:
+    """
+    Units bought at `price` (fees are part of the cost).
+    """
+    symbol, asset_type = _key(symbol, asset_type)
+    cost = quantity * price + fees
+    return Event(
+        LedgerEventType.BUY, asset_type, symbol, quantity, cost, -cost, price,
+        holding_id=holding_id, occurred_at=occurred_at,
+    )
+
+
+def sell(
+    symbol: str, asset_type, quantity: float, price: float, cost_basis: float, fees: float = 0.0,
+    occurred_at: Optional[datetime] = None, holding_id: Optional[int] = None,
+) -> Event:
+    """
+    Units sold at `price`, taking `cost_basis` out of the position.
+    """
+    symbol, asset_type = _key(symbol, asset_type)
+    return Event(
+        LedgerEventType.SELL, asset_type, symbol, -quantity, -cost_basis, quantity * price - fees, price,
+        holding_id=holding_id, occurred_at=occurred_at,
+    )
+
+
+def trade(
+    kind, symbol: str, asset_type, quantity: float, price: float, fees: float,
+    position_change: Tuple[float, float], occurred_at: Optional[datetime] = None,
+    holding_id: Optional[int] = None,
+) -> Event:
+    """
+    A recorded buy or sell whose effect on the position, `(units, cost
+    basis)`, was worked out by lot matching rather than from the trade alone
+    (a backdated trade can change what later sells took out).
+    """
+    symbol, asset_type = _key(symbol, asset_type)
+    kind = LedgerEventType(getattr(kind, "value", kind))
+    gross = quantity * price
+    amount = -(gross + fees) if kind is LedgerEventType.BUY else gross - fees
+    return Event(
+        kind, asset_type, symbol, position_change[0], position_change[1], amount, price,
+        holding_id=holding_id, occurred_at=occurred_at,
+    )
+
+
+def split(symbol: str, asset_type, ratio: float, occurred_at: Optional[datetime] = None) -> Event:
+    """
+    Every unit held becomes `ratio` units; cost basis is unchanged.
+    """
+    symbol, asset_type = _key(symbol, asset_type)
+    return Event(LedgerEventType.SPLIT, asset_type, symbol, ratio=ratio, occurred_at=occurred_at)
+
+
+def dividend(
+    symbol: str, asset_type, amount: float, occurred_at: Optional[datetime] = None
+) -> Event:
+    """
+    Cash received from a position.
+    """
+    symbol, asset_type = _key(symbol, asset_type)
+    return Event(LedgerEventType.DIVIDEND, asset_type, symbol, amount=amount, occurred_at=occurred_at)
+
+
+def adjustment(
+    symbol: str, asset_type, quantity: float, purchase_price: float, sign: int = 1,
+    holding_id: Optional[int] = None, occurred_at: Optional[datetime] = None,
+) -> Event:
+    """
+    A holding put into (`sign=1`) or taken out of (`sign=-1`) a position
+    by an edit rather than a trade.
+    """
+    symbol, asset_type = _key(symbol, asset_type)
+    return Event(
+        LedgerEventType.ADJUSTMENT, asset_type, symbol,
+        sign * quantity, sign * quantity * purchase_price,
+        holding_id=holding_id, occurred_at=occurred_at,
+    )
+
+
+async def append(db: AsyncSession, user_id: UUID, events: Iterable[Event]) -> List[int]:
+    """
+    Append events to a user's ledger, and drop the snapshots they invalidate.
+
+    Does not commit: call it in the transaction that made the change.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The owner user ID.
+        events (Iterable[Event]): Events to append (undated ones occur now).
+
+    Returns:
+        List[int]: IDs of the appended events, in order.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {**event._asdict(), "user_id": user_id, "occurred_at": event.occurred_at or now, "recorded_at": now}
+        for event in events
+    ]
+    if not rows:
+        return []
+    result = await db.execute(
+        insert(LedgerEvent.__table__).returning(LedgerEvent.id, sort_by_parameter_order=True), rows
+    )
+    await db.execute(
+        delete(LedgerSnapshot)
+        .where(
+            LedgerSnapshot.user_id == user_id,
+            LedgerSnapshot.as_of >= min(row["occurred_at"] for row in rows),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    written_users.add(user_id)
+    return list(result.scalars().all())
+
+
+def event_columns():
+    """
+    `LedgerEvent` columns in `EVENT_FIELDS` order.
+    """
+    return [getattr(LedgerEvent, name) for name in EVENT_FIELDS]
+
+
+async def latest_snapshot(
+    db: AsyncSession, user_id: UUID, at: Optional[datetime] = None
+) -> Optional[LedgerSnapshot]:
+    """
+    The user's most recent snapshot, or the most recent one at or before `at`.
+    """
+    query = select(LedgerSnapshot).where(LedgerSnapshot.user_id == user_id)
+    if at is not None:
+        query = query.where(LedgerSnapshot.as_of <= at)
+    result = await db.execute(query.order_by(LedgerSnapshot.as_of.desc()).limit(1))
+    return result.scalar_one_or_none()
+
+
+async def positions_at(
+    db: AsyncSession, user_id: UUID, at: Optional[datetime] = None
+) -> Tuple[PositionState, Optional[LedgerSnapshot], int]:
+    """
+    Rebuild a user's positions at a point in time.
+
+    Two indexed reads: the nearest snapshot at or before `at`, then the
+    events between it and `at`, replayed onto it.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The owner user ID.
+        at (datetime, optional): Point in time (naive UTC; default: now).
+
+    Returns:
+        Tuple[PositionState, Optional[LedgerSnapshot], int]: The positions,
+        the snapshot they started from, and the number of events replayed.
+    """
+    at = at or datetime.utcnow()
+    snapshot = await latest_snapshot(db, user_id, at)
+    query = (
+        select(*event_columns())
+        .where(LedgerEvent.user_id == user_id, LedgerEvent.occurred_at <= at)
+        .order_by(LedgerEvent.occurred_at, LedgerEvent.id)
+    )
+    state = PositionState.empty()
+    if snapshot is not None:
+        query = query.where(LedgerEvent.occurred_at > snapshot.as_of)
+        state = PositionState.from_json(snapshot.positions)
+    events = (await db.execute(query)).all()
+    return replay(state, events), snapshot, len(events)
+
+
+async def get_events_page(
+    db: AsyncSession, user_id: UUID, limit: int, after_id: Optional[int] = None
+) -> Tuple[List[LedgerEvent], Optional[int]]:
+    """
+    A user's events in time order, one keyset page at a time.
+
+    Seeks past the (occurred_at, id) of `after_id` on the replay index, so
+    deep pages cost the same as the first.
+
+    Args:
+        db (AsyncSession): The database session.
+        user_id (UUID): The owner user ID.
+        limit (int): Page size.
+        after_id (int, optional): Return the events after this one.
+
+    Returns:
+        Tuple[List[LedgerEvent], Optional[int]]: The page, and the last ID in
+        it when more events follow (else None).
+    """
+    query = (
+        select(LedgerEvent)
+        .where(LedgerEvent.user_id == user_id)
+        .order_by(LedgerEvent.occurred_at, LedgerEvent.id)
+        .limit(limit + 1)
+    )
+    if after_id is not None:
+        after = (
+            select(LedgerEvent.occurred_at)
+            .where(LedgerEvent.id == after_id, LedgerEvent.user_id == user_id)
+            .scalar_subquery()
+        )
+        query = query.where(or_(
+            LedgerEvent.occurred_at > after,
+            and_(LedgerEvent.occurred_at == after, LedgerEvent.id > after_id),
+        ))
+    events = list((await db.execute(query)).scalars().all())
+    if len(events) > limit:
+        events = events[:limit]
+        return events, events[-1].id
+    return events, None
+
+
+# ✅ Users with events appended in this process since compaction last looked
+written_users: Set[UUID] = set()
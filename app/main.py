@@ -1,17 +1,36 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from app.admission import AdmissionMiddleware, create_admission_controller
+from app.config import get_settings
+from app.db.database import session_router
+from app.insights.service import insight_service
+from app.ledger.compaction import compactor as ledger_compactor
+from app.market.scheduler import scheduler as price_scheduler
+from app.market.stream import broadcaster
+from app.metrics import PROMETHEUS_MEDIA_TYPE, REGISTRY, MetricsMiddleware
+from app.responses import ContentNegotiationMiddleware, NegotiatedResponse
+from app.startup import run_startup
+from app.users.passwords import PasswordPoolBusy, password_pool
 
 # Routers
 from app.routes.auth import router as auth_router
 from app.holdings.routes import router as holdings_router
+from app.market.routes import router as market_router
+from app.insights.routes import router as insights_router
+from app.ledger.routes import router as ledger_router
 
 """
 Main application entry point for the Dwight Assistant API.
 
 This file:
 - Instantiates the FastAPI app
+- Warms up and starts/stops background work (price refresh) in the app lifespan
 - Registers modular API routes
-- Defines the root health check endpoint
+- Defines the root health check and /metrics endpoints
 
 FastAPI automatically generates OpenAPI docs at:
 - /docs     → Swagger UI
@@ -21,12 +40,45 @@ FastAPI automatically generates OpenAPI docs at:
 # ----------------------------------------
 # 🚀 Create FastAPI app instance
 # ----------------------------------------
+settings = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up (schema, connections, provider, caches) and start background
+    price refresh and ledger compaction on startup; stop background work on
+    shutdown.
+    """
+    app.state.startup = await run_startup(settings)
+    if settings.market_refresh_enabled:
+        price_scheduler.start()
+    if settings.ledger_compaction_enabled:
+        ledger_compactor.start()
+    yield
+    await price_scheduler.stop()
+    await ledger_compactor.stop()
+    await broadcaster.stop()
+    await insight_service.stop()
+    password_pool.shutdown()
+    await session_router.dispose()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Dwight Assistant",
     description="AI-powered assistant to manage and analyze your stock/crypto portfolio.",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=NegotiatedResponse,  # ⚡ orjson, or msgpack on request
 )
 
+# ----------------------------------------
+# 🚦 Admission control (inside CORS, so rejections carry CORS headers
+# and preflights are never limited)
+# ----------------------------------------
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware, controller=create_admission_controller(settings))
+
 # ----------------------------------------
 # 🌐 CORS Middleware (for frontend)
 # ----------------------------------------
@@ -38,6 +90,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ----------------------------------------
+# 📦 Content negotiation (JSON / MessagePack)
+# ----------------------------------------
+app.add_middleware(ContentNegotiationMiddleware)
+
+# ----------------------------------------
+# 📊 Request / SQL metrics (outermost, so it times everything)
+# ----------------------------------------
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, debug_header=settings.metrics_debug_header)
+
+# ----------------------------------------
+# 🔑 Password hashing backlog full → ask the client to retry
+# ----------------------------------------
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy(request: Request, exc: PasswordPoolBusy):
+    return NegotiatedResponse(
+        status_code=503,
+        content={"detail": "Too many sign-ins in progress, retry shortly."},
+        headers={"Retry-After": "1"},
+    )
+
 # ----------------------------------------
 # 🔐 Authentication Routes
 # ----------------------------------------
@@ -46,7 +120,22 @@ app.include_router(auth_router)
 # ----------------------------------------
 # 📊 Holdings Routes
 # ----------------------------------------
-app.include_router(holdings_router, prefix="/holdings", tags=["Holdings"])
+app.include_router(holdings_router)  # prefix and tags are set on the router
+
+# ----------------------------------------
+# 📡 Market Routes (live price WebSocket)
+# ----------------------------------------
+app.include_router(market_router)
+
+# ----------------------------------------
+# 🧠 AI Insight Routes
+# ----------------------------------------
+app.include_router(insights_router)
+
+# ----------------------------------------
+# 📒 Ledger Routes (point-in-time positions)
+# ----------------------------------------
+app.include_router(ledger_router)
 
 # ----------------------------------------
 # ✅ Root Health Check
@@ -57,3 +146,15 @@ def root():
     Root endpoint to confirm the API is online.
     """
     return {"message": "Dwight is running"}
+
+
+# ----------------------------------------
+# 📊 Prometheus metrics
+# ----------------------------------------
+if settings.metrics_enabled:
+    @app.get("/metrics", tags=["Root"], include_in_schema=False)
+    def metrics():
+        """
+        Request latency, status and SQL metrics in Prometheus text format.
+        """
+        return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_MEDIA_TYPE)
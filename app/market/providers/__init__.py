@@ -0,0 +1,74 @@
+"""
+Pluggable market-data providers.
+
+`get_provider()` returns the process-wide provider selected by the
+`market_data_provider` setting ("yahoo" by default, or "replay" for offline,
+repeatable runs configured by the `market_replay_*` settings).
+"""
+import threading
+from typing import Optional
+
+from app.config import get_settings
+from app.market.providers.base import MarketDataProvider, PriceBars, ProviderError
+
+__all__ = [
+    "MarketDataProvider",
+    "PriceBars",
+    "ProviderError",
+    "create_provider",
+    "get_provider",
+    "set_provider",
+]
+
+_provider: Optional[MarketDataProvider] = None
+_lock = threading.Lock()
+
+
+def create_provider(name: Optional[str] = None) -> MarketDataProvider:
+    """
+    Build a provider by name from settings.
+
+    Args:
+        name (str, optional): "yahoo" or "replay". Defaults to `market_data_provider`.
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    settings = get_settings()
+    name = (name or settings.market_data_provider).lower()
+    if name == "yahoo":
+        from app.market.providers.yahoo import YahooProvider
+
+        return YahooProvider()
+    if name == "replay":
+        from app.market.providers.replay import ReplayProvider
+
+        return ReplayProvider(
+            data_dir=settings.market_replay_dir,
+            latency_ms=settings.market_replay_latency_ms,
+            jitter_ms=settings.market_replay_jitter_ms,
+            error_rate=settings.market_replay_error_rate,
+            seed=settings.market_replay_seed,
+        )
+    raise ValueError(f"Unknown market data provider: {name}")
+
+
+def get_provider() -> MarketDataProvider:
+    """
+    Return the active provider, creating it from settings on first use.
+    """
+    global _provider
+    if _provider is None:
+        with _lock:
+            if _provider is None:
+                _provider = create_provider()
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider) -> None:
+    """
+    Swap the active provider (benchmarks, tests, or runtime reconfiguration).
+    """
+    global _provider
+    with _lock:
+        _provider = provider
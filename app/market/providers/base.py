@@ -0,0 +1,96 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Sequence
+
+import numpy as np
+
+"""
+Market-data provider interface.
+
+Providers are plain blocking objects; the market service is responsible for
+running them off the event loop, batching, and caching.
+"""
+
+
+def to_epoch(moment: datetime) -> int:
+    """
+    UTC epoch seconds for a datetime (naive values are treated as UTC).
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+class ProviderError(RuntimeError):
+    """
+    Raised when a provider cannot serve a request (network, quota, injected fault).
+    """
+
+
+@dataclass(frozen=True)
+class PriceBars:
+    """
+    Columnar OHLCV bars for one symbol, sorted by timestamp.
+
+    `timestamp` holds UTC epoch seconds (int64); the price columns are float64.
+    """
+    timestamp: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @classmethod
+    def empty(cls) -> "PriceBars":
+        return cls(
+            np.empty(0, dtype=np.int64),
+            *(np.empty(0, dtype=np.float64) for _ in range(5)),
+        )
+
+    def between(self, start: int, end: int) -> "PriceBars":
+        """
+        Bars with `start <= timestamp < end` (epoch seconds), as array views.
+        """
+        lo, hi = np.searchsorted(self.timestamp, [start, end], side="left")
+        return PriceBars(*(getattr(self, f)[lo:hi] for f in self.FIELDS))
+
+
+class MarketDataProvider(ABC):
+    """
+    A source of market prices (live API, recorded replay, ...).
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    def fetch_latest(self, symbols: Sequence[str]) -> Dict[str, float]:
+        """
+        Blocking: latest price for each symbol, in as few upstream calls as possible.
+
+        Args:
+            symbols (Sequence[str]): Normalized, de-duplicated ticker symbols.
+
+        Returns:
+            Dict[str, float]: Symbol → price. Symbols without data are omitted.
+
+        Raises:
+            ProviderError: If the upstream request fails as a whole.
+        """
+
+    @abstractmethod
+    def fetch_bars(
+        self, symbol: str, start: datetime, end: datetime, interval: str = "1d"
+    ) -> PriceBars:
+        """
+        Blocking: OHLCV bars for `symbol` in `[start, end)` at the given interval.
+
+        Raises:
+            ProviderError: If the upstream request fails.
+        """
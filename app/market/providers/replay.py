@@ -0,0 +1,202 @@
+import argparse
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+from app.market.providers.base import MarketDataProvider, PriceBars, ProviderError, to_epoch
+
+"""
+Deterministic offline provider that replays recorded price bars from disk.
+
+Layout: `<data_dir>/<interval>/<SYMBOL>.csv` with the header
+`timestamp,open,high,low,close,volume` (timestamp in UTC epoch seconds).
+
+Each `fetch_latest` call steps every requested symbol one bar forward through
+its recording (wrapping at the end), so a run with the same seed and call
+sequence always sees the same prices, latencies and injected failures.
+
+Record real data once with:
+    python -m app.market.providers.replay AAPL MSFT --start 2024-01-01 --end 2025-01-01 --out data/replay
+"""
+
+CSV_HEADER = ",".join(PriceBars.FIELDS)
+
+
+def bars_path(data_dir: Union[str, Path], symbol: str, interval: str = "1d") -> Path:
+    return Path(data_dir) / interval / f"{symbol}.csv"
+
+
+def write_bars(path: Union[str, Path], bars: PriceBars) -> None:
+    """
+    Write bars to a replay CSV file, creating parent directories as needed.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = np.column_stack([getattr(bars, f).astype(np.float64) for f in PriceBars.FIELDS])
+    np.savetxt(
+        path, table, delimiter=",", header=CSV_HEADER, comments="",
+        fmt=["%d", "%.6f", "%.6f", "%.6f", "%.6f", "%.0f"],
+    )
+
+
+def read_bars(path: Union[str, Path]) -> PriceBars:
+    """
+    Load a replay CSV file into columnar arrays.
+    """
+    table = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+    if table.size == 0:
+        return PriceBars.empty()
+    order = np.argsort(table[:, 0], kind="stable")
+    table = table[order]
+    return PriceBars(
+        timestamp=table[:, 0].astype(np.int64),
+        open=np.ascontiguousarray(table[:, 1]),
+        high=np.ascontiguousarray(table[:, 2]),
+        low=np.ascontiguousarray(table[:, 3]),
+        close=np.ascontiguousarray(table[:, 4]),
+        volume=np.ascontiguousarray(table[:, 5]),
+    )
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Replays recorded bars with configurable injected latency and error rate.
+
+    Args:
+        data_dir: Root directory of the recording.
+        latency_ms (float): Fixed delay added to every upstream call.
+        jitter_ms (float): Extra uniformly distributed delay in `[0, jitter_ms)`.
+        error_rate (float): Probability in `[0, 1]` that a call raises ProviderError.
+        seed (int): Seed for the latency/error random stream.
+        latest_interval (str): Recording interval that `fetch_latest` steps through.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        data_dir: Union[str, Path],
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        latest_interval: str = "1d",
+    ) -> None:
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.data_dir = Path(data_dir)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.latest_interval = latest_interval
+        self.calls = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._bars: Dict[tuple, Optional[PriceBars]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, symbol: str, interval: str) -> Optional[PriceBars]:
+        key = (symbol, interval)
+        with self._lock:
+            if key in self._bars:
+                return self._bars[key]
+        path = bars_path(self.data_dir, symbol, interval)
+        bars = read_bars(path) if path.exists() else None
+        with self._lock:
+            self._bars[key] = bars
+        return bars
+
+    def _simulate_upstream(self) -> None:
+        """
+        Account for one upstream call: sleep the injected latency, maybe fail.
+        """
+        with self._lock:
+            self.calls += 1
+            delay_ms = self.latency_ms + self._rng.random() * self.jitter_ms
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+        if fail:
+            raise ProviderError("Injected replay failure")
+
+    def fetch_latest(self, symbols: Sequence[str]) -> Dict[str, float]:
+        self._simulate_upstream()
+        prices: Dict[str, float] = {}
+        for symbol in symbols:
+            bars = self._load(symbol, self.latest_interval)
+            if not bars:
+                continue
+            with self._lock:
+                step = self._cursors.get(symbol, 0)
+                self._cursors[symbol] = step + 1
+            prices[symbol] = round(float(bars.close[step % len(bars)]), 2)
+        return prices
+
+    def fetch_bars(
+        self, symbol: str, start: datetime, end: datetime, interval: str = "1d"
+    ) -> PriceBars:
+        self._simulate_upstream()
+        bars = self._load(symbol, interval)
+        if not bars:
+            return PriceBars.empty()
+        return bars.between(to_epoch(start), to_epoch(end))
+
+    def reset(self) -> None:
+        """
+        Rewind every symbol to its first bar and zero the call counters.
+        """
+        with self._lock:
+            self._cursors.clear()
+            self.calls = 0
+            self.errors = 0
+
+
+def record(
+    source: MarketDataProvider,
+    symbols: Iterable[str],
+    start: datetime,
+    end: datetime,
+    data_dir: Union[str, Path],
+    interval: str = "1d",
+) -> Dict[str, int]:
+    """
+    Record bars from a live provider into a replay directory.
+
+    Returns:
+        Dict[str, int]: Symbol → number of bars written.
+    """
+    written: Dict[str, int] = {}
+    for symbol in symbols:
+        bars = source.fetch_bars(symbol, start, end, interval)
+        if len(bars):
+            write_bars(bars_path(data_dir, symbol, interval), bars)
+        written[symbol] = len(bars)
+    return written
+
+
+if __name__ == "__main__":
+    from app.config import get_settings
+    from app.market.providers.yahoo import YahooProvider
+
+    parser = argparse.ArgumentParser(description="Record Yahoo price bars for offline replay.")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--end", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--out", default=get_settings().market_replay_dir)
+    args = parser.parse_args()
+
+    counts = record(
+        YahooProvider(), [s.upper() for s in args.symbols],
+        args.start, args.end, args.out, args.interval,
+    )
+    for symbol, count in counts.items():
+        print(f"📼 {symbol}: {count} bars")
@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Dict, Sequence
+
+import numpy as np
+import yfinance as yf
+
+from app.market.providers.base import MarketDataProvider, PriceBars, ProviderError
+
+
+class YahooProvider(MarketDataProvider):
+    """
+    Live prices from Yahoo Finance via yfinance.
+    """
+
+    name = "yahoo"
+
+    def fetch_latest(self, symbols: Sequence[str]) -> Dict[str, float]:
+        """
+        Fetch the latest close for all `symbols` in one `yf.download` call.
+        """
+        try:
+            # 5 days so weekends/holidays still yield the last trading close
+            data = yf.download(
+                list(symbols),
+                period="5d",
+                progress=False,
+                threads=False,
+                group_by="column",
+                auto_adjust=False,
+            )
+        except Exception as exc:
+            raise ProviderError(f"Yahoo download failed: {exc}") from exc
+        if data is None or data.empty:
+            return {}
+
+        closes = data["Close"]
+        if closes.ndim == 1:
+            closes = closes.to_frame(symbols[0])
+        last = closes.ffill().iloc[-1]
+        return {
+            str(symbol): round(float(price), 2)
+            for symbol, price in last.items()
+            if price == price  # drop NaN
+        }
+
+    def fetch_bars(
+        self, symbol: str, start: datetime, end: datetime, interval: str = "1d"
+    ) -> PriceBars:
+        """
+        Fetch OHLCV history for one symbol via `Ticker.history`.
+        """
+        try:
+            history = yf.Ticker(symbol).history(
+                start=start, end=end, interval=interval, auto_adjust=False
+            )
+        except Exception as exc:
+            raise ProviderError(f"Yahoo history failed for {symbol}: {exc}") from exc
+        if history is None or history.empty:
+            return PriceBars.empty()
+
+        index = history.index
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        timestamps = index.values.astype("datetime64[s]").astype(np.int64)
+        return PriceBars(
+            timestamp=timestamps,
+            open=history["Open"].to_numpy(dtype=np.float64),
+            high=history["High"].to_numpy(dtype=np.float64),
+            low=history["Low"].to_numpy(dtype=np.float64),
+            close=history["Close"].to_numpy(dtype=np.float64),
+            volume=history["Volume"].to_numpy(dtype=np.float64),
+        )
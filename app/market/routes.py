@@ -0,0 +1,138 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import anyio
+import orjson
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
+from pydantic import TypeAdapter, ValidationError
+
+from app.config import get_settings
+from app.db.database import session_router
+from app.holdings import valuation
+from app.market.stream import Subscription, broadcaster
+from app.users.deps import authenticate_token
+
+router = APIRouter(
+    prefix="/market",
+    tags=["market"],
+)
+
+"""
+📡 Live market data over WebSocket.
+
+    ws://<host>/market/ws/prices?token=<access token>
+
+On connect the client is subscribed to the symbols in its portfolio and
+receives `{"type": "subscribed", "symbols": [...]}`. Price changes then
+arrive as coalesced batches, at most one message per tick:
+
+    {"type": "prices", "ts": 1718000000.0, "prices": {"AAPL": 191.2, ...}}
+
+Clients can follow more or fewer symbols at any time:
+
+    {"action": "subscribe", "symbols": ["MSFT"]}
+    {"action": "unsubscribe", "symbols": ["AAPL"]}
+"""
+
+settings = get_settings()
+
+# Command symbols must be a list of strings (a bare string would be split
+# into letters)
+_symbols_adapter = TypeAdapter(List[str])
+
+
+def _message(payload: Dict[str, Any]) -> str:
+    return orjson.dumps(payload).decode()
+
+
+async def _portfolio_symbols(user_id) -> list:
+    async with session_router.reader(user_id) as session:
+        columns = await valuation.load_position_columns(session, user_id)
+    return list(columns.price_lookup_types())
+
+
+async def _send_prices(websocket: WebSocket, subscription: Subscription) -> None:
+    """
+    Push pending price batches; a client that cannot take one within the send
+    timeout is disconnected rather than allowed to fall further behind.
+    """
+    while True:
+        batch = await subscription.next_batch()
+        message = _message({"type": "prices", "ts": time.time(), "prices": batch})
+        try:
+            await asyncio.wait_for(
+                websocket.send_text(message), settings.market_stream_send_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Client too slow")
+            return
+
+
+async def _receive_commands(websocket: WebSocket, subscription: Subscription) -> None:
+    """
+    Apply subscribe / unsubscribe commands until the client disconnects.
+    """
+    while True:
+        try:
+            command = orjson.loads(await websocket.receive_text())
+            action = command["action"]
+            symbols = _symbols_adapter.validate_python(command.get("symbols", []), strict=True)
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValidationError):
+            await websocket.send_text(_message({"type": "error", "detail": "Invalid command."}))
+            continue
+
+        if action == "subscribe":
+            room = settings.market_stream_max_symbols - len(subscription.symbols)
+            added = broadcaster.subscribe(subscription, symbols[:max(room, 0)])
+            await websocket.send_text(_message({"type": "subscribed", "symbols": added}))
+        elif action == "unsubscribe":
+            broadcaster.unsubscribe(subscription, symbols)
+            await websocket.send_text(
+                _message({"type": "unsubscribed", "symbols": sorted(symbols)})
+            )
+        else:
+            await websocket.send_text(_message({"type": "error", "detail": "Unknown action."}))
+
+
+@router.websocket("/ws/prices")
+async def price_stream(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None, description="Access token (browsers cannot set headers)"),
+):
+    """
+    ✅ Stream live prices for the current user's portfolio (and any extra symbols).
+    """
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    user = await authenticate_token(token)
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = broadcaster.open()
+    try:
+        symbols = (await _portfolio_symbols(user.id))[:settings.market_stream_max_symbols]
+        added = broadcaster.subscribe(subscription, symbols)
+        await websocket.send_text(_message({"type": "subscribed", "symbols": added}))
+
+        # Sending and receiving run side by side; when either ends (client
+        # gone, or too slow), the other is cancelled
+        async with anyio.create_task_group() as group:
+
+            async def run_until_done(side: Callable[..., Awaitable[None]]) -> None:
+                try:
+                    await side(websocket, subscription)
+                except WebSocketDisconnect:
+                    pass
+                finally:
+                    group.cancel_scope.cancel()
+
+            group.start_soon(run_until_done, _send_prices)
+            group.start_soon(run_until_done, _receive_commands)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broadcaster.close(subscription)
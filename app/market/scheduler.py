@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import distinct, func, select
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+from app.config import get_settings
+from app.db.database import AsyncSessionLocal
+from app.db.models import AssetType, Holding as holding_model
+from app.market import service
+from app.market.providers import ProviderError
+from app.metrics import REGISTRY, Counter, Gauge, Histogram
+
+"""
+Background price refresh driven by the holdings table.
+
+Request handlers read prices from the shared cache in `app.market.service`;
+this scheduler keeps that cache warm so provider latency stays off the
+request path. Every pass it:
+
+1. knows the distinct held symbols and how many users hold each (reloaded
+   from `holdings` every `market_refresh_universe_seconds`),
+2. picks the symbols whose cached price is missing or will expire before
+   the pass after next,
+3. orders them by priority — holders, boosted for symbols a request asked
+   for recently — so the most visible prices are refreshed first,
+4. fetches them in rate-limited batches, retrying provider errors with
+   exponential backoff, and writes the results into the cache.
+"""
+
+logger = logging.getLogger(__name__)
+
+# 📊 Refresh metrics
+REFRESH_SYMBOLS = REGISTRY.register(Counter(
+    "price_refresh_symbols_total", "Symbols refreshed by the background scheduler",
+))
+REFRESH_FAILURES = REGISTRY.register(Counter(
+    "price_refresh_failed_batches_total", "Refresh batches that failed after every retry",
+))
+REFRESH_UNIVERSE = REGISTRY.register(Gauge(
+    "price_refresh_universe_symbols", "Distinct held symbols tracked by the scheduler",
+))
+REFRESH_PASS_LATENCY = REGISTRY.register(Histogram(
+    "price_refresh_pass_seconds", "Duration of one background refresh pass",
+))
+
+# A request in the last few minutes can double a symbol's priority
+RECENT_REQUEST_HALF_LIFE = 300.0
+
+
+@dataclass
+class HeldSymbol:
+    """
+    A symbol from the holdings table and how many users hold it.
+    """
+    asset_type: str
+    holders: int
+
+
+class PriceRefreshScheduler:
+    """
+    Periodically refreshes the prices of held symbols into the price cache.
+
+    Args:
+        interval (float): Seconds between refresh passes.
+        universe_seconds (float): Seconds between reloads of the held symbols.
+        batch_size (int): Symbols per upstream call.
+        batches_per_second (float): Upstream call rate limit.
+        max_attempts (int): Tries per batch before giving up until the next pass.
+        session_factory: Async session factory used to read the holdings table.
+        clock (Callable[[], float]): Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        universe_seconds: float,
+        batch_size: int,
+        batches_per_second: float,
+        max_attempts: int,
+        session_factory=AsyncSessionLocal,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.interval = interval
+        self.universe_seconds = universe_seconds
+        self.batch_size = batch_size
+        self.batches_per_second = batches_per_second
+        self.max_attempts = max_attempts
+        self.session_factory = session_factory
+        self.clock = clock
+        self.universe: Dict[str, HeldSymbol] = {}
+        self._universe_loaded_at: Optional[float] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def load_universe(self) -> Dict[str, HeldSymbol]:
+        """
+        Read the distinct held symbols (cash and sold-out holdings excluded)
+        and their holder counts.
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(
+                    holding_model.symbol,
+                    holding_model.asset_type,
+                    func.count(distinct(holding_model.user_id)),
+                )
+                .where(holding_model.asset_type != AssetType.CASH, holding_model.quantity > 0)
+                .group_by(holding_model.symbol, holding_model.asset_type)
+            )
+        universe: Dict[str, HeldSymbol] = {}
+        for symbol, asset_type, holders in result.all():
+            key = service.normalize_symbol(symbol)
+            held = universe.get(key)
+            if held is None:
+                universe[key] = HeldSymbol(asset_type.value, holders)
+            else:
+                held.holders += holders  # same ticker spelled differently
+        self.universe = universe
+        self._universe_loaded_at = self.clock()
+        REFRESH_UNIVERSE.set(len(universe))
+        return universe
+
+    def priority(self, symbol: str, holders: int) -> float:
+        """
+        Holder count, up to doubled for symbols a request asked for recently.
+        """
+        requested = service.last_requested.get_entry(symbol)
+        if requested is None:
+            return float(holders)
+        age = service.last_requested.clock() - requested.stored_at
+        return holders * (1.0 + 0.5 ** (age / RECENT_REQUEST_HALF_LIFE))
+
+    def due(self) -> List[str]:
+        """
+        Held symbols whose price is missing or expires before the pass after
+        next, highest priority first.
+        """
+        now = service.price_cache.clock()
+        horizon = now + 2 * self.interval
+        due = []
+        for symbol, held in self.universe.items():
+            entry = service.price_cache.get_entry(symbol, allow_stale=True)
+            if entry is None or entry.expires_at <= horizon:
+                due.append(symbol)
+        due.sort(key=lambda s: self.priority(s, self.universe[s].holders), reverse=True)
+        return due
+
+    async def _refresh_batch(self, batch: List[str]) -> int:
+        types = {symbol: self.universe[symbol].asset_type for symbol in batch}
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_exponential_jitter(initial=0.5, max=10.0),
+            retry=retry_if_exception_type(ProviderError),
+            reraise=True,
+        )
+        try:
+            async for attempt in retrying:
+                with attempt:
+                    prices = await service.refresh_prices(batch, types)
+        except Exception:
+            REFRESH_FAILURES.inc()
+            logger.warning("Price refresh failed for %d symbols", len(batch), exc_info=True)
+            return 0
+        REFRESH_SYMBOLS.inc(len(prices))
+        return len(prices)
+
+    async def refresh_once(self) -> int:
+        """
+        Run one refresh pass.
+
+        Returns:
+            int: Number of prices written to the cache.
+        """
+        started = time.perf_counter()
+        if (
+            self._universe_loaded_at is None
+            or self.clock() - self._universe_loaded_at >= self.universe_seconds
+        ):
+            await self.load_universe()
+
+        due = self.due()
+        spacing = 1.0 / self.batches_per_second
+        refreshed = 0
+        for i in range(0, len(due), self.batch_size):
+            if i:
+                await asyncio.sleep(spacing)
+            refreshed += await self._refresh_batch(due[i:i + self.batch_size])
+
+        REFRESH_PASS_LATENCY.observe(time.perf_counter() - started)
+        return refreshed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_once()
+            except Exception:
+                logger.warning("Price refresh pass failed", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """
+        Start the refresh loop on the running event loop (app startup).
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Cancel the refresh loop (app shutdown).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_scheduler() -> PriceRefreshScheduler:
+    """
+    Build a scheduler from the `market_refresh_*` settings.
+    """
+    settings = get_settings()
+    return PriceRefreshScheduler(
+        interval=settings.market_refresh_interval_seconds,
+        universe_seconds=settings.market_refresh_universe_seconds,
+        batch_size=settings.market_batch_size,
+        batches_per_second=settings.market_refresh_batches_per_second,
+        max_attempts=settings.market_refresh_max_attempts,
+    )
+
+
+# ✅ Process-wide scheduler, started and stopped by the app lifespan
+scheduler = create_scheduler()
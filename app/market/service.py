@@ -1,9 +1,236 @@
-import yfinance as yf   
-from typing import Dict
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from app.cache import TTLCache
+from app.config import get_settings
+from app.holdings.schemas import AssetType
+from app.market.providers import PriceBars, ProviderError, get_provider
+from app.market.providers.base import to_epoch
+from app.market.store import BarStore
+
+"""
+Market price lookups.
+
+Prices come from the pluggable provider in `app.market.providers` (Yahoo by
+default, or an offline replay). Provider calls are blocking, so they run in a
+bounded thread pool instead of on the event loop. Lookups are batched,
+de-duplicated, shared between concurrent callers asking for the same symbol,
+and served from a TTL/LRU cache whose expiry depends on how fast the asset
+type's price actually moves. The background refresh scheduler
+(`app.market.scheduler`) keeps held symbols warm ahead of expiry, and an
+expired price is still served — and reported as stale — when a refetch
+fails. Historical bars are read through the local
+`BarStore`, which only goes upstream for ranges it has not stored yet.
+"""
+
+logger = logging.getLogger(__name__)
+
+# 📌 Tunables (see app/config.py)
+_settings = get_settings()
+MARKET_MAX_WORKERS = _settings.market_max_workers
+MARKET_BATCH_SIZE = _settings.market_batch_size
+PRICE_CACHE_MAXSIZE = _settings.price_cache_maxsize
+DEFAULT_PRICE_TTL = 60.0
+
+# ⏱️ Seconds a cached price stays fresh, per asset type
+ASSET_TYPE_TTLS: Dict[str, float] = {
+    AssetType.CRYPTO.value: 15.0,
+    AssetType.OPTION.value: 30.0,
+    AssetType.STOCK.value: 60.0,
+    AssetType.ETF.value: 60.0,
+    AssetType.OTHER.value: 300.0,
+    AssetType.MUTUAL_FUND.value: 3600.0,  # NAV is published once a day
+    AssetType.CASH.value: 86400.0,
+}
+
+price_cache: TTLCache[str, float] = TTLCache(
+    maxsize=PRICE_CACHE_MAXSIZE, default_ttl=DEFAULT_PRICE_TTL
+)
+# 🕒 When each symbol was last asked for by a request (the value is unused)
+last_requested: TTLCache[str, bool] = TTLCache(maxsize=PRICE_CACHE_MAXSIZE, default_ttl=3600.0)
+_executor = ThreadPoolExecutor(max_workers=MARKET_MAX_WORKERS, thread_name_prefix="market")
+_inflight: Dict[str, "asyncio.Future[Optional[float]]"] = {}
+_fetch_tasks: Set["asyncio.Task[None]"] = set()
+bar_store = BarStore(
+    _settings.market_store_dir, refresh_seconds=_settings.market_store_refresh_seconds
+)
+
+
+def normalize_symbol(symbol: str) -> str:
+    """
+    Canonical cache/provider key for a ticker (e.g., " aapl " → "AAPL").
+    """
+    return symbol.strip().upper()
+
+
+def ttl_for(asset_type: Optional[str]) -> float:
+    """
+    Cache lifetime for a price of the given asset type.
+    """
+    if asset_type is None:
+        return DEFAULT_PRICE_TTL
+    return ASSET_TYPE_TTLS.get(getattr(asset_type, "value", asset_type), DEFAULT_PRICE_TTL)
+
+
+def _fetch_batch(symbols: List[str]) -> Dict[str, float]:
+    """
+    Blocking: one upstream call for a batch of symbols. Runs in the market pool.
+    """
+    return get_provider().fetch_latest(symbols)
+
+
+async def refresh_prices(
+    symbols: List[str], asset_types: Optional[Mapping[str, str]] = None
+) -> Dict[str, float]:
+    """
+    Fetch one batch upstream now, bypassing the cache, and cache the results.
+
+    Used by the background refresh scheduler; unlike `get_current_prices`,
+    provider failures are raised so the caller can retry.
+
+    Args:
+        symbols (List[str]): Normalized ticker symbols (at most one batch).
+        asset_types (Mapping[str, str], optional): Symbol → asset type, for cache TTLs.
+
+    Returns:
+        Dict[str, float]: Symbol → price for the symbols the provider knew.
+
+    Raises:
+        ProviderError: If the upstream call failed.
+    """
+    loop = asyncio.get_running_loop()
+    prices = await loop.run_in_executor(_executor, _fetch_batch, symbols)
+    types = asset_types or {}
+    for symbol, price in prices.items():
+        price_cache.set(symbol, price, ttl=ttl_for(types.get(symbol)))
+    return prices
+
+
+def price_staleness(symbols: Iterable[str]) -> Tuple[Optional[float], List[str]]:
+    """
+    How old the cached prices for `symbols` are.
+
+    Returns:
+        Tuple[Optional[float], List[str]]: Age in seconds of the oldest cached
+        price (None if none are cached), and the symbols whose price is past
+        its TTL (served only because a refetch failed).
+    """
+    now = price_cache.clock()
+    oldest: Optional[float] = None
+    stale = []
+    for symbol in symbols:
+        entry = price_cache.get_entry(normalize_symbol(symbol), allow_stale=True)
+        if entry is None:
+            continue
+        age = now - entry.stored_at
+        oldest = age if oldest is None else max(oldest, age)
+        if entry.expires_at <= now:
+            stale.append(symbol)
+    return oldest, sorted(stale)
+
+
+async def _fetch_and_publish(batch: List[str], ttls: Mapping[str, float]) -> None:
+    """
+    Fetch one batch off the event loop, then cache and hand out the results.
+
+    Every in-flight future for the batch is resolved — with None when the
+    provider had no price or failed — so concurrent waiters never hang.
+    """
+    loop = asyncio.get_running_loop()
+    prices: Dict[str, float] = {}
+    try:
+        prices = await loop.run_in_executor(_executor, _fetch_batch, batch)
+    except ProviderError as exc:
+        logger.warning("Price fetch failed for %d symbols: %s", len(batch), exc)
+    except Exception:
+        logger.warning("Price fetch failed for %d symbols", len(batch), exc_info=True)
+    finally:
+        for symbol in batch:
+            price = prices.get(symbol)
+            if price is not None:
+                price_cache.set(symbol, price, ttl=ttls.get(symbol, DEFAULT_PRICE_TTL))
+            future = _inflight.pop(symbol, None)
+            if future is not None and not future.done():
+                future.set_result(price)
+
+
+async def get_current_prices(
+    symbols: Iterable[str],
+    asset_types: Optional[Mapping[str, str]] = None,
+    max_age: Optional[float] = None,
+) -> Dict[str, float]:
+    """
+    Fetch the latest market prices for many symbols at once.
+
+    Duplicates are collapsed, cached prices are served directly, symbols already
+    being fetched by another request are awaited rather than refetched, and the
+    remainder goes upstream in batches of `MARKET_BATCH_SIZE`. If a refetch
+    fails, the expired cached price (if any) is returned instead of nothing.
+
+    Args:
+        symbols (Iterable[str]): Ticker symbols (any case, duplicates allowed).
+        asset_types (Mapping[str, str], optional): Symbol → asset type, used to
+            choose how long each fetched price is cached.
+        max_age (float, optional): Refetch cached prices older than this many
+            seconds, even if their TTL has not run out (e.g., live streams).
+
+    Returns:
+        Dict[str, float]: Normalized symbol → price. Symbols without a price are omitted.
+    """
+    wanted = list(dict.fromkeys(normalize_symbol(s) for s in symbols if s and s.strip()))
+    types = {normalize_symbol(s): t for s, t in (asset_types or {}).items()}
+
+    prices: Dict[str, float] = {}
+    fallback: Dict[str, float] = {}
+    waiting: Dict[str, "asyncio.Future[Optional[float]]"] = {}
+    to_fetch: List[str] = []
+
+    now = price_cache.clock()
+    for symbol in wanted:
+        last_requested.set(symbol, True)
+        cached = price_cache.get_entry(symbol, allow_stale=True)
+        if cached is not None:
+            if cached.expires_at > now and (max_age is None or now - cached.stored_at <= max_age):
+                prices[symbol] = cached.value
+                continue
+            fallback[symbol] = cached.value
+        if symbol in _inflight:
+            waiting[symbol] = _inflight[symbol]
+        else:
+            to_fetch.append(symbol)
+
+    if to_fetch:
+        loop = asyncio.get_running_loop()
+        for symbol in to_fetch:
+            waiting[symbol] = _inflight[symbol] = loop.create_future()
+
+        ttls = {symbol: ttl_for(types.get(symbol)) for symbol in to_fetch}
+        batches = [
+            to_fetch[i:i + MARKET_BATCH_SIZE]
+            for i in range(0, len(to_fetch), MARKET_BATCH_SIZE)
+        ]
+        # Fetch tasks outlive a cancelled caller so other waiters still get results
+        for batch in batches:
+            task = loop.create_task(_fetch_and_publish(batch, ttls))
+            _fetch_tasks.add(task)
+            task.add_done_callback(_fetch_tasks.discard)
+
+    for symbol, future in waiting.items():
+        price = await asyncio.shield(future)
+        if price is None:
+            price = fallback.get(symbol)
+        if price is not None:
+            prices[symbol] = price
+
+    return prices
+
 
 async def get_current_price(symbol: str) -> Dict[str, float]:
     """
-    Fetch the latest market price for a ticker symbol using Yahoo finance.
+    Fetch the latest market price for a ticker symbol.
 
     Args:
         symbol (str): Stock/ETF/crypto ticker symbol.
@@ -11,11 +238,34 @@ async def get_current_price(symbol: str) -> Dict[str, float]:
     Returns:
         dict: { "symbol": str, "current_price": float }
     """
-
-    ticker = yf.Ticker(symbol)
-    history = ticker.history(perioid="id")
-    if history.empty:
+    key = normalize_symbol(symbol)
+    prices = await get_current_prices([key])
+    if key not in prices:
         raise ValueError(f"No price data for {symbol}")
+    return {"symbol": key, "current_price": prices[key]}
 
-    price = history["Close"].iloc[-1]
-    return {"symbol": symbol, "current_price": round(price, 2)}
\ No newline at end of file
+
+async def get_price_history(
+    symbol: str, start: datetime, end: datetime, interval: str = "1d"
+) -> PriceBars:
+    """
+    OHLCV bars for a ticker in `[start, end)`.
+
+    Served straight from the local bar store when the range is already
+    covered; otherwise the missing ranges are fetched in the market pool.
+
+    Args:
+        symbol (str): Ticker symbol (any case).
+        start (datetime): Range start (naive values are UTC).
+        end (datetime): Range end, exclusive.
+        interval (str): Bar interval, e.g. "1d" or "5m".
+
+    Returns:
+        PriceBars: Zero-copy, read-only views into the local store.
+    """
+    key = normalize_symbol(symbol)
+    lo, hi = to_epoch(start), to_epoch(end)
+    if not bar_store.missing_ranges(key, lo, hi, interval):
+        return bar_store.read(key, lo, hi, interval)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, bar_store.get_bars, key, start, end, interval)
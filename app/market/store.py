@@ -0,0 +1,353 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.market.providers.base import MarketDataProvider, PriceBars, to_epoch
+
+try:  # POSIX: serialize writers across worker processes too
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+"""
+Local historical price-bar store.
+
+Bars live under `<root>/<interval>/<SYMBOL>/` as one raw little-endian file
+per column (`timestamp.<gen>.i8`, `close.<gen>.f8`, ...) plus a `meta.json`
+holding the committed row count, the file generation and the time ranges
+already fetched from the provider ("coverage").
+
+- Reads memory-map the column files and return zero-copy array views; a
+  repeated query touches no network and no file I/O beyond one `stat`.
+- Writes only ever append past the committed row count, then publish the new
+  count by atomically replacing `meta.json`. Readers map exactly the committed
+  rows, so they never see a half-written bar. Bars that do not extend the end
+  of the series (backfill, today's bar being revised) are merged into a new
+  generation of files, and the old generation is left to readers that still
+  have it mapped.
+- `get_bars` asks the provider only for the parts of the requested range that
+  are not covered yet.
+"""
+
+_DTYPES = {
+    "timestamp": np.dtype("<i8"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+
+# Seconds per bar, used to align gap fetches to bar boundaries
+INTERVAL_SECONDS: Dict[str, int] = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800,
+    "60m": 3600, "90m": 5400, "1h": 3600, "1d": 86400, "5d": 432000, "1wk": 604800,
+}
+
+Range = Tuple[int, int]
+
+
+def _merge_ranges(ranges: Sequence[Range]) -> List[Range]:
+    merged: List[Range] = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _subtract(coverage: Sequence[Range], start: int, end: int) -> List[Range]:
+    """
+    Parts of `[start, end)` not covered by the sorted, disjoint `coverage`.
+    """
+    gaps: List[Range] = []
+    cursor = start
+    for lo, hi in coverage:
+        if hi <= cursor:
+            continue
+        if lo >= end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+@dataclass(frozen=True)
+class _Series:
+    """
+    A committed, memory-mapped snapshot of one symbol/interval.
+    """
+    generation: int
+    rows: int
+    coverage: List[Range]
+    bars: PriceBars
+    meta_version: Tuple[int, int]
+
+
+class BarStore:
+    """
+    Append-only, memory-mapped columnar store of OHLCV bars per symbol.
+
+    Args:
+        root: Directory holding the store (created on first write).
+        provider (MarketDataProvider, optional): Source for missing ranges
+            (defaults to the configured provider).
+        refresh_seconds (float): How long the most recent, still-forming part
+            of a series is served from disk before it is fetched again.
+        clock: Returns the current UTC epoch seconds.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        provider: Optional[MarketDataProvider] = None,
+        refresh_seconds: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.root = Path(root)
+        self.refresh_seconds = refresh_seconds
+        self.upstream_calls = 0
+        self._provider = provider
+        self._clock = clock
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._locks: Dict[Tuple[str, str], threading.RLock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def provider(self) -> MarketDataProvider:
+        if self._provider is None:
+            from app.market.providers import get_provider
+
+            return get_provider()
+        return self._provider
+
+    # -------------------------------------------------------
+    # 📂 Files
+    # -------------------------------------------------------
+    def _dir(self, symbol: str, interval: str) -> Path:
+        return self.root / interval / symbol
+
+    @staticmethod
+    def _column_path(directory: Path, field: str, generation: int) -> Path:
+        return directory / f"{field}.{generation}.{_DTYPES[field].kind}{_DTYPES[field].itemsize}"
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.RLock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.RLock())
+
+    def _load(self, symbol: str, interval: str) -> Optional[_Series]:
+        """
+        The committed series, re-mapped only when another writer published.
+        """
+        key = (symbol, interval)
+        meta_path = self._dir(symbol, interval) / "meta.json"
+        while True:
+            try:
+                stat = os.stat(meta_path)
+            except FileNotFoundError:
+                return None
+            # meta.json is replaced, never edited: a new inode means a new commit
+            version = (stat.st_ino, stat.st_mtime_ns)
+            cached = self._series.get(key)
+            if cached is not None and cached.meta_version == version:
+                return cached
+            try:
+                series = self._map(meta_path, version)
+            except FileNotFoundError:
+                continue  # a writer replaced the generation under us; re-read meta
+            self._series[key] = series
+            return series
+
+    def _map(self, meta_path: Path, version: Tuple[int, int]) -> _Series:
+        meta = json.loads(meta_path.read_text())
+        rows, generation = meta["rows"], meta["generation"]
+        if rows:
+            bars = PriceBars(*(
+                np.memmap(self._column_path(meta_path.parent, f, generation), dtype=_DTYPES[f],
+                          mode="r", shape=(rows,))
+                for f in PriceBars.FIELDS
+            ))
+        else:
+            bars = PriceBars.empty()
+        coverage = [(lo, hi) for lo, hi in meta["coverage"]]
+        return _Series(generation, rows, coverage, bars, version)
+
+    def _publish(self, directory: Path, generation: int, rows: int, coverage: List[Range]) -> None:
+        """
+        Atomically commit a new row count / generation / coverage.
+        """
+        tmp = directory / f"meta.json.{os.getpid()}.{threading.get_ident()}"
+        tmp.write_text(json.dumps(
+            {"generation": generation, "rows": rows, "coverage": [list(r) for r in coverage]}
+        ))
+        os.replace(tmp, directory / "meta.json")
+
+    # -------------------------------------------------------
+    # 📖 Reads
+    # -------------------------------------------------------
+    def read(self, symbol: str, start: int, end: int, interval: str = "1d") -> PriceBars:
+        """
+        Locally stored bars with `start <= timestamp < end`, as zero-copy views.
+
+        Args:
+            symbol (str): Normalized ticker.
+            start (int): Range start, UTC epoch seconds (inclusive).
+            end (int): Range end, UTC epoch seconds (exclusive).
+            interval (str): Bar interval (e.g., "1d", "5m").
+
+        Returns:
+            PriceBars: Read-only views into the memory-mapped columns.
+        """
+        series = self._load(symbol, interval)
+        if series is None:
+            return PriceBars.empty()
+        return series.bars.between(start, end)
+
+    def missing_ranges(self, symbol: str, start: int, end: int, interval: str = "1d") -> List[Range]:
+        """
+        Parts of `[start, end)` that still have to be fetched, aligned to bar
+        boundaries. The future is never missing, and the newest part of a
+        series counts as covered for `refresh_seconds` after it was fetched.
+        """
+        return self._gaps(self._load(symbol, interval), start, end, interval)
+
+    def _gaps(self, series: Optional[_Series], start: int, end: int, interval: str) -> List[Range]:
+        now = int(self._clock())
+        end = min(end, now)
+        if start >= end:
+            return []
+        coverage = series.coverage if series else []
+        step = INTERVAL_SECONDS.get(interval, 1)
+        grace = int(self.refresh_seconds)
+
+        gaps = []
+        for lo, hi in _subtract(coverage, start, end):
+            if hi == end and end == now and now - lo <= grace and lo > start:
+                continue  # the still-forming tail was refreshed recently
+            gaps.append((lo - lo % step, hi))
+        return _merge_ranges(gaps)
+
+    # -------------------------------------------------------
+    # ✏️ Writes
+    # -------------------------------------------------------
+    def write(
+        self, symbol: str, bars: PriceBars, interval: str = "1d", covered: Optional[Range] = None
+    ) -> None:
+        """
+        Store bars for a symbol and record `covered` as fetched.
+
+        Bars past the end of the series are appended in place; anything else
+        (backfill, revised bars) is merged into a new file generation, with
+        the newer bar winning on duplicate timestamps.
+        """
+        key = (symbol, interval)
+        directory = self._dir(symbol, interval)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._key_lock(key), open(directory / ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            series = self._load(symbol, interval)
+            generation = series.generation if series else 0
+            rows = series.rows if series else 0
+            coverage = list(series.coverage) if series else []
+            if covered is not None:
+                coverage = _merge_ranges(coverage + [covered])
+
+            if len(bars):
+                order = np.argsort(bars.timestamp, kind="stable")
+                new = PriceBars(*(np.asarray(getattr(bars, f))[order] for f in PriceBars.FIELDS))
+                last = int(series.bars.timestamp[-1]) if series and rows else None
+                if last is None or int(new.timestamp[0]) > last:
+                    self._append(directory, generation, rows, new)
+                    rows += len(new)
+                else:
+                    merged = self._merged(series.bars, new)
+                    self._write_generation(directory, generation + 1, merged)
+                    self._drop_generation(directory, generation)
+                    generation, rows = generation + 1, len(merged)
+
+            self._publish(directory, generation, rows, coverage)
+            self._load(symbol, interval)
+
+    def _append(self, directory: Path, generation: int, rows: int, bars: PriceBars) -> None:
+        for field in PriceBars.FIELDS:
+            dtype = _DTYPES[field]
+            path = self._column_path(directory, field, generation)
+            with open(path, "r+b" if path.exists() else "wb") as handle:
+                # Drop anything a crashed writer left past the committed rows
+                handle.truncate(rows * dtype.itemsize)
+                handle.seek(0, os.SEEK_END)
+                handle.write(np.ascontiguousarray(getattr(bars, field), dtype=dtype).tobytes())
+
+    @staticmethod
+    def _merged(old: PriceBars, new: PriceBars) -> PriceBars:
+        timestamp = np.concatenate([old.timestamp, new.timestamp])
+        order = np.argsort(timestamp, kind="stable")  # old before new on ties
+        timestamp = timestamp[order]
+        keep = np.r_[timestamp[1:] != timestamp[:-1], True]  # last of each tie
+        return PriceBars(*(
+            np.concatenate([getattr(old, f), getattr(new, f)])[order][keep]
+            for f in PriceBars.FIELDS
+        ))
+
+    def _write_generation(self, directory: Path, generation: int, bars: PriceBars) -> None:
+        for field in PriceBars.FIELDS:
+            path = self._column_path(directory, field, generation)
+            path.write_bytes(np.ascontiguousarray(getattr(bars, field), dtype=_DTYPES[field]).tobytes())
+
+    def _drop_generation(self, directory: Path, generation: int) -> None:
+        for field in PriceBars.FIELDS:
+            try:
+                # Readers that still map the old files keep them alive (POSIX)
+                self._column_path(directory, field, generation).unlink()
+            except OSError:
+                pass
+
+    # -------------------------------------------------------
+    # 🔄 Read-through
+    # -------------------------------------------------------
+    def get_bars(
+        self, symbol: str, start: datetime, end: datetime, interval: str = "1d"
+    ) -> PriceBars:
+        """
+        Blocking: bars for `[start, end)`, fetching only uncovered ranges.
+
+        Args:
+            symbol (str): Normalized ticker.
+            start (datetime): Range start (naive values are UTC).
+            end (datetime): Range end, exclusive.
+            interval (str): Bar interval.
+
+        Returns:
+            PriceBars: Zero-copy views into the local store.
+
+        Raises:
+            ProviderError: If a missing range could not be fetched.
+        """
+        lo, hi = to_epoch(start), to_epoch(end)
+        series = self._load(symbol, interval)
+        if series is not None and not self._gaps(series, lo, hi, interval):
+            return series.bars.between(lo, hi)
+        with self._key_lock((symbol, interval)):
+            # Another thread may have filled the gaps while we waited
+            for gap_start, gap_end in self.missing_ranges(symbol, lo, hi, interval):
+                self.upstream_calls += 1
+                bars = self.provider.fetch_bars(
+                    symbol,
+                    datetime.fromtimestamp(gap_start, tz=timezone.utc),
+                    datetime.fromtimestamp(gap_end, tz=timezone.utc),
+                    interval,
+                )
+                self.write(symbol, bars, interval, covered=(gap_start, gap_end))
+        return self.read(symbol, lo, hi, interval)
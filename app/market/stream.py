@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from app.config import get_settings
+from app.metrics import REGISTRY, Counter, Gauge, Histogram
+from app.market.service import get_current_prices, normalize_symbol
+
+"""
+Live price fan-out for WebSocket subscribers.
+
+One `PriceBroadcaster` per process owns a single refresh loop. Every tick it
+looks up each distinct subscribed symbol exactly once (one batched market
+service call, however many clients hold the symbol), keeps only the prices
+that changed since the previous tick, and hands each subscriber the subset
+it cares about.
+
+Subscribers never queue messages: each keeps a "latest price per symbol"
+mailbox that new ticks overwrite. A slow client therefore receives one
+coalesced batch with the newest prices when it catches up, its backlog is
+bounded by the number of symbols it follows, and the broadcaster never
+waits on any client's socket.
+"""
+
+logger = logging.getLogger(__name__)
+
+# 📊 Stream metrics
+STREAM_SUBSCRIBERS = REGISTRY.register(Gauge(
+    "price_stream_subscribers", "Connected price stream subscribers",
+))
+STREAM_SYMBOLS = REGISTRY.register(Gauge(
+    "price_stream_symbols", "Distinct symbols refreshed by the price stream",
+))
+STREAM_TICK_LATENCY = REGISTRY.register(Histogram(
+    "price_stream_tick_seconds", "Time to refresh and fan out one price stream tick",
+))
+STREAM_COALESCED = REGISTRY.register(Counter(
+    "price_stream_coalesced_total", "Price updates replaced by a newer one before being sent",
+))
+
+PriceFetcher = Callable[..., Awaitable[Dict[str, float]]]
+
+
+class Subscription:
+    """
+    One client's symbols and its mailbox of not-yet-sent price changes.
+    """
+
+    def __init__(self) -> None:
+        self.symbols: Set[str] = set()
+        self._pending: Dict[str, float] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, prices: Dict[str, float]) -> None:
+        """
+        Merge new prices into the mailbox, replacing any unsent older ones.
+        """
+        if not prices:
+            return
+        overwritten = len(self._pending.keys() & prices.keys())
+        if overwritten:
+            STREAM_COALESCED.inc(overwritten)
+        self._pending.update(prices)
+        self._ready.set()
+
+    async def next_batch(self) -> Dict[str, float]:
+        """
+        Wait for price changes and take everything pending, newest values only.
+        """
+        await self._ready.wait()
+        self._ready.clear()
+        batch, self._pending = self._pending, {}
+        return batch
+
+
+class PriceBroadcaster:
+    """
+    Reference-counted symbol refresh loop fanning out to many subscriptions.
+
+    Args:
+        interval (float): Seconds between ticks.
+        fetch: Batched price lookup (defaults to the market service).
+    """
+
+    def __init__(self, interval: float, fetch: PriceFetcher = get_current_prices) -> None:
+        self.interval = interval
+        self.ticks = 0
+        self._fetch = fetch
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._last: Dict[str, float] = {}
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._clients = 0
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._subscribers)
+
+    def open(self) -> Subscription:
+        self._clients += 1
+        STREAM_SUBSCRIBERS.set(self._clients)
+        return Subscription()
+
+    def close(self, subscription: Subscription) -> None:
+        self.unsubscribe(subscription, list(subscription.symbols))
+        self._clients -= 1
+        STREAM_SUBSCRIBERS.set(self._clients)
+
+    def subscribe(self, subscription: Subscription, symbols: Iterable[str]) -> List[str]:
+        """
+        Follow `symbols`. Known prices are delivered right away; the refresh
+        loop starts with the first subscribed symbol.
+
+        Returns:
+            List[str]: The normalized symbols newly followed.
+        """
+        added = []
+        for symbol in {normalize_symbol(s) for s in symbols if s and s.strip()}:
+            if symbol in subscription.symbols:
+                continue
+            subscription.symbols.add(symbol)
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            added.append(symbol)
+        subscription.offer({s: self._last[s] for s in added if s in self._last})
+        STREAM_SYMBOLS.set(len(self._subscribers))
+        if self._subscribers and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return sorted(added)
+
+    def unsubscribe(self, subscription: Subscription, symbols: Iterable[str]) -> None:
+        """
+        Stop following `symbols`; symbols nobody follows any more are dropped.
+        """
+        for symbol in {normalize_symbol(s) for s in symbols}:
+            subscription.symbols.discard(symbol)
+            holders = self._subscribers.get(symbol)
+            if holders is None:
+                continue
+            holders.discard(subscription)
+            if not holders:
+                del self._subscribers[symbol]
+                self._last.pop(symbol, None)
+        STREAM_SYMBOLS.set(len(self._subscribers))
+
+    async def tick(self) -> int:
+        """
+        Refresh every followed symbol once and fan out the changes.
+
+        Returns:
+            int: Number of symbols whose price changed.
+        """
+        symbols = self.symbols
+        if not symbols:
+            return 0
+        started = time.perf_counter()
+        prices = await self._fetch(symbols, max_age=self.interval)
+
+        batches: Dict[Subscription, Dict[str, float]] = {}
+        changed = 0
+        for symbol, price in prices.items():
+            holders = self._subscribers.get(symbol)
+            if not holders or self._last.get(symbol) == price:
+                continue  # unsubscribed meanwhile, or unchanged
+            self._last[symbol] = price
+            changed += 1
+            for subscription in holders:
+                batches.setdefault(subscription, {})[symbol] = price
+        for subscription, batch in batches.items():
+            subscription.offer(batch)
+
+        self.ticks += 1
+        STREAM_TICK_LATENCY.observe(time.perf_counter() - started)
+        return changed
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while self._subscribers:
+            try:
+                await self.tick()
+            except Exception:
+                logger.warning("Price stream tick failed", exc_info=True)
+            # Keep a steady cadence; skip ticks rather than pile them up
+            next_tick += self.interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def stop(self) -> None:
+        """
+        Cancel the refresh loop (e.g., on shutdown).
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# ✅ Process-wide broadcaster shared by every WebSocket connection
+broadcaster = PriceBroadcaster(interval=get_settings().market_stream_interval_seconds)
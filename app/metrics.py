@@ -0,0 +1,317 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+"""
+In-process metrics in the Prometheus text exposition format.
+
+A small dependency-free registry of counters, gauges and histograms, the
+`MetricsMiddleware` that times every HTTP request by route template, and the
+per-request `QueryStats` that the SQLAlchemy hooks in `app.db.database` fill
+in, so query counts and DB time can be attributed to the route that caused
+them (an N+1 shows up as a high `db_queries_per_request` for one route).
+
+Metrics are per process; with several workers, scrape each one.
+"""
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+# ⏱️ Default latency buckets (seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    """
+    Base class: a named metric family with a fixed set of label names.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, values: LabelValues, extra: Iterable[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    A monotonically increasing value per label set.
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """
+    A value per label set that can go up and down.
+    """
+
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Observations counted into cumulative buckets, plus their sum and count.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # bucket counts…, sum, count
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[-1]) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, hits in zip(self.buckets, series):
+                cumulative += hits
+                le = self._labels(key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{le} {_format_value(cumulative)}")
+            le = self._labels(key, [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{le} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {_format_value(series[-1])}")
+        return lines
+
+
+class Registry:
+    """
+    The set of metrics exposed on `/metrics`.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+# -------------------------------------------------------
+# 📊 Metrics
+# -------------------------------------------------------
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code",
+    ["method", "route", "status"],
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request",
+    ["method", "route"],
+))
+HTTP_IN_PROGRESS = REGISTRY.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ["method"],
+))
+DB_QUERIES = REGISTRY.register(Counter(
+    "db_queries_total", "SQL statements executed", ["route"],
+))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Time spent executing a single SQL statement",
+))
+DB_QUERIES_PER_REQUEST = REGISTRY.register(Histogram(
+    "db_queries_per_request", "SQL statements executed while serving one request",
+    ["method", "route"], buckets=QUERY_COUNT_BUCKETS,
+))
+DB_TIME_PER_REQUEST = REGISTRY.register(Histogram(
+    "db_time_per_request_seconds", "Total SQL time while serving one request",
+    ["method", "route"],
+))
+
+
+# -------------------------------------------------------
+# 🗄️ Per-request SQL statistics
+# -------------------------------------------------------
+@dataclass
+class QueryStats:
+    """
+    SQL statements executed (and seconds spent) on behalf of one request.
+    """
+    count: int = 0
+    seconds: float = 0.0
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """
+    Stats for the request being served, or None outside of a request.
+    """
+    return _query_stats.get()
+
+
+def record_query(seconds: float) -> None:
+    """
+    Account one executed SQL statement to the metrics and the current request.
+    """
+    DB_QUERY_LATENCY.observe(seconds)
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += seconds
+    else:
+        DB_QUERIES.inc(route="background")
+
+
+def route_label(scope: Scope) -> str:
+    """
+    The matched route template (e.g., "/holdings/{holding_id}"), never the raw
+    path, so label cardinality stays bounded.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing each HTTP request and its SQL statements.
+
+    When `debug_header` is on, responses carry `X-DB-Queries` and a
+    `Server-Timing` entry with the statements executed and DB time spent
+    before the response started.
+    """
+
+    def __init__(self, app: ASGIApp, debug_header: bool = False) -> None:
+        self.app = app
+        self.debug_header = debug_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+        # The route is only known once routing has run, so in-flight requests
+        # are counted per method
+        HTTP_IN_PROGRESS.inc(method=method)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.debug_header:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(stats.count).encode()))
+                    headers.append((
+                        b"server-timing",
+                        f'db;dur={stats.seconds * 1000:.2f};desc="queries={stats.count}", '
+                        f"app;dur={elapsed_ms:.2f}".encode(),
+                    ))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = route_label(scope)
+            HTTP_IN_PROGRESS.dec(method=method)
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status_code))
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            DB_QUERIES.inc(stats.count, route=route)
+            DB_QUERIES_PER_REQUEST.observe(stats.count, method=method, route=route)
+            DB_TIME_PER_REQUEST.observe(stats.seconds, method=method, route=route)
+            _query_stats.reset(token)
@@ -0,0 +1,90 @@
+from contextvars import ContextVar
+from typing import Any, Mapping, Optional
+
+import orjson
+import ormsgpack
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+"""
+Fast response encoding with JSON / MessagePack content negotiation.
+
+`NegotiatedResponse` is the app's default response class: it encodes with
+orjson, or with ormsgpack when the client sent `Accept: application/msgpack`.
+The accepted media type is captured per request by `ContentNegotiationMiddleware`
+in a context variable, so route handlers do not need to know about it.
+"""
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+_MSGPACK_OPTIONS = ormsgpack.OPT_NON_STR_KEYS | ormsgpack.OPT_SERIALIZE_NUMPY
+
+_accept: ContextVar[str] = ContextVar("accept", default="")
+
+
+def wants_msgpack() -> bool:
+    """
+    True if the current request asked for MessagePack.
+    """
+    accept = _accept.get()
+    return MSGPACK_MEDIA_TYPE in accept or "application/x-msgpack" in accept
+
+
+def encode(content: Any) -> tuple[bytes, str]:
+    """
+    Encode `content` in the negotiated format.
+
+    Returns:
+        tuple[bytes, str]: The body and its media type.
+    """
+    if wants_msgpack():
+        return ormsgpack.packb(content, option=_MSGPACK_OPTIONS), MSGPACK_MEDIA_TYPE
+    return orjson.dumps(content, option=_ORJSON_OPTIONS), JSON_MEDIA_TYPE
+
+
+class NegotiatedResponse(JSONResponse):
+    """
+    JSON response encoded with orjson, or MessagePack if the client asked for it.
+    """
+
+    def __init__(
+        self,
+        content: Any = None,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+    ) -> None:
+        super().__init__(content, status_code, headers, media_type, background)
+        self.headers.append("Vary", "Accept")
+
+    def render(self, content: Any) -> bytes:
+        body, self.media_type = encode(content)
+        return body
+
+
+class ContentNegotiationMiddleware:
+    """
+    Pure ASGI middleware recording the request's `Accept` header for encoding.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept":
+                accept = value.decode("latin-1")
+                break
+        token = _accept.set(accept)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _accept.reset(token)
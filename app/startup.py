@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import Settings
+from app.db.database import AsyncSessionLocal, Base
+from app.db.models import AssetType, PortfolioSnapshot, PositionSnapshot
+from app.market.providers import get_provider
+from app.market.service import get_current_prices
+from app.metrics import REGISTRY, Gauge
+from app.users.cache import user_cache
+from app.users.models import User
+
+"""
+Startup work run by the app lifespan, so the first requests don't pay for it.
+
+1. create the schema (optional; `python -m app.db.init_db` does the same),
+2. pre-open `startup_min_connections` pooled database connections,
+3. load the market data provider, whose imports (yfinance, pandas) are
+   deferred until first use and take about half a second,
+4. warm the user cache and the price cache for the most recently active
+   users (by last holdings change).
+
+Every step is timed; `StartupReport` keeps the breakdown, logs it and
+exports it as the `app_startup_seconds{step}` gauge. Warmup steps are
+best-effort: a failure is logged and startup continues.
+"""
+
+logger = logging.getLogger(__name__)
+
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    "app_startup_seconds", "Time spent in each startup step", ("step",),
+))
+
+
+class StartupReport:
+    """
+    Durations of the startup steps, in the order they ran.
+    """
+
+    def __init__(self) -> None:
+        self.steps: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def step(self, name: str, required: bool = False) -> AsyncIterator[None]:
+        """
+        Time one step. Unless `required`, its errors are logged and swallowed.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            if required:
+                raise
+            logger.warning("Startup step %s failed", name, exc_info=True)
+        finally:
+            self.steps[name] = time.perf_counter() - started
+            STARTUP_SECONDS.set(self.steps[name], step=name)
+
+    @property
+    def total(self) -> float:
+        return sum(self.steps.values())
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.steps.items())
+        return f"Startup took {self.total * 1000:.0f}ms ({parts})"
+
+
+async def create_schema(engine: AsyncEngine) -> None:
+    """
+    Create any missing tables (existing tables are left as they are).
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def open_connections(engine: AsyncEngine, count: int) -> None:
+    """
+    Open `count` pooled connections at once and return them to the pool,
+    so early requests don't each pay for a connect (and its pragmas).
+    """
+    # Never ask for more than the pool keeps (or holding them would deadlock)
+    size = getattr(engine.pool, "size", None)
+    count = min(count, size()) if callable(size) else min(count, 1)
+    if count <= 0:
+        return
+    opened = 0
+    all_open = asyncio.Event()
+
+    async def hold() -> None:
+        nonlocal opened
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            opened += 1
+            if opened == count:
+                all_open.set()
+            await all_open.wait()
+
+    await asyncio.gather(*(hold() for _ in range(count)))
+
+
+async def load_market_provider() -> None:
+    """
+    Create the market data provider off the event loop (imports its SDK).
+    """
+    await asyncio.get_running_loop().run_in_executor(None, get_provider)
+
+
+async def recent_user_ids(limit: int) -> List[UUID]:
+    """
+    The users whose holdings changed most recently.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(PortfolioSnapshot.user_id)
+            .where(PortfolioSnapshot.position_count > 0)
+            .order_by(PortfolioSnapshot.updated_at.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+
+async def warm_user_cache(user_ids: List[UUID]) -> int:
+    """
+    Load active users into the user cache.
+
+    Returns:
+        int: Users cached.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(User).where(User.id.in_(user_ids), User.is_active.is_(True))
+        )
+        users = result.scalars().all()
+    for user in users:
+        await user_cache.set(user)
+    return len(users)
+
+
+async def warm_price_cache(user_ids: List[UUID]) -> int:
+    """
+    Fetch current prices for every symbol those users hold, in one batched lookup.
+
+    Returns:
+        int: Prices cached.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(PositionSnapshot.symbol, PositionSnapshot.asset_type)
+            .where(
+                PositionSnapshot.user_id.in_(user_ids),
+                PositionSnapshot.asset_type != AssetType.CASH,
+                PositionSnapshot.total_quantity > 0,
+            )
+            .distinct()
+        )
+        lookup = {symbol: asset_type.value for symbol, asset_type in result.all()}
+    prices = await get_current_prices(lookup.keys(), asset_types=lookup)
+    return len(prices)
+
+
+async def run_startup(settings: Settings, engine: Optional[AsyncEngine] = None) -> StartupReport:
+    """
+    Run every enabled startup step and return their timings.
+
+    Args:
+        settings (Settings): The `startup_*` settings choose the steps.
+        engine (AsyncEngine, optional): Defaults to the session factory's engine.
+    """
+    engine = engine or AsyncSessionLocal.kw["bind"]
+    report = StartupReport()
+
+    if settings.startup_create_schema:
+        async with report.step("create_schema", required=True):
+            await create_schema(engine)
+    async with report.step("open_connections"):
+        await open_connections(engine, settings.startup_min_connections)
+    if settings.startup_load_provider:
+        async with report.step("load_market_provider"):
+            await load_market_provider()
+    if settings.startup_warm_users:
+        async with report.step("warm_caches"):
+            user_ids = await recent_user_ids(settings.startup_warm_users)
+            if user_ids:
+                await asyncio.wait_for(
+                    asyncio.gather(warm_user_cache(user_ids), warm_price_cache(user_ids)),
+                    settings.startup_warm_timeout_seconds,
+                )
+
+    logger.info(report.summary())
+    return report
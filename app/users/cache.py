@@ -0,0 +1,137 @@
+import logging
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+import orjson
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.cache import TTLCache
+from app.config import Settings, get_settings
+from app.users.models import User
+
+"""
+Cache of authenticated users, keyed by user id.
+
+Resolving `current_active_user` otherwise costs a users-table SELECT on every
+request. Entries are column snapshots rather than ORM instances, so each
+request gets its own detached `User` that can safely be attached to that
+request's session (e.g., by profile updates).
+
+With `user_cache_redis_url` set, snapshots are shared through Redis so all
+uvicorn workers benefit; a short in-process TTL sits in front of it to save
+the Redis round trip. The password hash is never cached.
+
+`UserManager` hooks invalidate entries on update, password reset and delete.
+"""
+
+logger = logging.getLogger(__name__)
+
+_EXCLUDED = {"hashed_password"}
+_COLUMNS = [
+    attr.key for attr in inspect(User).column_attrs if attr.key not in _EXCLUDED
+]
+
+
+def _snapshot(user: User) -> Dict[str, Any]:
+    return {key: getattr(user, key) for key in _COLUMNS}
+
+
+def _restore(snapshot: Dict[str, Any]) -> User:
+    user = User(**snapshot)
+    make_transient_to_detached(user)  # behaves like a row loaded by another session
+    return user
+
+
+class UserCache:
+    """
+    Two-level (process memory, optional Redis) TTL cache of user snapshots.
+
+    Args:
+        ttl (float): Lifetime of an entry in seconds (0 disables caching).
+        maxsize (int): Bound on in-process entries (LRU eviction).
+        redis_url (str, optional): Shared backing store for multi-worker setups.
+        local_ttl (float): In-process lifetime used when Redis is configured.
+    """
+
+    key_prefix = "stockmind:user:"
+
+    def __init__(
+        self,
+        ttl: float,
+        maxsize: int,
+        redis_url: Optional[str] = None,
+        local_ttl: float = 5.0,
+    ) -> None:
+        self.ttl = ttl
+        self.enabled = ttl > 0
+        self._redis = None
+        if redis_url and self.enabled:
+            from redis import asyncio as redis_asyncio
+
+            self._redis = redis_asyncio.from_url(redis_url)
+        local = min(ttl, local_ttl) if self._redis is not None else ttl
+        self._local: TTLCache[UUID, Dict[str, Any]] = TTLCache(
+            maxsize=maxsize, default_ttl=local
+        )
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "UserCache":
+        return cls(
+            ttl=settings.user_cache_ttl_seconds,
+            maxsize=settings.user_cache_maxsize,
+            redis_url=settings.user_cache_redis_url,
+            local_ttl=settings.user_cache_local_ttl_seconds,
+        )
+
+    def _key(self, user_id: UUID) -> str:
+        return f"{self.key_prefix}{user_id}"
+
+    async def get(self, user_id: UUID) -> Optional[User]:
+        """
+        Return a fresh detached `User` for `user_id`, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        snapshot = self._local.get(user_id)
+        if snapshot is None and self._redis is not None:
+            try:
+                raw = await self._redis.get(self._key(user_id))
+            except Exception:
+                logger.warning("User cache read from Redis failed", exc_info=True)
+                raw = None
+            if raw is not None:
+                snapshot = orjson.loads(raw)
+                snapshot["id"] = UUID(snapshot["id"])
+                self._local.set(user_id, snapshot)
+        return None if snapshot is None else _restore(snapshot)
+
+    async def set(self, user: User) -> None:
+        """
+        Cache the current state of `user`.
+        """
+        if not self.enabled:
+            return
+        snapshot = _snapshot(user)
+        self._local.set(user.id, snapshot)
+        if self._redis is not None:
+            try:
+                await self._redis.set(
+                    self._key(user.id), orjson.dumps(snapshot), ex=max(1, int(self.ttl))
+                )
+            except Exception:
+                logger.warning("User cache write to Redis failed", exc_info=True)
+
+    async def invalidate(self, user_id: UUID) -> None:
+        """
+        Forget `user_id` so the next request reloads it from the database.
+        """
+        self._local.pop(user_id)
+        if self._redis is not None:
+            try:
+                await self._redis.delete(self._key(user_id))
+            except Exception:
+                logger.warning("User cache invalidation in Redis failed", exc_info=True)
+
+
+user_cache = UserCache.from_settings(get_settings())
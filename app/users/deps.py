@@ -1,14 +1,24 @@
-from fastapi_users import FastAPIUsers
+from fastapi_users import FastAPIUsers, exceptions
 from fastapi_users.authentication import (
     AuthenticationBackend,
     BearerTransport,
     JWTStrategy,
 )
+from fastapi_users.jwt import decode_jwt
+from fastapi_users.manager import BaseUserManager
+from typing import AsyncGenerator, Optional
 from uuid import UUID
+import jwt
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.users.models import User
 from app.users.schemas import UserCreate, UserRead
-from app.users.manager import get_user_manager, SECRET
+from app.users.manager import UserManager, get_user_manager, SECRET
+from app.db.database import AsyncSessionLocal, session_router
+from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from app.config import get_settings
+from app.users.cache import user_cache
 
 # -------------------------------------------------------
 # 🔐 Bearer Transport (Authorization: Bearer <token>)
@@ -20,14 +30,51 @@ bearer_transport = BearerTransport(tokenUrl="auth/jwt/login")
 # 🔐 JWT Strategy for access tokens
 # -------------------------------------------------------
 
+class CachedJWTStrategy(JWTStrategy[User, UUID]):
+    """
+    JWT strategy that resolves the token's user through `user_cache`.
+
+    The signature and expiry are still verified on every request; only the
+    users-table lookup is skipped while the user is cached.
+    """
+
+    async def read_token(
+        self, token: Optional[str], user_manager: BaseUserManager[User, UUID]
+    ) -> Optional[User]:
+        if token is None:
+            return None
+
+        try:
+            data = decode_jwt(
+                token, self.decode_key, self.token_audience, algorithms=[self.algorithm]
+            )
+            user_id = data.get("sub")
+            if user_id is None:
+                return None
+            parsed_id = user_manager.parse_id(user_id)
+        except (jwt.PyJWTError, exceptions.InvalidID, ValueError):
+            return None
+
+        user = await user_cache.get(parsed_id)
+        if user is not None:
+            return user
+        try:
+            user = await user_manager.get(parsed_id)
+        except exceptions.UserNotExists:
+            return None
+        await user_cache.set(user)
+        return user
+
+
 def get_jwt_strategy() -> JWTStrategy:
     """
-    Returns the configured JWT strategy using your app's secret key.
+    Returns the configured JWT strategy using your app's secret key
+    and the token lifetime from settings (JWT_LIFETIME_SECONDS).
 
     Returns:
         JWTStrategy: Configured JWT strategy instance.
     """
-    return JWTStrategy(secret=SECRET, lifetime_seconds=3600)
+    return CachedJWTStrategy(secret=SECRET, lifetime_seconds=get_settings().jwt_lifetime_seconds)
 
 # -------------------------------------------------------
 # 🔐 Authentication Backend (JWT + Bearer)
@@ -57,3 +104,53 @@ fastapi_users = FastAPIUsers[User, UUID](
 # -------------------------------------------------------
 
 current_active_user = fastapi_users.current_user(active=True)
+
+# -------------------------------------------------------
+# 🔀 Per-user DB sessions (read replicas + read-your-writes)
+# -------------------------------------------------------
+
+async def get_read_session(
+    user: User = Depends(current_active_user),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only routes: on a read replica, unless the user wrote
+    recently (then on the primary, so they see their own change).
+    """
+    async with session_router.reader(user.id) as session:
+        yield session
+
+
+async def get_write_session(
+    user: User = Depends(current_active_user),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session on the primary for routes that change the user's data.
+    """
+    async with session_router.writer(user.id) as session:
+        yield session
+
+# -------------------------------------------------------
+# 🔐 Token → user outside of HTTP dependencies (e.g., WebSockets)
+# -------------------------------------------------------
+
+async def authenticate_token(token: Optional[str]) -> Optional[User]:
+    """
+    Resolve an access token to its active user, or None.
+
+    Uses a short-lived session of its own, so long-lived connections do not
+    hold a database connection open.
+
+    Args:
+        token (str, optional): The JWT access token.
+
+    Returns:
+        Optional[User]: The active user, or None if the token is invalid.
+    """
+    if not token:
+        return None
+    async with AsyncSessionLocal() as session:
+        user_manager = UserManager(SQLAlchemyUserDatabase(session, User))
+        user = await get_jwt_strategy().read_token(token, user_manager)
+    if user is None or not user.is_active:
+        return None
+    return user
@@ -1,13 +1,21 @@
+import jwt
 from fastapi import Depends, Request
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi_users import exceptions
+from fastapi_users.jwt import decode_jwt
 from fastapi_users.manager import BaseUserManager
 from fastapi_users.exceptions import UserAlreadyExists
 from app.users.db import get_user_db
 from app.users.models import User
 from uuid import UUID
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, Optional
 
-# 🔐 Secret key for JWT operations (should come from env var in production)
-SECRET = "SUPER_SECRET_JWT_KEY"
+from app.config import get_settings
+from app.users.cache import user_cache
+from app.users.passwords import PooledPasswordHelper, password_pool
+
+# 🔐 Secret key for JWT operations (set JWT_SECRET in the environment / .env)
+SECRET = get_settings().jwt_secret
 
 
 class UserManager(BaseUserManager[User, UUID]):
@@ -16,12 +24,20 @@ class UserManager(BaseUserManager[User, UUID]):
 
     Handles user lifecycle logic such as registration, password reset,
     verification, and token decoding for UUID-based primary keys.
+
+    Every password hash and verification runs in `password_pool` (off the
+    event loop) instead of inline in fastapi-users' helper calls.
     """
 
     user_db_model = User  # ✅ Required: link to the SQLAlchemy User model
     reset_password_token_secret = SECRET  # 🔐 Used to sign password reset tokens
     verification_token_secret = SECRET    # 🔐 Used to sign email verification tokens
 
+    password_helper: PooledPasswordHelper
+
+    def __init__(self, user_db):
+        super().__init__(user_db, PooledPasswordHelper(password_pool))
+
     def parse_id(self, user_id: str) -> UUID:
         """
         Convert user_id from JWT (as string) into UUID format.
@@ -46,6 +62,50 @@ class UserManager(BaseUserManager[User, UUID]):
         """
         print(f"✅ User registered: {user.email}")
 
+    async def on_after_update(
+        self, user: User, update_dict: Dict[str, Any], request: Request | None = None
+    ) -> None:
+        """
+        Hook: triggered after a user is updated (profile, password, deactivation).
+        Drops the cached copy so the next request sees the change.
+
+        Args:
+            user (User): The updated user.
+            update_dict (dict): The fields that were changed.
+            request (Request, optional): The HTTP request context.
+        """
+        await user_cache.invalidate(user.id)
+
+    async def on_after_reset_password(self, user: User, request: Request | None = None) -> None:
+        """
+        Hook: triggered after a password reset. Drops the cached copy.
+
+        Args:
+            user (User): The user whose password was reset.
+            request (Request, optional): The HTTP request context.
+        """
+        await user_cache.invalidate(user.id)
+
+    async def on_after_verify(self, user: User, request: Request | None = None) -> None:
+        """
+        Hook: triggered after a user is verified. Drops the cached copy.
+
+        Args:
+            user (User): The verified user.
+            request (Request, optional): The HTTP request context.
+        """
+        await user_cache.invalidate(user.id)
+
+    async def on_after_delete(self, user: User, request: Request | None = None) -> None:
+        """
+        Hook: triggered after a user is deleted. Drops the cached copy.
+
+        Args:
+            user (User): The deleted user.
+            request (Request, optional): The HTTP request context.
+        """
+        await user_cache.invalidate(user.id)
+
     async def on_after_forgot_password(self, user: User, token: str, request: Request | None = None) -> None:
         """
         Optional hook: triggered after a user requests a password reset.
@@ -70,11 +130,73 @@ class UserManager(BaseUserManager[User, UUID]):
         print(f"📧 Verification requested for {user.email}")
         print(f"🔗 Verification token: {token}")
 
-    # Optional override: customize how users are created
-    # async def create(
-    #     self, user_create: UserCreate, safe: bool = False, request: Request | None = None
-    # ) -> User:
-    #     return await super().create(user_create, safe=safe, request=request)
+    # ----------------------------------------
+    # 🔑 Password hashing off the event loop
+    # ----------------------------------------
+    # BaseUserManager's own methods run unchanged; each hash or verification
+    # they are about to make is computed in the pool first (see
+    # PooledPasswordHelper)
+
+    async def _release_connection(self) -> None:
+        """
+        End the current read transaction so its pooled DB connection is not
+        held while waiting for a hash (loaded users stay usable:
+        expire_on_commit is off).
+        """
+        await self.user_db.session.commit()
+
+    async def validate_password(self, password: str, user: Any) -> None:
+        """
+        BaseUserManager hashes a password (registration, update, reset) right
+        after validating it: hash it in the pool now.
+        """
+        await super().validate_password(password, user)
+        await self._release_connection()
+        await self.password_helper.prepare_hash(password)
+
+    async def authenticate(self, credentials: OAuth2PasswordRequestForm) -> Optional[User]:
+        """
+        Check an email and password, verifying in the password pool (unknown
+        emails still cost a hash, so they take as long as wrong passwords).
+        """
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            user = None
+        await self._release_connection()
+        if user is None:
+            await self.password_helper.prepare_hash(credentials.password)
+        else:
+            await self.password_helper.prepare_verify(credentials.password, user.hashed_password)
+        return await super().authenticate(credentials)
+
+    async def forgot_password(self, user: User, request: Request | None = None) -> None:
+        """
+        Start a password reset; the token fingerprint is hashed in the pool.
+        """
+        await self._release_connection()
+        await self.password_helper.prepare_hash(user.hashed_password)
+        await super().forgot_password(user, request)
+
+    async def reset_password(
+        self, token: str, password: str, request: Request | None = None
+    ) -> User:
+        """
+        Reset a password; the token fingerprint is verified in the pool.
+        BaseUserManager still validates the token and rejects bad ones.
+        """
+        try:
+            data = decode_jwt(
+                token, self.reset_password_token_secret, [self.reset_password_token_audience]
+            )
+            user = await self.get(self.parse_id(data["sub"]))
+            fingerprint = data["password_fgpt"]
+        except (jwt.PyJWTError, KeyError, exceptions.InvalidID, exceptions.UserNotExists):
+            pass
+        else:
+            await self._release_connection()
+            await self.password_helper.prepare_verify(user.hashed_password, fingerprint)
+        return await super().reset_password(token, password, request)
 
 
 # ✅ Dependency injection for the user manager (used internally by FastAPI Users)
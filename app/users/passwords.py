@@ -0,0 +1,234 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi_users.password import PasswordHelper
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+from pwdlib.hashers.bcrypt import BcryptHasher
+
+from app.config import Settings, get_settings
+from app.metrics import REGISTRY, Counter, Gauge, Histogram
+
+"""
+Password hashing off the event loop.
+
+Argon2 / bcrypt are deliberately slow, CPU-bound calls (tens to hundreds of
+milliseconds). Run inline in an async handler, one login stalls every other
+request on the worker. `PasswordPool` runs them in a small dedicated thread
+pool (argon2-cffi and bcrypt release the GIL while hashing) or process pool,
+so at most `password_hash_workers` hashes run at once and everything else
+keeps being served. Beyond `password_hash_max_queue` waiting hashes, new
+ones are refused with `PasswordPoolBusy` (→ 503) instead of queueing
+without bound.
+
+fastapi-users calls its password helper synchronously, so the user manager
+hands it a `PooledPasswordHelper`: the manager awaits the hash or
+verification in the pool just before fastapi-users asks for it, and the
+helper then returns the result.
+
+Hash costs are configurable (`password_argon2_*`, `password_bcrypt_rounds`);
+hashes made with other parameters still verify, and are upgraded on the next
+successful login.
+"""
+
+# 📊 Hashing metrics
+HASH_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "password_hash_queue_depth", "Password hashes waiting for a free worker",
+))
+HASH_IN_PROGRESS = REGISTRY.register(Gauge(
+    "password_hash_in_progress", "Password hashes running",
+))
+HASH_LATENCY = REGISTRY.register(Histogram(
+    "password_hash_seconds", "Time from submitting a password hash to its result, queueing included",
+))
+HASH_REJECTED = REGISTRY.register(Counter(
+    "password_hash_rejected_total", "Password hashes refused because the queue was full",
+))
+
+# (argon2 time cost, argon2 memory KiB, argon2 parallelism, bcrypt rounds)
+HashParams = Tuple[int, int, int, int]
+
+
+class PasswordPoolBusy(RuntimeError):
+    """
+    Raised when too many password hashes are already waiting.
+    """
+
+
+@lru_cache(maxsize=4)
+def build_password_helper(params: HashParams) -> PasswordHelper:
+    """
+    A fastapi-users password helper using the given hash costs (Argon2 for new
+    hashes; bcrypt hashes still verify and are upgraded).
+    """
+    time_cost, memory_cost, parallelism, rounds = params
+    return PasswordHelper(PasswordHash((
+        Argon2Hasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism),
+        BcryptHasher(rounds=rounds),
+    )))
+
+
+def hash_params(settings: Settings) -> HashParams:
+    return (
+        settings.password_argon2_time_cost,
+        settings.password_argon2_memory_kib,
+        settings.password_argon2_parallelism,
+        settings.password_bcrypt_rounds,
+    )
+
+
+# Module-level so they can be sent to a process pool
+def _hash(params: HashParams, password: str) -> str:
+    return build_password_helper(params).hash(password)
+
+
+def _verify_and_update(params: HashParams, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return build_password_helper(params).verify_and_update(password, hashed)
+
+
+class PasswordPool:
+    """
+    Bounded executor for password hashing and verification.
+
+    Args:
+        params (HashParams): Hash cost parameters.
+        workers (int): Hashes run concurrently.
+        max_queue (int): Hashes allowed to wait for a worker before new ones are refused.
+        executor (str): "thread", "process", or "inline" (on the event loop; no offloading).
+    """
+
+    def __init__(self, params: HashParams, workers: int, max_queue: int, executor: str = "thread") -> None:
+        if executor not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown password hash executor: {executor}")
+        self.params = params
+        self.workers = workers
+        self.max_queue = max_queue
+        self.mode = executor
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0  # submitted, not finished (cancelled waits included)
+
+    @property
+    def helper(self) -> PasswordHelper:
+        return build_password_helper(self.params)
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="password"
+                    )
+            return self._executor
+
+    def _track(self, delta: int) -> None:
+        """
+        Adjust the pending count and gauges; call with the lock held.
+        """
+        self._pending += delta
+        running = min(self._pending, self.workers)
+        HASH_IN_PROGRESS.set(running)
+        HASH_QUEUE_DEPTH.set(self._pending - running)
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        started = time.perf_counter()
+        if self.mode == "inline":
+            try:
+                return fn(self.params, *args)
+            finally:
+                HASH_LATENCY.observe(time.perf_counter() - started)
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending - self.workers >= self.max_queue:
+                HASH_REJECTED.inc()
+                raise PasswordPoolBusy("Too many password hashes queued")
+            self._track(1)
+        try:
+            future = executor.submit(fn, self.params, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        # The slot is freed when the job ends, not when the caller stops
+        # waiting: a disconnected client's hash keeps a worker busy until done
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            HASH_LATENCY.observe(time.perf_counter() - started)
+
+    def _release(self, future: Optional[Future]) -> None:
+        with self._lock:
+            self._track(-1)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self._submit(_verify_and_update, password, hashed)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PooledPasswordHelper:
+    """
+    fastapi-users password helper answering from results computed in a pool.
+
+    Await `prepare_hash` / `prepare_verify` right before fastapi-users calls
+    `hash` / `verify_and_update` with the same arguments; the call then
+    returns the pooled result. Calls nothing was prepared for run inline.
+    Meant for one user manager, i.e. one request.
+
+    Args:
+        pool (PasswordPool): Where hashes and verifications run.
+    """
+
+    def __init__(self, pool: PasswordPool) -> None:
+        self.pool = pool
+        self._hashes: Dict[str, str] = {}
+        self._verified: Dict[Tuple[str, str], Tuple[bool, Optional[str]]] = {}
+
+    async def prepare_hash(self, password: str) -> None:
+        self._hashes[password] = await self.pool.hash(password)
+
+    async def prepare_verify(self, password: str, hashed: str) -> None:
+        self._verified[(password, hashed)] = await self.pool.verify_and_update(password, hashed)
+
+    def hash(self, password: str) -> str:
+        hashed = self._hashes.pop(password, None)
+        return hashed if hashed is not None else self.pool.helper.hash(password)
+
+    def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        result = self._verified.pop((plain_password, hashed_password), None)
+        if result is None:
+            result = self.pool.helper.verify_and_update(plain_password, hashed_password)
+        return result
+
+    def generate(self) -> str:
+        return self.pool.helper.generate()
+
+
+def create_password_pool(settings: Optional[Settings] = None) -> PasswordPool:
+    """
+    Build a pool from the `password_*` settings.
+    """
+    settings = settings or get_settings()
+    return PasswordPool(
+        hash_params(settings),
+        workers=settings.password_hash_workers,
+        max_queue=settings.password_hash_max_queue,
+        executor=settings.password_hash_executor,
+    )
+
+
+# ✅ Process-wide pool used by the user manager
+password_pool = create_password_pool()
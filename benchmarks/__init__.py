@@ -0,0 +1,10 @@
+"""
+Repeatable performance benchmarks for StockMind.
+
+Run any module directly, e.g. `python -m benchmarks.bench_market --help`.
+"""
+import os
+
+# Benchmarks drive many requests per user: keep admission control out of the
+# way unless a run asks for it (bench_admission builds its own controllers)
+os.environ.setdefault("ADMISSION_ENABLED", "false")
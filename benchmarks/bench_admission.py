@@ -0,0 +1,237 @@
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from fastapi_users.jwt import generate_jwt
+
+from app.admission import (
+    AUDIENCE,
+    AdmissionController,
+    AdmissionMiddleware,
+    ConcurrencyLimiter,
+    MemoryBackend,
+    RedisBackend,
+)
+from benchmarks.common import latency_stats, print_table
+
+"""
+Admission control: per-request overhead, and behavior under overload.
+
+1. overhead: a no-op ASGI app called directly, bare vs. behind the
+   admission middleware (anonymous and JWT-identified requests; the Redis
+   backend too with `--redis-url`), in µs per request
+2. overload: a handler holding one of `--pool` "DB connections" for
+   `--service-ms`, hit by `--clients` closed-loop clients for `--seconds`.
+   Without admission, requests pile up on the pool and fail after its
+   timeout; with it, the excess is turned away early with 503s
+3. noisy neighbour: one user running `--clients` loops next to 4 users
+   polling 5 times a second; the others' latency and errors, with and
+   without per-user limits
+
+    python -m benchmarks.bench_admission --clients 64 --pool 15 --seconds 5
+"""
+
+SECRET = "bench-secret"
+
+
+def user_token(user_id: str) -> bytes:
+    return generate_jwt({"sub": user_id, "aud": AUDIENCE}, SECRET, 3600).encode()
+
+
+def http_scope(path: str = "/holdings/", token: Optional[bytes] = None) -> dict:
+    headers = [(b"host", b"bench")]
+    if token is not None:
+        headers.append((b"authorization", b"Bearer " + token))
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "server": ("bench", 80), "client": ("10.0.0.1", 0),
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": headers,
+    }
+
+
+async def call(app, scope: dict) -> int:
+    """
+    Run one request through `app` and return its status code.
+    """
+    status = 0
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def respond(send, status: int = 200) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def noop_app(scope, receive, send) -> None:
+    await respond(send)
+
+
+def controller(
+    rate: float = 0.0, burst: int = 1, user_concurrency: int = 0,
+    limit: int = 10_000, queue: int = 10_000, timeout: float = 2.0, redis_url: Optional[str] = None,
+) -> AdmissionController:
+    memory = MemoryBackend(rate=rate, burst=burst, max_concurrent=user_concurrency)
+    backend = RedisBackend(redis_url, fallback=memory) if redis_url else memory
+    return AdmissionController(
+        backend, ConcurrencyLimiter(limit, queue, timeout), secret=SECRET, exempt_paths=frozenset({"/"})
+    )
+
+
+async def overhead(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    token = user_token(str(uuid.uuid4()))
+    setups = [
+        ("bare app", noop_app, None),
+        ("admission, anonymous", AdmissionMiddleware(noop_app, controller(1e9, 10**9, 1000)), None),
+        ("admission, JWT user", AdmissionMiddleware(noop_app, controller(1e9, 10**9, 1000)), token),
+    ]
+    if args.redis_url:
+        setups.append((
+            "admission, JWT user, Redis",
+            AdmissionMiddleware(noop_app, controller(1e9, 10**9, 1000, redis_url=args.redis_url)),
+            token,
+        ))
+    results = {}
+    baseline = None
+    for name, app, auth in setups:
+        scope = http_scope(token=auth)
+        for _ in range(200):  # warm up (token cache, code paths)
+            await call(app, scope)
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            await call(app, scope)
+        per_request = (time.perf_counter() - started) / args.requests * 1e6
+        baseline = baseline if baseline is not None else per_request
+        results[f"overhead: {name}"] = {
+            "us_per_request": round(per_request, 2),
+            "added_us": round(per_request - baseline, 2),
+        }
+    return results
+
+
+def pool_app(pool: asyncio.Semaphore, service: float, pool_timeout: float):
+    """
+    A handler that needs one of the pool's connections for `service` seconds,
+    and fails (500) when none frees up within `pool_timeout`.
+    """
+
+    async def app(scope, receive, send) -> None:
+        try:
+            await asyncio.wait_for(pool.acquire(), pool_timeout)
+        except asyncio.TimeoutError:
+            await respond(send, 500)
+            return
+        try:
+            await asyncio.sleep(service)
+        finally:
+            pool.release()
+        await respond(send)
+
+    return app
+
+
+async def closed_loop(app, scope: dict, deadline: float, pause: float = 0.0) -> List[Tuple[int, float]]:
+    samples = []
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        status = await call(app, scope)
+        samples.append((status, time.perf_counter() - started))
+        if status != 200 and pause == 0.0:
+            await asyncio.sleep(0.01)  # a client backing off a little after an error
+        if pause:
+            await asyncio.sleep(pause)
+    return samples
+
+
+def summarize(samples: List[Tuple[int, float]], elapsed: float) -> Dict[str, float]:
+    ok = [seconds for status, seconds in samples if status == 200]
+    stats = latency_stats(ok, elapsed)
+    return {
+        "ok_per_s": stats["throughput_per_s"],
+        "ok_p50_ms": stats.get("p50_ms", 0.0),
+        "ok_p95_ms": stats.get("p95_ms", 0.0),
+        "shed_503": sum(1 for status, _ in samples if status == 503),
+        "limited_429": sum(1 for status, _ in samples if status == 429),
+        "failed_500": sum(1 for status, _ in samples if status == 500),
+    }
+
+
+async def overload(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, guarded in (("overload: no admission", False), ("overload: admission", True)):
+        pool = asyncio.Semaphore(args.pool)
+        app = pool_app(pool, args.service_ms / 1000, args.pool_timeout)
+        if guarded:
+            app = AdmissionMiddleware(
+                app, controller(limit=args.pool, queue=args.pool, timeout=args.pool_timeout / 4)
+            )
+        started = time.perf_counter()
+        deadline = started + args.seconds
+        runs = await asyncio.gather(*(
+            closed_loop(app, http_scope(), deadline) for _ in range(args.clients)
+        ))
+        results[name] = summarize([s for run in runs for s in run], time.perf_counter() - started)
+    return results
+
+
+async def noisy_neighbour(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, per_user in (("neighbours: no per-user limits", False), ("neighbours: per-user limits", True)):
+        pool = asyncio.Semaphore(args.pool)
+        app = pool_app(pool, args.service_ms / 1000, args.pool_timeout)
+        if per_user:
+            app = AdmissionMiddleware(app, controller(
+                rate=20, burst=40, user_concurrency=8,
+                limit=args.pool, queue=args.pool * 4, timeout=args.pool_timeout / 4,
+            ))
+        started = time.perf_counter()
+        deadline = started + args.seconds
+        noisy = http_scope(token=user_token("noisy"))
+        polite = [http_scope(token=user_token(f"polite-{i}")) for i in range(4)]
+        runs = await asyncio.gather(
+            *(closed_loop(app, noisy, deadline) for _ in range(args.clients)),
+            *(closed_loop(app, scope, deadline, pause=0.2) for scope in polite),
+        )
+        elapsed = time.perf_counter() - started
+        results[f"{name} (others)"] = summarize(
+            [s for run in runs[args.clients:] for s in run], elapsed
+        )
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    results = await overhead(args)
+    results.update(await overload(args))
+    results.update(await noisy_neighbour(args))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per overhead run")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent client loops")
+    parser.add_argument("--pool", type=int, default=15, help="Simulated DB connections")
+    parser.add_argument("--pool-timeout", type=float, default=2.0, help="Simulated pool timeout (s)")
+    parser.add_argument("--service-ms", type=float, default=20.0, help="Time a request holds a connection")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each load run")
+    parser.add_argument("--redis-url", default=None, help="Also measure the Redis backend")
+    args = parser.parse_args()
+    print_table(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
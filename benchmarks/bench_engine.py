@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import Settings
+from app.db.database import Base, build_engine
+from app.holdings import crud
+from app.holdings.schemas import HoldingCreate
+from app.users.models import User
+from benchmarks.common import latency_stats, print_table, save_results
+
+"""
+Database throughput under the old engine setup vs. the settings-driven one.
+
+`legacy` mirrors the previous hard-coded engine: SQL echo on, rollback
+journal, synchronous=FULL, default page cache, no mmap. `tuned` uses the
+defaults from app/config.py (echo off, WAL, synchronous=NORMAL, mmap, 64 MiB
+cache). The workload mixes keyset-paginated reads with single-row inserts.
+
+    python -m benchmarks.bench_engine --ops 4000 --concurrency 16 --write-ratio 0.2
+"""
+
+PROFILES = {
+    "legacy": dict(
+        db_echo=True,
+        sqlite_journal_mode="DELETE",
+        sqlite_synchronous="FULL",
+        sqlite_mmap_size=0,
+        sqlite_cache_size_kib=2000,
+    ),
+    "tuned": {},
+}
+
+
+async def run_profile(
+    name: str, workdir: Path, args: argparse.Namespace
+) -> Dict[str, float]:
+    path = workdir / f"{name}.db"
+    settings = Settings(database_url=f"sqlite+aiosqlite:///{path}", **PROFILES[name])
+    engine = build_engine(settings)
+    if settings.db_echo:
+        # Keep the echo cost (formatting + writing) without flooding the terminal
+        sink = logging.StreamHandler(open(os.devnull, "w"))
+        logging.getLogger("sqlalchemy.engine.Engine").handlers = [sink]
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    rng = random.Random(args.seed)
+    users: List[UUID] = []
+    async with sessions() as db:
+        for i in range(args.users):
+            user = User(email=f"u{i}@example.com", hashed_password="x")
+            db.add(user)
+            await db.flush()
+            users.append(user.id)
+        await db.commit()
+        for user_id in users:
+            await crud.bulk_insert_holdings(db, [
+                HoldingCreate(symbol=f"S{rng.randrange(500)}", quantity=1, purchase_price=10)
+                for _ in range(args.holdings_per_user)
+            ], user_id)
+        await db.commit()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    samples: List[float] = []
+
+    async def op(i: int) -> None:
+        user_id = users[i % len(users)]
+        write = rng.random() < args.write_ratio
+        async with semaphore:
+            started = time.perf_counter()
+            async with sessions() as db:
+                if write:
+                    await crud.create_holding(
+                        db, HoldingCreate(symbol="NEW", quantity=1, purchase_price=1), user_id
+                    )
+                else:
+                    await crud.get_holdings_page(db, user_id, limit=50)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(op(i) for i in range(args.ops)))
+    stats = latency_stats(samples, time.perf_counter() - started)
+    await engine.dispose()
+    logging.getLogger("sqlalchemy.engine.Engine").handlers = []
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--holdings-per-user", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in PROFILES:
+            results[name] = asyncio.run(run_profile(name, Path(workdir), args))
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
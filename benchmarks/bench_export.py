@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import csv
+import io
+import random
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict
+
+from sqlalchemy import insert, select
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import Holding as holding_model
+from app.holdings import crud, export
+from app.holdings.schemas import AssetType
+from benchmarks.common import (
+    Timer,
+    create_bench_user,
+    print_table,
+    save_results,
+    scratch_database,
+    synthetic_symbols,
+)
+
+"""
+Full holdings export throughput and memory.
+
+Seeds `--rows` holdings over `--users` users in a scratch SQLite database,
+then exports all of them with `export.export_holdings` in every format and
+compression (`--chunk-size` rows per chunk), discarding the output. Rows/s
+and output size come from a timed pass; `peak_mb` is the peak of Python
+allocations (tracemalloc) in a second pass. `load all + csv` is the
+`.all()` approach, for comparison: its peak grows with the row count, the
+streaming exports' does not.
+
+    python -m benchmarks.bench_export --rows 2000000 --chunk-size 10000
+"""
+
+VARIANTS = [("csv", "none"), ("csv", "zstd"), ("parquet", "none"), ("parquet", "zstd")]
+
+
+async def seed(rows: int, users: int, seed: int) -> None:
+    rng = random.Random(seed)
+    symbols = synthetic_symbols(500)
+    user_ids = [await create_bench_user(f"export{i}@bench.example.com") for i in range(users)]
+    start = datetime(2015, 1, 2)
+    async with AsyncSessionLocal() as db:
+        for offset in range(0, rows, 10_000):
+            values = []
+            for i in range(offset, min(rows, offset + 10_000)):
+                at = start + timedelta(minutes=i)
+                values.append({
+                    "user_id": user_ids[i % users], "symbol": rng.choice(symbols),
+                    "name": "Synthetic holding", "quantity": round(rng.uniform(1, 100), 4),
+                    "purchase_price": round(rng.uniform(5, 500), 2), "purchase_date": at,
+                    "asset_type": rng.choice([AssetType.STOCK, AssetType.ETF, AssetType.CRYPTO]),
+                    "notes": None, "created_at": at, "updated_at": at,
+                })
+            await db.execute(insert(holding_model.__table__), values)
+        await db.commit()
+
+
+async def streamed(fmt: str, compression: str, chunk_size: int) -> int:
+    size = 0
+    async with AsyncSessionLocal() as db:
+        async for data in export.export_holdings(db, fmt, compression, chunk_size=chunk_size):
+            size += len(data)
+    return size
+
+
+async def load_all_csv() -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(*crud.HOLDING_READ_COLUMNS).order_by(holding_model.id))
+        rows = result.all()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(export.FIELDS)
+    writer.writerows(rows)
+    return len(buffer.getvalue().encode("utf-8"))
+
+
+async def measure(run, rows: int) -> Dict[str, float]:
+    with Timer() as t:
+        size = await run()
+    tracemalloc.start()
+    await run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "rows_per_s": round(rows / t.elapsed),
+        "total_s": round(t.elapsed, 3),
+        "output_mb": round(size / 1e6, 2),
+        "peak_mb": round(peak / 1e6, 1),
+    }
+
+
+async def run(args: argparse.Namespace, workdir: Path) -> Dict[str, Dict[str, float]]:
+    engine = await scratch_database(workdir / "export.db")
+    with Timer() as t:
+        await seed(args.rows, args.users, args.seed)
+    print(f"seeded {args.rows} holdings in {t.elapsed:.1f}s")
+
+    results = {}
+    for fmt, compression in VARIANTS:
+        name = fmt if compression == "none" else f"{fmt} + {compression}"
+        results[name] = await measure(lambda: streamed(fmt, compression, args.chunk_size), args.rows)
+    if args.baseline:
+        results["load all + csv (before)"] = await measure(load_all_csv, args.rows)
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Holdings to seed and export")
+    parser.add_argument("--users", type=int, default=100, help="Users the holdings are spread over")
+    parser.add_argument("--chunk-size", type=int, default=export.DEFAULT_CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument("--no-baseline", dest="baseline", action="store_false",
+                        help="Skip the load-everything comparison (its memory grows with --rows)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, Path(workdir)))
+
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+from app.market.providers.replay import ReplayProvider
+from app.market.store import BarStore
+from benchmarks.common import (
+    latency_stats,
+    print_table,
+    save_results,
+    synthetic_symbols,
+    write_synthetic_replay,
+)
+
+"""
+History queries through the local bar store: cold, warm and incremental.
+
+- cold: empty store, every query goes to the provider
+- warm: the same queries again, served from the memory-mapped store
+- incremental: every range extended by `--extend-days`; only the new days
+  are fetched
+
+    python -m benchmarks.bench_history --symbols 50 --days 2500 --latency-ms 80
+"""
+
+START = datetime(2015, 1, 2)
+
+
+def run_queries(store: BarStore, queries: List[tuple]) -> Dict[str, float]:
+    samples = []
+    calls_before = store.upstream_calls
+    started = time.perf_counter()
+    for symbol, start, end in queries:
+        t0 = time.perf_counter()
+        store.get_bars(symbol, start, end)
+        samples.append(time.perf_counter() - t0)
+    stats = latency_stats(samples, time.perf_counter() - started)
+    for name in [k for k in stats if k.endswith("_ms")]:
+        stats[name[:-3] + "_us"] = round(stats.pop(name) * 1000, 1)
+    stats["upstream_calls"] = store.upstream_calls - calls_before
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--days", type=int, default=2500, help="Bars recorded per symbol")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--extend-days", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    symbols = synthetic_symbols(args.symbols)
+    span = args.days - args.extend_days
+    queries = []
+    for symbol in symbols:
+        first = rng.randrange(0, span // 2)
+        queries.append((symbol, START + timedelta(days=first),
+                        START + timedelta(days=rng.randrange(first + 30, span))))
+    # Repeated queries for ranges inside what each symbol has already loaded
+    repeats = [rng.choice(queries) for _ in range(args.queries)]
+    extended = [(s, a, b + timedelta(days=args.extend_days)) for s, a, b in queries]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        write_synthetic_replay(Path(workdir) / "replay", symbols, days=args.days, seed=args.seed)
+        provider = ReplayProvider(Path(workdir) / "replay", latency_ms=args.latency_ms)
+        store = BarStore(Path(workdir) / "bars", provider=provider)
+        results = {
+            "cold": run_queries(store, queries),
+            "warm": run_queries(store, repeats),
+            "incremental": run_queries(store, extended),
+            "warm (new process)": run_queries(
+                BarStore(Path(workdir) / "bars", provider=provider), repeats
+            ),
+        }
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import io
+import random
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+from app.db.database import AsyncSessionLocal
+from app.holdings import crud, importer
+from app.holdings.schemas import HoldingCreate
+from benchmarks.common import (
+    Timer,
+    create_bench_user,
+    print_table,
+    save_results,
+    scratch_database,
+    synthetic_symbols,
+)
+
+"""
+Bulk import throughput (rows/sec) vs. one create_holding() call per row.
+
+    python -m benchmarks.bench_import --rows 10000 --batch-sizes 100 500 1000 2000
+"""
+
+
+def synthetic_csv(rows: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    symbols = synthetic_symbols(500)
+    lines = ["symbol,name,quantity,purchase_price,asset_type,purchase_date,notes"]
+    for _ in range(rows):
+        lines.append(
+            f"{rng.choice(symbols)},,{rng.uniform(1, 100):.4f},{rng.uniform(5, 500):.2f},"
+            f"stock,2024-01-{rng.randint(1, 28):02d},"
+        )
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def run(args: argparse.Namespace, workdir: Path) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    payload = synthetic_csv(args.rows, args.seed)
+
+    engine = await scratch_database(workdir / "per_row.db")
+    user_id = await create_bench_user()
+    sample = min(args.rows, args.per_row_rows)
+    records = [record for _, record in importer.iter_records(io.BytesIO(payload), "csv")][:sample]
+    holdings = [HoldingCreate.model_validate(r) for r in records]
+    async with AsyncSessionLocal() as db:
+        with Timer() as t:
+            for holding in holdings:
+                await crud.create_holding(db, holding, user_id)
+    results["per-row create_holding"] = {"rows": sample, "seconds": round(t.elapsed, 3),
+                                         "rows_per_s": round(sample / t.elapsed)}
+    await engine.dispose()
+
+    for batch_size in args.batch_sizes:
+        engine = await scratch_database(workdir / f"bulk_{batch_size}.db")
+        user_id = await create_bench_user()
+        async with AsyncSessionLocal() as db:
+            with Timer() as t:
+                outcome = await importer.import_holdings(
+                    db, user_id, io.BytesIO(payload), "csv", batch_size=batch_size
+                )
+        assert outcome.imported == args.rows, outcome.errors[:3]
+        results[f"import batch={batch_size}"] = {"rows": args.rows, "seconds": round(t.elapsed, 3),
+                                                 "rows_per_s": round(args.rows / t.elapsed)}
+        await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--per-row-rows", type=int, default=2_000,
+                        help="Rows used for the (slow) per-row baseline")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 500, 1000, 2000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, Path(workdir)))
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+from app.db.database import AsyncSessionLocal
+from app.holdings import crud
+from app.holdings.schemas import AssetType, HoldingCreate
+from app.insights.llm import StubModel, set_model
+from app.insights.service import insight_service
+from app.main import app
+from app.users.deps import get_jwt_strategy
+from app.users.models import User
+from benchmarks.common import (
+    create_bench_user,
+    latency_stats,
+    print_table,
+    save_results,
+    scratch_database,
+    synthetic_symbols,
+)
+
+"""
+AI insight serving against the local stub model: model calls, time to first
+token and full-reply latency over SSE.
+
+Scenarios:
+
+- cold, identical: `--clients` concurrent requests for the same portfolio
+  with an empty cache (they should share one generation → 1 model call)
+- warm, identical: the same requests again (served from the reply cache → 0 calls)
+- cold, distinct: one request per `--portfolios` different portfolios, all
+  at once (one call each)
+
+    python -m benchmarks.bench_insights --clients 50 --latency 0.5 --token-delay 0.02
+"""
+
+
+async def sse_request(token: str) -> Tuple[float, float]:
+    """
+    Seconds to the first token and to the end of the stream.
+
+    Drives the ASGI app directly: httpx's ASGI transport buffers the whole
+    body, which would hide the time to first token.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "server": ("bench", 80), "client": ("127.0.0.1", 0),
+        "path": "/insights/portfolio", "raw_path": b"/insights/portfolio",
+        "root_path": "", "query_string": b"",
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", b"application/json"),
+            (b"content-length", b"2"),
+            (b"accept", b"text/event-stream"),
+            (b"authorization", f"Bearer {token}".encode()),
+        ],
+    }
+    requested = False
+    first = None
+    started = time.perf_counter()
+
+    async def receive() -> dict:
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"{}", "more_body": False}
+        await asyncio.Event().wait()  # the client never disconnects
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        nonlocal first
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"insight request failed: {message['status']}")
+        chunk = message.get("body", b"")
+        if b"event: error" in chunk:
+            raise RuntimeError("insight generation failed")
+        if first is None and b"event: token" in chunk:
+            first = time.perf_counter() - started
+
+    await app(scope, receive, send)
+    total = time.perf_counter() - started
+    return (total if first is None else first), total
+
+
+async def scenario(model: StubModel, tokens: List[str]) -> Dict[str, float]:
+    calls = model.calls
+    started = time.perf_counter()
+    timings = await asyncio.gather(*(sse_request(token) for token in tokens))
+    elapsed = time.perf_counter() - started
+    ttft = latency_stats([first for first, _ in timings], elapsed)
+    total = latency_stats([whole for _, whole in timings], elapsed)
+    return {
+        "requests": len(tokens),
+        "model_calls": model.calls - calls,
+        "ttft_p50_ms": ttft["p50_ms"],
+        "ttft_p95_ms": ttft["p95_ms"],
+        "reply_p50_ms": total["p50_ms"],
+        "reply_p95_ms": total["p95_ms"],
+    }
+
+
+async def seed_user(index: int, symbols: List[str], rng: random.Random) -> str:
+    user_id = await create_bench_user(f"insight{index}@bench.example.com")
+    async with AsyncSessionLocal() as db:
+        await crud.bulk_insert_holdings(db, [
+            HoldingCreate(
+                symbol=rng.choice(symbols), quantity=rng.randint(1, 100),
+                purchase_price=rng.uniform(5, 500), asset_type=AssetType.STOCK,
+            )
+            for _ in range(20)
+        ], user_id)
+        await db.commit()
+        user = await db.get(User, user_id)
+    return await get_jwt_strategy().write_token(user)
+
+
+async def run(args: argparse.Namespace, workdir: Path) -> Dict[str, Dict[str, float]]:
+    engine = await scratch_database(workdir / "insights.db")
+    model = StubModel(latency_seconds=args.latency, token_delay_seconds=args.token_delay)
+    set_model(model)
+    rng = random.Random(0)
+    symbols = synthetic_symbols(200)
+    tokens = [await seed_user(i, symbols, rng) for i in range(args.portfolios)]
+
+    results: Dict[str, Dict[str, float]] = {}
+    transport = httpx.ASGITransport(app=app)
+    # Resolve every user once (user cache) and build the graph (imports
+    # langgraph) outside the timings
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for token in tokens:
+            response = await client.get(
+                "/holdings/", params={"limit": 1}, headers={"Authorization": f"Bearer {token}"}
+            )
+            response.raise_for_status()
+    await sse_request(tokens[-1])
+    insight_service.cache.clear()
+
+    results["cold, identical"] = await scenario(model, [tokens[0]] * args.clients)
+    results["warm, identical"] = await scenario(model, [tokens[0]] * args.clients)
+    results["cold, distinct"] = await scenario(model, tokens[1:])
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent identical requests")
+    parser.add_argument("--portfolios", type=int, default=20, help="Distinct portfolios")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Stub delay between tokens (s)")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+    args.portfolios = max(args.portfolios, 2)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, Path(workdir)))
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import select
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import LedgerEvent
+from app.holdings.schemas import AssetType
+from app.ledger import compaction, store
+from app.ledger.replay import PositionState, replay
+from benchmarks.common import (
+    Timer,
+    create_bench_user,
+    latency_stats,
+    print_table,
+    save_results,
+    scratch_database,
+    synthetic_symbols,
+)
+
+"""
+Point-in-time positions over a long ledger.
+
+Appends `--events` synthetic events (buys, sells, splits, dividends over
+`--symbols` symbols, one a minute) for one user to a scratch SQLite database,
+then times:
+
+- `compact`: writing every snapshot (`compact_user`, one per
+  `--snapshot-every` events);
+- `snapshot:` `positions_at()` at `--queries` random points in time, i.e.
+  the nearest snapshot plus a replay of at most about `--snapshot-every` events;
+- `full replay:` the same points rebuilt from the first event.
+
+Both paths must agree on every position.
+
+    python -m benchmarks.bench_ledger --events 1000000 --snapshot-every 1000
+"""
+
+START = datetime(2015, 1, 2)
+
+
+def synthetic_events(count: int, symbols: List[str], seed: int) -> List[store.Event]:
+    """
+    Events one minute apart; sells take a share of what is held, and a
+    position with nothing held only buys.
+    """
+    rng = random.Random(seed)
+    held = dict.fromkeys(symbols, 0.0)
+    cost = dict.fromkeys(symbols, 0.0)
+    events = []
+    for i in range(count):
+        symbol = rng.choice(symbols)
+        at = START + timedelta(minutes=i)
+        roll = rng.random()
+        price = rng.uniform(10, 500)
+        if held[symbol] <= 0 or roll < 0.6:
+            quantity = float(rng.randint(1, 100))
+            event = store.buy(symbol, AssetType.STOCK, quantity, price, occurred_at=at)
+            held[symbol] += quantity
+            cost[symbol] += event.cost_basis
+        elif roll < 0.9:
+            quantity = held[symbol] * rng.uniform(0.05, 0.5)
+            taken = cost[symbol] * quantity / held[symbol]
+            event = store.sell(symbol, AssetType.STOCK, quantity, price, taken, occurred_at=at)
+            held[symbol] -= quantity
+            cost[symbol] -= taken
+        elif roll < 0.91:
+            ratio = rng.choice([2.0, 3.0, 0.5])
+            event = store.split(symbol, AssetType.STOCK, ratio, occurred_at=at)
+            held[symbol] *= ratio
+        else:
+            event = store.dividend(symbol, AssetType.STOCK, rng.uniform(1, 50), occurred_at=at)
+        events.append(event)
+    return events
+
+
+async def full_replay(user_id, at: datetime) -> PositionState:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(*store.event_columns())
+            .where(LedgerEvent.user_id == user_id, LedgerEvent.occurred_at <= at)
+            .order_by(LedgerEvent.occurred_at, LedgerEvent.id)
+        )
+        return replay(PositionState.empty(), result.all())
+
+
+def assert_same(a: PositionState, b: PositionState) -> None:
+    assert sorted(a.keys) == sorted(b.keys), (len(a), len(b))
+    order_a = np.argsort([f"{k}" for k in a.keys])
+    order_b = np.argsort([f"{k}" for k in b.keys])
+    for column in ("quantity", "cost_basis", "realized_gain", "dividends"):
+        x, y = getattr(a, column)[order_a], getattr(b, column)[order_b]
+        assert np.allclose(x, y, rtol=1e-6, atol=1e-6), column
+
+
+async def run(args: argparse.Namespace, workdir: Path) -> Dict[str, Dict[str, float]]:
+    engine = await scratch_database(workdir / "ledger.db")
+    user_id = await create_bench_user("ledger@bench.example.com")
+    events = synthetic_events(args.events, synthetic_symbols(args.symbols), args.seed)
+
+    results = {}
+    with Timer() as t:
+        for i in range(0, len(events), 10_000):
+            async with AsyncSessionLocal() as db:
+                await store.append(db, user_id, events[i:i + 10_000])
+                await db.commit()
+    results["append"] = {"events": len(events), "total_s": round(t.elapsed, 3)}
+
+    with Timer() as t:
+        async with AsyncSessionLocal() as db:
+            written = await compaction.compact_user(db, user_id, args.snapshot_every)
+    results["compact"] = {
+        "snapshots": written, "total_s": round(t.elapsed, 3),
+        "events_per_s": round(len(events) / t.elapsed),
+    }
+
+    rng = random.Random(args.seed)
+    points = [START + timedelta(minutes=rng.uniform(0, len(events))) for _ in range(args.queries)]
+    snapshot_samples, full_samples, replayed = [], [], []
+    with Timer() as total:
+        for at in points:
+            async with AsyncSessionLocal() as db:
+                with Timer() as t:
+                    state, _, n = await store.positions_at(db, user_id, at)
+            snapshot_samples.append(t.elapsed)
+            replayed.append(n)
+    results["snapshot: positions_at"] = {
+        **latency_stats(snapshot_samples, total.elapsed), "max_replayed": max(replayed),
+    }
+    for at in points[:args.full_queries]:
+        with Timer() as t:
+            reference = await full_replay(user_id, at)
+        full_samples.append(t.elapsed)
+        async with AsyncSessionLocal() as db:
+            state, _, _ = await store.positions_at(db, user_id, at)
+        assert_same(state, reference)
+    results["full replay"] = latency_stats(full_samples, sum(full_samples))
+    results["full replay"]["speedup_p50"] = round(
+        results["full replay"]["p50_ms"] / results["snapshot: positions_at"]["p50_ms"], 1
+    )
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--events", type=int, default=1_000_000, help="Events in the ledger")
+    parser.add_argument("--symbols", type=int, default=200, help="Symbols the events are spread over")
+    parser.add_argument("--snapshot-every", type=int, default=1000, help="Events per snapshot")
+    parser.add_argument("--queries", type=int, default=200, help="Point-in-time queries with snapshots")
+    parser.add_argument("--full-queries", type=int, default=5, help="Of those, also rebuilt by full replay")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, Path(workdir)))
+
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from app.main import app
+from app.users import manager
+from app.users.passwords import PasswordPool, hash_params
+from app.config import get_settings
+from benchmarks.bench_routes import PASSWORD
+from benchmarks.common import latency_stats, print_table, save_results, scratch_database
+
+"""
+Holdings-read latency while a login storm is running.
+
+Registers `--logins` users, then reads `GET /holdings/?limit=50` back to
+back for `--seconds`: on its own (idle), and again while `--logins`
+concurrent login loops hammer the same worker, once per password hashing
+mode:
+
+- inline: hashing on the event loop (fastapi-users' default behavior)
+- thread: hashing in the bounded password pool
+
+With hashing offloaded the read p95 should stay close to idle.
+
+    python -m benchmarks.bench_login_storm --logins 32 --seconds 10
+"""
+
+
+async def read_latency(client: httpx.AsyncClient, token: str, seconds: float) -> List[float]:
+    samples: List[float] = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get(
+            "/holdings/", params={"limit": 50}, headers={"Authorization": f"Bearer {token}"}
+        )
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def login_storm(client: httpx.AsyncClient, emails: List[str], stop: asyncio.Event) -> int:
+    logins = 0
+
+    async def worker(email: str) -> None:
+        nonlocal logins
+        while not stop.is_set():
+            await client.post("/auth/jwt/login", data={"username": email, "password": PASSWORD})
+            logins += 1
+
+    await asyncio.gather(*(worker(email) for email in emails))
+    return logins
+
+
+async def run(args: argparse.Namespace, workdir: Path) -> Dict[str, Dict[str, float]]:
+    engine = await scratch_database(workdir / "storm.db")
+    params = hash_params(get_settings())
+    results: Dict[str, Dict[str, float]] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        emails = [f"storm{i}@bench.example.com" for i in range(args.logins)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for email in emails:
+                response = await client.post(
+                    "/auth/register", json={"email": email, "password": PASSWORD}
+                )
+                response.raise_for_status()
+        response = await client.post(
+            "/auth/jwt/login", data={"username": emails[0], "password": PASSWORD}
+        )
+        token = response.json()["access_token"]
+
+        samples = await read_latency(client, token, args.seconds)
+        results["idle"] = latency_stats(samples, sum(samples))
+
+        for mode in ("inline", "thread"):
+            manager.password_pool = PasswordPool(
+                params, workers=args.workers, max_queue=args.logins, executor=mode
+            )
+            stop = asyncio.Event()
+            storm = asyncio.create_task(login_storm(client, emails, stop))
+            await asyncio.sleep(0.2)  # let the storm build up
+            started = time.perf_counter()
+            samples = await read_latency(client, token, args.seconds)
+            elapsed = time.perf_counter() - started
+            stop.set()
+            logins = await storm
+            manager.password_pool.shutdown()
+
+            stats = latency_stats(samples, elapsed)
+            stats["logins_per_s"] = round(logins / elapsed, 1)
+            results[f"storm ({mode} hashing)"] = stats
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--logins", type=int, default=32, help="Concurrent login loops")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Read phase duration")
+    parser.add_argument("--workers", type=int, default=get_settings().password_hash_workers)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, Path(workdir)))
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import heapq
+import random
+import tempfile
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import insert
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import HoldingTransaction
+from app.holdings import crud, lots
+from app.holdings.schemas import AssetType, CostBasisMethod, HoldingCreate, TransactionType
+from app.market.providers import set_provider
+from app.market.providers.replay import ReplayProvider
+from benchmarks.common import (
+    Timer,
+    create_bench_user,
+    print_table,
+    save_results,
+    scratch_database,
+    synthetic_symbols,
+    write_synthetic_replay,
+)
+
+"""
+Cost-basis matching over a large lot history.
+
+For each method, `engine_ms` times `match_lots()` on a ledger of `--lots`
+buys spread over `--holdings` holdings, with `--sell-ratio` sells per buy,
+against `loop_ms`, an event-by-event Python loop over per-lot dicts (what
+matching ORM rows one by one amounts to). `ledger_ms` is the row → array
+conversion. With `--db`, the same history is written to a scratch SQLite
+database and `db:` rows time what `GET /holdings/gains` does: loading the
+ledger (`load_ms`) and the whole report with prices (`report_ms`).
+
+    python -m benchmarks.bench_lots --lots 100000 --holdings 200 --db
+"""
+
+Row = Tuple[int, str, float, float, float]
+
+
+def synthetic_history(lot_count: int, holdings: int, sell_ratio: float, seed: int) -> List[Row]:
+    """
+    `(holding, type, quantity, price, fees)` rows grouped by holding and in
+    time order; every sell takes a random share of what is held (a sell with
+    nothing held becomes a buy).
+    """
+    rng = random.Random(seed)
+    per_holding = [lot_count // holdings + (i < lot_count % holdings) for i in range(holdings)]
+    rows: List[Row] = []
+    for group, buys in enumerate(per_holding):
+        held, price = 0.0, rng.uniform(10, 500)
+        sells = int(buys * sell_ratio)
+        events = ["buy"] * buys + ["sell"] * sells
+        rng.shuffle(events)
+        for event in events:
+            price *= rng.uniform(0.97, 1.03)
+            if event == "buy" or held <= 0:
+                quantity = float(rng.randint(1, 100))
+                rows.append((group, "buy", quantity, price, rng.choice([0.0, 1.0])))
+                held += quantity
+            else:
+                quantity = held * rng.uniform(0.05, 0.5)
+                rows.append((group, "sell", quantity, price, 1.0))
+                held -= quantity
+    return rows
+
+
+def loop_match(rows: Sequence[Row], method: CostBasisMethod) -> float:
+    """
+    Reference implementation: one Python object per lot, one step per event.
+    Returns the total realized cost basis.
+    """
+    realized = 0.0
+    group = None
+    for holding, kind, quantity, price, fees in rows:
+        if holding != group:
+            group = holding
+            fifo: deque = deque()
+            stack: List[dict] = []
+            heap: List[tuple] = []
+            total_qty = total_cost = 0.0
+        if kind == "buy":
+            lot = {"quantity": quantity, "unit_cost": (quantity * price + fees) / quantity}
+            fifo.append(lot)
+            stack.append(lot)
+            heapq.heappush(heap, (-lot["unit_cost"], len(heap), lot))
+            total_qty += quantity
+            total_cost += quantity * price + fees
+            continue
+        if method is CostBasisMethod.AVERAGE:
+            cost = total_cost * quantity / total_qty
+            total_qty -= quantity
+            total_cost -= cost
+            realized += cost
+            continue
+        need = quantity
+        while need > 1e-9:
+            if method is CostBasisMethod.FIFO:
+                lot = fifo[0]
+            elif method is CostBasisMethod.LIFO:
+                lot = stack[-1]
+            else:
+                lot = heap[0][2]
+            take = min(lot["quantity"], need)
+            realized += take * lot["unit_cost"]
+            lot["quantity"] -= take
+            need -= take
+            if lot["quantity"] <= 1e-9:
+                if method is CostBasisMethod.FIFO:
+                    fifo.popleft()
+                elif method is CostBasisMethod.LIFO:
+                    stack.pop()
+                else:
+                    heapq.heappop(heap)
+    return realized
+
+
+def bench_engine(rows: Sequence[Row], repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for method in CostBasisMethod:
+        best = dict.fromkeys(["ledger_ms", "engine_ms", "loop_ms"], float("inf"))
+        for _ in range(repeat):
+            with Timer() as t:
+                ledger = lots.LotLedger.from_rows(rows)
+            best["ledger_ms"] = min(best["ledger_ms"], t.elapsed * 1000)
+            with Timer() as t:
+                match = lots.match_lots(ledger, method)
+            best["engine_ms"] = min(best["engine_ms"], t.elapsed * 1000)
+            with Timer() as t:
+                reference = loop_match(rows, method)
+            best["loop_ms"] = min(best["loop_ms"], t.elapsed * 1000)
+
+        realized = float(match.realized_cost.sum())
+        assert abs(realized - reference) <= 1e-6 * max(1.0, abs(reference)), (method, realized, reference)
+        stats = {k: round(v, 3) for k, v in best.items()}
+        stats["speedup"] = round(best["loop_ms"] / best["engine_ms"], 1)
+        results[f"engine: {method.value}"] = stats
+    return results
+
+
+async def bench_database(rows: Sequence[Row], args: argparse.Namespace, workdir: Path) -> Dict[str, Dict[str, float]]:
+    engine = await scratch_database(workdir / "lots.db")
+    symbols = synthetic_symbols(args.holdings)
+    write_synthetic_replay(workdir / "replay", symbols, seed=args.seed)
+    set_provider(ReplayProvider(workdir / "replay"))
+
+    user_id = await create_bench_user("lots@bench.example.com")
+    async with AsyncSessionLocal() as db:
+        holding_ids = await crud.bulk_insert_holdings(db, [
+            HoldingCreate(symbol=symbol, quantity=1, purchase_price=1, asset_type=AssetType.STOCK)
+            for symbol in symbols
+        ], user_id)
+        start = datetime(2015, 1, 2)
+        values = [
+            {
+                "holding_id": holding_ids[group], "user_id": user_id,
+                "type": TransactionType(kind), "quantity": quantity, "price": price, "fees": fees,
+                "executed_at": start + timedelta(minutes=i), "created_at": start,
+            }
+            for i, (group, kind, quantity, price, fees) in enumerate(rows)
+        ]
+        for i in range(0, len(values), 5000):
+            await db.execute(insert(HoldingTransaction.__table__), values[i:i + 5000])
+        await db.commit()
+
+    results = {}
+    for method in CostBasisMethod:
+        best = {"load_ms": float("inf"), "report_ms": float("inf")}
+        for _ in range(args.repeat):
+            async with AsyncSessionLocal() as db:
+                with Timer() as t:
+                    await lots.load_ledger(db, user_id)
+                best["load_ms"] = min(best["load_ms"], t.elapsed * 1000)
+                with Timer() as t:
+                    report = await lots.gains_report(db, user_id, method)
+                best["report_ms"] = min(best["report_ms"], t.elapsed * 1000)
+        assert report.lots == sum(1 for row in rows if row[1] == "buy")
+        results[f"db: {method.value}"] = {k: round(v, 3) for k, v in best.items()}
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--lots", type=int, default=100_000, help="Buy lots in the history")
+    parser.add_argument("--holdings", type=int, default=200, help="Holdings the lots are spread over")
+    parser.add_argument("--sell-ratio", type=float, default=0.1, help="Sells per buy")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", action="store_true", help="Also time loading and reporting from SQLite")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    rows = synthetic_history(args.lots, args.holdings, args.sell_ratio, args.seed)
+    results = bench_engine(rows, args.repeat)
+    if args.db:
+        with tempfile.TemporaryDirectory() as workdir:
+            results.update(asyncio.run(bench_database(rows, args, Path(workdir))))
+
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import Dict, List
+
+from app.market import service
+from app.market.providers import create_provider, set_provider
+from app.market.providers.replay import ReplayProvider
+from benchmarks.common import (
+    latency_stats,
+    print_table,
+    save_results,
+    synthetic_symbols,
+    write_synthetic_replay,
+)
+
+"""
+Price-lookup throughput/latency under concurrent load, per provider.
+
+Every simulated request values a portfolio of `--portfolio` symbols drawn from
+a universe of `--universe` symbols. `--cold` clears the price cache before
+each request so every lookup reaches the provider.
+
+    python -m benchmarks.bench_market --provider replay --latency-ms 80 --concurrency 32
+"""
+
+
+async def run_load(
+    portfolios: List[List[str]], concurrency: int, cold: bool
+) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+
+    async def one(symbols: List[str]) -> None:
+        async with semaphore:
+            if cold:
+                service.price_cache.clear()
+            started = time.perf_counter()
+            await service.get_current_prices(symbols)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in portfolios))
+    return latency_stats(samples, time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--provider", choices=["replay", "yahoo"], action="append")
+    parser.add_argument("--universe", type=int, default=500)
+    parser.add_argument("--portfolio", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cold", action="store_true")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    universe = synthetic_symbols(args.universe)
+    step = max(1, args.universe - args.portfolio)
+    portfolios = [
+        universe[(i * 7) % step:(i * 7) % step + args.portfolio]
+        for i in range(args.requests)
+    ]
+
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as replay_dir:
+        for name in args.provider or ["replay"]:
+            if name == "replay":
+                write_synthetic_replay(replay_dir, universe, seed=args.seed)
+                provider = ReplayProvider(
+                    replay_dir, args.latency_ms, args.jitter_ms, args.error_rate, args.seed
+                )
+            else:
+                provider = create_provider(name)
+            set_provider(provider)
+            service.price_cache.clear()
+
+            stats = asyncio.run(run_load(portfolios, args.concurrency, args.cold))
+            stats["upstream_calls"] = getattr(provider, "calls", "n/a")
+            results[name] = stats
+
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
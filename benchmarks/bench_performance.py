@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.holdings.performance import (
+    SECONDS_PER_DAY,
+    HoldingHistory,
+    PriceMatrix,
+    compute_performance,
+    load_price_matrix,
+)
+from app.holdings.schemas import AssetType
+from app.market import service
+from app.market.providers.replay import ReplayProvider
+from app.market.store import BarStore
+from benchmarks.common import (
+    print_table,
+    save_results,
+    synthetic_symbols,
+    write_synthetic_replay,
+)
+
+"""
+Portfolio performance (TWR/MWR/drawdown) latency at scale.
+
+Builds `--years` of daily bars for `--symbols` symbols, warms the local bar
+store once, then times loading the price matrix from the store and the
+vectorized computation for a portfolio of `--holdings` holdings. Fails
+first if a small traded-then-sold-out history is valued wrong.
+
+    python -m benchmarks.bench_performance --symbols 500 --years 10 --holdings 5000
+"""
+
+START = datetime(2015, 1, 2, tzinfo=timezone.utc)
+
+
+def synthetic_history(symbols: List[str], holdings: int, days: int, seed: int) -> HoldingHistory:
+    rng = random.Random(seed)
+    types = [AssetType.STOCK, AssetType.ETF, AssetType.CRYPTO]
+    rows = [
+        (
+            rng.choice(symbols),
+            round(rng.uniform(1, 100), 4),
+            round(rng.uniform(5, 500), 2),
+            rng.choice(types),
+            START + timedelta(days=rng.randrange(0, days - 1)),
+        )
+        for _ in range(holdings)
+    ]
+    rows.append(("USD", 10_000.0, 1.0, AssetType.CASH, START))
+    return HoldingHistory.from_rows(rows)
+
+
+def check_sold_out() -> None:
+    """
+    Regression check: a holding bought twice and sold out is valued from its
+    trades on every day, and its realized gain stays in the results.
+    """
+    day = lambda n: START + timedelta(days=n)  # noqa: E731
+    history = HoldingHistory.from_rows([
+        ("AAPL", 10.0, 100.0, AssetType.STOCK, day(0)),
+        ("AAPL", 10.0, 150.0, AssetType.STOCK, day(10), 1.0),
+        ("AAPL", -15.0, 200.0, AssetType.STOCK, day(20), 1.0),
+        ("AAPL", -5.0, 210.0, AssetType.STOCK, day(25)),
+    ])
+    first = int(START.timestamp()) // SECONDS_PER_DAY
+    prices = PriceMatrix(["AAPL"], first + np.arange(30), np.full((1, 30), 120.0))
+    result = compute_performance(history, prices)
+    values = dict(zip(result.dates, result.values))
+    assert [values[day(n).date()] for n in (5, 15, 22, 29)] == [1200.0, 2400.0, 600.0, 0.0], values
+    assert result.net_invested == 1000 + 1501 - 2999 - 1050, result.net_invested
+    assert result.by_asset_type[0].pnl == 1548.0, result.by_asset_type
+
+
+async def run(args: argparse.Namespace, workdir: Path) -> Dict[str, Dict[str, float]]:
+    check_sold_out()
+    days = int(args.years * 365)
+    symbols = synthetic_symbols(args.symbols)
+    write_synthetic_replay(workdir / "replay", symbols, days=days, seed=args.seed)
+    service.bar_store = BarStore(workdir / "bars", provider=ReplayProvider(workdir / "replay"))
+    history = synthetic_history(symbols, args.holdings, days, args.seed)
+    end = START + timedelta(days=days)
+
+    started = time.perf_counter()
+    await load_price_matrix(history.priced_symbols(), START, end)
+    cold = time.perf_counter() - started
+
+    load, compute, compute_no_series = [], [], []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        prices = await load_price_matrix(history.priced_symbols(), START, end)
+        t1 = time.perf_counter()
+        compute_performance(history, prices)
+        t2 = time.perf_counter()
+        compute_performance(history, prices, include_series=False)
+        t3 = time.perf_counter()
+        load.append(t1 - t0)
+        compute.append(t2 - t1)
+        compute_no_series.append(t3 - t2)
+
+    def ms(samples: List[float]) -> float:
+        return round(float(np.median(samples)) * 1000, 2)
+
+    shape = {"symbols": args.symbols, "days": days, "holdings": args.holdings}
+    return {
+        "cold load (fills store)": {**shape, "median_ms": round(cold * 1000, 2)},
+        "warm load (price matrix)": {**shape, "median_ms": ms(load)},
+        "compute (with series)": {**shape, "median_ms": ms(compute)},
+        "compute (metrics only)": {**shape, "median_ms": ms(compute_no_series)},
+        "total warm request": {**shape, "median_ms": ms([a + b for a, b in zip(load, compute)])},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--holdings", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, Path(workdir)))
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+from app.db.database import AsyncSessionLocal
+from app.holdings import crud
+from app.holdings.schemas import AssetType, HoldingCreate
+from app.insights.llm import StubModel, set_model
+from app.main import app
+from app.market import service
+from app.market.providers import set_provider
+from app.market.providers.replay import ReplayProvider
+from benchmarks.common import (
+    compare_to_baseline,
+    latency_stats,
+    print_table,
+    save_results,
+    scratch_database,
+    synthetic_symbols,
+    write_synthetic_replay,
+)
+
+"""
+In-process load and latency benchmark for every route in app/main.py.
+
+Drives the ASGI app through httpx's ASGI transport (no network, no server)
+against a fresh SQLite database seeded with `--users` users holding
+`--holdings` holdings each, prices served by the replay provider and
+insights by the stub model (no delay). Every
+route runs `--requests` requests at each `--concurrency` level and reports
+throughput and p50/p95/p99 latency.
+
+    python -m benchmarks.bench_routes --concurrency 1 8 32 --output routes.json
+    python -m benchmarks.bench_routes --save-baseline benchmarks/baseline_routes.json
+    python -m benchmarks.bench_routes --baseline benchmarks/baseline_routes.json
+
+With `--baseline`, results are compared against the stored run and the
+process exits non-zero if any route's p95 or throughput regressed by more
+than `--tolerance`.
+"""
+
+PASSWORD = "bench-password-123"
+IMPORT_ROWS = 10  # holdings per uploaded file
+
+
+@dataclass
+class Context:
+    """
+    Seeded state shared by the scenarios.
+    """
+    tokens: List[str]
+    emails: List[str]
+    holding_ids: List[List[int]]
+    symbols: List[str]
+    rng: random.Random
+    created: List[Tuple[int, int]] = field(default_factory=list)  # (user index, holding id)
+    imported: List[Tuple[int, List[int]]] = field(default_factory=list)  # (user index, holding ids)
+    registered: int = 0
+
+    def auth(self, user: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[user]}"}
+
+
+# A scenario turns (context, request number) into (method, url, httpx kwargs)
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    build: Callable[[Context, int], Request]
+    expect: int = 200
+
+
+def _user(ctx: Context, i: int) -> int:
+    return i % len(ctx.tokens)
+
+
+def _new_holding(ctx: Context) -> Dict[str, Any]:
+    return {
+        "symbol": ctx.rng.choice(ctx.symbols),
+        "quantity": round(ctx.rng.uniform(1, 100), 4),
+        "purchase_price": round(ctx.rng.uniform(5, 500), 2),
+        "asset_type": "stock",
+    }
+
+
+def _register(ctx: Context, i: int) -> Request:
+    ctx.registered += 1
+    email = f"new{ctx.registered}@bench.example.com"
+    return "POST", "/auth/register", {"json": {"email": email, "password": PASSWORD}}
+
+
+def _login(ctx: Context, i: int) -> Request:
+    email = ctx.emails[_user(ctx, i)]
+    return "POST", "/auth/jwt/login", {"data": {"username": email, "password": PASSWORD}}
+
+
+def _me(ctx: Context, i: int) -> Request:
+    return "GET", "/users/me", {"headers": ctx.auth(_user(ctx, i))}
+
+
+def _list(ctx: Context, i: int) -> Request:
+    return "GET", "/holdings/", {"headers": ctx.auth(_user(ctx, i))}
+
+
+def _page(ctx: Context, i: int) -> Request:
+    return "GET", "/holdings/", {"headers": ctx.auth(_user(ctx, i)), "params": {"limit": 100}}
+
+
+def _summary(ctx: Context, i: int) -> Request:
+    return "GET", "/holdings/summary", {"headers": ctx.auth(_user(ctx, i))}
+
+
+def _performance(ctx: Context, i: int) -> Request:
+    return "GET", "/holdings/performance", {"headers": ctx.auth(_user(ctx, i))}
+
+
+def _gains(ctx: Context, i: int) -> Request:
+    return "GET", "/holdings/gains", {"headers": ctx.auth(_user(ctx, i))}
+
+
+def _export(ctx: Context, i: int) -> Request:
+    return "GET", "/holdings/export", {"headers": ctx.auth(_user(ctx, i))}
+
+
+def _get_one(ctx: Context, i: int) -> Request:
+    user = _user(ctx, i)
+    holding_id = ctx.rng.choice(ctx.holding_ids[user])
+    return "GET", f"/holdings/{holding_id}", {"headers": ctx.auth(user)}
+
+
+def _create(ctx: Context, i: int) -> Request:
+    return "POST", "/holdings/", {"headers": ctx.auth(_user(ctx, i)), "json": _new_holding(ctx)}
+
+
+def _import(ctx: Context, i: int) -> Request:
+    rows = ["symbol,quantity,purchase_price,asset_type"] + [
+        "{symbol},{quantity},{purchase_price},{asset_type}".format(**_new_holding(ctx))
+        for _ in range(IMPORT_ROWS)
+    ]
+    upload = ("holdings.csv", "\n".join(rows).encode(), "text/csv")
+    return "POST", "/holdings/import", {"headers": ctx.auth(_user(ctx, i)), "files": {"file": upload}}
+
+
+def _update(ctx: Context, i: int) -> Request:
+    user = _user(ctx, i)
+    holding_id = ctx.rng.choice(ctx.holding_ids[user])
+    body = {"quantity": round(ctx.rng.uniform(1, 100), 4)}
+    return "PUT", f"/holdings/{holding_id}", {"headers": ctx.auth(user), "json": body}
+
+
+def _set_asset_type(ctx: Context, i: int) -> Request:
+    body = {"symbol": ctx.rng.choice(ctx.symbols), "asset_type": ctx.rng.choice(["stock", "etf"])}
+    return "PATCH", "/holdings/bulk/asset-type", {"headers": ctx.auth(_user(ctx, i)), "json": body}
+
+
+def _split(ctx: Context, i: int) -> Request:
+    # Splits and reverse splits alternate, so quantities stay put over a run
+    body = {"symbol": ctx.rng.choice(ctx.symbols), "ratio": 2 if i % 2 == 0 else 0.5}
+    return "POST", "/holdings/bulk/split", {"headers": ctx.auth(_user(ctx, i)), "json": body}
+
+
+def _bulk_delete(ctx: Context, i: int) -> Request:
+    # Deletes holdings made by the import scenario
+    user, ids = ctx.imported.pop()
+    return "POST", "/holdings/bulk/delete", {"headers": ctx.auth(user), "json": {"ids": ids}}
+
+
+def _delete(ctx: Context, i: int) -> Request:
+    # Deletes holdings made by the create scenario, so the seeded set is stable
+    user, holding_id = ctx.created.pop()
+    return "DELETE", f"/holdings/{holding_id}", {"headers": ctx.auth(user)}
+
+
+def _dividend(ctx: Context, i: int) -> Request:
+    body = {"symbol": ctx.rng.choice(ctx.symbols), "amount": round(ctx.rng.uniform(1, 50), 2)}
+    return "POST", "/ledger/dividends", {"headers": ctx.auth(_user(ctx, i)), "json": body}
+
+
+def _ledger_events(ctx: Context, i: int) -> Request:
+    return "GET", "/ledger/events", {"headers": ctx.auth(_user(ctx, i))}
+
+
+def _ledger_positions(ctx: Context, i: int) -> Request:
+    return "GET", "/ledger/positions", {"headers": ctx.auth(_user(ctx, i))}
+
+
+def _insight(ctx: Context, i: int) -> Request:
+    return "POST", "/insights/portfolio", {"headers": ctx.auth(_user(ctx, i)), "json": {}}
+
+
+def _root(ctx: Context, i: int) -> Request:
+    return "GET", "/", {}
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("GET /", _root),
+    Scenario("POST /auth/register", _register, expect=201),
+    Scenario("POST /auth/jwt/login", _login),
+    Scenario("GET /users/me", _me),
+    Scenario("GET /holdings/", _list),
+    Scenario("GET /holdings/?limit=100", _page),
+    Scenario("GET /holdings/{id}", _get_one),
+    Scenario("GET /holdings/summary", _summary),
+    Scenario("GET /holdings/performance", _performance),
+    Scenario("GET /holdings/gains", _gains),
+    Scenario("GET /holdings/export", _export),
+    Scenario("POST /holdings/", _create, expect=201),
+    Scenario("POST /holdings/import", _import),
+    Scenario("PUT /holdings/{id}", _update),
+    Scenario("PATCH /holdings/bulk/asset-type", _set_asset_type),
+    Scenario("POST /holdings/bulk/split", _split),
+    Scenario("POST /holdings/bulk/delete", _bulk_delete),
+    Scenario("DELETE /holdings/{id}", _delete, expect=204),
+    Scenario("POST /ledger/dividends", _dividend, expect=201),
+    Scenario("GET /ledger/events", _ledger_events),
+    Scenario("GET /ledger/positions", _ledger_positions),
+    Scenario("POST /insights/portfolio", _insight),
+]
+
+
+async def seed(client: httpx.AsyncClient, args: argparse.Namespace, symbols: List[str]) -> Context:
+    """
+    Register and log in `--users` users through the API, then bulk-insert holdings.
+    """
+    rng = random.Random(args.seed)
+    emails = [f"user{i}@bench.example.com" for i in range(args.users)]
+    tokens: List[str] = []
+    holding_ids: List[List[int]] = []
+    for email in emails:
+        response = await client.post("/auth/register", json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+        user_id = response.json()["id"]
+        response = await client.post(
+            "/auth/jwt/login", data={"username": email, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        tokens.append(response.json()["access_token"])
+
+        holdings = [
+            HoldingCreate(
+                symbol=rng.choice(symbols),
+                quantity=round(rng.uniform(1, 100), 4),
+                purchase_price=round(rng.uniform(5, 500), 2),
+                asset_type=rng.choice([AssetType.STOCK, AssetType.ETF, AssetType.CRYPTO]),
+            )
+            for _ in range(args.holdings)
+        ]
+        async with AsyncSessionLocal() as db:
+            holding_ids.append(await crud.bulk_insert_holdings(db, holdings, user_id))
+            await db.commit()
+    return Context(tokens, emails, holding_ids, symbols, rng)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, ctx: Context, scenario: Scenario, requests: int, concurrency: int
+) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            method, url, kwargs = scenario.build(ctx, i)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            samples.append(time.perf_counter() - started)
+            if response.status_code != scenario.expect:
+                errors += 1
+            elif scenario.build is _create:
+                ctx.created.append((_user(ctx, i), response.json()["id"]))
+            elif scenario.build is _import:
+                ctx.imported.append((_user(ctx, i), response.json()["created_ids"]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    stats = latency_stats(samples, time.perf_counter() - started)
+    stats["errors"] = errors
+    return stats
+
+
+async def run(args: argparse.Namespace, workdir: Path) -> Dict[str, Dict[str, float]]:
+    engine = await scratch_database(workdir / "routes.db")
+    symbols = synthetic_symbols(args.universe)
+    write_synthetic_replay(workdir / "replay", symbols, seed=args.seed)
+    set_provider(
+        ReplayProvider(workdir / "replay", args.latency_ms, args.jitter_ms, seed=args.seed)
+    )
+    service.price_cache.clear()
+    set_model(StubModel(latency_seconds=0.0, token_delay_seconds=0.0))
+
+    selected = [s for s in SCENARIOS if not args.routes or any(r in s.name for r in args.routes)]
+    results: Dict[str, Dict[str, float]] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # fastapi-users prints on registration; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            ctx = await seed(client, args, symbols)
+            for concurrency in args.concurrency:
+                for scenario in selected:
+                    requests = args.requests
+                    if scenario.build is _delete:
+                        requests = min(requests, len(ctx.created))
+                    elif scenario.build is _bulk_delete:
+                        requests = min(requests, len(ctx.imported))
+                    if requests == 0:
+                        continue
+                    results[f"{scenario.name} @c{concurrency}"] = await run_scenario(
+                        client, ctx, scenario, requests, concurrency
+                    )
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--holdings", type=int, default=200, help="Holdings seeded per user")
+    parser.add_argument("--universe", type=int, default=500, help="Distinct symbols")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route and level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--routes", nargs="*", help="Only routes whose name contains one of these")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated provider latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    parser.add_argument("--baseline", default=None, help="Fail on regressions against this run")
+    parser.add_argument("--save-baseline", default=None, help="Store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed p95/throughput regression as a fraction")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, Path(workdir)))
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+    if args.save_baseline:
+        save_results(args.save_baseline, results)
+
+    failed = [name for name, stats in results.items() if stats["errors"]]
+    if failed:
+        print(f"\n❌ Unexpected status codes: {', '.join(failed)}", file=sys.stderr)
+    regressions: List[str] = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:",
+                  file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+        else:
+            print(f"\n✅ No regressions beyond {args.tolerance:.0%} vs. {args.baseline}")
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
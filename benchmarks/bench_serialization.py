@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import orjson
+import ormsgpack
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import Holding as holding_model
+from app.holdings import crud
+from app.holdings.schemas import AssetType, HoldingCreate, HoldingRead
+from benchmarks.common import (
+    create_bench_user,
+    print_table,
+    save_results,
+    scratch_database,
+    synthetic_symbols,
+)
+
+"""
+Bytes on the wire and CPU per response for a large holdings list.
+
+Compares the previous path (ORM objects → one HoldingRead per row → stdlib
+json, as FastAPI's response_model + JSONResponse did) with the fast path
+(plain column rows encoded directly by orjson or ormsgpack).
+
+    python -m benchmarks.bench_serialization --holdings 10000 --repeat 20
+"""
+
+_read_list = TypeAdapter(List[HoldingRead])
+
+
+async def seed(holdings: int, seed: int):
+    rng = random.Random(seed)
+    symbols = synthetic_symbols(500)
+    user_id = await create_bench_user()
+    rows = [
+        HoldingCreate(
+            symbol=rng.choice(symbols),
+            name="Synthetic holding",
+            quantity=round(rng.uniform(1, 100), 4),
+            purchase_price=round(rng.uniform(5, 500), 2),
+            asset_type=rng.choice([AssetType.STOCK, AssetType.ETF, AssetType.CRYPTO]),
+        )
+        for _ in range(holdings)
+    ]
+    async with AsyncSessionLocal() as db:
+        await crud.bulk_insert_holdings(db, rows, user_id)
+        await db.commit()
+    return user_id
+
+
+async def orm_rows(db, user_id) -> List[holding_model]:
+    result = await db.execute(
+        select(holding_model).where(holding_model.user_id == user_id).order_by(holding_model.id)
+    )
+    return list(result.scalars().all())
+
+
+async def plain_rows(db, user_id) -> List[Dict[str, Any]]:
+    rows, _ = await crud.get_holdings_page(db, user_id)
+    return rows
+
+
+def encode_pydantic_json(rows: List[holding_model]) -> bytes:
+    models = _read_list.validate_python(rows, from_attributes=True)
+    content = _read_list.dump_python(models, mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+VARIANTS: Dict[str, Tuple[Callable, Callable[[Any], bytes]]] = {
+    "orm + HoldingRead + json (before)": (orm_rows, encode_pydantic_json),
+    "rows + orjson": (plain_rows, orjson.dumps),
+    "rows + msgpack": (plain_rows, ormsgpack.packb),
+}
+
+
+async def run(args: argparse.Namespace, workdir: Path) -> Dict[str, Dict[str, float]]:
+    engine = await scratch_database(workdir / "serialization.db")
+    user_id = await seed(args.holdings, args.seed)
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, (load, encode) in VARIANTS.items():
+        load_cpu = encode_cpu = 0.0
+        body = b""
+        for _ in range(args.repeat):
+            # Fresh session per response, like a request
+            async with AsyncSessionLocal() as db:
+                start = time.process_time()
+                rows = await load(db, user_id)
+                loaded = time.process_time()
+                body = encode(rows)
+                encode_cpu += time.process_time() - loaded
+                load_cpu += loaded - start
+        results[name] = {
+            "holdings": args.holdings,
+            "bytes": len(body),
+            "load_cpu_ms": round(load_cpu / args.repeat * 1000, 2),
+            "encode_cpu_ms": round(encode_cpu / args.repeat * 1000, 2),
+            "cpu_ms_per_response": round((load_cpu + encode_cpu) / args.repeat * 1000, 2),
+        }
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--holdings", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, Path(workdir)))
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+"""
+Import-time breakdown and startup time of the API, against a budget.
+
+1. `python -X importtime -c "import app.main"` in a fresh interpreter,
+   summed per package (self time), largest first
+2. wall-clock `import app.main` in fresh interpreters (median of `--repeat`)
+3. the app lifespan startup (schema, connections, provider, cache warmup)
+   against a scratch database with `--users` active users, step by step
+
+Exits 1 when the import or the startup exceeds its budget.
+
+    python -m benchmarks.bench_startup --import-budget-ms 1500 --startup-budget-ms 1000
+    python -m benchmarks.bench_startup --provider yahoo   # include yfinance / pandas (needs network)
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env(workdir: Path, provider: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=f"sqlite+aiosqlite:///{workdir / 'startup.db'}",
+        MARKET_DATA_PROVIDER=provider,
+        MARKET_REPLAY_DIR=str(workdir / "replay"),
+        MARKET_STORE_DIR=str(workdir / "bars"),
+        MARKET_REFRESH_ENABLED="false",
+        STARTUP_CREATE_SCHEMA="true",
+        STARTUP_LOAD_PROVIDER="true",
+    )
+    return env
+
+
+def import_breakdown(env: Dict[str, str], top: int) -> List[Tuple[str, float]]:
+    """
+    Self import time per package (first-party modules per `app.<module>`), in ms.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    totals: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        name = match.group(4)
+        parts = name.split(".")
+        group = ".".join(parts[:2]) if parts[0] == "app" else parts[0]
+        totals[group] = totals.get(group, 0.0) + int(match.group(1)) / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def import_wall_time(env: Dict[str, str], repeat: int) -> float:
+    """
+    Median wall-clock ms to `import app.main` in a fresh interpreter.
+    """
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    samples = [
+        float(subprocess.run(
+            [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1])
+        for _ in range(repeat)
+    ]
+    return statistics.median(samples) * 1000
+
+
+async def measure_startup(args: argparse.Namespace, workdir: Path) -> Dict[str, float]:
+    # Imported here: the environment set up in main() must be in place first
+    from app.db.database import AsyncSessionLocal
+    from app.holdings import crud
+    from app.holdings.schemas import AssetType, HoldingCreate
+    from app.main import app
+    from benchmarks.common import (
+        create_bench_user, scratch_database, synthetic_symbols, write_synthetic_replay,
+    )
+
+    symbols = synthetic_symbols(args.universe)
+    write_synthetic_replay(workdir / "replay", symbols)
+    engine = await scratch_database(workdir / "startup.db")
+
+    # Seed through crud so the snapshot tables (used to pick active users) are filled
+    rng = random.Random(0)
+    for i in range(args.users):
+        user_id = await create_bench_user(f"warm{i}@bench.example.com")
+        async with AsyncSessionLocal() as db:
+            await crud.bulk_insert_holdings(db, [
+                HoldingCreate(
+                    symbol=rng.choice(symbols), quantity=1.0, purchase_price=10.0,
+                    asset_type=AssetType.STOCK,
+                )
+                for _ in range(args.holdings)
+            ], user_id)
+            await db.commit()
+    await engine.dispose()  # start from an empty pool, like a fresh worker
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        total = time.perf_counter() - started
+        steps = {
+            f"startup: {name}": seconds * 1000
+            for name, seconds in app.state.startup.steps.items()
+        }
+    await engine.dispose()
+    return {**steps, "startup (total)": total * 1000}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--provider", default="replay", help="replay or yahoo")
+    parser.add_argument("--users", type=int, default=50, help="Active users to warm")
+    parser.add_argument("--holdings", type=int, default=50, help="Holdings per user")
+    parser.add_argument("--universe", type=int, default=200, help="Distinct symbols")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Packages shown in the breakdown")
+    parser.add_argument("--import-budget-ms", type=float, default=2000.0)
+    parser.add_argument("--startup-budget-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        env = _env(workdir, args.provider)
+        print("Import time by package (self, ms)")
+        for name, ms in import_breakdown(env, args.top):
+            print(f"  {name:<40} {ms:8.1f}")
+        import_ms = import_wall_time(env, args.repeat)
+
+        os.environ.update(env)
+        startup = asyncio.run(measure_startup(args, workdir))
+
+    print()
+    print(f"  {'import app.main (median)':<40} {import_ms:8.1f}")
+    for name, ms in startup.items():
+        print(f"  {name:<40} {ms:8.1f}")
+
+    over = []
+    if import_ms > args.import_budget_ms:
+        over.append(f"import {import_ms:.0f}ms > {args.import_budget_ms:.0f}ms")
+    if startup["startup (total)"] > args.startup_budget_ms:
+        over.append(f"startup {startup['startup (total)']:.0f}ms > {args.startup_budget_ms:.0f}ms")
+    if over:
+        print(f"\n❌ Over budget: {'; '.join(over)}", file=sys.stderr)
+        sys.exit(1)
+    print("\n✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+from app.market.stream import PriceBroadcaster, Subscription
+from benchmarks.common import latency_stats, print_table, save_results, synthetic_symbols
+
+"""
+Live price fan-out: upstream lookups and tick latency vs. subscriber count.
+
+Each simulated client follows `--per-client` symbols drawn from a universe of
+`--symbols`; a fraction of them (`--slow`) never read their mailbox. Per
+tick the broadcaster should look up every distinct symbol exactly once, no
+matter how many clients follow it, and slow clients should not slow ticks.
+
+    python -m benchmarks.bench_stream --clients 1000 --symbols 200 --ticks 20
+"""
+
+
+class CountingFeed:
+    """
+    Stand-in for the market service: random-walk prices, counts lookups.
+    """
+
+    def __init__(self, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.prices: Dict[str, float] = {}
+        self.lookups = 0
+
+    async def __call__(self, symbols: List[str], max_age=None) -> Dict[str, float]:
+        self.lookups += len(symbols)
+        for symbol in symbols:
+            price = self.prices.get(symbol, 100.0)
+            if self.rng.random() < 0.5:
+                price = round(price * (1 + self.rng.gauss(0, 0.002)), 2)
+            self.prices[symbol] = price
+        return {s: self.prices[s] for s in symbols}
+
+
+async def drain(subscription: Subscription, received: List[int]) -> None:
+    while True:
+        batch = await subscription.next_batch()
+        received.append(len(batch))
+
+
+async def run(clients: int, args: argparse.Namespace) -> Dict[str, float]:
+    rng = random.Random(args.seed)
+    universe = synthetic_symbols(args.symbols)
+    feed = CountingFeed(args.seed)
+    broadcaster = PriceBroadcaster(interval=3600, fetch=feed)  # ticks driven below
+
+    received: List[int] = []
+    readers = []
+    for i in range(clients):
+        subscription = broadcaster.open()
+        broadcaster.subscribe(subscription, rng.sample(universe, args.per_client))
+        if i >= clients * args.slow:
+            readers.append(asyncio.create_task(drain(subscription, received)))
+    await broadcaster.stop()
+
+    samples = []
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        t0 = time.perf_counter()
+        await broadcaster.tick()
+        samples.append(time.perf_counter() - t0)
+        await asyncio.sleep(0)  # let readers take their batches
+    elapsed = time.perf_counter() - started
+
+    for task in readers:
+        task.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+
+    stats = latency_stats(samples, elapsed)
+    stats["distinct_symbols"] = len(broadcaster.symbols)
+    stats["lookups_per_tick"] = feed.lookups / args.ticks
+    stats["messages_per_tick"] = round(len(received) / args.ticks, 1)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, action="append", help="Repeatable")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--per-client", type=int, default=20)
+    parser.add_argument("--slow", type=float, default=0.1, help="Fraction of clients that never read")
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    results = {
+        f"{clients} clients": asyncio.run(run(clients, args))
+        for clients in args.clients or [10, 100, 1000]
+    }
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
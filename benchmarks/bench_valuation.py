@@ -0,0 +1,96 @@
+import argparse
+import random
+from collections import defaultdict
+from typing import Dict, List, Mapping, Sequence
+
+from app.holdings.schemas import AssetType
+from app.holdings.valuation import HoldingColumns, aggregate, summarize
+from benchmarks.common import Timer, print_table, save_results, synthetic_symbols
+
+"""
+Vectorized portfolio valuation vs. a per-row Python loop.
+
+`vectorized_ms` times `aggregate()` (the join and every group-by) against
+`loop_ms`, a row-by-row loop computing the same totals. `columns_ms` is the
+row → array conversion and `summary_ms` the full response build.
+
+    python -m benchmarks.bench_valuation --holdings 1000 10000 50000
+"""
+
+
+def synthetic_rows(count: int, distinct: int, seed: int) -> List[tuple]:
+    rng = random.Random(seed)
+    symbols = synthetic_symbols(distinct)
+    types = [t for t in AssetType if t is not AssetType.CASH]
+    return [
+        (rng.choice(symbols), rng.uniform(1, 100), rng.uniform(5, 500), rng.choice(types))
+        for _ in range(count)
+    ]
+
+
+def loop_summary(rows: Sequence[tuple], prices: Mapping[str, float]) -> Dict[str, float]:
+    """
+    Reference implementation: what a client did row by row.
+    """
+    total_cost = total_value = total_pnl = 0.0
+    by_type: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0, 0.0])
+    by_symbol: Dict[str, float] = defaultdict(float)
+    for symbol, quantity, purchase_price, asset_type in rows:
+        cost = quantity * purchase_price
+        total_cost += cost
+        by_type[asset_type.value][0] += cost
+        price = prices.get(symbol.strip().upper())
+        if price is None:
+            continue
+        value = quantity * price
+        total_value += value
+        total_pnl += value - cost
+        by_type[asset_type.value][1] += value
+        by_type[asset_type.value][2] += value - cost
+        by_symbol[symbol] += value
+    weights = {s: v / total_value for s, v in by_symbol.items()} if total_value else {}
+    return {"total_cost": total_cost, "total_value": total_value, "pnl": total_pnl, "n": len(weights)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--holdings", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    prices = {s: rng.uniform(5, 500) for s in synthetic_symbols(args.distinct)}
+    results: Dict[str, Dict[str, float]] = {}
+
+    for count in args.holdings:
+        rows = synthetic_rows(count, args.distinct, args.seed)
+        best = dict.fromkeys(["columns_ms", "vectorized_ms", "summary_ms", "loop_ms"], float("inf"))
+        for _ in range(args.repeat):
+            with Timer() as t:
+                columns = HoldingColumns.from_rows(rows)
+            best["columns_ms"] = min(best["columns_ms"], t.elapsed * 1000)
+            with Timer() as t:
+                aggregate(columns, prices)
+            best["vectorized_ms"] = min(best["vectorized_ms"], t.elapsed * 1000)
+            with Timer() as t:
+                summary = summarize(columns, prices)
+            best["summary_ms"] = min(best["summary_ms"], t.elapsed * 1000)
+            with Timer() as t:
+                reference = loop_summary(rows, prices)
+            best["loop_ms"] = min(best["loop_ms"], t.elapsed * 1000)
+
+        assert abs(summary.total_market_value - round(reference["total_value"], 2)) < 0.05
+        stats = {k: round(v, 3) for k, v in best.items()}
+        stats["speedup"] = round(best["loop_ms"] / best["vectorized_ms"], 2)
+        results[f"{count} holdings"] = stats
+
+    print_table(results)
+    if args.output:
+        save_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
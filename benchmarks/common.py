@@ -0,0 +1,156 @@
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Union
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.market.providers.base import PriceBars
+from app.market.providers.replay import bars_path, write_bars
+
+"""
+Shared helpers for the benchmark scripts: synthetic data and latency stats.
+"""
+
+
+def synthetic_symbols(count: int) -> List[str]:
+    return [f"S{i:05d}" for i in range(count)]
+
+
+def synthetic_bars(days: int, seed: int, start: datetime = datetime(2015, 1, 2)) -> PriceBars:
+    """
+    A seeded geometric random walk of daily OHLCV bars.
+    """
+    rng = np.random.default_rng(seed)
+    first = int(start.replace(tzinfo=timezone.utc).timestamp())
+    timestamp = first + np.arange(days, dtype=np.int64) * 86400
+    close = 20.0 + 180.0 * rng.random() * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+    spread = np.abs(rng.normal(0.0, 0.01, days)) * close
+    return PriceBars(
+        timestamp=timestamp,
+        open=close * (1.0 + rng.normal(0.0, 0.005, days)),
+        high=close + spread,
+        low=close - spread,
+        close=close,
+        volume=rng.integers(1_000, 1_000_000, days).astype(np.float64),
+    )
+
+
+def write_synthetic_replay(
+    data_dir: Union[str, Path], symbols: Iterable[str], days: int = 30, seed: int = 0
+) -> None:
+    """
+    Populate a replay directory with synthetic daily bars for `symbols`.
+    """
+    for offset, symbol in enumerate(symbols):
+        write_bars(bars_path(data_dir, symbol, "1d"), synthetic_bars(days, seed + offset))
+
+
+async def scratch_database(path: Union[str, Path]) -> AsyncEngine:
+    """
+    Point the app's session factory at a fresh SQLite file and create the schema.
+    """
+    from app.config import Settings
+    from app.db.database import AsyncSessionLocal, Base, build_engine
+    import app.db.models  # noqa: F401  (register tables)
+    import app.users.models  # noqa: F401
+
+    Path(path).unlink(missing_ok=True)
+    engine = build_engine(Settings(database_url=f"sqlite+aiosqlite:///{path}"))
+    AsyncSessionLocal.configure(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+async def create_bench_user(email: str = "bench@example.com") -> uuid.UUID:
+    """
+    Insert a user row directly (no password hashing) and return its id.
+    """
+    from app.db.database import AsyncSessionLocal
+    from app.users.models import User
+
+    async with AsyncSessionLocal() as session:
+        user = User(email=email, hashed_password="x", is_active=True)
+        session.add(user)
+        await session.commit()
+        return user.id
+
+
+def latency_stats(samples: Sequence[float], elapsed: float) -> Dict[str, float]:
+    """
+    Throughput and p50/p95/p99/max latency (ms) for per-operation timings in seconds.
+    """
+    if not samples:
+        return {"count": 0, "throughput_per_s": 0.0}
+    ms = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "throughput_per_s": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+class Timer:
+    """
+    Context manager recording wall-clock seconds in `.elapsed`.
+    """
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.elapsed = time.perf_counter() - self.start
+
+
+def save_results(path: Union[str, Path], results: Dict) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, default=str))
+
+
+def print_table(rows: Dict[str, Dict[str, float]]) -> None:
+    """
+    Print `{name: stats}` as an aligned table.
+    """
+    columns = sorted({key for stats in rows.values() for key in stats}, key=str)
+    width = max((len(name) for name in rows), default=4)
+    print(" ".join([f"{'name':<{width}}"] + [f"{c:>16}" for c in columns]))
+    for name, stats in rows.items():
+        print(" ".join([f"{name:<{width}}"] + [f"{stats.get(c, ''):>16}" for c in columns]))
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """
+    Regressions of `results` against `baseline`, as human-readable lines.
+
+    A case regresses when its p95 latency grows, or its throughput drops, by
+    more than `tolerance` (a fraction, e.g. 0.25 = 25%). Cases missing from
+    either side are ignored.
+    """
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before.get("p95_ms") and stats.get("p95_ms", 0.0) > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms → {stats['p95_ms']}ms")
+        if before.get("throughput_per_s") and (
+            stats.get("throughput_per_s", 0.0) < before["throughput_per_s"] * (1 - tolerance)
+        ):
+            regressions.append(
+                f"{name}: throughput {before['throughput_per_s']}/s → {stats['throughput_per_s']}/s"
+            )
+    return regressions
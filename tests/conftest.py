@@ -0,0 +1,67 @@
+import os
+import tempfile
+from pathlib import Path
+
+# Settings are read once, on first use: point the app at throwaway files and
+# offline providers before anything from `app` is imported. Admission control
+# is off, so bursts of test requests are not rate limited (tests/test_admission.py
+# runs its own middleware)
+_WORKDIR = Path(tempfile.mkdtemp(prefix="stockmind-tests-"))
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_WORKDIR / 'stockmind.db'}",
+    "MARKET_DATA_PROVIDER": "replay",
+    "MARKET_REPLAY_DIR": str(_WORKDIR / "replay"),
+    "MARKET_STORE_DIR": str(_WORKDIR / "bars"),
+    "MARKET_REFRESH_ENABLED": "false",
+    "LEDGER_COMPACTION_ENABLED": "false",
+    "INSIGHTS_PROVIDER": "stub",
+    "ADMISSION_ENABLED": "false",
+})
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.db.database import AsyncSessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.users.deps import get_jwt_strategy  # noqa: E402
+from app.users.models import User  # noqa: E402
+from benchmarks.common import create_bench_user, scratch_database, write_synthetic_replay  # noqa: E402
+
+"""
+Shared fixtures: a fresh SQLite database per test, a user, and an API client
+authenticated as that user. Prices come from a synthetic replay recording
+(30 daily bars from 2015-01-02) for `SYMBOLS`.
+"""
+
+SYMBOLS = ["AAPL", "MSFT", "BTC-USD"]
+write_synthetic_replay(_WORKDIR / "replay", SYMBOLS)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def database(tmp_path):
+    engine = await scratch_database(tmp_path / "test.db")
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def user(database) -> User:
+    user_id = await create_bench_user(f"{os.urandom(4).hex()}@example.com")
+    async with AsyncSessionLocal() as db:
+        return await db.get(User, user_id)
+
+
+@pytest.fixture
+async def client(user):
+    token = await get_jwt_strategy().write_token(user)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://test",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+        yield client
@@ -0,0 +1,158 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi_users.jwt import generate_jwt
+
+from app.admission import (
+    ADMISSION_REJECTED, AUDIENCE, AdmissionController, AdmissionMiddleware, ConcurrencyLimiter,
+    MemoryBackend, create_admission_controller,
+)
+from app.config import get_settings
+
+pytestmark = pytest.mark.anyio
+
+SECRET = "admission-test-secret"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class BlockingApp:
+    """
+    Answers 200 at once, except `/slow`, which waits for `release` to be set.
+    """
+
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+        self.started = 0
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["path"] == "/slow":
+            self.started += 1
+            await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def build(
+    rate=0.0, burst=1, user_concurrent=0, limit=10, max_queue=10, timeout=1.0, clock=None,
+    exempt=frozenset({"/"}),
+):
+    inner = BlockingApp()
+    backend = MemoryBackend(rate, burst, user_concurrent, clock=clock or Clock())
+    controller = AdmissionController(
+        backend, ConcurrencyLimiter(limit, max_queue, timeout), SECRET, exempt_paths=exempt
+    )
+    app = AdmissionMiddleware(inner, controller)
+    return inner, controller, httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def bearer(subject: str) -> dict:
+    token = generate_jwt({"sub": subject, "aud": AUDIENCE}, SECRET, 60)
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def wait_until(condition) -> None:
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("condition not reached")
+
+
+async def test_rate_limit_returns_429_with_retry_after_per_user():
+    clock = Clock()
+    _, _, client = build(rate=0.25, burst=2, clock=clock)
+    rejected = ADMISSION_REJECTED.value(reason="rate_limited")
+    async with client:
+        alice, bob = bearer("alice"), bearer("bob")
+        assert [(await client.get("/fast", headers=alice)).status_code for _ in range(2)] == [200, 200]
+
+        response = await client.get("/fast", headers=alice)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "4"
+        assert response.json() == {"detail": "Too many requests, slow down."}
+
+        # Another user, and anonymous clients (keyed by IP), have their own buckets
+        assert (await client.get("/fast", headers=bob)).status_code == 200
+        assert (await client.get("/fast")).status_code == 200
+        # A forged token counts against the client IP, not the user it names
+        forged = generate_jwt({"sub": "bob", "aud": AUDIENCE}, "wrong-secret", 60)
+        assert (await client.get("/fast", headers={"Authorization": f"Bearer {forged}"})).status_code == 200
+        assert (await client.get("/fast")).status_code == 429
+
+        # The exempt path is never limited
+        assert (await client.get("/", headers=alice)).status_code == 200
+
+        clock.now += 4
+        assert (await client.get("/fast", headers=alice)).status_code == 200
+    assert ADMISSION_REJECTED.value(reason="rate_limited") == rejected + 2
+
+
+async def test_user_concurrency_cap_returns_429():
+    inner, _, client = build(user_concurrent=2)
+    async with client:
+        alice = bearer("alice")
+        slow = [asyncio.create_task(client.get("/slow", headers=alice)) for _ in range(2)]
+        await wait_until(lambda: inner.started == 2)
+
+        response = await client.get("/fast", headers=alice)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        assert (await client.get("/fast", headers=bearer("bob"))).status_code == 200
+        assert (await client.get("/", headers=alice)).status_code == 200
+
+        inner.release.set()
+        assert [r.status_code for r in await asyncio.gather(*slow)] == [200, 200]
+        # Slots are given back once the responses are sent
+        assert (await client.get("/fast", headers=alice)).status_code == 200
+
+
+async def test_overload_queues_then_sheds_with_503():
+    inner, controller, client = build(limit=1, max_queue=1, timeout=0.1)
+    async with client:
+        running = asyncio.create_task(client.get("/slow"))
+        await wait_until(lambda: inner.started == 1)
+
+        # One request may wait; it gives up after the queue timeout
+        queued = asyncio.create_task(client.get("/fast"))
+        await wait_until(lambda: controller.limiter.queue_depth == 1)
+        full = await client.get("/fast")
+        assert full.status_code == 503
+        assert full.headers["Retry-After"] == "1"
+        timed_out = await queued
+        assert timed_out.status_code == 503
+        assert timed_out.headers["Retry-After"] == "1"
+        assert controller.limiter.queue_depth == 0
+
+        # The health check gets through while the server is saturated
+        assert (await client.get("/")).status_code == 200
+
+        # A waiter is handed the slot as soon as the running request responds
+        queued = asyncio.create_task(client.get("/fast"))
+        await wait_until(lambda: controller.limiter.queue_depth == 1)
+        inner.release.set()
+        assert (await running).status_code == 200
+        assert (await queued).status_code == 200
+    assert controller.limiter.in_flight == 0
+
+
+async def test_root_is_exempt_in_the_default_settings():
+    settings = get_settings().model_copy(update={
+        "admission_user_rate_per_second": 0.001, "admission_user_burst": 1,
+    })
+    controller = create_admission_controller(settings)
+    assert "/" in controller.exempt_paths
+
+    inner = BlockingApp()
+    app = AdmissionMiddleware(inner, controller)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/fast")).status_code == 200
+        assert (await client.get("/fast")).status_code == 429
+        assert [(await client.get("/")).status_code for _ in range(5)] == [200] * 5
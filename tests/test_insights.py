@@ -0,0 +1,146 @@
+import asyncio
+from typing import AsyncIterator, List, Tuple
+
+import orjson
+import pytest
+
+from app.insights.llm import InsightModel, InsightModelError, StubModel, set_model
+from app.insights.pipeline import PortfolioPosition, run_insight
+from app.insights.service import insight_service
+
+pytestmark = pytest.mark.anyio
+
+POSITIONS = [
+    PortfolioPosition("etf", "VTI", 5.0, 1000.0),
+    PortfolioPosition("stock", "AAPL", 10.0, 1500.0),
+]
+
+
+class FailingModel(InsightModel):
+    name = "failing"
+
+    async def stream(self, messages) -> AsyncIterator[str]:
+        raise InsightModelError("model unavailable")
+        yield  # pragma: no cover (makes this an async generator)
+
+
+def use_model(model: InsightModel) -> InsightModel:
+    set_model(model)
+    insight_service.cache.clear()
+    return model
+
+
+@pytest.fixture(autouse=True)
+def restore_service():
+    timeout = insight_service.timeout
+    yield
+    insight_service.timeout = timeout
+    insight_service.cache.clear()
+
+
+async def collect(positions=POSITIONS, question=None) -> Tuple[List[str], dict]:
+    tokens = []
+    async for kind, value in run_insight(positions, question):
+        if kind == "token":
+            tokens.append(value)
+        else:
+            state = value
+    return tokens, state
+
+
+async def test_identical_portfolio_and_prompt_is_served_from_cache():
+    model = use_model(StubModel(latency_seconds=0, token_delay_seconds=0))
+
+    first_tokens, first = await collect()
+    second_tokens, second = await collect()
+
+    assert (first["source"], second["source"]) == ("generated", "cached")
+    assert model.calls == 1
+    assert second["text"] == first["text"] == "".join(first_tokens)
+    assert second["key"] == first["key"]
+
+    # Same positions in another order normalize to the same prompt
+    _, reordered = await collect(list(reversed(POSITIONS)))
+    assert reordered["source"] == "cached"
+    assert model.calls == 1
+
+    _, other = await collect(question="What is my largest position?")
+    assert other["source"] == "generated"
+    assert model.calls == 2
+
+
+async def test_concurrent_identical_requests_share_one_generation():
+    model = use_model(StubModel(latency_seconds=0.05, token_delay_seconds=0.005))
+
+    leader = asyncio.create_task(collect())
+    while not insight_service._inflight:
+        await asyncio.sleep(0)
+    [generation] = insight_service._inflight.values()
+    while not generation.tokens:
+        await asyncio.sleep(0.005)
+    # Followers join after the first tokens were produced
+    followers = [asyncio.create_task(collect()) for _ in range(4)]
+    assert len(insight_service._inflight) == 1
+    results = await asyncio.gather(leader, *followers)
+
+    assert model.calls == 1
+    assert [state["source"] for _, state in results] == ["generated"] + ["shared"] * 4
+    leader_tokens, leader_state = results[0]
+    assert len(leader_tokens) > 1
+    for tokens, state in results[1:]:
+        assert tokens == leader_tokens
+        assert state["text"] == leader_state["text"]
+    assert insight_service._inflight == {}
+
+
+async def _sse_events(client) -> List[Tuple[str, dict]]:
+    response = await client.post(
+        "/insights/portfolio", json={}, headers={"Accept": "text/event-stream"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name.removeprefix("event: "), orjson.loads(data.removeprefix("data: "))))
+    return events
+
+
+async def _add_holding(client) -> None:
+    response = await client.post(
+        "/holdings/", json={"symbol": "AAPL", "quantity": 10, "purchase_price": 150}
+    )
+    assert response.status_code == 201
+
+
+async def test_sse_streams_tokens_then_done(client):
+    use_model(StubModel(latency_seconds=0, token_delay_seconds=0))
+    await _add_holding(client)
+
+    events = await _sse_events(client)
+
+    names = [name for name, _ in events]
+    assert names[-1] == "done"
+    assert set(names[:-1]) == {"token"} and len(names) > 2
+    assert events[-1][1]["source"] == "generated"
+    assert events[-1][1]["model"] == "stub"
+
+
+async def test_sse_reports_timeout_as_error_event(client):
+    use_model(StubModel(latency_seconds=5, token_delay_seconds=0))
+    insight_service.timeout = 0.05
+    await _add_holding(client)
+
+    events = await _sse_events(client)
+
+    assert [name for name, _ in events] == ["error"]
+    assert "timed out" in events[0][1]["detail"]
+
+
+async def test_sse_reports_model_failure_as_error_event(client):
+    use_model(FailingModel())
+    await _add_holding(client)
+
+    events = await _sse_events(client)
+
+    assert events == [("error", {"detail": "model unavailable"})]
@@ -0,0 +1,257 @@
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import LedgerEventType, LedgerSnapshot
+from app.holdings.schemas import AssetType
+from app.ledger import compaction, store
+from app.ledger.replay import PositionState, replay
+from benchmarks.common import create_bench_user
+
+START = datetime(2015, 1, 2)
+EVERY = 10
+
+
+def synthetic_events(count: int, seed: int, start: datetime = START) -> List[store.Event]:
+    """
+    Buys, sells, splits and dividends over a few positions, in time order.
+    About a third of the events share their instant with the one before.
+    """
+    rng = random.Random(seed)
+    keys = [("AAPL", AssetType.STOCK), ("VTI", AssetType.ETF), ("BTC-USD", AssetType.CRYPTO)]
+    held: Dict[Tuple[str, AssetType], List[float]] = {key: [0.0, 0.0] for key in keys}
+    at = start
+    events = []
+    for _ in range(count):
+        if rng.random() > 0.3:
+            at += timedelta(minutes=rng.randint(1, 120))
+        symbol, asset_type = key = rng.choice(keys)
+        quantity, cost = held[key]
+        roll = rng.random()
+        if quantity <= 0 or roll < 0.5:
+            units = float(rng.randint(1, 100))
+            event = store.buy(symbol, asset_type, units, rng.uniform(10, 500), fees=1.0, occurred_at=at)
+            held[key] = [quantity + units, cost + event.cost_basis]
+        elif roll < 0.8:
+            # Now and then the whole position is sold
+            units = quantity if roll < 0.55 else quantity * rng.uniform(0.1, 0.9)
+            taken = cost * units / quantity
+            event = store.sell(symbol, asset_type, units, rng.uniform(10, 500), taken, occurred_at=at)
+            held[key] = [quantity - units, cost - taken]
+        elif roll < 0.9:
+            ratio = rng.choice([2.0, 3.0, 0.5])
+            event = store.split(symbol, asset_type, ratio, occurred_at=at)
+            held[key] = [quantity * ratio, cost]
+        else:
+            event = store.dividend(symbol, asset_type, rng.uniform(1, 50), occurred_at=at)
+        events.append(event)
+    return events
+
+
+def naive_positions(events: List[store.Event]) -> Dict[Tuple[str, str], List[float]]:
+    """
+    Reference replay: one event at a time, then closed positions dropped.
+    """
+    positions: Dict[Tuple[str, str], List[float]] = {}
+    for event in events:
+        position = positions.setdefault((event.asset_type.value, event.symbol), [0.0] * 4)
+        if event.type is LedgerEventType.SPLIT:
+            position[0] *= event.ratio
+            continue
+        position[0] += event.quantity
+        position[1] += event.cost_basis
+        if event.type is LedgerEventType.SELL:
+            position[2] += event.amount + event.cost_basis
+        elif event.type is LedgerEventType.DIVIDEND:
+            position[3] += event.amount
+    return {
+        key: [0.0, 0.0, *position[2:]] if abs(position[0]) <= 1e-9 else position
+        for key, position in positions.items()
+        if abs(position[0]) > 1e-9 or position[2] or position[3]
+    }
+
+
+def as_dict(state: PositionState) -> Dict[Tuple[str, str], List[float]]:
+    return {
+        key: list(values)
+        for key, *values in zip(
+            state.keys, state.quantity.tolist(), state.cost_basis.tolist(),
+            state.realized_gain.tolist(), state.dividends.tolist(),
+        )
+    }
+
+
+def assert_same_positions(state: PositionState, expected: Dict[Tuple[str, str], List[float]]) -> None:
+    actual = as_dict(state)
+    assert sorted(actual) == sorted(expected)
+    for key, values in expected.items():
+        assert actual[key] == pytest.approx(values, rel=1e-9, abs=1e-6), key
+
+
+def rows(events: List[store.Event]) -> List[tuple]:
+    return [
+        (e.type, e.asset_type, e.symbol, e.quantity, e.cost_basis, e.amount, e.ratio) for e in events
+    ]
+
+
+def in_time_order(events: List[store.Event]) -> List[store.Event]:
+    # Same order as a replay: by time, then by when they were appended
+    return sorted(events, key=lambda event: event.occurred_at)
+
+
+def test_replay_matches_a_naive_loop_however_it_is_chunked():
+    events = synthetic_events(300, seed=1)
+    assert any(e.type is LedgerEventType.SPLIT for e in events)
+
+    assert_same_positions(replay(PositionState.empty(), rows(events)), naive_positions(events))
+
+    state = PositionState.empty()
+    for cut in range(0, len(events), 37):
+        # Through a snapshot's JSON, as compaction stores it
+        state = PositionState.from_json(replay(state, rows(events[cut:cut + 37])).to_json())
+    assert_same_positions(state, naive_positions(events))
+
+
+def test_split_scales_units_held_at_its_time_only():
+    events = [
+        store.buy("AAPL", AssetType.STOCK, 10, 100, occurred_at=START),
+        store.split("AAPL", AssetType.STOCK, 4.0, occurred_at=START + timedelta(days=1)),
+        store.buy("AAPL", AssetType.STOCK, 5, 30, occurred_at=START + timedelta(days=2)),
+        store.split("AAPL", AssetType.STOCK, 0.5, occurred_at=START + timedelta(days=3)),
+    ]
+    state = replay(PositionState.empty(), rows(events))
+
+    assert as_dict(state) == {("stock", "AAPL"): [pytest.approx(22.5), 1150.0, 0.0, 0.0]}
+
+
+async def _append(user_id, events: List[store.Event]) -> None:
+    async with AsyncSessionLocal() as db:
+        await store.append(db, user_id, events)
+        await db.commit()
+
+
+async def _snapshot_times(user_id) -> List[datetime]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(LedgerSnapshot.as_of).where(LedgerSnapshot.user_id == user_id).order_by(LedgerSnapshot.as_of)
+        )
+        return list(result.scalars().all())
+
+
+async def _check_points_in_time(user_id, events: List[store.Event], points: List[datetime]) -> List[int]:
+    """
+    Positions from the nearest snapshot equal a full replay at every point.
+    Returns how many events each query replayed.
+    """
+    ordered = in_time_order(events)
+    replayed = []
+    for at in points:
+        async with AsyncSessionLocal() as db:
+            state, _, n = await store.positions_at(db, user_id, at)
+        assert_same_positions(state, naive_positions([e for e in ordered if e.occurred_at <= at]))
+        replayed.append(n)
+    return replayed
+
+
+def _points(events: List[store.Event], rng: random.Random) -> List[datetime]:
+    first, last = events[0].occurred_at, events[-1].occurred_at
+    span = (last - first).total_seconds()
+    return (
+        [first - timedelta(minutes=1), last + timedelta(days=1)]
+        + [e.occurred_at for e in rng.sample(events, 20)]  # exactly at an event (and its ties)
+        + [first + timedelta(seconds=rng.uniform(0, span)) for _ in range(40)]
+    )
+
+
+@pytest.mark.anyio
+async def test_snapshot_plus_tail_equals_full_replay(database):
+    user_id = await create_bench_user("ledger@example.com")
+    events = synthetic_events(400, seed=2)
+    await _append(user_id, events)
+
+    async with AsyncSessionLocal() as db:
+        written = await compaction.compact_user(db, user_id, EVERY)
+    assert written >= 400 // EVERY - 5
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(LedgerSnapshot.as_of, LedgerSnapshot.event_count)
+            .where(LedgerSnapshot.user_id == user_id)
+        )
+        snapshots = result.all()
+    assert len(snapshots) == written
+    # A snapshot covers every event up to its time: it never splits events
+    # that happened at the same instant
+    for as_of, event_count in snapshots:
+        assert event_count == sum(1 for e in events if e.occurred_at <= as_of)
+
+    rng = random.Random(3)
+    replayed = await _check_points_in_time(user_id, events, _points(events, rng))
+    ties = max(sum(1 for e in events if e.occurred_at == at) for at in {e.occurred_at for e in events})
+    assert max(replayed) <= EVERY + ties
+
+
+@pytest.mark.anyio
+async def test_backdated_events_drop_later_snapshots_and_stay_consistent(database):
+    user_id = await create_bench_user("backdated@example.com")
+    events = synthetic_events(300, seed=4)
+    await _append(user_id, events)
+    async with AsyncSessionLocal() as db:
+        await compaction.compact_user(db, user_id, EVERY)
+    before = await _snapshot_times(user_id)
+
+    # Dated between two snapshots: the later ones no longer hold
+    backdated_at = before[len(before) // 2] + timedelta(seconds=1)
+    backdated = [
+        store.buy("AAPL", AssetType.STOCK, 1000, 5, occurred_at=backdated_at),
+        store.split("VTI", AssetType.ETF, 2.0, occurred_at=backdated_at),
+        store.dividend("MSFT", AssetType.STOCK, 12.5, occurred_at=backdated_at),
+    ]
+    await _append(user_id, backdated)
+    after = await _snapshot_times(user_id)
+    assert after == [as_of for as_of in before if as_of < backdated_at]
+
+    everything = events + backdated
+    rng = random.Random(5)
+    points = _points(everything, rng) + [backdated_at, backdated_at - timedelta(seconds=1)]
+    await _check_points_in_time(user_id, everything, points)
+
+    # Compaction writes the dropped snapshots again, including the new events
+    async with AsyncSessionLocal() as db:
+        assert await compaction.compact_user(db, user_id, EVERY) > 0
+    assert len(await _snapshot_times(user_id)) >= len(before)
+    await _check_points_in_time(user_id, everything, points)
+
+
+@pytest.mark.anyio
+async def test_compaction_discards_snapshots_made_stale_by_a_concurrent_append(database, monkeypatch):
+    user_id = await create_bench_user("conflict@example.com")
+    events = synthetic_events(100, seed=6)
+    await _append(user_id, events)
+    backdated = store.buy("AAPL", AssetType.STOCK, 7, 10, occurred_at=events[10].occurred_at)
+
+    async with AsyncSessionLocal() as db:
+        flush = db.flush
+
+        async def append_then_flush(*args, **kwargs):
+            # Another request appends a backdated event after compaction
+            # read the ledger, before its snapshots are written
+            await _append(user_id, [backdated])
+            await flush(*args, **kwargs)
+
+        monkeypatch.setattr(db, "flush", append_then_flush)
+        conflicts = compaction.COMPACTION_CONFLICTS.value()
+        assert await compaction.compact_user(db, user_id, EVERY) == 0
+    assert compaction.COMPACTION_CONFLICTS.value() == conflicts + 1
+    assert await _snapshot_times(user_id) == []
+
+    async with AsyncSessionLocal() as db:
+        assert await compaction.compact_user(db, user_id, EVERY) > 0
+        count = (await db.execute(
+            select(func.max(LedgerSnapshot.event_count)).where(LedgerSnapshot.user_id == user_id)
+        )).scalar_one()
+    assert count > 0
+    await _check_points_in_time(user_id, events + [backdated], _points(events, random.Random(7)))
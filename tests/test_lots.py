@@ -0,0 +1,190 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.holdings.lots import LotLedger, OversoldError, match_lots
+from app.holdings.schemas import CostBasisMethod
+
+FIFO, LIFO, HIFO, AVERAGE = (
+    CostBasisMethod.FIFO, CostBasisMethod.LIFO, CostBasisMethod.HIFO, CostBasisMethod.AVERAGE,
+)
+
+# (group, type, quantity, price, fees) in time order. Lot unit costs:
+# 10, 20.2 (a fee of 2 on 10 units), 15, then 25 before the second sell
+TRADES = [
+    (0, "buy", 10, 10, 0),
+    (0, "buy", 10, 20, 2),
+    (0, "buy", 5, 15, 0),
+    (0, "sell", 12, 30, 1),
+    (0, "buy", 4, 25, 0),
+    (0, "sell", 6, 30, 0),
+]
+
+
+def naive_match(rows, method):
+    """
+    Reference matcher: one Python list of open lots per holding.
+    Returns each sell's cost and each lot's remaining units.
+    """
+    sell_costs, lots = [], []
+    open_lots = {}
+    for group, kind, quantity, price, fees in rows:
+        held = open_lots.setdefault(group, [])
+        if kind == "buy":
+            lot = [len(lots), quantity, (quantity * price + fees) / quantity]
+            lots.append(lot)
+            held.append(lot)
+            continue
+        if method is AVERAGE:
+            units = sum(lot[1] for lot in held)
+            cost = sum(lot[1] * lot[2] for lot in held) * quantity / units
+            for lot in held:
+                lot[1] -= lot[1] * quantity / units
+            sell_costs.append(cost)
+            continue
+        if method is FIFO:
+            order = sorted(held, key=lambda lot: lot[0])
+        elif method is LIFO:
+            order = sorted(held, key=lambda lot: -lot[0])
+        else:
+            order = sorted(held, key=lambda lot: (-lot[2], lot[0]))
+        need, cost = quantity, 0.0
+        for lot in order:
+            if need <= 1e-12:
+                break
+            taken = min(lot[1], need)
+            lot[1] -= taken
+            cost += taken * lot[2]
+            need -= taken
+        sell_costs.append(cost)
+    return sell_costs, [lot[1] for lot in lots]
+
+
+@pytest.mark.parametrize("method, sell_cost, lot_remaining", [
+    (FIFO, [140.4, 121.2], [0, 2, 5, 4]),
+    (LIFO, [216.4, 140.4], [10, 1, 0, 0]),
+    (HIFO, [232.0, 130.0], [10, 0, 1, 0]),
+    (AVERAGE, [180.96, (377 - 180.96 + 100) * 6 / 17], None),
+])
+def test_each_method_consumes_lots_partially(method, sell_cost, lot_remaining):
+    ledger = LotLedger.from_rows(TRADES)
+    match = match_lots(ledger, method)
+
+    assert match.sell_cost == pytest.approx(sell_cost)
+    if lot_remaining is None:
+        assert match.lot_remaining is None
+    else:
+        assert match.lot_remaining == pytest.approx(lot_remaining)
+        assert match.open_lots(ledger).tolist() == [sum(1 for units in lot_remaining if units)]
+    assert match.remaining_quantity == pytest.approx([11])
+    assert match.remaining_cost == pytest.approx([477 - sum(sell_cost)])
+    assert match.proceeds == pytest.approx([12 * 30 - 1 + 6 * 30])
+    assert match.realized_gain == pytest.approx([539 - sum(sell_cost)])
+    assert (match.lot_count.tolist(), match.sell_count.tolist()) == ([4], [2])
+
+
+def test_hifo_breaks_equal_price_ties_oldest_first():
+    ledger = LotLedger.from_rows([
+        (0, "buy", 5, 10, 0),
+        (0, "buy", 5, 8, 0),
+        (0, "buy", 5, 10, 0),
+        (0, "sell", 7, 12, 0),
+        (0, "sell", 4, 12, 0),
+    ])
+    match = match_lots(ledger, HIFO)
+
+    # 5 + 2 of the two 10s (oldest first), then the other 3 at 10 and 1 at 8
+    assert match.sell_cost == pytest.approx([70, 38])
+    assert match.lot_remaining == pytest.approx([0, 4, 0])
+
+
+@pytest.mark.parametrize("method", list(CostBasisMethod))
+def test_selling_more_than_held_raises(method):
+    ledger = LotLedger.from_rows([
+        (0, "buy", 5, 10, 0),
+        (0, "sell", 5, 12, 0),
+        (1, "buy", 5, 10, 0),
+        (1, "sell", 3, 12, 0),
+        (1, "buy", 1, 10, 0),
+        (1, "sell", 3, 12, 0),
+    ])
+    assert match_lots(ledger, method).remaining_quantity.tolist() == [0, 0]
+
+    oversold = LotLedger.from_rows([
+        (0, "buy", 5, 10, 0),
+        (1, "buy", 5, 10, 0),
+        (1, "sell", 3, 12, 0),
+        # Held at the time: 2. A later buy does not make up for it
+        (1, "sell", 3, 12, 0),
+        (1, "buy", 10, 10, 0),
+    ])
+    with pytest.raises(OversoldError) as info:
+        match_lots(oversold, method)
+    assert (info.value.group, info.value.position) == (1, 2)
+
+
+@pytest.mark.parametrize("method", list(CostBasisMethod))
+def test_selling_everything_in_fractions_leaves_nothing(method):
+    ledger = LotLedger.from_rows([(0, "buy", 0.1, 10, 0)] * 3 + [(0, "sell", 0.3, 12, 0)])
+    match = match_lots(ledger, method)
+
+    assert match.remaining_quantity == pytest.approx([0])
+    assert match.remaining_cost == pytest.approx([0])
+    assert match.sell_cost == pytest.approx([3.0])
+
+
+@pytest.mark.parametrize("method", list(CostBasisMethod))
+def test_matches_a_naive_loop_over_random_ledgers(method):
+    rng = random.Random(7)
+    rows = []
+    for group in range(40):
+        held = 0.0
+        for _ in range(rng.randint(1, 30)):
+            if held > 0 and rng.random() < 0.4:
+                quantity = round(held * rng.uniform(0.1, 1.0), 4)
+                held -= quantity
+                rows.append((group, "sell", quantity, rng.choice([10, 20, 30]), rng.choice([0, 1])))
+            else:
+                quantity = rng.randint(1, 50)
+                held += quantity
+                # Few distinct prices, so HIFO sees ties
+                rows.append((group, "buy", quantity, rng.choice([10, 20, 30]), rng.choice([0, 1])))
+
+    match = match_lots(LotLedger.from_rows(rows), method)
+    expected_cost, expected_remaining = naive_match(rows, method)
+
+    assert match.sell_cost == pytest.approx(expected_cost, abs=1e-6)
+    if method is not AVERAGE:
+        assert match.lot_remaining == pytest.approx(expected_remaining, abs=1e-6)
+    assert np.all(match.remaining_quantity >= 0)
+
+
+@pytest.mark.anyio
+async def test_recording_a_sell_resets_holding_cost_from_lots(client):
+    response = await client.post("/holdings/", json={
+        "symbol": "AAPL", "quantity": 10, "purchase_price": 100,
+        "purchase_date": "2015-01-02T00:00:00",
+    })
+    holding_id = response.json()["id"]
+    trades = [
+        {"type": "buy", "quantity": 10, "price": 200, "executed_at": "2015-01-10T00:00:00"},
+        {"type": "sell", "quantity": 15, "price": 300, "executed_at": "2015-01-20T00:00:00"},
+    ]
+    for trade in trades:
+        response = await client.post(f"/holdings/{holding_id}/transactions", json=trade)
+        assert response.status_code == 201, response.text
+
+    holding = (await client.get(f"/holdings/{holding_id}")).json()
+    # FIFO: the opening lot of 10 and 5 of the later lot are gone
+    assert holding["quantity"] == pytest.approx(5)
+    assert holding["purchase_price"] == pytest.approx(200)
+
+    gains = (await client.get("/holdings/gains", params={"method": "lifo"})).json()
+    assert gains["realized_gain"] == pytest.approx(15 * 300 - (10 * 200 + 5 * 100))
+
+    response = await client.post(
+        f"/holdings/{holding_id}/transactions",
+        json={"type": "sell", "quantity": 6, "price": 300, "executed_at": "2015-01-25T00:00:00"},
+    )
+    assert response.status_code == 400
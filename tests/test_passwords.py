@@ -0,0 +1,134 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi_users.schemas import BaseUserUpdate
+from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from pwdlib.hashers.bcrypt import BcryptHasher
+
+from app.db.database import AsyncSessionLocal
+from app.main import app
+from app.users.manager import UserManager
+from app.users.models import User
+from app.users.passwords import PasswordPool, PasswordPoolBusy
+
+pytestmark = pytest.mark.anyio
+
+# Cheap hash costs: argon2 time 1, 64 KiB, 1 lane; bcrypt 4 rounds
+PARAMS = (1, 64, 1, 4)
+
+
+def wait_for(params, event: threading.Event) -> str:
+    event.wait(5)
+    return "done"
+
+
+async def test_cancelled_wait_keeps_the_slot_until_the_job_ends():
+    pool = PasswordPool(PARAMS, workers=1, max_queue=1)
+    running, queued = threading.Event(), threading.Event()
+    try:
+        first = asyncio.create_task(pool._submit(wait_for, running))
+        second = asyncio.create_task(pool._submit(wait_for, queued))
+        await asyncio.sleep(0.05)
+        assert pool._pending == 2
+        with pytest.raises(PasswordPoolBusy):
+            await pool.hash("password")
+
+        # Not started yet: cancelling the wait cancels the job and frees its slot
+        second.cancel()
+        await asyncio.sleep(0.05)
+        assert pool._pending == 1
+
+        # Already running: the job goes on, and keeps its slot until it ends
+        first.cancel()
+        await asyncio.sleep(0.05)
+        assert pool._pending == 1
+        running.set()
+        await asyncio.sleep(0.05)
+        assert pool._pending == 0
+        assert await pool.verify_and_update("password", await pool.hash("password")) == (True, None)
+    finally:
+        running.set()
+        queued.set()
+        pool.shutdown()
+
+
+@pytest.fixture
+def pooled_only(monkeypatch):
+    """
+    Fail any hash made inline instead of in the pool.
+    """
+    def inline(self):
+        raise AssertionError("password hashed on the event loop")
+
+    monkeypatch.setattr(PasswordPool, "helper", property(inline))
+
+
+async def test_auth_flows_hash_in_the_pool(database, pooled_only, monkeypatch):
+    tokens = []
+
+    async def remember_token(self, user, token, request=None):
+        tokens.append(token)
+
+    monkeypatch.setattr(UserManager, "on_after_forgot_password", remember_token)
+    email, password = "pooled@example.com", "first-password"
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        async def login(username: str, secret: str) -> httpx.Response:
+            return await client.post("/auth/jwt/login", data={"username": username, "password": secret})
+
+        response = await client.post("/auth/register", json={"email": email, "password": password})
+        assert response.status_code == 201
+        assert (await login(email, password)).status_code == 200
+        assert (await login(email, "wrong-password")).status_code == 400
+        assert (await login("nobody@example.com", password)).status_code == 400
+
+        response = await client.post("/auth/forgot-password", json={"email": email})
+        assert response.status_code == 202 and len(tokens) == 1
+        response = await client.post(
+            "/auth/reset-password", json={"token": tokens[0], "password": "second-password"}
+        )
+        assert response.status_code == 200
+        assert (await login(email, password)).status_code == 400
+        assert (await login(email, "second-password")).status_code == 200
+
+        # The token's password fingerprint no longer matches
+        response = await client.post(
+            "/auth/reset-password", json={"token": tokens[0], "password": "third-password"}
+        )
+        assert response.status_code == 400
+
+    # No route changes a password in place (PATCH /users/me takes UserRead),
+    # so update through the manager
+    async with AsyncSessionLocal() as db:
+        manager = UserManager(SQLAlchemyUserDatabase(db, User))
+        user = await manager.get_by_email(email)
+        await manager.update(BaseUserUpdate(password="third-password"), user)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/auth/jwt/login", data={"username": email, "password": "third-password"}
+        )
+    assert response.status_code == 200
+
+
+async def test_login_upgrades_legacy_hashes(database):
+    async with AsyncSessionLocal() as db:
+        db.add(User(
+            email="legacy@example.com", hashed_password=BcryptHasher(rounds=4).hash("old-password"),
+            is_active=True,
+        ))
+        await db.commit()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/auth/jwt/login", data={"username": "legacy@example.com", "password": "old-password"}
+        )
+    assert response.status_code == 200
+
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(
+            User.__table__.select().where(User.email == "legacy@example.com")
+        )).one()
+    assert user.hashed_password.startswith("$argon2")
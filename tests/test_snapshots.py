@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from app.db.database import AsyncSessionLocal
+from app.holdings import crud
+from app.holdings.schemas import HoldingCreate
+from app.holdings.snapshots import verify_snapshots
+from benchmarks.common import create_bench_user
+
+pytestmark = pytest.mark.anyio
+
+
+async def assert_no_drift(user_id=None) -> None:
+    async with AsyncSessionLocal() as db:
+        assert await verify_snapshots(db, user_id) == []
+
+
+async def create(client, symbol, quantity, price, asset_type="stock") -> int:
+    response = await client.post("/holdings/", json={
+        "symbol": symbol, "quantity": quantity, "purchase_price": price,
+        "asset_type": asset_type, "purchase_date": "2015-01-02T00:00:00",
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def test_single_holding_writes_keep_snapshots_in_sync(client, user):
+    first = await create(client, "AAPL", 10, 150)
+    second = await create(client, "AAPL", 5, 120)
+    await create(client, "BTC-USD", 0.5, 30000, "crypto")
+    await assert_no_drift(user.id)
+
+    # Fields the snapshots track, one at a time and together
+    for change in (
+        {"quantity": 12},
+        {"purchase_price": 155.5},
+        {"symbol": "MSFT"},
+        {"asset_type": "etf"},
+        {"symbol": "AAPL", "asset_type": "stock", "quantity": 3, "purchase_price": 99},
+        {"notes": "long term"},
+    ):
+        response = await client.put(f"/holdings/{first}", json=change)
+        assert response.status_code == 200, response.text
+        await assert_no_drift(user.id)
+
+    response = await client.post(
+        f"/holdings/{second}/transactions",
+        json={"type": "sell", "quantity": 2, "price": 130, "executed_at": "2015-01-10T00:00:00"},
+    )
+    assert response.status_code == 201, response.text
+    await assert_no_drift(user.id)
+
+    assert (await client.delete(f"/holdings/{first}")).status_code == 204
+    assert (await client.delete(f"/holdings/{second}")).status_code == 204
+    await assert_no_drift(user.id)
+
+
+async def test_bulk_writes_keep_snapshots_in_sync(client, user):
+    csv = "symbol,quantity,purchase_price,asset_type\n" + "".join(
+        f"{symbol},{quantity},{price},{asset_type}\n"
+        for symbol, quantity, price, asset_type in [
+            ("AAPL", 10, 150, "stock"), ("aapl", 4, 160, "stock"), ("MSFT", 3, 300, "stock"),
+            ("VTI", 8, 200, "etf"), ("BTC-USD", 0.25, 40000, "crypto"), ("BAD", -1, 1, "stock"),
+        ]
+    )
+    response = await client.post("/holdings/import", files={"file": ("holdings.csv", csv, "text/csv")})
+    assert response.status_code == 200, response.text
+    ids = response.json()["created_ids"]
+    assert len(ids) == 5
+    await assert_no_drift(user.id)
+
+    for path, method, body in [
+        ("/holdings/bulk/split", "post", {"symbol": "aapl", "ratio": 4}),
+        ("/holdings/bulk/split", "post", {"symbol": "MSFT", "ratio": 0.1}),
+        ("/holdings/bulk/asset-type", "patch", {"symbol": "AAPL", "asset_type": "etf"}),
+        ("/holdings/bulk/delete", "post", {"ids": ids[2:4] + [10**9]}),
+        ("/holdings/bulk/delete", "post", {"ids": ids}),
+    ]:
+        response = await client.request(method, path, json=body)
+        assert response.status_code == 200, response.text
+        await assert_no_drift(user.id)
+
+
+async def test_random_writes_keep_snapshots_in_sync(client, user):
+    # Another user's holdings must not leak into this user's totals
+    other = await create_bench_user("other@example.com")
+    async with AsyncSessionLocal() as db:
+        await crud.create_holding(db, HoldingCreate(symbol="AAPL", quantity=7, purchase_price=90), other)
+
+    rng = random.Random(11)
+    symbols = ["AAPL", "MSFT", "VTI"]
+    ids = []
+    for _ in range(60):
+        roll = rng.random()
+        if not ids or roll < 0.4:
+            ids.append(await create(
+                client, rng.choice(symbols), rng.randint(1, 50), rng.uniform(10, 500),
+                rng.choice(["stock", "etf"]),
+            ))
+        elif roll < 0.7:
+            change = rng.choice([
+                {"quantity": rng.randint(1, 50)},
+                {"purchase_price": rng.uniform(10, 500)},
+                {"symbol": rng.choice(symbols)},
+                {"asset_type": rng.choice(["stock", "etf", "crypto"])},
+            ])
+            response = await client.put(f"/holdings/{rng.choice(ids)}", json=change)
+            assert response.status_code == 200, response.text
+        elif roll < 0.85:
+            holding_id = ids.pop(rng.randrange(len(ids)))
+            assert (await client.delete(f"/holdings/{holding_id}")).status_code == 204
+        else:
+            response = await client.post(
+                "/holdings/bulk/split", json={"symbol": rng.choice(symbols), "ratio": rng.choice([2, 0.5])}
+            )
+            assert response.status_code == 200, response.text
+        await assert_no_drift(user.id)
+    await assert_no_drift()
@@ -0,0 +1,153 @@
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.market.providers.base import MarketDataProvider, PriceBars, ProviderError, to_epoch
+from app.market.store import BarStore
+
+DAY = 86400
+START = to_epoch(datetime(2015, 1, 2))
+NOW = START + 365 * DAY
+
+
+def day(n: int) -> datetime:
+    return datetime.fromtimestamp(START + n * DAY, tz=timezone.utc)
+
+
+def bars_for(timestamps, close=None) -> PriceBars:
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    close = (timestamps - START) / DAY + 100.0 if close is None else np.asarray(close, dtype=np.float64)
+    return PriceBars(timestamps, close - 1, close + 1, close - 2, close, np.full(len(timestamps), 1e6))
+
+
+class RecordingProvider(MarketDataProvider):
+    """
+    One bar a day at midnight UTC, closing at 100 + days since START.
+    """
+    name = "recording"
+
+    def __init__(self) -> None:
+        self.calls = []
+        self.fail = False
+
+    def fetch_latest(self, symbols):
+        return {}
+
+    def fetch_bars(self, symbol, start, end, interval="1d"):
+        lo, hi = to_epoch(start), to_epoch(end)
+        self.calls.append((symbol, (lo - START) // DAY, (hi - START) // DAY))
+        if self.fail:
+            raise ProviderError("upstream down")
+        first = lo + (-lo) % DAY
+        return bars_for(range(first, hi, DAY))
+
+
+@pytest.fixture
+def provider():
+    return RecordingProvider()
+
+
+@pytest.fixture
+def store(tmp_path, provider):
+    return BarStore(tmp_path, provider=provider, clock=lambda: NOW)
+
+
+def assert_days(bars: PriceBars, first: int, last: int) -> None:
+    expected = bars_for(range(START + first * DAY, START + last * DAY, DAY))
+    for field in PriceBars.FIELDS:
+        np.testing.assert_array_equal(getattr(bars, field), getattr(expected, field))
+
+
+def meta(store: BarStore, symbol: str) -> dict:
+    return json.loads((store.root / "1d" / symbol / "meta.json").read_text())
+
+
+def test_round_trip_fetches_only_the_gaps(store, provider, tmp_path):
+    assert_days(store.get_bars("AAPL", day(10), day(20)), 10, 20)
+    assert provider.calls == [("AAPL", 10, 20)]
+
+    # Covered: served from the mapped files
+    assert_days(store.get_bars("AAPL", day(12), day(18)), 12, 18)
+    assert provider.calls == [("AAPL", 10, 20)]
+
+    # Only the parts on either side are fetched
+    assert_days(store.get_bars("AAPL", day(0), day(30)), 0, 30)
+    assert provider.calls[1:] == [("AAPL", 0, 10), ("AAPL", 20, 30)]
+    assert meta(store, "AAPL")["rows"] == 30
+    assert meta(store, "AAPL")["coverage"] == [[START, START + 30 * DAY]]
+
+    # A second store over the same directory (another process) reads the same bars
+    other = BarStore(tmp_path, provider=RecordingProvider(), clock=lambda: NOW)
+    assert_days(other.get_bars("AAPL", day(5), day(25)), 5, 25)
+    assert other.provider.calls == []
+    assert other.upstream_calls == 0
+    assert store.upstream_calls == 3
+
+
+def test_backfill_writes_a_new_generation_and_old_views_stay_valid(store, provider):
+    later = store.get_bars("AAPL", day(10), day(20))
+    assert meta(store, "AAPL")["generation"] == 0
+
+    store.get_bars("AAPL", day(0), day(10))
+    assert meta(store, "AAPL")["generation"] == 1
+    directory = store.root / "1d" / "AAPL"
+    assert sorted(path.name for path in directory.glob("close.*")) == ["close.1.f8"]
+    # Views handed out before the merge still read the old mapping
+    assert_days(later, 10, 20)
+    assert_days(store.read("AAPL", START, START + 20 * DAY), 0, 20)
+
+
+def test_revised_bars_replace_older_ones(store):
+    store.write("AAPL", bars_for([START, START + DAY]), covered=(START, START + 2 * DAY))
+    store.write("AAPL", bars_for([START + DAY], close=[50.0]))
+
+    bars = store.read("AAPL", START, START + 2 * DAY)
+    assert bars.timestamp.tolist() == [START, START + DAY]
+    assert bars.close.tolist() == [100.0, 50.0]
+
+
+def test_readers_see_only_published_rows(store):
+    store.get_bars("AAPL", day(0), day(5))
+    directory = store.root / "1d" / "AAPL"
+    # A writer that died after appending, before publishing meta.json
+    with open(directory / "close.0.f8", "ab") as handle:
+        handle.write(np.array([999.0]).tobytes())
+    with open(directory / "timestamp.0.i8", "ab") as handle:
+        handle.write(np.array([START + 5 * DAY], dtype=np.int64).tobytes())
+
+    fresh = BarStore(store.root, provider=store.provider, clock=lambda: NOW)
+    assert_days(fresh.read("AAPL", START, NOW), 0, 5)
+    assert not list(directory.glob("meta.json.*"))
+
+    # The next append overwrites the unpublished tail
+    assert_days(fresh.get_bars("AAPL", day(0), day(8)), 0, 8)
+
+
+def test_failed_fetch_records_nothing(store, provider):
+    store.get_bars("AAPL", day(0), day(5))
+    provider.fail = True
+    with pytest.raises(ProviderError):
+        store.get_bars("AAPL", day(0), day(10))
+    assert meta(store, "AAPL")["coverage"] == [[START, START + 5 * DAY]]
+
+    provider.fail = False
+    assert_days(store.get_bars("AAPL", day(0), day(10)), 0, 10)
+    assert provider.calls[-1] == ("AAPL", 5, 10)
+
+
+def test_recent_tail_is_refetched_after_refresh_seconds(tmp_path, provider):
+    now = [START + 10 * DAY]
+    store = BarStore(tmp_path, provider=provider, refresh_seconds=600, clock=lambda: now[0])
+    store.get_bars("AAPL", day(0), day(30))
+    assert provider.calls == [("AAPL", 0, 10)]
+
+    now[0] += 300
+    store.get_bars("AAPL", day(0), day(30))
+    assert len(provider.calls) == 1
+
+    now[0] += DAY
+    # Bars for days 10 and 11 exist by now; the fetch starts where coverage ended
+    assert_days(store.get_bars("AAPL", day(0), day(30)), 0, 12)
+    assert provider.calls[-1] == ("AAPL", 10, 11)